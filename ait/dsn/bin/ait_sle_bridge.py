@@ -40,7 +40,7 @@ def process_pdu(raf_mngr):
             continue
 
         log.info('Empty {}'.format(raf_mngr._data_queue.empty()))
-        pdu = raf_mngr._data_queue.get()
+        pdu, _ = raf_mngr._data_queue.get()
 
         try:
             decoded_pdu, remainder = raf_mngr.decode(pdu)
@@ -22,6 +22,7 @@ import datetime as dt
 import time
 
 import ait.dsn.sle
+ait.dsn.sle.monkey_patch()
 
 # CLTU pulls parameters from config file by default
 cltu_mngr = ait.dsn.sle.CLTU()
@@ -41,6 +41,7 @@
 import time
 
 import ait.dsn.sle
+ait.dsn.sle.monkey_patch()
 
 cltu_mngr = ait.dsn.sle.CLTU(
     hostnames=['atb-ocio-sspsim.jpl.nasa.gov'],
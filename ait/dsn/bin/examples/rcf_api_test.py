@@ -55,6 +55,7 @@ import datetime as dt
 import time
 
 import ait.dsn.sle
+ait.dsn.sle.monkey_patch()
 
 # runtime parameters will override config file defaults
 rcf_mngr = ait.dsn.sle.RCF(
@@ -12,6 +12,59 @@
 # or other export authority as may be required before exporting such
 # information to foreign countries or providing access to foreign persons.
 
-from raf import RAF
-from rcf import RCF
-from cltu import CLTU
+''' SLE Transfer Services
+
+:func:`RAF`, :func:`RCF` and :func:`CLTU` create the service interfaces
+and import each service module (and the ASN.1 specification it depends
+on) the first time they are called. Tools that only need one service do
+not pay the start-up cost of the others. The interface classes
+themselves are in :mod:`ait.dsn.sle.raf`, :mod:`ait.dsn.sle.rcf` and
+:mod:`ait.dsn.sle.cltu`.
+
+Importing this package does not patch the standard library. Scripts that
+rely on blocking standard library calls (such as :func:`time.sleep`)
+yielding to the SLE greenlets should call :func:`monkey_patch` before
+doing any other work.
+'''
+
+__all__ = ['RAF', 'RCF', 'CLTU', 'monkey_patch']
+
+
+def RAF(*args, **kwargs):
+    ''' Create a :class:`ait.dsn.sle.raf.RAF` interface
+
+    The arguments are passed to the class. :mod:`ait.dsn.sle.raf` is
+    imported on the first call.
+    '''
+    import raf
+    return raf.RAF(*args, **kwargs)
+
+
+def RCF(*args, **kwargs):
+    ''' Create a :class:`ait.dsn.sle.rcf.RCF` interface
+
+    The arguments are passed to the class. :mod:`ait.dsn.sle.rcf` is
+    imported on the first call.
+    '''
+    import rcf
+    return rcf.RCF(*args, **kwargs)
+
+
+def CLTU(*args, **kwargs):
+    ''' Create a :class:`ait.dsn.sle.cltu.CLTU` interface
+
+    The arguments are passed to the class. :mod:`ait.dsn.sle.cltu` is
+    imported on the first call.
+    '''
+    import cltu
+    return cltu.CLTU(*args, **kwargs)
+
+
+def monkey_patch():
+    ''' Patch the standard library for cooperative use with gevent
+
+    This is a thin wrapper around :func:`gevent.monkey.patch_all` and
+    should be called as early as possible in the process.
+    '''
+    import gevent.monkey
+    gevent.monkey.patch_all()
@@ -0,0 +1,270 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' asyncio SLE Engine
+
+The ait.dsn.sle.aio module provides an asyncio based transport for the SLE
+interfaces as an alternative to the default gevent greenlets. It is used
+by passing ``engine='asyncio'`` (and optionally ``loop``) when creating a
+RAF, RCF or CLTU instance, or by setting ``dsn.sle.engine`` in the config.
+Handlers are added with :meth:`ait.dsn.sle.common.SLE.add_handler` exactly
+as they are for the gevent engine.
+
+Like the rest of ait.dsn.sle the module runs on Python 2.7, where the
+`trollius` backport provides the asyncio API. Coroutines are driven with
+the loop's ``run_until_complete`` rather than ``await``.
+
+Example::
+
+    loop = trollius.get_event_loop()
+    raf = ait.dsn.sle.RAF(engine='asyncio', loop=loop)
+    loop.run_until_complete(raf.connect())
+
+    bound = ait.dsn.sle.aio.wait_for_pdu(raf, 'RafBindReturn')
+    raf.bind()
+    loop.run_until_complete(bound)
+
+Classes:
+    SLEProtocol: An asyncio.Protocol which frames the TML messages
+        received from the provider and hands complete PDUs to the
+        interface for decoding and dispatch.
+
+    AsyncioEngine: Drives the connection, writes and heartbeats of an
+        SLE interface from an asyncio event loop.
+
+Functions:
+    wait_for_pdu: Return a future for the next PDU received for an event.
+'''
+
+import errno
+import socket
+import struct
+import time
+
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+import ait.core.log
+
+import common
+
+TML_HEADER = struct.Struct('!II')
+
+
+class SLEProtocol(asyncio.Protocol):
+    ''' Frame TML messages received from the provider
+
+    Complete SLE PDUs are passed to the interface to be decoded and
+    dispatched to its handlers as soon as they are received. Heartbeat
+    messages only update the engine's receive time.
+    '''
+    def __init__(self, engine):
+        self._engine = engine
+        self._buffer = bytearray()
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._engine._connection_made(transport)
+
+    def data_received(self, data):
+        self._engine._last_recv = self._engine._loop.time()
+        self._engine._handler._pdu_received = time.time()
+
+        buf = self._buffer
+        buf.extend(data)
+        process_pdu = self._engine._handler._process_pdu
+
+        offset = 0
+        while len(buf) - offset >= TML_HEADER.size:
+            msg_type, body_len = TML_HEADER.unpack_from(buf, offset)
+
+            if msg_type == common.TML_SLE_TYPE:
+                end = offset + TML_HEADER.size + body_len
+                if len(buf) < end:
+                    break
+
+                process_pdu(bytes(buf[offset + TML_HEADER.size:end]))
+                offset = end
+            elif msg_type == common.TML_CONTEXT_HEARTBEAT_TYPE and body_len == 0:
+                offset += TML_HEADER.size
+            else:
+                ait.core.log.error(
+                    'Received PDU with unexpected header. '
+                    'Unable to parse data further. Closing connection.'
+                )
+                self._transport.close()
+                return
+
+        if offset:
+            del buf[:offset]
+
+    def connection_lost(self, exc):
+        self._engine._connection_lost(exc)
+
+
+class AsyncioEngine(object):
+    ''' Drive an SLE interface from an asyncio event loop
+
+    The engine replaces the gevent connection and data processing
+    greenlets. Received PDUs are decoded and dispatched from the event
+    loop, outbound data is written through the asyncio transport and
+    heartbeats are sent from a timer. If nothing is received from the
+    provider for ``heartbeat * deadfactor`` seconds the connection is
+    treated as dead and closed. A heartbeat interval of 0 turns off both
+    heartbeats and dead link detection.
+    '''
+    def __init__(self, handler, loop=None):
+        self._handler = handler
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._transport = None
+        self._heartbeat_timer = None
+        self._last_recv = None
+
+    def connect(self):
+        ''' Connect to the first reachable provider hostname
+
+        Returns:
+            A future which completes once the connection is made and the
+            context message has been sent. If no hostname can be reached
+            the future's exception is set.
+        '''
+        future = asyncio.Future(loop=self._loop)
+        self._try_connect(list(self._handler._hostnames), future)
+        return future
+
+    def call_later(self, delay, callback):
+        ''' Schedule callback on the event loop after delay seconds '''
+        return self._loop.call_later(delay, callback)
+
+    def write(self, buffers):
+        ''' Write a list of buffers to the provider '''
+        if self._transport is None:
+            raise socket.error(errno.ENOTCONN, 'Not connected to DSN')
+
+        self._transport.writelines(buffers)
+
+    def close(self):
+        ''' Stop heartbeats and close the connection '''
+        self._cancel_heartbeat()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def _try_connect(self, hostnames, future):
+        ''''''
+        if not hostnames:
+            ait.core.log.error('Connection failure with DSN. Aborting ...')
+            future.set_exception(
+                Exception('Unable to connect to DSN through any provided hostnames.')
+            )
+            return
+
+        hostname = hostnames.pop(0)
+        task = self._loop.create_task(self._loop.create_connection(
+            lambda: SLEProtocol(self), hostname, self._handler._port
+        ))
+        task.add_done_callback(
+            lambda t: self._connect_done(t, hostname, hostnames, future)
+        )
+
+    def _connect_done(self, task, hostname, hostnames, future):
+        ''''''
+        if task.cancelled() or task.exception() is not None:
+            ait.core.log.info('Failed to connect to DSN at {}. Trying next hostname.'.format(hostname))
+            self._try_connect(hostnames, future)
+            return
+
+        ait.core.log.info('Connection to DSN successful through {}.'.format(hostname))
+
+        try:
+            self._handler._send_context_message()
+        except socket.error as e:
+            future.set_exception(e)
+            return
+
+        self._schedule_heartbeat()
+        future.set_result(None)
+
+    def _connection_made(self, transport):
+        ''''''
+        self._transport = transport
+        self._last_recv = self._loop.time()
+
+    def _connection_lost(self, exc):
+        ''''''
+        if exc is not None:
+            ait.core.log.error('Socket connection lost to DSN: {}'.format(exc))
+        self._cancel_heartbeat()
+        self._transport = None
+
+    def _schedule_heartbeat(self):
+        ''''''
+        if self._handler._heartbeat <= 0:
+            return
+        self._heartbeat_timer = self._loop.call_later(
+            self._handler._heartbeat, self._heartbeat_task
+        )
+
+    def _cancel_heartbeat(self):
+        ''''''
+        if self._heartbeat_timer is not None:
+            self._heartbeat_timer.cancel()
+            self._heartbeat_timer = None
+
+    def _heartbeat_task(self):
+        ''''''
+        self._heartbeat_timer = None
+        if self._transport is None:
+            return
+
+        dead_time = self._handler._heartbeat * self._handler._deadfactor
+        if self._loop.time() - self._last_recv >= dead_time:
+            ait.core.log.error('No data received from DSN within the dead factor interval. Closing connection.')
+            self.close()
+            return
+
+        self._handler._send_heartbeat()
+        self._schedule_heartbeat()
+
+
+def wait_for_pdu(sle, event, priority=0):
+    ''' Return a future for the next PDU received for an event
+
+    The future's result is the decoded PDU. The interface's own handlers for
+    the event run before the future completes unless a higher priority is
+    given.
+
+    Arguments:
+        sle:
+            An SLE interface instance using the asyncio engine.
+
+        event:
+            The PDU name to wait for, as passed to
+            :meth:`ait.dsn.sle.common.SLE.add_handler`.
+
+        priority (optional integer):
+            The handler priority used for the waiter.
+    '''
+    future = asyncio.Future(loop=sle._engine._loop)
+
+    def on_pdu(pdu):
+        sle.remove_handler(event, on_pdu)
+        if not future.done():
+            future.set_result(pdu)
+
+    sle.add_handler(event, on_pdu, priority=priority)
+    return future
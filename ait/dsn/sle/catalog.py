@@ -0,0 +1,331 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Retrieved Range Catalog
+
+The ait.dsn.sle.catalog module keeps track of the earth receive time (ERT)
+ranges that have already been received from each RAF or RCF service
+instance and virtual channel. After an outage only the ranges which are
+missing from the catalog need to be requested again.
+
+Ranges are held as a sorted list of non-overlapping runs per service
+instance and VCID and can be persisted to a JSON file.
+
+Example:
+
+    catalog = RangeCatalog('/gds/data/sle_catalog.json')
+    catalog.watch(raf)
+    ...
+    # After reconnecting and binding to an offline instance
+    catalog.fetch_missing(raf, start_time, end_time)
+
+Classes:
+    RangeCatalog: Record received ERT ranges and fetch the missing ones.
+'''
+
+import bisect
+import datetime as dt
+import json
+import os
+
+import gevent.event
+
+import ait.core.log
+
+import ccsdstime
+import frames
+from retrieval import invoke_and_wait, service_event
+
+_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+_ZERO = dt.timedelta(0)
+
+
+def _sort_key(item):
+    ''''''
+    (inst_id, vcid), _ = item
+    return inst_id, -1 if vcid is None else vcid
+
+
+class RangeCatalog(object):
+    ''' Record received ERT ranges and fetch the missing ones
+
+    Arguments:
+        path (optional string):
+            The JSON file the catalog is loaded from and saved to. If None
+            the catalog is only kept in memory.
+
+        max_gap (optional :class:`datetime.timedelta`):
+            Frames recorded by :meth:`watch` whose ERTs are no more than
+            this far apart are treated as one continuous range. Defaults
+            to 10 seconds.
+    '''
+    def __init__(self, path=None, max_gap=dt.timedelta(seconds=10)):
+        self._path = path
+        self._max_gap = max_gap
+        self._runs = {}
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def add(self, inst_id, start_time, end_time, vcid=None):
+        ''' Record a range as received
+
+        Arguments:
+            inst_id (string):
+                The service instance id the range was received from.
+
+            start_time (:class:`datetime.datetime`):
+                The start ERT of the range.
+
+            end_time (:class:`datetime.datetime`):
+                The end ERT of the range.
+
+            vcid (optional integer):
+                The virtual channel the range was received for. None for
+                all frames.
+        '''
+        self._add((inst_id, vcid), start_time, end_time, _ZERO)
+
+    def ranges(self, inst_id, vcid=None):
+        ''' Return the recorded ranges as a sorted list of (start, end) '''
+        starts, ends = self._runs.get((inst_id, vcid), ([], []))
+        return list(zip(starts, ends))
+
+    def missing(self, inst_id, start_time, end_time, vcid=None):
+        ''' Return the sub-ranges of a range which have not been received
+
+        Arguments:
+            inst_id (string):
+                The service instance id to check.
+
+            start_time (:class:`datetime.datetime`):
+                The start ERT of the range.
+
+            end_time (:class:`datetime.datetime`):
+                The end ERT of the range.
+
+            vcid (optional integer):
+                The virtual channel to check. None for all frames.
+
+        Returns:
+            A sorted list of (start, end) tuples which are not covered by
+            the catalog.
+        '''
+        starts, ends = self._runs.get((inst_id, vcid), ([], []))
+        gaps = []
+        cursor = start_time
+
+        i = bisect.bisect_left(ends, start_time)
+        while i < len(starts) and starts[i] < end_time:
+            if starts[i] > cursor:
+                gaps.append((cursor, starts[i]))
+            cursor = max(cursor, ends[i])
+            i += 1
+
+        if cursor < end_time:
+            gaps.append((cursor, end_time))
+
+        return gaps
+
+    def watch(self, service, inst_id=None, vcid=None):
+        ''' Record the ERT of every frame a service receives
+
+        Consecutive frames less than ``max_gap`` apart extend the same
+        range, so the catalog reflects what was actually received by an
+        online session before an outage.
+
+        Arguments:
+            service:
+                The RAF or RCF instance to watch.
+
+            inst_id (optional string):
+                The service instance id to record against. Defaults to the
+                service's configured instance id.
+
+            vcid (optional integer):
+                The virtual channel to record. Frames on other virtual
+                channels are ignored. None for all frames.
+
+        Returns:
+            The AnnotatedFrame handler that was added, which can be passed
+            to the service's remove_handler to stop recording.
+        '''
+        key = (inst_id or service._inst_id, vcid)
+        max_gap = self._max_gap
+        decode = ccsdstime.decode
+        frame_id = frames.frame_id
+
+        def on_frame(pdu):
+            frame = pdu.getComponent()
+            if vcid is not None and frame_id(frame['data'].asOctets())[1] != vcid:
+                return
+            ert = decode(frame['earthReceiveTime'].getComponent().asOctets())
+            self._add(key, ert, ert, max_gap)
+
+        service.add_handler('AnnotatedFrame', on_frame)
+        return on_frame
+
+    def fetch_missing(self, service, start_time, end_time, vcid=None, timeout=30, **start_kwargs):
+        ''' Request only the parts of a range that have not been received
+
+        The service must already be bound to an offline service instance.
+        A start is issued for each missing sub-range and the service is
+        stopped again once the provider signals the end of data, at which
+        point the whole sub-range is recorded as received. Frames are
+        delivered to the service's handlers as usual. The catalog is saved
+        after each sub-range if it has a path.
+
+        If the provider sends neither a frame nor the end of data for
+        ``timeout`` seconds the service is stopped and the sub-range is
+        left missing.
+
+        Arguments:
+            service:
+                A bound RAF or RCF instance.
+
+            start_time (:class:`datetime.datetime`):
+                The start ERT of the range.
+
+            end_time (:class:`datetime.datetime`):
+                The end ERT of the range.
+
+            vcid (optional integer):
+                The virtual channel to request. It is passed to the
+                service's start method as ``virtual_channel``, so the
+                service must be an RCF instance. None for all frames.
+
+            timeout (optional number):
+                The number of seconds to wait for each start and stop
+                return, and between frames before the end of data.
+                Defaults to 30.
+
+            start_kwargs:
+                Any additional keyword arguments are passed to the service's
+                start method.
+
+        Returns:
+            The list of (start, end) sub-ranges that were requested.
+
+        Raises:
+            Exception: If a start or stop is unsuccessful, the provider
+                aborts or the end of data does not arrive in time.
+        '''
+        inst_id = service._inst_id
+        if vcid is not None:
+            start_kwargs['virtual_channel'] = vcid
+        gaps = self.missing(inst_id, start_time, end_time, vcid=vcid)
+
+        for gap_start, gap_end in gaps:
+            end_of_data = gevent.event.Event()
+            aborted = []
+            received = [0]
+
+            def on_sync(pdu):
+                if pdu.getComponent()['notification'].getName() == 'endOfData':
+                    end_of_data.set()
+
+            def on_abort(pdu):
+                aborted.append(pdu)
+                end_of_data.set()
+
+            def on_progress(pdu):
+                received[0] += 1
+
+            abort_event = service_event(service, 'PeerAbortInvocation')
+            on_frame = self.watch(service, inst_id=inst_id, vcid=vcid)
+            service.add_handler('AnnotatedFrame', on_progress)
+            service.add_handler('SyncNotification', on_sync)
+            service.add_handler(abort_event, on_abort)
+
+            try:
+                ait.core.log.info('Fetching missing range {} to {}'.format(gap_start, gap_end))
+                invoke_and_wait(service, 'StartReturn', 'active',
+                                lambda: service.start(gap_start, gap_end, **start_kwargs),
+                                timeout)
+                seen = 0
+                while not end_of_data.wait(timeout):
+                    if received[0] == seen:
+                        invoke_and_wait(service, 'StopReturn', 'ready', service.stop, timeout)
+                        raise Exception('Timed out waiting for the end of data from {}'.format(inst_id))
+                    seen = received[0]
+
+                if aborted:
+                    raise Exception('Fetch from {} was aborted by the provider'.format(inst_id))
+
+                invoke_and_wait(service, 'StopReturn', 'ready', service.stop, timeout)
+                self.add(inst_id, gap_start, gap_end, vcid=vcid)
+            finally:
+                service.remove_handler('AnnotatedFrame', on_frame)
+                service.remove_handler('AnnotatedFrame', on_progress)
+                service.remove_handler('SyncNotification', on_sync)
+                service.remove_handler(abort_event, on_abort)
+                if self._path is not None:
+                    self.save()
+
+        return gaps
+
+    def load(self):
+        ''' Replace the catalog's ranges with those saved at its path '''
+        with open(self._path, 'r') as infile:
+            entries = json.load(infile)
+
+        self._runs = {}
+        for entry in entries:
+            key = (entry['inst_id'], entry['vcid'])
+            for start, end in entry['ranges']:
+                self._add(
+                    key,
+                    dt.datetime.strptime(start, _TIME_FORMAT),
+                    dt.datetime.strptime(end, _TIME_FORMAT),
+                    _ZERO
+                )
+
+    def save(self):
+        ''' Write the catalog to its path
+
+        The catalog is written to a temporary file which is then renamed
+        over the previous one so a crash never leaves a partial catalog.
+        '''
+        entries = [
+            {
+                'inst_id': inst_id,
+                'vcid': vcid,
+                'ranges': [
+                    [s.strftime(_TIME_FORMAT), e.strftime(_TIME_FORMAT)]
+                    for s, e in zip(starts, ends)
+                ]
+            }
+            for (inst_id, vcid), (starts, ends) in sorted(self._runs.items(), key=_sort_key)
+        ]
+
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump(entries, outfile, indent=2)
+        os.rename(tmp_path, self._path)
+
+    def _add(self, key, start_time, end_time, tolerance):
+        ''''''
+        starts, ends = self._runs.setdefault(key, ([], []))
+
+        # Runs [i, j) overlap or lie within tolerance of the new range and
+        # are collapsed into a single run.
+        i = bisect.bisect_left(ends, start_time - tolerance)
+        j = bisect.bisect_right(starts, end_time + tolerance)
+
+        if i < j:
+            start_time = min(start_time, starts[i])
+            end_time = max(end_time, ends[j - 1])
+
+        starts[i:j] = [start_time]
+        ends[i:j] = [end_time]
@@ -0,0 +1,194 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' CCSDS Day Segmented Time Codes
+
+The ait.dsn.sle.ccsdstime module encodes and decodes the CCSDS Day
+Segmented (CDS) time codes used by SLE. Both the 8 byte format (16 bit
+day, 32 bit millisecond of day, 16 bit microsecond of millisecond) and
+the 10 byte pico format (32 bit picosecond of millisecond) are supported.
+
+Times are exchanged as naive UTC :class:`datetime.datetime` objects. The
+batch decoders return NumPy ``datetime64[ns]`` arrays and require NumPy,
+which is an optional dependency.
+
+Attributes:
+    CCSDS_EPOCH: A datetime object pointing to the CCSDS Epoch.
+
+    CDS_FORMAT: The struct used to pack an 8 byte CDS time.
+
+    CDS_PICO_FORMAT: The struct used to pack a 10 byte CDS pico time.
+'''
+
+import datetime as dt
+import struct
+
+CCSDS_EPOCH = dt.datetime(1958, 1, 1)
+
+CDS_FORMAT = struct.Struct('!HIH')
+CDS_PICO_FORMAT = struct.Struct('!HII')
+
+_NS_PER_DAY = 86400 * 10 ** 9
+
+
+def cds_fields(value):
+    ''' Split a datetime into its CDS day, millisecond and microsecond fields
+
+    Arguments:
+        value (:class:`datetime.datetime`):
+            The UTC time to split.
+
+    Returns:
+        A (days, milliseconds of day, microseconds of millisecond) tuple.
+
+    Raises:
+        ValueError: If the time can't be represented with a 16 bit day
+            count from the CCSDS epoch.
+    '''
+    delta = value - CCSDS_EPOCH
+    if not 0 <= delta.days <= 0xFFFF:
+        raise ValueError('Time {} is outside the CDS day range'.format(value))
+
+    ms, us = divmod(delta.seconds * 1000000 + delta.microseconds, 1000)
+    return delta.days, ms, us
+
+
+def encode_cds(value):
+    ''' Encode a datetime as an 8 byte CDS time '''
+    return CDS_FORMAT.pack(*cds_fields(value))
+
+
+def encode_cds_pico(value):
+    ''' Encode a datetime as a 10 byte CDS pico time '''
+    days, ms, us = cds_fields(value)
+    return CDS_PICO_FORMAT.pack(days, ms, us * 1000000)
+
+
+def decode_cds(data):
+    ''' Decode an 8 byte CDS time to a datetime '''
+    days, ms, us = CDS_FORMAT.unpack(data)
+    return CCSDS_EPOCH + dt.timedelta(days=days, milliseconds=ms, microseconds=us)
+
+
+def decode_cds_pico(data):
+    ''' Decode a 10 byte CDS pico time to a datetime
+
+    Picoseconds below a whole microsecond are truncated. Use
+    :func:`decode_array` to keep nanosecond resolution.
+    '''
+    days, ms, ps = CDS_PICO_FORMAT.unpack(data)
+    return CCSDS_EPOCH + dt.timedelta(days=days, milliseconds=ms, microseconds=ps // 1000000)
+
+
+def decode(data):
+    ''' Decode an 8 byte CDS or 10 byte CDS pico time to a datetime '''
+    if len(data) == CDS_FORMAT.size:
+        return decode_cds(data)
+    elif len(data) == CDS_PICO_FORMAT.size:
+        return decode_cds_pico(data)
+
+    raise ValueError('Invalid CDS time length: {}'.format(len(data)))
+
+
+def to_nanoseconds(data):
+    ''' Convert a CDS or CDS pico time to integer nanoseconds since the epoch
+
+    This avoids creating datetime objects where only time differences or
+    ordering are needed.
+    '''
+    if len(data) == CDS_FORMAT.size:
+        days, ms, us = CDS_FORMAT.unpack(data)
+        return days * _NS_PER_DAY + ms * 1000000 + us * 1000
+    elif len(data) == CDS_PICO_FORMAT.size:
+        days, ms, ps = CDS_PICO_FORMAT.unpack(data)
+        return days * _NS_PER_DAY + ms * 1000000 + ps // 1000
+
+    raise ValueError('Invalid CDS time length: {}'.format(len(data)))
+
+
+def decode_array(times, pico=False):
+    ''' Decode many CDS or CDS pico times with NumPy
+
+    Arguments:
+        times:
+            Either a byte string of concatenated times of one format or a
+            sequence of individual 8 or 10 byte times, which may mix the
+            two formats.
+
+        pico (optional boolean):
+            Whether a concatenated byte string holds 10 byte CDS pico
+            times. Ignored for sequences, where each time's format is
+            taken from its length. Defaults to False.
+
+    Returns:
+        A NumPy ``datetime64[ns]`` array with one entry per time.
+    '''
+    import numpy
+
+    if isinstance(times, (bytes, bytearray)):
+        size = CDS_PICO_FORMAT.size if pico else CDS_FORMAT.size
+        if len(times) % size != 0:
+            raise ValueError('CDS time batch length is not a multiple of {}'.format(size))
+        return _decode_packed(numpy, bytes(times), pico)
+
+    times = list(times)
+    if any(len(t) not in (CDS_FORMAT.size, CDS_PICO_FORMAT.size) for t in times):
+        raise ValueError('Invalid CDS time length in batch')
+
+    result = numpy.empty(len(times), dtype='datetime64[ns]')
+    for size, is_pico in [(CDS_FORMAT.size, False), (CDS_PICO_FORMAT.size, True)]:
+        idx = [i for i, t in enumerate(times) if len(t) == size]
+        if len(idx) == len(times):
+            return _decode_packed(numpy, b''.join(times), is_pico)
+        if idx:
+            result[idx] = _decode_packed(numpy, b''.join(times[i] for i in idx), is_pico)
+
+    return result
+
+
+def decode_erts(transfer_buffer):
+    ''' Decode the earth receive times of a RAF or RCF transfer buffer
+
+    Arguments:
+        transfer_buffer:
+            A decoded RafTransferBuffer or RcfTransferBuffer, or any
+            iterable of its FrameOrNotification elements.
+
+    Returns:
+        A NumPy ``datetime64[ns]`` array with the earth receive time of
+        each annotated frame, in buffer order. Sync notifications are
+        skipped.
+    '''
+    erts = [
+        element.getComponent()['earthReceiveTime'].getComponent().asOctets()
+        for element in transfer_buffer
+        if element.getName() == 'annotatedFrame'
+    ]
+    return decode_array(erts)
+
+
+def _decode_packed(numpy, data, pico):
+    ''''''
+    sub_type = '>u4' if pico else '>u2'
+    dtype = numpy.dtype([('days', '>u2'), ('ms', '>u4'), ('sub', sub_type)])
+    fields = numpy.frombuffer(data, dtype=dtype)
+
+    ns = fields['days'].astype('i8') * _NS_PER_DAY
+    ns += fields['ms'].astype('i8') * 1000000
+    if pico:
+        ns += fields['sub'].astype('i8') // 1000
+    else:
+        ns += fields['sub'].astype('i8') * 1000
+
+    return numpy.datetime64('1958-01-01T00:00:00', 'ns') + ns.astype('timedelta64[ns]')
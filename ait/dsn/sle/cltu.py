@@ -22,9 +22,10 @@ Classes:
         implements the Forward CLTU standard.
 '''
 import binascii
-import struct
 
 import ait.core.log
+import ccsdstime
+import cltufile
 import common
 
 if ait.config.get('dsn.sle.version', None) == 4:
@@ -100,6 +101,11 @@ class CLTU(common.SLE):
     # TODO: Add error checking for actions based on current state
     _cltu_id = 0
     event_invoc_id = 0
+    _provider_pdu_spec = CltuProviderToUserPdu
+
+    # An :class:`ait.dsn.sle.tracker.CLTUTracker` which is told about each
+    # uploaded CLTU. Set by the tracker's attach method.
+    tracker = None
 
     def __init__(self, *args, **kwargs):
         self._inst_id = ait.config.get('dsn.sle.fcltu.inst_id',
@@ -114,17 +120,17 @@ class CLTU(common.SLE):
         self._service_type = 'fwdCltu'
         self._version = kwargs.get('version', 5)
 
-        self._handlers['CltuBindReturn'].append(self._bind_return_handler)
-        self._handlers['CltuUnbindReturn'].append(self._unbind_return_handler)
-        self._handlers['CltuStartReturn'].append(self._start_return_handler)
-        self._handlers['CltuStopReturn'].append(self._stop_return_handler)
-        self._handlers['CltuAsyncNotifyInvocation'].append(self._async_notify_invoc_handler)
-        self._handlers['CltuTransferDataReturn'].append(self._trans_data_return_handler)
-        self._handlers['CltuScheduleStatusReportReturn'].append(self._schedule_status_report_return_handler)
-        self._handlers['CltuStatusReportInvocation'].append(self._status_report_invoc_handler)
-        self._handlers['CltuGetParameterReturn'].append(self._get_param_return_handler)
-        self._handlers['CltuPeerAbortInvocation'].append(self._peer_abort_handler)
-        self._handlers['CltuThrowEventReturn'].append(self._throw_event_handler)
+        self.add_handler('CltuBindReturn', self._bind_return_handler)
+        self.add_handler('CltuUnbindReturn', self._unbind_return_handler)
+        self.add_handler('CltuStartReturn', self._start_return_handler)
+        self.add_handler('CltuStopReturn', self._stop_return_handler)
+        self.add_handler('CltuAsyncNotifyInvocation', self._async_notify_invoc_handler)
+        self.add_handler('CltuTransferDataReturn', self._trans_data_return_handler)
+        self.add_handler('CltuScheduleStatusReportReturn', self._schedule_status_report_return_handler)
+        self.add_handler('CltuStatusReportInvocation', self._status_report_invoc_handler)
+        self.add_handler('CltuGetParameterReturn', self._get_param_return_handler)
+        self.add_handler('CltuPeerAbortInvocation', self._peer_abort_handler)
+        self.add_handler('CltuThrowEventReturn', self._throw_event_handler)
 
     def bind(self, inst_id=None):
         ''' Bind to a CLTU interface
@@ -166,7 +172,7 @@ class CLTU(common.SLE):
         start_invoc['cltuStartInvocation']['firstCltuIdentification'] = self._cltu_id
 
         ait.core.log.info('Sending data start invocation ...')
-        self.send(self.encode_pdu(start_invoc))
+        self.send_pdu(start_invoc)
 
     def stop(self):
         ''' Request the provider stop radiation of received CLTUs '''
@@ -197,13 +203,22 @@ class CLTU(common.SLE):
             notify (optional boolean):
                 Specify whether the provider shall invoke the CLTU-ASYNCNOTIFY
                 operation upon completion of the radiation of the CLTU.
+
+        Returns:
+            The CLTU identification assigned to the CLTU.
         '''
         pdu = self._prepare_cltu_pdu(tc_data, earliest_time, latest_time, delay, notify)
+        cltu_id = int(pdu['cltuTransferDataInvocation']['cltuIdentification'])
+
+        if self.tracker is not None:
+            self.tracker.submitted(cltu_id, len(tc_data))
 
         ait.core.log.info('Sending TC Data ...')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
+        return cltu_id
 
-    def _prepare_cltu_pdu(self, tc_data, earliest_time=None, latest_time=None, delay=0, notify=False):
+    def _prepare_cltu_pdu(self, tc_data, earliest_time=None, latest_time=None, delay=0, notify=False,
+                          cltu_id=None, invoke_id=None):
         ''' Returns CLTU PDU prepared for upload
 
         Arguments:
@@ -225,6 +240,14 @@ class CLTU(common.SLE):
             notify (optional boolean):
                 Specify whether the provider shall invoke the CLTU-ASYNCNOTIFY
                 operation upon completion of the radiation of the CLTU.
+
+            cltu_id (optional integer):
+                The CLTU identification to use. If None the next CLTU
+                identification is taken from the instance's counter.
+
+            invoke_id (optional integer):
+                The invoke id to use. If None the next invoke id is taken
+                from the instance's counter.
         '''
         pdu = CltuUserToProviderPdu()
 
@@ -233,18 +256,23 @@ class CLTU(common.SLE):
         else:
             pdu['cltuTransferDataInvocation']['invokerCredentials']['unused'] = None
 
-        pdu['cltuTransferDataInvocation']['invokeId'] = self.invoke_id
-        pdu['cltuTransferDataInvocation']['cltuIdentification'] = self._cltu_id
-        self._cltu_id += 1
+        if invoke_id is None:
+            invoke_id = self.invoke_id
+        if cltu_id is None:
+            cltu_id = self._cltu_id
+            self._cltu_id += 1
+
+        pdu['cltuTransferDataInvocation']['invokeId'] = invoke_id
+        pdu['cltuTransferDataInvocation']['cltuIdentification'] = cltu_id
 
         if earliest_time:
-            t = struct.pack('!HIH', (earliest_time - common.CCSDS_EPOCH).days, 0, 0)
+            t = ccsdstime.encode_cds(earliest_time)
             pdu['cltuTransferDataInvocation']['earliestTransmissionTime']['known']['ccsdsFormat'] = t
         else:
             pdu['cltuTransferDataInvocation']['earliestTransmissionTime']['undefined'] = None
 
         if latest_time:
-            t = struct.pack('!HIH', (latest_time - common.CCSDS_EPOCH).days, 0, 0)
+            t = ccsdstime.encode_cds(latest_time)
             pdu['cltuTransferDataInvocation']['latestTransmissionTime']['known']['ccsdsFormat'] = t
         else:
             pdu['cltuTransferDataInvocation']['latestTransmissionTime']['undefined'] = None
@@ -293,6 +321,32 @@ class CLTU(common.SLE):
 
         ait.core.log.info('Saved TC Data to {}.'.format(filename))
 
+    def save_batch_to_file(self, filename, tc_data, earliest_time=None, latest_time=None, delay=0, notify=False):
+        ''' Save many CLTU PDUs to a single container file
+
+        The file can be validated and replayed with
+        :class:`ait.dsn.sle.cltufile.CLTUFileReader`. The CLTU
+        identifications continue from the instance's counter, but neither
+        its CLTU identification nor its invoke id counter is advanced.
+
+        Arguments:
+            filename:
+                Full path to save file to.
+
+            tc_data:
+                An iterable of the data to transfer in each CLTU.
+
+            The remaining arguments are applied to every CLTU and are the
+            same as for :meth:`save_to_file`.
+
+        Returns:
+            The number of CLTUs saved.
+        '''
+        with cltufile.CLTUFileWriter(filename, self) as writer:
+            for data in tc_data:
+                writer.add(data, earliest_time, latest_time, delay, notify)
+            return len(writer)
+
     def schedule_status_report(self, report_type='immediately', cycle=None):
         ''' Send a status report schedule request to the CLTU interface
 
@@ -326,7 +380,7 @@ class CLTU(common.SLE):
             raise ValueError('Unknown report type: {}'.format(report_type))
 
         ait.core.log.info('Scheduling Status Report')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def get_parameter(self):
         ''''''
@@ -365,7 +419,7 @@ class CLTU(common.SLE):
         pdu['cltuThrowEventInvocation']['eventQualifier'] = event_qualifier
 
         ait.core.log.info('Sending Throw Event Invocation')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def peer_abort(self, reason=127):
         ''' Send a peer abort notification to the CLTU interface
@@ -380,7 +434,7 @@ class CLTU(common.SLE):
         pdu['cltuPeerAbortInvocation'] = reason
 
         ait.core.log.info('Sending Peer Abort')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
         self._state = 'unbound'
 
     def decode(self, message):
@@ -451,7 +505,7 @@ class CLTU(common.SLE):
             ))
         else:
             result = result['negativeResult']
-            if 'commmon' in result:
+            if 'common' in result:
                 opts = ['Duplicate Invoke Id', 'Other Reason']
                 diag = opts[result['common']]
             else:
@@ -496,7 +550,7 @@ class CLTU(common.SLE):
         pdu = pdu['cltuAsyncNotifyInvocation']
 
         msg = '\n'
-        if 'cltuNoficiation' in pdu:
+        if 'cltuNotification' in pdu:
             msg += 'CLTU Notification: {}\n'.format(pdu['cltuNotification'].getName())
 
         if 'cltuLastProcessed' in pdu:
@@ -529,7 +583,7 @@ class CLTU(common.SLE):
 
         if 'uplinkStatus' in pdu:
             uplink_status = ['Status Not Avail.', 'No RF Avail.', 'No Bit Lock', 'Nominal']
-            msg == 'Uplink Status: {}\n'.format(uplink_status[pdu['uplinkStatus']])
+            msg += 'Uplink Status: {}\n'.format(uplink_status[pdu['uplinkStatus']])
 
         ait.core.log.info(msg)
 
@@ -0,0 +1,382 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' CLTU Container Files
+
+The ait.dsn.sle.cltufile module stores many prepared CLTU transfer data
+PDUs in a single container file and replays them through an F-CLTU
+service instance. Commanding products can be prepared and validated
+offline and later uplinked in bulk without re-encoding them.
+
+A container starts with a header holding a magic string, the number of
+PDUs and the offset of the index. The PDUs follow, each as it would be
+written to the socket (TML header and ASN.1 encoded body) except that its
+invoke id is 0. Invoke ids are assigned from the replaying service when
+the PDUs are sent. The index at the end holds the offset, length, CLTU
+identification and CLTU size of every PDU.
+
+Replay writes PDUs only while the provider reports room for them in its
+CLTU buffer, and uses the gevent engine.
+
+Example:
+
+    with CLTUFileWriter('/gds/uplink/pass42.cltu', cltu_mngr) as writer:
+        for cltu in cltus:
+            writer.add(cltu, notify=True)
+
+    ...
+    reader = CLTUFileReader('/gds/uplink/pass42.cltu')
+    reader.replay(cltu_mngr)
+
+Classes:
+    CLTUFileWriter: Write prepared CLTU PDUs to a container file.
+
+    CLTUFileReader: Read, validate and replay a container file.
+'''
+
+import mmap
+import os
+import struct
+
+import gevent.event
+
+import ait.core.log
+
+import common
+from scheduler import ProviderBuffer
+from stream import read_header
+
+MAGIC = b'AITCLTU3'
+
+_HEADER = struct.Struct('>8sIQ')
+_INDEX_ENTRY = struct.Struct('>QIII')
+_TML_HEADER = struct.Struct(common.TML_SLE_FORMAT)
+
+
+class CLTUFileWriter(object):
+    ''' Write prepared CLTU transfer data PDUs to a container file
+
+    PDUs are prepared with the service's credentials, as
+    :meth:`ait.dsn.sle.cltu.CLTU.upload_cltu` would send them, but with
+    CLTU identifications from the writer's own counter and an invoke id of
+    0, so the service's counters are not advanced. The file is written
+    under a temporary name and renamed into place when the writer is
+    closed.
+
+    Arguments:
+        path (string):
+            The container file to write.
+
+        service (:class:`ait.dsn.sle.cltu.CLTU`):
+            The CLTU instance used to prepare and encode the PDUs. It does
+            not need to be connected.
+
+        first_cltu_id (optional integer):
+            The CLTU identification of the first PDU. Defaults to the
+            service's next CLTU identification.
+    '''
+    def __init__(self, path, service, first_cltu_id=None):
+        self._path = path
+        self._tmp_path = path + '.tmp'
+        self._service = service
+        self._cltu_id = service._cltu_id if first_cltu_id is None else first_cltu_id
+        self._index = []
+
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, 0, 0))
+        self._offset = _HEADER.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, tc_data, earliest_time=None, latest_time=None, delay=0, notify=False):
+        ''' Prepare a CLTU PDU and append it to the container
+
+        The arguments are the same as for
+        :meth:`ait.dsn.sle.cltu.CLTU.upload_cltu`.
+
+        Returns:
+            The CLTU identification assigned to the CLTU.
+        '''
+        service = self._service
+        cltu_id = self._cltu_id
+        pdu = service._prepare_cltu_pdu(tc_data, earliest_time, latest_time, delay, notify,
+                                        cltu_id=cltu_id, invoke_id=0)
+        self._cltu_id += 1
+
+        data = service.encode_pdu(pdu)
+        self._file.write(data)
+        self._index.append((self._offset, len(data), cltu_id, len(tc_data)))
+        self._offset += len(data)
+        return cltu_id
+
+    def close(self):
+        ''' Write the index and move the container into place '''
+        if self._file.closed:
+            return
+
+        index = b''.join(_INDEX_ENTRY.pack(*entry) for entry in self._index)
+        self._file.write(index)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, len(self._index), self._offset))
+        self._file.close()
+        os.rename(self._tmp_path, self._path)
+
+        ait.core.log.info('Saved {} CLTUs to {}'.format(len(self._index), self._path))
+
+
+class CLTUFileReader(object):
+    ''' Read, validate and replay a CLTU container file
+
+    The file is memory mapped, so PDUs are read from it on demand.
+
+    Arguments:
+        path (string):
+            The container file to read.
+
+    Raises:
+        ValueError: If the file is not a CLTU container or its index is
+            truncated.
+    '''
+    def __init__(self, path):
+        self._path = path
+        with open(path, 'rb') as infile:
+            self._map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            raise ValueError('{} is too short to be a CLTU container'.format(path))
+
+        magic, count, index_offset = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError('{} is not a CLTU container'.format(path))
+
+        if index_offset + count * _INDEX_ENTRY.size > len(self._map):
+            raise ValueError('{} has a truncated index'.format(path))
+
+        self._index = [
+            _INDEX_ENTRY.unpack_from(self._map, index_offset + i * _INDEX_ENTRY.size)
+            for i in range(count)
+        ]
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, i):
+        offset, length = self._index[i][:2]
+        return self._map[offset:offset + length]
+
+    def __iter__(self):
+        for i in range(len(self._index)):
+            yield self[i]
+
+    @property
+    def cltu_ids(self):
+        ''' The CLTU identification of each PDU, in file order '''
+        return [entry[2] for entry in self._index]
+
+    def close(self):
+        ''' Unmap the file '''
+        self._map.close()
+
+    def decode(self, i):
+        ''' Decode a PDU and return its cltuTransferDataInvocation '''
+        from pyasn1.codec.ber.decoder import decode
+        import cltu
+
+        body = self[i][_TML_HEADER.size:]
+        return decode(body, asn1Spec=cltu.CltuUserToProviderPdu())[0]['cltuTransferDataInvocation']
+
+    def validate(self):
+        ''' Check every PDU in the container
+
+        Each PDU must decode as a CLTU transfer data invocation whose TML
+        length and CLTU identification match the index, and the CLTU
+        identifications must be consecutive.
+
+        Returns:
+            A list of problem descriptions, empty if the container is valid.
+        '''
+        problems = []
+        previous = None
+        for i, (offset, length, cltu_id, _) in enumerate(self._index):
+            data = self[i]
+            if len(data) < _TML_HEADER.size or _TML_HEADER.unpack_from(data)[1] != length - _TML_HEADER.size:
+                problems.append('PDU {}: TML length does not match the index'.format(i))
+                continue
+
+            try:
+                invocation = self.decode(i)
+            except Exception as e:
+                problems.append('PDU {}: cannot be decoded: {}'.format(i, e))
+                continue
+
+            if int(invocation['cltuIdentification']) != cltu_id:
+                problems.append('PDU {}: CLTU id {} does not match the index id {}'.format(
+                    i, invocation['cltuIdentification'], cltu_id))
+
+            if previous is not None and cltu_id != previous + 1:
+                problems.append('PDU {}: CLTU id {} does not follow {}'.format(i, cltu_id, previous))
+            previous = cltu_id
+
+        return problems
+
+    def replay(self, service, start=0, stop=None, batch_size=1024, buffer_available=None, timeout=30):
+        ''' Send the container's PDUs through an F-CLTU service
+
+        Each PDU is given the service's next invoke id and is otherwise
+        sent without being decoded or re-encoded. PDUs are written only
+        while the provider's CLTU buffer has room for them, tracked with a
+        :class:`ait.dsn.sle.scheduler.ProviderBuffer` as the uplink
+        scheduler does, and those that fit are queued and written together
+        in batches. Until the provider first reports its buffer space, one
+        PDU is sent at a time. The service's CLTU identification counter is
+        advanced past each CLTU sent, and each CLTU is reported to the
+        service's tracker, if one is attached.
+
+        Arguments:
+            service (:class:`ait.dsn.sle.cltu.CLTU`):
+                An active CLTU instance using the gevent engine.
+
+            start (optional integer):
+                The index of the first PDU to send. Defaults to 0.
+
+            stop (optional integer):
+                The index after the last PDU to send. Defaults to the end
+                of the container.
+
+            batch_size (optional integer):
+                The largest number of PDUs written together. Defaults to
+                1024.
+
+            buffer_available (optional integer):
+                The provider's CLTU buffer space in octets before the first
+                CltuTransferDataReturn is received, if it is known.
+
+            timeout (optional number):
+                The number of seconds to wait for the provider to report
+                buffer space. Defaults to 30.
+
+        Returns:
+            The number of PDUs sent.
+
+        Raises:
+            Exception: If the first CLTU id is not the one the service
+                expects next, if the provider reports no room for the next
+                PDU within the timeout, or if the service authenticates
+                every invocation, since the credentials in the prepared
+                PDUs would be stale.
+        '''
+        entries = self._index[start:stop]
+        if not entries:
+            return 0
+
+        if service._auth_level == 'all':
+            raise Exception('Prepared CLTU PDUs cannot be replayed with auth_level "all"')
+
+        if entries[0][2] != service._cltu_id:
+            raise Exception('Container continues from CLTU id {} but the service expects {}'.format(
+                entries[0][2], service._cltu_id))
+
+        data = self._map
+        tracker = service.tracker
+        returned = gevent.event.Event()
+        provider_buffer = ProviderBuffer(service, buffer_available, on_return=returned.set)
+
+        sent = 0
+        try:
+            while sent < len(entries):
+                batch = []
+                for entry in entries[sent:sent + batch_size]:
+                    if provider_buffer.available is None and (batch or provider_buffer.in_flight):
+                        break
+                    if not provider_buffer.fits(entry[3]):
+                        break
+                    provider_buffer.sent(entry[3])
+                    batch.append(entry)
+
+                if not batch:
+                    returned.clear()
+                    if not returned.wait(timeout):
+                        raise Exception('Timed out waiting for CLTU buffer space after {} of {} CLTUs'.format(
+                            sent, len(entries)))
+                    continue
+
+                service._enqueue([
+                    _with_invoke_id(data[entry[0]:entry[0] + entry[1]], service.invoke_id)
+                    for entry in batch
+                ])
+                service.flush()
+                service._cltu_id = batch[-1][2] + 1
+                sent += len(batch)
+
+                if tracker is not None:
+                    for entry in batch:
+                        tracker.submitted(entry[2], entry[3])
+        finally:
+            provider_buffer.close()
+
+        ait.core.log.info('Replayed {} CLTUs from {}'.format(sent, self._path))
+        return sent
+
+
+def _with_invoke_id(pdu, invoke_id):
+    ''' Return an encoded CLTU transfer data PDU with its invoke id replaced
+
+    The invoke id follows the invoker credentials at the start of the
+    invocation, so the new value is spliced in and the invocation and TML
+    lengths are rewritten.
+    '''
+    buf = bytearray(pdu)
+    content, length = read_header(buf, _TML_HEADER.size)
+    credentials, credentials_length = read_header(buf, content)
+    value, value_length = read_header(buf, credentials + credentials_length)
+
+    encoded = _encode_integer(invoke_id)
+    body = buf[content:value - 1] + bytearray([len(encoded)]) + encoded + buf[value + value_length:content + length]
+    header = buf[_TML_HEADER.size:_TML_HEADER.size + 1] + _encode_length(len(body))
+    return _TML_HEADER.pack(common.TML_SLE_TYPE, len(header) + len(body)) + bytes(header + body)
+
+
+def _encode_integer(value):
+    ''''''
+    octets = bytearray([value & 0xFF])
+    value >>= 8
+    while value:
+        octets.insert(0, value & 0xFF)
+        value >>= 8
+    if octets[0] & 0x80:
+        octets.insert(0, 0)
+    return octets
+
+
+def _encode_length(length):
+    ''''''
+    if length < 0x80:
+        return bytearray([length])
+
+    octets = bytearray()
+    while length:
+        octets.insert(0, length & 0xFF)
+        length >>= 8
+    return bytearray([0x80 | len(octets)]) + octets
@@ -0,0 +1,255 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' TC Synchronization and Channel Coding
+
+The ait.dsn.sle.coding module turns TC Transfer Frames into Communications
+Link Transmission Units (CLTUs) as defined in CCSDS 231.0-B. A CLTU is the
+start sequence, the frame split into BCH(63,56) code blocks and the tail
+sequence. The frame can optionally be randomised before it is encoded.
+
+The BCH parity of each code block is computed a byte at a time from a 256
+entry lookup table and the randomiser sequence is computed once, so the
+per frame work is table lookups and a single XOR.
+
+Example:
+
+    generator = CLTUGenerator(spacecraft_id=250, virtual_channel_id=0)
+    cltus = generator.encode_batch(command_packets)
+    for cltu in cltus:
+        cltu_mngr.upload_cltu(cltu)
+
+Attributes:
+    START_SEQUENCE: The CLTU start sequence.
+
+    TAIL_SEQUENCE: The CLTU tail sequence.
+
+    FILL_OCTET: The octet used to fill the last code block.
+
+Classes:
+    CLTUGenerator: Encode user data units into TC Transfer Frames and
+        CLTUs, numbering the frames.
+
+Functions:
+    bch_parity: Return the parity octet of a code block's information
+        octets.
+
+    randomise: XOR a frame with the TC randomiser sequence.
+
+    encode_cltu: Encode a TC Transfer Frame as a CLTU.
+'''
+
+import binascii
+
+import frames
+
+START_SEQUENCE = b'\xEB\x90'
+TAIL_SEQUENCE = b'\xC5\xC5\xC5\xC5\xC5\xC5\xC5\x79'
+FILL_OCTET = 0x55
+
+_BLOCK_DATA = 7
+
+# BCH(63,56) generator polynomial x^7 + x^6 + x^2 + 1 without its x^7 term
+_BCH_POLY = 0x45
+
+
+def _bch_table():
+    ''''''
+    table = []
+    for value in range(256):
+        reg = 0
+        for bit in range(7, -1, -1):
+            feedback = ((reg >> 6) ^ (value >> bit)) & 1
+            reg = (reg << 1) & 0x7F
+            if feedback:
+                reg ^= _BCH_POLY
+        table.append(reg)
+    return table
+
+
+def _randomiser_sequence(length):
+    ''''''
+    # h(x) = x^8 + x^6 + x^4 + x^3 + x^2 + x + 1, all ones seed
+    bits = [1] * 8
+    while len(bits) < length * 8:
+        n = len(bits) - 8
+        bits.append(bits[n] ^ bits[n + 1] ^ bits[n + 2] ^ bits[n + 3] ^ bits[n + 4] ^ bits[n + 6])
+
+    return bytearray(
+        int(''.join(str(b) for b in bits[i:i + 8]), 2)
+        for i in range(0, length * 8, 8)
+    )
+
+
+_BCH_TABLE = _bch_table()
+_RANDOMISER = bytes(_randomiser_sequence(frames.TC_MAX_FRAME_LENGTH))
+
+
+def bch_parity(block):
+    ''' Return the parity octet of a BCH(63,56) code block
+
+    Arguments:
+        block (bytearray):
+            The 7 information octets of the code block.
+
+    Returns:
+        The complemented 7 parity bits followed by the 0 filler bit.
+    '''
+    table = _BCH_TABLE
+    reg = 0
+    for octet in block:
+        reg = table[octet ^ (reg << 1)]
+    return ((~reg) & 0x7F) << 1
+
+
+def randomise(frame):
+    ''' XOR a frame with the TC randomiser sequence
+
+    Randomising is its own inverse, so this also de-randomises.
+
+    Raises:
+        ValueError: If the frame is longer than the maximum TC frame length.
+    '''
+    frame = bytes(frame)
+    length = len(frame)
+    if length > len(_RANDOMISER):
+        raise ValueError('Frame length {} exceeds {} octets'.format(length, len(_RANDOMISER)))
+    if not length:
+        return frame
+
+    value = int(binascii.hexlify(frame), 16) ^ int(binascii.hexlify(_RANDOMISER[:length]), 16)
+    return binascii.unhexlify('{:0{}x}'.format(value, length * 2))
+
+
+def encode_cltu(frame, randomised=False):
+    ''' Encode a TC Transfer Frame as a CLTU
+
+    Arguments:
+        frame (bytes):
+            The encoded TC Transfer Frame.
+
+        randomised (optional boolean):
+            Whether to randomise the frame before encoding it. Defaults to
+            False.
+
+    Returns:
+        The CLTU: the start sequence, the code blocks and the tail
+        sequence. The last code block is filled with FILL_OCTET.
+    '''
+    if randomised:
+        frame = randomise(frame)
+
+    data = bytearray(frame)
+    remainder = len(data) % _BLOCK_DATA
+    if remainder:
+        data.extend([FILL_OCTET] * (_BLOCK_DATA - remainder))
+
+    table = _BCH_TABLE
+    out = bytearray(START_SEQUENCE)
+    for i in range(0, len(data), _BLOCK_DATA):
+        block = data[i:i + _BLOCK_DATA]
+        reg = 0
+        for octet in block:
+            reg = table[octet ^ (reg << 1)]
+        out += block
+        out.append(((~reg) & 0x7F) << 1)
+
+    out += TAIL_SEQUENCE
+    return bytes(out)
+
+
+class CLTUGenerator(object):
+    ''' Encode user data units into TC Transfer Frames and CLTUs
+
+    The generator numbers the frames it builds for its virtual channel
+    consecutively.
+
+    Arguments:
+        spacecraft_id (integer):
+            The spacecraft id.
+
+        virtual_channel_id (integer):
+            The virtual channel id.
+
+        map_id (optional integer):
+            The MAP id. If given every frame carries a segment header and
+            data units longer than a frame are segmented. Defaults to None.
+
+        bypass_flag (optional integer):
+            1 for Type-B (expedited) frames. Defaults to 1.
+
+        fecf (optional boolean):
+            Whether frames have a Frame Error Control Field. Defaults to
+            True.
+
+        randomised (optional boolean):
+            Whether frames are randomised before BCH encoding. Defaults to
+            False.
+
+        max_frame_length (optional integer):
+            The maximum frame length in octets. Defaults to
+            :data:`ait.dsn.sle.frames.TC_MAX_FRAME_LENGTH`.
+
+        frame_seq_num (optional integer):
+            The sequence number of the next frame. Defaults to 0.
+    '''
+    def __init__(self, spacecraft_id, virtual_channel_id, map_id=None, bypass_flag=1,
+                 fecf=True, randomised=False, max_frame_length=frames.TC_MAX_FRAME_LENGTH,
+                 frame_seq_num=0):
+        self._spacecraft_id = spacecraft_id
+        self._virtual_channel_id = virtual_channel_id
+        self._map_id = map_id
+        self._bypass_flag = bypass_flag
+        self._fecf = fecf
+        self._randomised = randomised
+        self._max_frame_length = max_frame_length
+        self.frame_seq_num = frame_seq_num & 0xFF
+
+    def frames(self, data):
+        ''' Build the TC Transfer Frames for a user data unit
+
+        Returns:
+            A list of :class:`ait.dsn.sle.frames.TCTransFrame` instances.
+        '''
+        tc_frames = frames.tc_frames(
+            data, self._spacecraft_id, self._virtual_channel_id,
+            frame_seq_num=self.frame_seq_num,
+            map_id=self._map_id,
+            bypass_flag=self._bypass_flag,
+            fecf=self._fecf,
+            max_frame_length=self._max_frame_length
+        )
+        self.frame_seq_num = (self.frame_seq_num + len(tc_frames)) & 0xFF
+        return tc_frames
+
+    def encode(self, data):
+        ''' Encode a user data unit as CLTUs
+
+        Returns:
+            A list with one CLTU per frame the data unit needed.
+        '''
+        randomised = self._randomised
+        return [encode_cltu(f.encode(), randomised) for f in self.frames(data)]
+
+    def encode_batch(self, data_units):
+        ''' Encode many user data units as CLTUs
+
+        Returns:
+            A flat list of CLTUs, in order.
+        '''
+        cltus = []
+        for data in data_units:
+            cltus.extend(self.encode(data))
+        return cltus
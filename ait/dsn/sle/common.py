@@ -38,6 +38,10 @@ Attributes:
 
     CCSDS_EPOCH: A datetime object pointing to the CCSDS Epoch.
 
+    SEND_JOIN_MAX: Outbound buffers smaller than this many bytes are
+        joined with their neighbours into a single socket write. Larger
+        buffers are written without being copied.
+
 Classes:
     SLE: An SLE interface "base" class that provides interface-agnostic
         methods and attributes for interfacing with SLE.
@@ -48,28 +52,27 @@ from collections import defaultdict
 import datetime as dt
 import errno
 import fcntl
-import hashlib
 import random
 import socket
 import struct
 import time
 
 import gevent
-import gevent.queue
+import gevent.event
+import gevent.lock
 import gevent.socket
-import gevent.monkey; gevent.monkey.patch_all()
 
 import pyasn1.error
 from pyasn1.codec.ber.encoder import encode
-from pyasn1.codec.der.encoder import encode as der_encode
 from pyasn1.codec.der.decoder import decode
 
 import ait.core
 import ait.core.log
 
-from ait.dsn.sle.pdu import service_instance
-from ait.dsn.sle.pdu.service_instance import *
-from ait.dsn.sle.pdu.common import HashInput, ISP1Credentials
+import ccsdstime
+import isp1
+import queues
+import stream
 import util
 
 TML_SLE_FORMAT = '!ii'
@@ -81,7 +84,9 @@ TML_CONTEXT_MSG_TYPE = 0x02000000
 TML_CONTEXT_HB_FORMAT = '!ii'
 TML_CONTEXT_HEARTBEAT_TYPE = 0x03000000
 
-CCSDS_EPOCH = dt.datetime(1958, 1, 1)
+CCSDS_EPOCH = ccsdstime.CCSDS_EPOCH
+
+SEND_JOIN_MAX = 4096
 
 
 class SLE(object):
@@ -92,12 +97,37 @@ class SLE(object):
 
     '''
     _state = 'unbound'
-    _handlers = defaultdict(list)
-    _data_queue = gevent.queue.Queue()
     _invoke_id = 0
 
+    # The PyASN1 Choice classes that received PDUs and transfer buffer
+    # elements decode to. Service classes override these so that handler
+    # registrations can be compiled into tag keyed dispatch tables.
+    _provider_pdu_spec = None
+    _frame_spec = None
+
+    # The name of the transfer buffer alternative of the provider PDU
+    # Choice. Services which set it have their transfer buffers decoded
+    # one element at a time.
+    _transfer_buffer_name = None
+
+    # An :class:`ait.dsn.sle.latency.LatencyTracer` which samples the
+    # latency of received frames. Set by the tracer's attach method.
+    tracer = None
+
     def __init__(self, *args, **kwargs):
         ''''''
+        self._handlers = defaultdict(list)
+        self._handler_count = 0
+        self._pdu_dispatch = {}
+        self._frame_dispatch = {}
+
+        self._transfer_buffer_decoder = None
+        self._stream_transfer_buffers = False
+        if self._transfer_buffer_name is not None:
+            self._transfer_buffer_decoder = stream.TransferBufferDecoder(
+                self._provider_pdu_spec, self._transfer_buffer_name, self._frame_spec
+            )
+
         self._downlink_frame_type = ait.config.get('dsn.sle.downlink_frame_type',
                                                    kwargs.get('downlink_frame_type', 'TMTransFrame'))
         self._heartbeat = ait.config.get('dsn.sle.heartbeat',
@@ -118,6 +148,36 @@ class SLE(object):
         self._telem_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._auth_level = ait.config.get('dsn.sle.auth_level',
                                           kwargs.get('auth_level', 'none'))
+        self._send_latency = ait.config.get('dsn.sle.send_latency',
+                                            kwargs.get('send_latency', 0))
+        self._send_batch_size = ait.config.get('dsn.sle.send_batch_size',
+                                               kwargs.get('send_batch_size', 65536))
+        self._engine_name = ait.config.get('dsn.sle.engine',
+                                           kwargs.get('engine', 'gevent'))
+
+        self._queue_policy = ait.config.get('dsn.sle.queue_policy',
+                                            kwargs.get('queue_policy', 'block'))
+        self._pdu_queue_size = ait.config.get('dsn.sle.pdu_queue_size',
+                                              kwargs.get('pdu_queue_size', 0))
+        self._frame_queue_size = ait.config.get('dsn.sle.frame_queue_size',
+                                                kwargs.get('frame_queue_size', 0))
+
+        self._data_queue = queues.BoundedQueue(self._pdu_queue_size, self._queue_policy)
+        # The Unix time the PDU being processed was read from the socket
+        self._pdu_received = None
+        self._frame_queue = None
+        self._frame_processor = None
+        self._provider_backlog = {'count': 0, 'last_time': None}
+
+        self._send_buffers = []
+        self._send_bytes = 0
+        self._send_lock = gevent.lock.Semaphore()
+        self._flush_timer = None
+
+        self._connected = gevent.event.Event()
+        self._heartbeat_timer = None
+        self._last_recv = None
+        self._last_heartbeat = None
 
         if not self._hostnames or not self._port:
             msg = 'Connection configuration missing hostnames ({}) or port ({})'
@@ -128,6 +188,10 @@ class SLE(object):
         if self._auth_level not in ['none', 'bind', 'all']:
             raise ValueError('Authentication level must be one of: "none", "bind", "all"')
 
+        if self._engine_name not in ['gevent', 'asyncio']:
+            raise ValueError('Engine must be one of: "gevent", "asyncio"')
+
+        self._credential_generators = {}
         self._local_entity_auth = {
             'local_entity_id': self._initiator_id,
             'auth_level': self._auth_level,
@@ -135,8 +199,17 @@ class SLE(object):
             'random_number': None
         }
 
-        self._conn_monitor = gevent.spawn(conn_handler, self)
-        self._data_processor = gevent.spawn(data_processor, self)
+        if self._engine_name == 'asyncio':
+            from ait.dsn.sle.aio import AsyncioEngine
+            self._engine = AsyncioEngine(self, loop=kwargs.get('loop', None))
+        else:
+            self._engine = None
+            self._conn_monitor = gevent.spawn(conn_handler, self)
+            self._data_processor = gevent.spawn(data_processor, self)
+
+            if self._frame_queue_size:
+                self._frame_queue = queues.BoundedQueue(self._frame_queue_size, self._queue_policy)
+                self._frame_processor = gevent.spawn(frame_processor, self)
 
     @property
     def invoke_id(self):
@@ -145,7 +218,7 @@ class SLE(object):
         self._invoke_id += 1
         return iid
 
-    def add_handler(self, event, handler):
+    def add_handler(self, event, handler, priority=0):
         ''' Add a "handler" function for an "event"
 
         Arguments:
@@ -157,20 +230,185 @@ class SLE(object):
                 The function that should be called for the specified event.
                 The function will be passed the decoded PyASN1 PDU as its
                 only argument.
+
+            priority (optional integer):
+                Handlers with a higher priority are called before those
+                with a lower priority. Handlers of equal priority are called
+                in the order in which they were added. Defaults to 0.
         '''
-        self._handlers[event].append(handler)
+        self._handlers[event].append((-priority, self._handler_count, handler))
+        self._handlers[event].sort()
+        self._handler_count += 1
+        self._compile_dispatch()
+
+    def remove_handler(self, event, handler):
+        ''' Remove a previously added "handler" function for an "event"
+
+        Arguments:
+            event:
+                A string of the PDU name that the handler was added for.
+
+            handler:
+                The handler function to remove.
+
+        Raises:
+            ValueError: If the handler is not registered for the event.
+        '''
+        entries = self._handlers.get(event, [])
+        for i, entry in enumerate(entries):
+            if entry[2] == handler:
+                del entries[i]
+                break
+        else:
+            raise ValueError('Handler {} not registered for event {}'.format(handler, event))
+
+        self._compile_dispatch()
+
+    def _compile_dispatch(self):
+        ''' Rebuild the PDU and frame dispatch tables from the handlers
+
+        The dispatch tables map the ASN.1 tag of each alternative of the
+        service's provider PDU and transfer buffer element Choice types to
+        a tuple of the handlers registered for it, so dispatching a decoded
+        PDU is a single dictionary lookup on the tag of its chosen component.
+
+        Transfer buffers are streamed, rather than decoded whole, while the
+        service's own transfer buffer handler is the only one registered,
+        since that handler only passes the elements on.
+        '''
+        self._pdu_dispatch = self._build_dispatch_table(self._provider_pdu_spec)
+        self._frame_dispatch = self._build_dispatch_table(self._frame_spec)
+
+        decoder = self._transfer_buffer_decoder
+        self._stream_transfer_buffers = (
+            decoder is not None and
+            self._pdu_dispatch.get(decoder.tag_set) == (getattr(self, '_data_transfer_handler', None),)
+        )
+
+    def _build_dispatch_table(self, spec):
+        ''''''
+        table = {}
+        if spec is None:
+            return table
+
+        for named_type in spec.componentType.namedTypes:
+            event = named_type.name[:1].upper() + named_type.name[1:]
+            entries = self._handlers.get(event)
+            if entries:
+                table[named_type.asn1Object.tagSet] = tuple(e[2] for e in entries)
+        return table
 
     def send(self, data):
-        ''' Send supplied data to DSN '''
-        try:
-            self._socket.send(data)
-        except socket.error as e:
-            if e.errno == errno.ECONNRESET:
-                ait.core.log.error('Socket connection lost to DSN')
-                self._socket.close()
+        ''' Send supplied data to DSN
+
+        The data is placed on the outbound queue. If no send latency budget
+        is configured the queue is written out immediately. Otherwise small
+        messages are held for up to ``send_latency`` seconds, or until
+        ``send_batch_size`` bytes are queued, so they can be written to the
+        socket together.
+        '''
+        self._enqueue([data])
+
+    def send_pdu(self, pdu):
+        ''' Encode a SLE PDU and send it to DSN
+
+        The TML header and the encoded PDU body are queued as separate
+        buffers, so a large body is written without being copied into a
+        single message first.
+
+        Arguments:
+            pdu: The PyASN1 class instance to encode and send
+        '''
+        self._enqueue(self._encode_pdu_parts(pdu))
+
+    def flush(self):
+        ''' Write all queued outbound data to DSN '''
+        self._cancel_flush_timer()
+        with self._send_lock:
+            buffers, self._send_buffers = self._send_buffers, []
+            self._send_bytes = 0
+            if not buffers:
+                return
+
+            try:
+                self._write_buffers(buffers)
+            except socket.error as e:
+                if e.errno == errno.ECONNRESET:
+                    ait.core.log.error('Socket connection lost to DSN')
+                    self._socket.close()
+                else:
+                    ait.core.log.error('Unexpected error encountered when sending data. Aborting ...')
+                    raise e
+
+    def _enqueue(self, buffers):
+        ''''''
+        self._send_buffers.extend(buffers)
+        self._send_bytes += sum(len(b) for b in buffers)
+
+        if self._send_latency <= 0 or self._send_bytes >= self._send_batch_size:
+            self.flush()
+        elif self._flush_timer is None:
+            if self._engine is not None:
+                self._flush_timer = self._engine.call_later(self._send_latency, self._timed_flush)
             else:
-                ait.core.log.error('Unexpected error encountered when sending data. Aborting ...')
-                raise e
+                self._flush_timer = gevent.spawn_later(self._send_latency, self._timed_flush)
+
+    def _timed_flush(self):
+        ''''''
+        self._flush_timer = None
+        self.flush()
+
+    def _cancel_flush_timer(self):
+        ''''''
+        if self._flush_timer is not None:
+            if self._engine is not None:
+                self._flush_timer.cancel()
+            else:
+                self._flush_timer.kill(block=False)
+            self._flush_timer = None
+
+    def _write_buffers(self, buffers):
+        ''' Write a list of buffers to the socket
+
+        Python 2.7 sockets have no scatter-gather ``sendmsg``, so buffers
+        of at least ``SEND_JOIN_MAX`` bytes are each written with their
+        own send and runs of smaller buffers, such as TML headers and
+        heartbeats, are joined into a single send. Partial writes are
+        resumed from the first unsent byte. When running on the asyncio
+        engine the buffers are handed to the engine's transport instead.
+        '''
+        if self._engine is not None:
+            self._engine.write(buffers)
+            return
+
+        run = []
+        run_size = 0
+        for data in buffers:
+            if len(data) >= SEND_JOIN_MAX:
+                if run:
+                    self._send_all(b''.join(run))
+                    run = []
+                    run_size = 0
+                self._send_all(data)
+                continue
+
+            run.append(data)
+            run_size += len(data)
+            if run_size >= SEND_JOIN_MAX:
+                self._send_all(b''.join(run))
+                run = []
+                run_size = 0
+
+        if run:
+            self._send_all(b''.join(run))
+
+    def _send_all(self, data):
+        ''''''
+        send = self._socket.send
+        sent = send(data)
+        while sent < len(data):
+            data = data[sent:]
+            sent = send(data)
 
     def decode(self, message, asn1Spec):
         ''' Decode a chunk of ASN.1 data
@@ -203,12 +441,18 @@ class SLE(object):
             The ASN.1 encoded PDU struct.pack-ed into the SLE PDU packet
             structure.
         '''
+        hdr, en = self._encode_pdu_parts(pdu)
+        return hdr + en
+
+    def _encode_pdu_parts(self, pdu):
+        ''' Encode a SLE PDU into its TML header and body
+
+        Returns:
+            A list containing the struct.pack-ed SLE PDU packet header and
+            the ASN.1 encoded PDU.
+        '''
         en = encode(pdu)
-        return struct.pack(
-                TML_SLE_FORMAT,
-                TML_SLE_TYPE,
-                len(en),
-        ) + en
+        return [struct.pack(TML_SLE_FORMAT, TML_SLE_TYPE, len(en)), en]
 
     def bind(self, pdu, **kwargs):
         ''' Bind to an SLE Interface
@@ -232,24 +476,26 @@ class SLE(object):
         if not inst_id:
             raise AttributeError('No instance id provided. Unable to bind.')
 
+        from ait.dsn.sle.pdu import service_instance
+
         inst_ids = [
             st.split('=')
             for st in inst_id.split('.')
         ]
 
-        sii = ServiceInstanceIdentifier()
+        sii = service_instance.ServiceInstanceIdentifier()
         for i, iden in enumerate(inst_ids):
             identifier = getattr(service_instance, iden[0].replace('-', '_'))
-            siae = ServiceInstanceAttributeElement()
+            siae = service_instance.ServiceInstanceAttributeElement()
             siae['identifier'] = identifier
             siae['siAttributeValue'] = iden[1]
-            sia = ServiceInstanceAttribute()
+            sia = service_instance.ServiceInstanceAttribute()
             sia[0] = siae
             sii[i] = sia
         pdu['serviceInstanceIdentifier'] = sii
 
         ait.core.log.info('Sending Bind request ...')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def unbind(self, pdu, reason=0):
         ''' Unbind from the SLE Interface
@@ -269,14 +515,22 @@ class SLE(object):
         pdu['unbindReason'] = reason
 
         ait.core.log.info('Sending Unbind request ...')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def connect(self):
         ''' Setup connection with DSN
 
         Initialize TCP connection with DSN and send context message
         to configure communication.
+
+        Returns:
+            None when using the gevent engine. When using the asyncio
+            engine the connection is made asynchronously and a future is
+            returned which completes once the context message is sent.
         '''
+        if self._engine is not None:
+            return self._engine.connect()
+
         self._socket = gevent.socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
         connected = False
@@ -293,6 +547,11 @@ class SLE(object):
             ait.core.log.error('Connection failure with DSN. Aborting ...')
             raise Exception('Unable to connect to DSN through any provided hostnames.')
 
+        self._send_context_message()
+        self._connection_made()
+
+    def _send_context_message(self):
+        ''' Send the ISP1 context message to configure the connection '''
         context_msg = struct.pack(
             TML_CONTEXT_MSG_FORMAT,
             TML_CONTEXT_MSG_TYPE,
@@ -316,12 +575,76 @@ class SLE(object):
         ''' Disconnect from SLE
 
         Disconnect the SLE and telemetry output sockets and kill the
-        greenlets for monitoring and processing data.
+        greenlets for monitoring and processing data. Any data still
+        waiting on the outbound queue is written before the socket closes.
         '''
+        try:
+            self.flush()
+        except socket.error:
+            ait.core.log.error('Unable to send queued data before disconnecting')
+
+        if self._engine is not None:
+            self._engine.close()
+            self._telem_sock.close()
+            return
+
+        self._connected.clear()
+        self._cancel_heartbeat()
         self._socket.close()
         self._telem_sock.close()
         self._conn_monitor.kill()
         self._data_processor.kill()
+        if self._frame_processor is not None:
+            self._frame_processor.kill()
+
+    def queue_status(self):
+        ''' Return the state of the receive queues
+
+        The provider's excessiveDataBacklog notifications are reported
+        alongside the local queues so a backlog at the provider can be told
+        apart from one caused by slow local processing.
+
+        Returns:
+            A dictionary with the following entries:
+
+            pdu_queue:
+                The depth, maxsize, high_water and dropped counts of the
+                queue of received PDUs waiting to be decoded.
+
+            frame_queue:
+                The same counts for the queue of decoded transfer buffer
+                elements waiting for their handlers, or None if frames are
+                dispatched as soon as they are decoded.
+
+            provider_backlog:
+                The number of excessiveDataBacklog notifications received
+                and the datetime of the most recent one.
+        '''
+        return {
+            'pdu_queue': self._data_queue.stats(),
+            'frame_queue': self._frame_queue.stats() if self._frame_queue is not None else None,
+            'provider_backlog': dict(self._provider_backlog),
+        }
+
+    def _provider_backlog_report(self):
+        ''' Record an excessiveDataBacklog notification
+
+        Returns:
+            A log message reporting the notification with the current
+            local queue depths.
+        '''
+        self._provider_backlog['count'] += 1
+        self._provider_backlog['last_time'] = dt.datetime.utcnow()
+
+        pdu_queue = self._data_queue
+        report = 'Excessive Data Backlog Detected. Local PDU queue: {}/{} ({} dropped)'.format(
+            pdu_queue.qsize(), pdu_queue.maxsize or 'unbounded', pdu_queue.dropped
+        )
+        if self._frame_queue is not None:
+            report += ', frame queue: {}/{} ({} dropped)'.format(
+                self._frame_queue.qsize(), self._frame_queue.maxsize, self._frame_queue.dropped
+            )
+        return report
 
     def stop(self, pdu):
         ''' Send a SLE Stop PDU.
@@ -339,12 +662,70 @@ class SLE(object):
         pdu['invokeId'] = self.invoke_id
 
         ait.core.log.info('Sending data stop invocation ...')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def _need_heartbeat(self, time_delta):
         ''''''
         return time_delta >= self._heartbeat
 
+    def _schedule_heartbeat(self, delay):
+        ''''''
+        self._cancel_heartbeat()
+        self._heartbeat_timer = gevent.spawn_later(max(delay, 0), self._heartbeat_task)
+
+    def _cancel_heartbeat(self):
+        ''''''
+        timer, self._heartbeat_timer = self._heartbeat_timer, None
+        if timer is not None and timer is not gevent.getcurrent():
+            timer.kill()
+
+    def _heartbeat_task(self):
+        ''' Send due heartbeats and check the connection is still alive
+
+        The task runs from a timer rather than from the receive loop so
+        heartbeats are sent on time however long the socket stays quiet.
+        If nothing has been received from the provider for ``heartbeat *
+        deadfactor`` seconds the connection is treated as dead and closed.
+        The next run is scheduled for whichever of the next heartbeat and
+        the dead factor deadline comes first. A heartbeat interval of 0
+        means no heartbeats, so the task does nothing.
+        '''
+        self._heartbeat_timer = None
+        if not self._connected.is_set() or self._heartbeat <= 0:
+            return
+
+        now = time.time()
+        dead_time = self._heartbeat * self._deadfactor
+        if now - self._last_recv >= dead_time:
+            ait.core.log.error('No data received from DSN within the dead factor interval. Closing connection.')
+            self._connection_lost()
+            return
+
+        if self._need_heartbeat(now - self._last_heartbeat):
+            self._last_heartbeat = now
+            try:
+                self._send_heartbeat()
+            except socket.error:
+                ait.core.log.error('Unable to send heartbeat to DSN')
+
+        next_run = min(self._last_heartbeat + self._heartbeat, self._last_recv + dead_time)
+        self._schedule_heartbeat(next_run - now)
+
+    def _connection_made(self):
+        ''' Start receiving and sending heartbeats on a new connection '''
+        now = time.time()
+        self._last_recv = now
+        self._last_heartbeat = now
+        self._connected.set()
+        if self._heartbeat > 0:
+            self._schedule_heartbeat(self._heartbeat)
+
+    def _connection_lost(self):
+        ''' Stop heartbeats and close the socket after the link is lost '''
+        self._connected.clear()
+        self._cancel_heartbeat()
+        self._socket.close()
+
     def _send_heartbeat(self):
         ''''''
         hb = struct.pack(
@@ -354,20 +735,84 @@ class SLE(object):
         )
         self.send(hb)
 
+    def _process_pdu(self, body):
+        ''' Decode the ASN.1 encoded body of a received PDU and handle it '''
+        if self._stream_transfer_buffers and self._transfer_buffer_decoder.matches(body):
+            try:
+                self._handle_frames(self._transfer_buffer_decoder.iter_elements(body))
+            except pyasn1.error.PyAsn1Error as e:
+                ait.core.log.error('Unable to decode transfer buffer. Skipping remaining frames ...')
+            return
+
+        try:
+            decoded_pdu, remainder = self.decode(body)
+        except pyasn1.error.PyAsn1Error as e:
+            ait.core.log.error('Unable to decode PDU. Skipping ...')
+            return
+        except TypeError as e:
+            ait.core.log.error('Unable to decode PDU due to type error ...')
+            return
+
+        self._handle_pdu(decoded_pdu)
+
     def _handle_pdu(self, pdu):
+        ''''''
+        pdu_handlers = self._pdu_dispatch.get(pdu.getComponent().tagSet)
+        if pdu_handlers is None:
+            self._log_unhandled(pdu)
+            return
+
+        for h in pdu_handlers:
+            h(pdu)
+
+    def _handle_frames(self, frames):
+        ''' Dispatch each element of a decoded transfer buffer
+
+        If a frame queue is configured the elements are placed on it and
+        dispatched by the frame processing greenlet instead, so handlers
+        may run after later PDUs, such as a stop return, have been handled.
+
+        Arguments:
+            frames:
+                An iterable of decoded transfer buffer elements (annotated
+                frames or sync notifications).
+        '''
+        if self.tracer is not None:
+            frames = self.tracer.trace(frames, self._pdu_received)
+
+        if self._frame_queue is not None:
+            put = self._frame_queue.put
+            for frame in frames:
+                put(frame)
+            return
+
+        self._dispatch_frames(frames)
+
+    def _dispatch_frames(self, frames):
+        ''''''
+        dispatch = self._frame_dispatch.get
+        tracer = self.tracer
+        for frame in frames:
+            frame_handlers = dispatch(frame.getComponent().tagSet)
+            if frame_handlers is None:
+                self._log_unhandled(frame)
+                continue
+
+            for h in frame_handlers:
+                h(frame)
+
+            if tracer is not None:
+                tracer.delivered(frame)
+
+    def _log_unhandled(self, pdu):
         ''''''
         pdu_key = pdu.getName()
         pdu_key = pdu_key[:1].upper() + pdu_key[1:]
-        if pdu_key in self._handlers:
-            pdu_handlers = self._handlers[pdu_key]
-            for h in pdu_handlers:
-                h(pdu)
-        else:
-            err = (
-                'PDU of type {} has no associated handlers. '
-                'Unable to process further and skipping ...'
-            )
-            ait.core.log.error(err.format(pdu_key))
+        err = (
+            'PDU of type {} has no associated handlers. '
+            'Unable to process further and skipping ...'
+        )
+        ait.core.log.error(err.format(pdu_key))
 
     def make_credentials(self):
         '''Makes credentials for the initiator'''
@@ -383,16 +828,8 @@ class SLE(object):
         return self._generate_encoded_credentials(now, random_number, self._initiator_id, self._password)
 
     def _check_return_credentials(self, responder_performer_credentials, username, password):
-        decoded_credentials = decode(responder_performer_credentials.asOctets(), ISP1Credentials())[0]
-        days, ms, us = struct.unpack('!HIH', str(bytearray(decoded_credentials['time'].asNumbers())))
-        time_delta = dt.timedelta(days=days, milliseconds=ms, microseconds=us)
-        cred_time = time_delta + dt.datetime(1958, 1, 1)
-        random_number = decoded_credentials['randomNumber']
-        performer_credentials = self._generate_encoded_credentials(cred_time,
-                                                                   random_number,
-                                                                   self._responder_id,
-                                                                   self._peer_password)
-        return performer_credentials == responder_performer_credentials
+        '''Verifies the ISP1 performer credentials returned by the provider'''
+        return self._credential_generator(username, password).verify(responder_performer_credentials)
 
     def _generate_encoded_credentials(self, current_time, random_number, username, password):
         '''Generates encoded ISP1 credentials
@@ -407,89 +844,83 @@ class SLE(object):
             password:
                 The password to use to create the credentials.
         '''
-        hash_input = HashInput()
-        days = (current_time - dt.datetime(1958, 1, 1)).days
-        millisecs = (current_time - current_time.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds() * 1000
-        microsecs = int(round(millisecs % 1 * 1000))
-        millisecs = int(millisecs)
-        credential_time = struct.pack('!HIH', days, millisecs, microsecs)
-
-        hash_input['time'] = credential_time
-        hash_input['randomNumber'] = random_number
-        hash_input['username'] = username
-        hash_input['password'] = password
-        der_encoded_hash_input = der_encode(hash_input)
-        the_protected = bytearray.fromhex(hashlib.sha1(der_encoded_hash_input).hexdigest())
-
-        isp1_creds = ISP1Credentials()
-        isp1_creds['time'] = credential_time
-        isp1_creds['randomNumber'] = random_number
-        isp1_creds['theProtected'] = the_protected
-
-        return encode(isp1_creds)
+        return self._credential_generator(username, password).generate(current_time, random_number)
+
+    def _credential_generator(self, username, password):
+        ''''''
+        key = (username, password)
+        gen = self._credential_generators.get(key)
+        if gen is None:
+            gen = isp1.CredentialGenerator(username, password)
+            self._credential_generators[key] = gen
+        return gen
 
 def conn_handler(handler):
-    ''' Handler for processing data received from the DSN into PDUs'''
-    hb_time = int(time.time())
-    msg = ''
+    ''' Handler for processing data received from the DSN into PDUs
 
+    The handler waits until the interface is connected and then blocks on
+    the socket until data arrives, so received PDUs are queued as soon as
+    they are complete. Heartbeats are sent and the dead factor is checked
+    from a separate timer.
+    '''
     while True:
-        gevent.sleep(0)
+        handler._connected.wait()
+        sock = handler._socket
+        msg = ''
 
-        now = int(time.time())
-        if handler._need_heartbeat(now - hb_time):
-            hb_time = now
-            handler._send_heartbeat()
+        while True:
+            try:
+                data = sock.recv(handler._buffer_size)
+            except socket.error as e:
+                data = ''
+                if handler._connected.is_set():
+                    ait.core.log.error('Socket connection lost to DSN: {}'.format(e))
+
+            if not data:
+                if handler._connected.is_set():
+                    ait.core.log.error('Connection closed by DSN')
+                    handler._connection_lost()
+                break
 
-        try:
-            msg = msg + handler._socket.recv(handler._buffer_size)
-        except:
-            gevent.sleep(1)
-
-        while len(msg) >= 8:
-            hdr, rem = msg[:8], msg[8:]
-
-            # PDU Received
-            if binascii.hexlify(hdr[:4]) == '01000000':
-                # Get length of body and check if the entirety of the
-                # body has been received. If we can, process the message(s)
-                body_len = util.hexint(hdr[4:])
-                if len(rem) < body_len:
-                    break
+            handler._last_recv = time.time()
+            msg = msg + data
+
+            while len(msg) >= 8:
+                hdr, rem = msg[:8], msg[8:]
+
+                # PDU Received
+                if binascii.hexlify(hdr[:4]) == '01000000':
+                    # Get length of body and check if the entirety of the
+                    # body has been received. If we can, process the message(s)
+                    body_len = util.hexint(hdr[4:])
+                    if len(rem) < body_len:
+                        break
+                    else:
+                        body = rem[:body_len]
+                        handler._data_queue.put((hdr + body, handler._last_recv))
+                        msg = msg[len(hdr) + len(body):]
+                # Heartbeat Received
+                elif binascii.hexlify(hdr[:8]) == '0300000000000000':
+                    msg = rem
                 else:
-                    body = rem[:body_len]
-                    handler._data_queue.put(hdr + body)
-                    msg = msg[len(hdr) + len(body):]
-            # Heartbeat Received
-            elif binascii.hexlify(hdr[:8]) == '0300000000000000':
-                msg = rem
-            else:
-                err = (
-                    'Received PDU with unexpected header. '
-                    'Unable to parse data further.\n'
-                )
-                ait.core.log.error(err)
-                ait.core.log.error('\n'.join([msg[i:i+16] for i in range(0, len(msg), 16)]))
-                raise ValueError(err)
+                    err = (
+                        'Received PDU with unexpected header. '
+                        'Unable to parse data further.\n'
+                    )
+                    ait.core.log.error(err)
+                    ait.core.log.error('\n'.join([msg[i:i+16] for i in range(0, len(msg), 16)]))
+                    raise ValueError(err)
 
 
 def data_processor(handler):
     ''' Handler for decoding ASN.1 encoded PDUs '''
     while True:
-        gevent.sleep(0)
-        if handler._data_queue.empty():
-            continue
-
-        msg = handler._data_queue.get()
-        hdr, body = msg[:8], msg[8:]
+        msg, handler._pdu_received = handler._data_queue.get()
+        handler._process_pdu(msg[8:])
 
-        try:
-            decoded_pdu, remainder = handler.decode(body)
-        except pyasn1.error.PyAsn1Error as e:
-            ait.core.log.error('Unable to decode PDU. Skipping ...')
-            continue
-        except TypeError as e:
-            ait.core.log.error('Unable to decode PDU due to type error ...')
-            continue
 
-        handler._handle_pdu(decoded_pdu)
+def frame_processor(handler):
+    ''' Handler for dispatching queued transfer buffer elements '''
+    while True:
+        frame = handler._frame_queue.get()
+        handler._dispatch_frames((frame,))
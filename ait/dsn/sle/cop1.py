@@ -0,0 +1,383 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' COP-1 Frame Operation Procedure
+
+The ait.dsn.sle.cop1 module implements the sending end of the CCSDS
+Communications Operation Procedure (COP-1, CCSDS 232.1-B), the Frame
+Operation Procedure (FOP-1), on top of an F-CLTU service instance.
+
+Sequence-controlled (Type-AD) frames are numbered and sent as long as they
+fit in a sliding window of unacknowledged frames. The spacecraft's FARM
+reports the next frame it expects, and whether it needs a retransmission,
+in the Communications Link Control Word (CLCW) carried in the Operational
+Control Field of downlink frames. Acknowledged frames leave the window,
+frames are retransmitted when the FARM asks for it or when the
+acknowledgement timer expires, and the procedure alerts once the
+transmission limit is reached or the FARM is locked out.
+
+The procedure uses the gevent engine for its timer.
+
+Example:
+
+    fop = FOP1(cltu_mngr, spacecraft_id=250, virtual_channel_id=0, window=15)
+    fop.watch(rcf_mngr)
+    fop.initialise()
+    for packet in packets:
+        fop.send(packet)
+
+Classes:
+    FOP1: Send Type-AD frames through a sliding window acknowledged by
+        CLCW reports.
+
+Attributes:
+    UNLOCK: The Unlock control command.
+'''
+
+from collections import deque
+
+import gevent
+
+import ait.core.log
+
+import coding
+import frames
+
+UNLOCK = b'\x00'
+_SET_VR = b'\x82\x00'
+
+
+def _modulo(value):
+    ''''''
+    return value & 0xFF
+
+
+class FOP1(object):
+    ''' Send Type-AD frames through a sliding window acknowledged by CLCWs
+
+    The procedure is in one of these states:
+
+        initial: Not sending. Frames given to :meth:`send` wait until the
+            procedure is initialised.
+
+        initialising: A Set V(R) directive was sent and the procedure is
+            waiting for a CLCW confirming it.
+
+        active: Frames are sent as the window allows.
+
+        retransmit: The FARM asked for a retransmission or the timer
+            expired, and the unacknowledged frames were sent again.
+
+        wait: The FARM has no buffer space. Nothing is sent until it
+            clears its wait flag.
+
+    Arguments:
+        service (:class:`ait.dsn.sle.cltu.CLTU`):
+            The F-CLTU service frames are sent through.
+
+        spacecraft_id (integer):
+            The spacecraft id.
+
+        virtual_channel_id (integer):
+            The virtual channel id.
+
+        window (optional integer):
+            The FOP sliding window width K, the maximum number of
+            unacknowledged frames. Defaults to 10.
+
+        timer (optional number):
+            The number of seconds to wait for an acknowledgement before
+            retransmitting (T1_Initial). Defaults to 5.
+
+        transmission_limit (optional integer):
+            The number of times a frame may be transmitted. Defaults to 3.
+
+        map_id (optional integer):
+            The MAP id. If given frames carry a segment header.
+
+        fecf (optional boolean):
+            Whether frames have a Frame Error Control Field. Defaults to
+            True.
+
+        randomised (optional boolean):
+            Whether CLTUs are randomised. Defaults to False.
+
+        on_alert (optional callable):
+            Called with a reason string when the procedure gives up. The
+            unacknowledged and waiting frames are discarded.
+
+    Attributes:
+        state: The procedure's state.
+
+        vs: V(S), the sequence number of the next new Type-AD frame.
+
+        nnr: NN(R), the sequence number of the oldest unacknowledged
+            frame.
+
+        retransmissions: The number of frames retransmitted.
+    '''
+    def __init__(self, service, spacecraft_id, virtual_channel_id, window=10, timer=5,
+                 transmission_limit=3, map_id=None, fecf=True, randomised=False, on_alert=None):
+        if not 1 <= window <= 255:
+            raise ValueError('FOP window width must be between 1 and 255')
+
+        self._service = service
+        self._spacecraft_id = spacecraft_id
+        self._virtual_channel_id = virtual_channel_id
+        self._window = window
+        self._timer = timer
+        self._transmission_limit = transmission_limit
+        self._map_id = map_id
+        self._fecf = fecf
+        self._randomised = randomised
+        self._on_alert = on_alert
+
+        self.state = 'initial'
+        self.vs = 0
+        self.nnr = 0
+        self.retransmissions = 0
+
+        # Entries are [frame sequence number, CLTU, transmission count]
+        self._sent = deque()
+        self._waiting = deque()
+        self._timer_greenlet = None
+        self._frame_handlers = {}
+
+    def status(self):
+        ''' Return a dictionary describing the procedure's state '''
+        return {
+            'state': self.state,
+            'vs': self.vs,
+            'nnr': self.nnr,
+            'unacknowledged': len(self._sent),
+            'waiting': len(self._waiting),
+            'retransmissions': self.retransmissions,
+        }
+
+    def watch(self, service, fecf=False):
+        ''' Read CLCWs from the frames received by a RAF or RCF instance
+
+        Arguments:
+            service:
+                The RAF or RCF instance.
+
+            fecf (optional boolean):
+                Whether the downlink frames end with a Frame Error Control
+                Field. Defaults to False.
+        '''
+        def on_frame(pdu):
+            ocf = frames.tm_ocf(pdu.getComponent()['data'].asOctets(), fecf)
+            if ocf is not None:
+                self.on_clcw(frames.CLCW(ocf))
+
+        self._frame_handlers[id(service)] = on_frame
+        service.add_handler('AnnotatedFrame', on_frame)
+
+    def unwatch(self, service):
+        ''' Stop reading CLCWs from a RAF or RCF instance '''
+        on_frame = self._frame_handlers.pop(id(service), None)
+        if on_frame is not None:
+            service.remove_handler('AnnotatedFrame', on_frame)
+
+    def initialise(self, vr=None):
+        ''' Initiate the AD service
+
+        Unacknowledged frames are discarded. Frames waiting for the window
+        are sent once the procedure is active.
+
+        Arguments:
+            vr (optional integer):
+                If given, a Set V(R) directive is sent with this value and
+                the procedure waits for a CLCW confirming it. Otherwise the
+                procedure becomes active immediately with V(S) unchanged.
+        '''
+        self._cancel_timer()
+        self._sent.clear()
+
+        if vr is None:
+            self.nnr = self.vs
+            self._set_state('active')
+            self._flush_waiting()
+            return
+
+        self.vs = self.nnr = _modulo(vr)
+        self._set_state('initialising')
+        self._send_control(_SET_VR + bytearray([self.vs]))
+        self._start_timer()
+
+    def unlock(self):
+        ''' Send the Unlock control command to clear a FARM lockout '''
+        self._send_control(UNLOCK)
+
+    def send(self, data):
+        ''' Send a user data unit in a Type-AD frame
+
+        The frame is sent now if the window has room and the procedure is
+        active, and otherwise waits its turn.
+        '''
+        self._waiting.append(data)
+        self._flush_waiting()
+
+    def send_expedited(self, data):
+        ''' Send a user data unit in a Type-BD frame, bypassing the window '''
+        self._upload(self._cltu(data, bypass_flag=1))
+
+    def on_clcw(self, clcw):
+        ''' Process a CLCW reported by the FARM '''
+        if clcw['virtual_channel_id'] != self._virtual_channel_id or clcw['cop_in_effect'] != 1:
+            return
+
+        if clcw['lockout']:
+            if self.state not in ('initial', 'initialising'):
+                self._alert('FARM lockout')
+            return
+
+        nr = clcw['report_value']
+        if self.state == 'initialising':
+            # CLCWs sent before the FARM processed Set V(R) still report the
+            # old value, so only a confirming CLCW is acted on.
+            if nr == self.vs and not clcw['retransmit'] and not clcw['wait']:
+                self._cancel_timer()
+                self._set_state('active')
+                self._flush_waiting()
+            return
+
+        if self.state == 'initial':
+            return
+
+        if _modulo(nr - self.nnr) > _modulo(self.vs - self.nnr):
+            self._alert('Invalid N(R) {} outside {} to {}'.format(nr, self.nnr, self.vs))
+            return
+
+        acknowledged = nr != self.nnr
+        while self._sent and self._sent[0][0] != nr:
+            self._sent.popleft()
+        self.nnr = nr
+
+        if acknowledged:
+            self._cancel_timer()
+            if self._sent:
+                self._start_timer()
+
+        if clcw['wait']:
+            self._set_state('wait')
+            return
+
+        if clcw['retransmit']:
+            if acknowledged or self.state != 'retransmit':
+                self._retransmit()
+            return
+
+        self._set_state('active')
+        self._flush_waiting()
+
+    def _flush_waiting(self):
+        ''''''
+        if self.state != 'active':
+            return
+
+        while self._waiting and len(self._sent) < self._window:
+            data = self._waiting.popleft()
+            entry = [self.vs, self._cltu(data, frame_seq_num=self.vs), 1]
+            self.vs = _modulo(self.vs + 1)
+            self._sent.append(entry)
+            self._upload(entry[1])
+
+            if self._timer_greenlet is None:
+                self._start_timer()
+
+    def _retransmit(self):
+        ''''''
+        self._cancel_timer()
+        if not self._sent:
+            self._set_state('active')
+            return
+
+        if any(entry[2] >= self._transmission_limit for entry in self._sent):
+            self._alert('Transmission limit reached for frame {}'.format(self._sent[0][0]))
+            return
+
+        self._set_state('retransmit')
+        for entry in self._sent:
+            entry[2] += 1
+            self.retransmissions += 1
+            self._upload(entry[1])
+        self._start_timer()
+
+    def _timer_expired(self):
+        ''''''
+        self._timer_greenlet = None
+
+        if self.state == 'initialising':
+            self._alert('Timed out waiting for Set V(R) confirmation')
+        elif self.state == 'wait':
+            self._alert('Timed out waiting for the FARM to clear its wait flag')
+        else:
+            self._retransmit()
+
+    def _start_timer(self):
+        ''''''
+        self._cancel_timer()
+        self._timer_greenlet = gevent.spawn_later(self._timer, self._timer_expired)
+
+    def _cancel_timer(self):
+        ''''''
+        if self._timer_greenlet is not None:
+            self._timer_greenlet.kill(block=False)
+            self._timer_greenlet = None
+
+    def _alert(self, reason):
+        ''''''
+        ait.core.log.error('FOP-1 alert on VC {}: {}'.format(self._virtual_channel_id, reason))
+        self._cancel_timer()
+        self._purge()
+        self._set_state('initial')
+
+        if self._on_alert is not None:
+            self._on_alert(reason)
+
+    def _purge(self):
+        ''''''
+        self._sent.clear()
+        self._waiting.clear()
+
+    def _set_state(self, state):
+        ''''''
+        if state != self.state:
+            ait.core.log.info('FOP-1 VC {}: {} -> {}'.format(self._virtual_channel_id, self.state, state))
+            self.state = state
+
+    def _send_control(self, data):
+        ''''''
+        self._upload(self._cltu(data, bypass_flag=1, control_command_flag=1))
+
+    def _cltu(self, data, frame_seq_num=0, bypass_flag=0, control_command_flag=0):
+        ''''''
+        frame = frames.TCTransFrame(
+            fecf=self._fecf,
+            bypass_flag=bypass_flag,
+            control_command_flag=control_command_flag,
+            spacecraft_id=self._spacecraft_id,
+            virtual_channel_id=self._virtual_channel_id,
+            frame_seq_num=frame_seq_num
+        )
+        frame['data'] = data
+        if self._map_id is not None and not control_command_flag:
+            frame['map_id'] = self._map_id
+        return coding.encode_cltu(frame.encode(), self._randomised)
+
+    def _upload(self, cltu):
+        ''''''
+        self._service.upload_cltu(bytearray(cltu))
@@ -0,0 +1,464 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Compiled Packet Decommutation
+
+The ait.dsn.sle.decom module decodes the space packets carried in
+downlinked frames into columns of telemetry values. Each packet definition
+from the telemetry dictionary (``tlm.yaml``) is compiled once into a
+:class:`PacketDecoder`: a ``struct`` layout for decoding single packets
+and a NumPy structured dtype for decoding batches. A batch of packets of
+one type is decoded with a single ``numpy.frombuffer`` call, giving one
+array per field and an array of earth receive times.
+
+Columns hold raw values. Masks are applied, but DN to EU conversions,
+enumerations and ``when`` conditions are left to the consumers of the
+columns. Time fields are decoded to seconds since the GPS epoch.
+
+Packets which span frames are reassembled per virtual channel by
+:class:`ait.dsn.sle.router.PacketReassembler`. A packet left incomplete by
+a missing frame is dropped and counted.
+
+Packet definitions don't name their APIDs, so the APID of each packet
+type is configured under ``dsn.sle.decom.apids``:
+
+.. code-block:: yaml
+
+    dsn:
+        sle:
+            decom:
+                apids:
+                    - apid: 0x12
+                      packet: 1553_HS_Packet
+
+NumPy is required for batch decoding and is an optional dependency.
+
+Example:
+
+    def publish(name, columns):
+        ...
+
+    decom = Decommutator(publish, apids={0x12: '1553_HS_Packet'})
+    decom.attach(raf_mngr)
+
+Classes:
+    PacketDecoder: Decode packets of one definition into columns.
+
+    Decommutator: Route packets from frames to their decoders by APID
+        and pass decoded batches to a sink.
+
+Functions:
+    load_packet_defs: Load the packet definitions from ``tlm.yaml``.
+'''
+
+from collections import OrderedDict
+import struct
+
+import ait.core.log
+
+import ccsdstime
+from router import PacketReassembler
+
+# struct formats of the AIT primitive types
+_FORMATS = {
+    'I8': 'b',
+    'U8': 'B',
+    'LSB_I16': '<h',
+    'MSB_I16': '>h',
+    'LSB_U16': '<H',
+    'MSB_U16': '>H',
+    'LSB_I32': '<i',
+    'MSB_I32': '>i',
+    'LSB_U32': '<I',
+    'MSB_U32': '>I',
+    'LSB_I64': '<q',
+    'MSB_I64': '>q',
+    'LSB_U64': '<Q',
+    'MSB_U64': '>Q',
+    'LSB_F32': '<f',
+    'MSB_F32': '>f',
+    'LSB_D64': '<d',
+    'MSB_D64': '>d',
+    'CMD16': '>H',
+    'EVR16': '>H',
+}
+
+# The time types as (struct format, offset, scale) parts which are summed
+# to give seconds since the GPS epoch.
+_TIME_PARTS = {
+    'TIME8': [('B', 0, 1 / 256.0)],
+    'TIME32': [('>I', 0, 1)],
+    'TIME40': [('>I', 0, 1), ('B', 4, 1 / 256.0)],
+    'TIME64': [('>I', 0, 1), ('>I', 4, 1e-9)],
+}
+
+_PACKET_ID = struct.Struct('>H')
+_NS_EPOCH = '1958-01-01T00:00:00'
+
+
+def load_packet_defs(filename=None):
+    ''' Load the packet definitions from tlm.yaml
+
+    Arguments:
+        filename (optional string):
+            The telemetry dictionary to load. Defaults to the AIT default
+            telemetry dictionary (the ``tlmdict.filename`` config value).
+
+    Returns:
+        An :class:`ait.core.tlm.TlmDict` of packet definitions by name.
+    '''
+    import ait.core.tlm
+
+    if filename is None:
+        return ait.core.tlm.getDefaultDict()
+    return ait.core.tlm.TlmDict(filename)
+
+
+def _type_name(field):
+    ''''''
+    return getattr(field.type, 'name', field.type)
+
+
+def _parts(type_name):
+    ''''''
+    if type_name in _TIME_PARTS:
+        return _TIME_PARTS[type_name]
+
+    count = 1
+    if type_name.endswith(']'):
+        type_name, count = type_name[:-1].split('[')
+        count = int(count)
+
+    if type_name in _FORMATS:
+        fmt = _FORMATS[type_name]
+    elif type_name.startswith('S') and type_name[1:].isdigit():
+        fmt = type_name[1:] + 's'
+    else:
+        raise ValueError('Unsupported field type {}'.format(type_name))
+
+    if count > 1:
+        fmt = fmt[:-1] + str(count) + fmt[-1]
+    return [(fmt, 0, None)]
+
+
+class PacketDecoder(object):
+    ''' Decode packets of one definition into columns
+
+    Fields without a byte offset follow the previous field, and fields at
+    ``@prev`` start where the previous field starts, as in the telemetry
+    dictionary. Fields may overlap, e.g. several masked fields in one word.
+
+    Arguments:
+        defn:
+            A packet definition with a ``name`` and a list of ``fields``,
+            such as an :class:`ait.core.tlm.PacketDefinition`. Each field
+            needs a ``name``, ``bytes``, ``type`` and ``mask``.
+
+        offset (optional integer):
+            The number of octets in each packet before the definition's
+            first byte, e.g. 6 for packets passed with their primary
+            header. Defaults to 0.
+
+    Attributes:
+        name: The packet definition's name.
+
+        size: The minimum packet length in octets, including the offset.
+
+        fields: The names of the columns, in definition order.
+
+        short: The number of packets dropped for being shorter than size.
+    '''
+    def __init__(self, defn, offset=0):
+        self.name = defn.name
+        self._offset = offset
+        self._columns = []
+        self.short = 0
+
+        position = 0
+        previous = 0
+        end = 0
+        for field in defn.fields:
+            parts = _parts(_type_name(field))
+            size = max(o + struct.calcsize(f) for f, o, _ in parts)
+
+            if field.bytes == '@prev':
+                start = previous
+            elif field.bytes is None:
+                start = position
+            elif isinstance(field.bytes, int):
+                start = field.bytes
+            else:
+                start = field.bytes[0]
+
+            mask = field.mask
+            shift = 0
+            while mask and not (mask >> shift) & 1:
+                shift += 1
+
+            self._columns.append((
+                field.name,
+                [(struct.Struct(f), start + o, scale) for f, o, scale in parts],
+                mask,
+                shift
+            ))
+
+            previous, position = start, start + size
+            end = max(end, position)
+
+        self.fields = [c[0] for c in self._columns]
+        self.size = offset + end
+        self._dtype = None
+
+    def decode_one(self, packet):
+        ''' Decode a single packet with struct
+
+        Returns:
+            An OrderedDict of field values by name.
+        '''
+        if len(packet) < self.size:
+            raise ValueError('{} packet is {} octets, expected at least {}'.format(
+                self.name, len(packet), self.size))
+
+        offset = self._offset
+        values = OrderedDict()
+        for name, parts, mask, shift in self._columns:
+            if parts[0][2] is None:
+                fmt, start, _ = parts[0]
+                value = fmt.unpack_from(packet, offset + start)
+                if mask is not None:
+                    value = [(v & mask) >> shift for v in value]
+                value = value[0] if len(value) == 1 else list(value)
+            else:
+                value = sum(f.unpack_from(packet, offset + s)[0] * scale for f, s, scale in parts)
+            values[name] = value
+        return values
+
+    def decode(self, packets, erts=None):
+        ''' Decode a batch of packets into columns with NumPy
+
+        Arguments:
+            packets (list):
+                The packets to decode. Octets beyond the definition are
+                ignored.
+
+            erts (optional list):
+                The earth receive time of each packet in nanoseconds since
+                the CCSDS epoch, as returned by
+                :func:`ait.dsn.sle.ccsdstime.to_nanoseconds`.
+
+        Returns:
+            An OrderedDict of NumPy arrays by field name, in native byte
+            order. If ERTs are given the first column is ``ert``, a
+            ``datetime64[ns]`` array.
+        '''
+        import numpy
+
+        if self._dtype is None:
+            self._dtype = self._compile(numpy)
+
+        lo = self._offset
+        hi = self.size
+        if packets and min(len(p) for p in packets) < hi:
+            keep = [i for i, p in enumerate(packets) if len(p) >= hi]
+            self.short += len(packets) - len(keep)
+            ait.core.log.warn('Dropped {} short {} packets'.format(len(packets) - len(keep), self.name))
+            packets = [packets[i] for i in keep]
+            if erts is not None:
+                erts = [erts[i] for i in keep]
+
+        records = numpy.frombuffer(
+            bytearray().join(p[lo:hi] for p in packets), dtype=self._dtype)
+
+        columns = OrderedDict()
+        if erts is not None:
+            columns['ert'] = (numpy.datetime64(_NS_EPOCH, 'ns')
+                              + numpy.array(erts, dtype='i8').astype('timedelta64[ns]'))
+
+        for index, (name, parts, mask, shift) in enumerate(self._columns):
+            if parts[0][2] is None:
+                raw = records['f{}_0'.format(index)]
+                value = raw.astype(raw.dtype.newbyteorder('='))
+                if mask is not None:
+                    value &= mask
+                    value >>= shift
+            else:
+                value = numpy.zeros(len(records))
+                for p, (_, _, scale) in enumerate(parts):
+                    value += records['f{}_{}'.format(index, p)] * scale
+            columns[name] = value
+
+        return columns
+
+    def _compile(self, numpy):
+        ''''''
+        names, formats, offsets = [], [], []
+        for index, (_, parts, _, _) in enumerate(self._columns):
+            for p, (fmt, start, _) in enumerate(parts):
+                names.append('f{}_{}'.format(index, p))
+                formats.append(_numpy_format(numpy, fmt.format))
+                offsets.append(start)
+
+        return numpy.dtype({
+            'names': names,
+            'formats': formats,
+            'offsets': offsets,
+            'itemsize': self.size - self._offset
+        })
+
+
+def _numpy_format(numpy, fmt):
+    ''''''
+    if fmt.endswith('s'):
+        return 'S' + fmt[:-1]
+
+    order = fmt[0] if fmt[0] in '<>' else ''
+    count = fmt[len(order):-1]
+    dtype = numpy.dtype(order + fmt[-1])
+    return (dtype, int(count)) if count else dtype
+
+
+class Decommutator(object):
+    ''' Route packets to their decoders by APID and decode them in batches
+
+    Packets are collected per APID and decoded once ``batch_size`` have
+    been collected or :meth:`flush` is called. Each decoded batch is passed
+    to the sink as the packet name and an OrderedDict of columns (see
+    :meth:`PacketDecoder.decode`), starting with the ``ert`` column.
+
+    Arguments:
+        sink:
+            A callable which receives the packet name and the columns of
+            each decoded batch.
+
+        apids (optional dict):
+            The packet definition name for each APID. The
+            ``dsn.sle.decom.apids`` config value, a list of ``apid`` and
+            ``packet`` entries, takes precedence.
+
+        tlmdict (optional dict):
+            The packet definitions by name. Defaults to the AIT default
+            telemetry dictionary.
+
+        header_size (optional integer):
+            The number of octets before each definition's first byte.
+            Defaults to 6, the primary header.
+
+        batch_size (optional integer):
+            The number of packets of one APID to collect before decoding.
+            Defaults to 1024.
+
+        fecf (optional boolean):
+            Whether frames end with a Frame Error Control Field. Defaults
+            to False.
+
+    Attributes:
+        received: The number of packets added.
+
+        unknown: The number of packets dropped because their APID has no
+            decoder.
+
+        dropped: The number of packets dropped because a frame carrying
+            part of them was missing.
+    '''
+    def __init__(self, sink, apids=None, tlmdict=None, header_size=6, batch_size=1024, fecf=False):
+        entries = ait.config.get('dsn.sle.decom.apids', None)
+        if entries is not None:
+            apids = dict((e['apid'], e['packet']) for e in entries)
+
+        if not apids:
+            raise ValueError('No APIDs are mapped to packet definitions')
+
+        if tlmdict is None:
+            tlmdict = load_packet_defs()
+
+        self._sink = sink
+        self._batch_size = batch_size
+        self._reassembler = PacketReassembler(fecf)
+        self._decoders = {}
+        self._pending = {}
+        for apid, name in apids.items():
+            if name not in tlmdict:
+                raise ValueError('Unknown packet definition {} for APID {}'.format(name, apid))
+            self._decoders[apid] = PacketDecoder(tlmdict[name], offset=header_size)
+            self._pending[apid] = ([], [])
+
+        self.received = 0
+        self.unknown = 0
+
+    @property
+    def dropped(self):
+        ''' The number of packets dropped because a frame was missing '''
+        return self._reassembler.dropped
+
+    def decoder(self, apid):
+        ''' Return the :class:`PacketDecoder` for an APID '''
+        return self._decoders[apid]
+
+    def attach(self, service):
+        ''' Decommutate the packets in the frames received by a RAF or RCF instance '''
+        service.add_handler('AnnotatedFrame', self.add_frame)
+
+    def detach(self, service):
+        ''' Stop decommutating the frames received by a RAF or RCF instance '''
+        service.remove_handler('AnnotatedFrame', self.add_frame)
+
+    def add_frame(self, pdu):
+        ''' Add the packets completed by an AnnotatedFrame transfer buffer element
+
+        A packet which continues into the next frame of its virtual channel
+        is added once that frame arrives, with the ERT of the frame it
+        started in.
+        '''
+        frame = pdu.getComponent()
+        ert = ccsdstime.to_nanoseconds(frame['earthReceiveTime'].getComponent().asOctets())
+        for packet, packet_ert, _, _ in self._reassembler.add(frame['data'].asOctets(), ert):
+            self.add(packet, packet_ert)
+
+    def add(self, packet, ert):
+        ''' Add a packet with its primary header
+
+        Arguments:
+            packet:
+                The packet.
+
+            ert (integer):
+                The packet's earth receive time in nanoseconds since the
+                CCSDS epoch.
+        '''
+        self.received += 1
+        apid = _PACKET_ID.unpack_from(packet)[0] & 0x07FF
+
+        pending = self._pending.get(apid)
+        if pending is None:
+            self.unknown += 1
+            return
+
+        pending[0].append(packet)
+        pending[1].append(ert)
+        if len(pending[0]) >= self._batch_size:
+            self._emit(apid)
+
+    def flush(self):
+        ''' Decode and pass on all collected packets '''
+        for apid in sorted(self._pending):
+            if self._pending[apid][0]:
+                self._emit(apid)
+
+    def _emit(self, apid):
+        ''''''
+        packets, erts = self._pending[apid]
+        self._pending[apid] = ([], [])
+
+        decoder = self._decoders[apid]
+        self._sink(decoder.name, decoder.decode(packets, erts))
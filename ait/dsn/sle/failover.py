@@ -0,0 +1,411 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Hot-Standby Failover
+
+The ait.dsn.sle.failover module lets two bridge processes on one host run
+a session as an active/standby pair. The processes coordinate through an
+exclusive lock on a local lock file. The process holding the lock is
+active and runs the session. The other waits, with its configuration
+loaded and its service class imported, and takes over as soon as the lock
+is released. The kernel releases the lock when the active process exits
+for any reason, including a crash, so no heartbeat between the processes
+is needed.
+
+The active process checkpoints the earth receive time (ERT) of the last
+frame it delivered and how many frames with that ERT it delivered. When
+the standby takes over, and whenever the active process restarts the
+session, it requests data from that ERT (for sessions with a defined
+start time) and skips the frames which were already delivered.
+Frames delivered after the last checkpoint was written are delivered
+again, so delivery is at least once.
+
+Example:
+
+    standby = HotStandby(
+        {'name': 'raf', 'service': 'raf', 'start_time': pass_start},
+        archive_frame,
+        '/var/run/ait/sle_bridge.lock',
+        '/var/run/ait/sle_bridge.json'
+    )
+    standby.start()
+
+Classes:
+    StandbyLock: An exclusive lock on a local file shared by a pair of
+        processes.
+
+    Checkpoint: The last delivered ERT and frame position of a session.
+
+    HotStandby: Run a session as the active or standby member of a pair.
+'''
+
+import datetime as dt
+import errno
+import fcntl
+import json
+import os
+
+import gevent
+import gevent.event
+
+import ait.core.log
+
+import ccsdstime
+from sessions import Session, SessionManager
+
+
+class StandbyLock(object):
+    ''' An exclusive lock on a local file
+
+    The lock is an advisory ``flock`` on the file, which is created if
+    needed. The holder's process id is written to the file for operators.
+
+    Arguments:
+        path (string):
+            The path of the lock file.
+    '''
+    def __init__(self, path):
+        self._path = path
+        self._fd = None
+
+    @property
+    def locked(self):
+        ''' True if this instance holds the lock '''
+        return self._fd is not None
+
+    def acquire(self, blocking=True, timeout=None, poll_interval=0.05):
+        ''' Acquire the lock
+
+        The lock is polled rather than waited on so that other greenlets
+        keep running while the standby waits.
+
+        Arguments:
+            blocking (optional boolean):
+                Whether to wait for the lock if it is held elsewhere.
+                Defaults to True.
+
+            timeout (optional number):
+                The maximum number of seconds to wait. Defaults to no limit.
+
+            poll_interval (optional number):
+                The number of seconds between attempts. This bounds how
+                long a takeover can be delayed. Defaults to 0.05.
+
+        Returns:
+            True if the lock was acquired, False otherwise.
+        '''
+        if self._fd is not None:
+            return True
+
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with gevent.Timeout(timeout, False):
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except IOError as e:
+                        if e.errno not in (errno.EAGAIN, errno.EACCES):
+                            raise
+                        if not blocking:
+                            return False
+                    gevent.sleep(poll_interval)
+                self._fd, fd = fd, None
+                os.ftruncate(self._fd, 0)
+                os.write(self._fd, '{}\n'.format(os.getpid()).encode('ascii'))
+                return True
+            return False
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def release(self):
+        ''' Release the lock if it is held '''
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class Checkpoint(object):
+    ''' The last delivered ERT and frame position of a session
+
+    ERTs are held as integer nanoseconds since the CCSDS epoch so that CDS
+    pico times keep their full resolution.
+
+    Arguments:
+        path (string):
+            The JSON file the checkpoint is loaded from and saved to.
+
+    Attributes:
+        last_ert: The ERT of the last delivered frame, or None.
+
+        position: The number of frames delivered with ERT ``last_ert``.
+
+        frames: The total number of frames delivered.
+    '''
+    def __init__(self, path):
+        self._path = path
+        self.last_ert = None
+        self.position = 0
+        self.frames = 0
+        self.dirty = False
+
+        self._skip = 0
+        self._resuming = False
+
+    def load(self):
+        ''' Load the saved checkpoint, if there is one, and prepare to resume
+
+        Returns:
+            True if a checkpoint was loaded.
+        '''
+        if not os.path.exists(self._path):
+            return False
+
+        with open(self._path, 'r') as infile:
+            state = json.load(infile)
+
+        self.last_ert = state['last_ert']
+        self.position = state['position']
+        self.frames = state['frames']
+        self.dirty = False
+
+        self.resume()
+        return True
+
+    def resume(self):
+        ''' Prepare to skip the delivered frames when data is requested again
+
+        Call this before each request from :meth:`resume_time`, so that
+        the frames before the checkpoint and the ``position`` frames at it
+        are rejected by :meth:`accept`.
+        '''
+        self._skip = self.position
+        self._resuming = self.last_ert is not None
+
+    def save(self):
+        ''' Write the checkpoint to its path
+
+        The checkpoint is written to a temporary file which is then renamed
+        over the previous one so a crash never leaves a partial checkpoint.
+        '''
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump({
+                'last_ert': self.last_ert,
+                'position': self.position,
+                'frames': self.frames,
+            }, outfile)
+        os.rename(tmp_path, self._path)
+        self.dirty = False
+
+    def resume_time(self):
+        ''' Return the checkpointed ERT as a datetime, or None
+
+        The time is truncated to the microsecond so that a start request
+        from it includes the last delivered frame.
+        '''
+        if self.last_ert is None:
+            return None
+        return ccsdstime.CCSDS_EPOCH + dt.timedelta(microseconds=self.last_ert // 1000)
+
+    def accept(self, ert):
+        ''' Record a frame and return whether it should be delivered
+
+        After a checkpoint is loaded or resumed, frames older than the
+        checkpointed ERT, and the first ``position`` frames at that ERT,
+        were already delivered and are rejected. Once a newer frame is seen
+        every frame is accepted.
+
+        Arguments:
+            ert (integer):
+                The frame's ERT in nanoseconds since the CCSDS epoch.
+
+        Returns:
+            True if the frame is new and has been recorded.
+        '''
+        if self._resuming:
+            if ert < self.last_ert:
+                return False
+            if ert == self.last_ert and self._skip > 0:
+                self._skip -= 1
+                return False
+            if ert > self.last_ert:
+                self._resuming = False
+
+        if ert == self.last_ert:
+            self.position += 1
+        else:
+            self.last_ert = ert
+            self.position = 1
+
+        self.frames += 1
+        self.dirty = True
+        return True
+
+
+class HotStandby(object):
+    ''' Run a session as the active or standby member of a pair
+
+    Both processes of the pair are given the same session configuration,
+    lock path and checkpoint path. The session's service class is imported
+    and the session validated when the instance is created, so a standby
+    only has to connect, bind and start when it takes over.
+
+    Arguments:
+        session:
+            The session to run, as a :class:`ait.dsn.sle.sessions.Session`
+            or a dictionary of its arguments.
+
+        sink:
+            A callable which receives each new AnnotatedFrame transfer
+            buffer element.
+
+        lock_path (string):
+            The lock file shared by the pair.
+
+        checkpoint_path (string):
+            The checkpoint file shared by the pair.
+
+        checkpoint_interval (optional number):
+            The number of seconds between checkpoint writes while active.
+            Defaults to 0.1.
+
+        poll_interval (optional number):
+            The number of seconds between attempts to take the lock while
+            standing by. Defaults to 0.05.
+
+        manager_kwargs:
+            Any additional keyword arguments are passed to the
+            :class:`ait.dsn.sle.sessions.SessionManager` which runs the
+            session.
+
+    Attributes:
+        role: One of "standby", "active" or "stopped".
+
+        active: A gevent Event which is set once this process is active.
+    '''
+    def __init__(self, session, sink, lock_path, checkpoint_path,
+                 checkpoint_interval=0.1, poll_interval=0.05, **manager_kwargs):
+        if not isinstance(session, Session):
+            session = Session(**session)
+
+        self._session = session
+        self._sink = sink
+        self._lock = StandbyLock(lock_path)
+        self._checkpoint = Checkpoint(checkpoint_path)
+        self._checkpoint_interval = checkpoint_interval
+        self._poll_interval = poll_interval
+
+        self._manager = _ResumingSessionManager(self._checkpoint, [session], **manager_kwargs)
+        self._manager._service_class(session.service_type)
+        self._manager.add_route(self._on_frame)
+
+        self._worker = None
+        self._checkpointer = None
+        self.role = 'stopped'
+        self.active = gevent.event.Event()
+
+    @property
+    def checkpoint(self):
+        ''' The session's :class:`Checkpoint` '''
+        return self._checkpoint
+
+    def start(self):
+        ''' Stand by and take over the session once the lock is acquired '''
+        if self._worker is None:
+            self.role = 'standby'
+            self._worker = gevent.spawn(self._run)
+
+    def wait_active(self, timeout=None):
+        ''' Wait for this process to become active
+
+        Returns:
+            True if the process is active.
+        '''
+        return self.active.wait(timeout)
+
+    def stop(self):
+        ''' Stop the session, write the checkpoint and release the lock '''
+        if self._worker is not None:
+            self._worker.kill()
+            self._worker = None
+
+        if self._checkpointer is not None:
+            self._checkpointer.kill()
+            self._checkpointer = None
+
+        if self.role == 'active':
+            self._manager.stop()
+            if self._checkpoint.dirty:
+                self._checkpoint.save()
+        self._lock.release()
+
+        self.active.clear()
+        self.role = 'stopped'
+
+    def _run(self):
+        ''''''
+        ait.core.log.info('Standing by for session {}'.format(self._session.name))
+        self._lock.acquire(poll_interval=self._poll_interval)
+
+        checkpoint = self._checkpoint
+        checkpoint.load()
+
+        ait.core.log.info('Taking over session {} from ERT {}'.format(
+            self._session.name, checkpoint.resume_time()))
+
+        self.role = 'active'
+        self._checkpointer = gevent.spawn(self._save_checkpoints)
+        self._manager.start()
+        self.active.set()
+
+    def _save_checkpoints(self):
+        ''''''
+        while True:
+            gevent.sleep(self._checkpoint_interval)
+            if self._checkpoint.dirty:
+                try:
+                    self._checkpoint.save()
+                except (IOError, OSError) as e:
+                    ait.core.log.error('Unable to save checkpoint: {}'.format(e))
+
+    def _on_frame(self, name, pdu):
+        ''''''
+        ert = ccsdstime.to_nanoseconds(
+            pdu.getComponent()['earthReceiveTime'].getComponent().asOctets()
+        )
+        if self._checkpoint.accept(ert):
+            self._sink(pdu)
+
+
+class _ResumingSessionManager(SessionManager):
+    ''''''
+    def __init__(self, checkpoint, sessions, **kwargs):
+        super(_ResumingSessionManager, self).__init__(sessions, **kwargs)
+        self._checkpoint = checkpoint
+
+    def _open_session(self, session):
+        ''''''
+        # A restarted session requests data again, so it resumes from the
+        # checkpoint like a takeover instead of from its original start
+        checkpoint = self._checkpoint
+        checkpoint.resume()
+        resume_time = checkpoint.resume_time()
+        if session.start_time is not None and resume_time is not None:
+            session.start_time = max(session.start_time, resume_time)
+
+        super(_ResumingSessionManager, self)._open_session(session)
@@ -12,12 +12,153 @@
 # or other export authority as may be required before exporting such
 # information to foreign countries or providing access to foreign persons.
 
+import binascii
+import struct
+
 from util import *
 
+_PRIMARY_HEADER = struct.Struct('>HBB')
+_AOS_HEADER = struct.Struct('>HHB')
+_TC_HEADER = struct.Struct('>HHB')
+_FECF = struct.Struct('>H')
+_CLCW = struct.Struct('>I')
+_DATA_FIELD_STATUS = struct.Struct('>H')
+_PACKET_HEADER = struct.Struct('>HHH')
+
+TC_MAX_FRAME_LENGTH = 1024
+
+# TC segment header sequence flags
+SEG_CONTINUING = 0
+SEG_FIRST = 1
+SEG_LAST = 2
+SEG_UNSEGMENTED = 3
+
+# TM first header pointer values for frames without a packet start
+FHP_IDLE = 0x07FE
+FHP_NO_PACKET = 0x07FF
+
+
+def frame_id(data):
+    ''' Return the identity of a TM or AOS transfer frame
+
+    The transfer frame version number selects the header layout: version
+    1 (binary 00) frames are parsed as TM frames with an 8 bit virtual
+    channel frame count and version 2 (binary 01) frames as AOS frames with
+    a 24 bit count.
+
+    Arguments:
+        data:
+            The raw transfer frame.
+
+    Returns:
+        A (spacecraft id, virtual channel id, virtual channel frame count)
+        tuple.
+    '''
+    if ord(data[0:1]) & 0xC0 == 0x40:
+        ident, count_hi, count_lo = _AOS_HEADER.unpack_from(data)
+        return (ident >> 6) & 0xFF, ident & 0x3F, (count_hi << 8) | count_lo
+
+    ident, _, vc_count = _PRIMARY_HEADER.unpack_from(data)
+    return (ident >> 4) & 0x3FF, (ident >> 1) & 0x07, vc_count
+
+
+def tm_ocf(data, fecf=False):
+    ''' Return the Operational Control Field of a TM transfer frame
+
+    Arguments:
+        data:
+            The raw transfer frame.
+
+        fecf (optional boolean):
+            Whether the frame ends with a Frame Error Control Field.
+            Defaults to False.
+
+    Returns:
+        The 4 octet OCF, or None if the frame's OCF flag is not set.
+    '''
+    if not ord(data[1:2]) & 0x01:
+        return None
+
+    end = len(data) - (_FECF.size if fecf else 0)
+    return data[end - _CLCW.size:end]
+
+
+def tm_data_field(data, fecf=False):
+    ''' Locate the data field of a TM transfer frame
+
+    Arguments:
+        data:
+            The raw transfer frame.
+
+        fecf (optional boolean):
+            Whether the frame ends with a Frame Error Control Field.
+            Defaults to False.
+
+    Returns:
+        A (first header pointer, start, end) tuple. Start and end are the
+        offsets of the data field in the frame, after any secondary
+        header and before any OCF or FECF.
+    '''
+    status = _DATA_FIELD_STATUS.unpack_from(data, _PRIMARY_HEADER.size)[0]
+
+    start = _PRIMARY_HEADER.size + _DATA_FIELD_STATUS.size
+    if status & 0x8000:
+        start += (ord(data[start:start + 1]) & 0x3F) + 1
+
+    end = len(data) - (_FECF.size if fecf else 0)
+    if ord(data[1:2]) & 0x01:
+        end -= _CLCW.size
+
+    return status & 0x07FF, start, end
+
+
+def packet_length(data, offset=0):
+    ''' Return the total length of the space packet starting at offset '''
+    return _PACKET_HEADER.unpack_from(data, offset)[2] + _PACKET_HEADER.size + 1
+
+
+def tm_packets(data, fecf=False):
+    ''' Return the complete space packets in a TM transfer frame
+
+    Packets are taken from the data field starting at the first header
+    pointer and are returned with their primary headers. The packet which
+    continues into the next frame, if any, is not included. Frames with
+    only idle data or without a packet start return no packets. Use
+    :class:`ait.dsn.sle.router.PacketReassembler` to keep packets which
+    span frames.
+
+    Arguments:
+        data:
+            The raw transfer frame.
+
+        fecf (optional boolean):
+            Whether the frame ends with a Frame Error Control Field.
+            Defaults to False.
+
+    Returns:
+        A list of packets.
+    '''
+    first_hdr_ptr, start, end = tm_data_field(data, fecf)
+    if first_hdr_ptr >= FHP_IDLE:
+        return []
+
+    packets = []
+    offset = start + first_hdr_ptr
+    while offset + _PACKET_HEADER.size <= end:
+        length = packet_length(data, offset)
+        if offset + length > end:
+            break
+        packets.append(data[offset:offset + length])
+        offset += length
+
+    return packets
+
+
 class TMTransFrame(dict):
-    def __init__(self, data=None):
+    def __init__(self, data=None, fecf=False):
         super(TMTransFrame, self).__init__()
 
+        self.fecf = fecf
         self._data = []
         self.is_idle = False
         self.has_no_pkts = False
@@ -30,6 +171,7 @@ class TMTransFrame(dict):
         self['spacecraft_id'] = hexint(data[0:2]) & 0x3FF0
         self['virtual_channel_id'] = hexint(data[1]) & 0x0E
         self['ocf_flag'] = hexint(data[1]) & 0x01
+        self['ocf'] = tm_ocf(data, self.fecf)
         self['master_chan_frame_count'] = data[2]
         self['virtual_chan_frame_count'] = data[3]
         self['sec_header_flag'] = hexint(data[4:6]) & 0x8000
@@ -115,8 +257,264 @@ class AOSTransFrame(dict):
         pass
 
 
-class TCTransFrame(object):
-    ''''''
-    # TODO: Implement
-    # See C Space Data Link Protocol pg. 4-1 for further information
-    pass
+class TCTransFrame(dict):
+    ''' TC Transfer Frame
+
+    A TC Transfer Frame as defined in the CCSDS TC Space Data Link Protocol
+    (CCSDS 232.0-B). The frame's fields are held as dictionary items:
+
+        version, bypass_flag, control_command_flag, spacecraft_id,
+        virtual_channel_id, frame_seq_num, data
+
+    Frames carrying a segment header also have ``sequence_flags`` and
+    ``map_id`` items. ``sequence_flags`` is one of the SEG_* constants.
+
+    Arguments:
+        data (optional bytes):
+            An encoded frame to decode.
+
+        fecf (optional boolean):
+            Whether the frame has a Frame Error Control Field. Defaults to
+            True.
+
+        segmented (optional boolean):
+            Whether an encoded frame's data field starts with a segment
+            header. Defaults to False.
+
+        fields:
+            Initial values for the frame's header fields. The data field
+            is set as an item since the ``data`` argument is an encoded
+            frame.
+
+    Attributes:
+        fecf_valid: After decoding, whether the FECF matched the frame.
+            None if the frame has no FECF.
+    '''
+    def __init__(self, data=None, fecf=True, segmented=False, **fields):
+        super(TCTransFrame, self).__init__()
+
+        self.update({
+            'version': 0,
+            'bypass_flag': 0,
+            'control_command_flag': 0,
+            'spacecraft_id': 0,
+            'virtual_channel_id': 0,
+            'frame_seq_num': 0,
+            'data': b'',
+        })
+        self.update(fields)
+
+        self.fecf = fecf
+        self.fecf_valid = None
+        if data:
+            self.decode(data, segmented=segmented)
+
+    def encode(self):
+        ''' Encode the frame
+
+        Returns:
+            The encoded frame, including the segment header if the frame
+            has a MAP id and the FECF if enabled.
+
+        Raises:
+            ValueError: If the frame would be longer than
+                TC_MAX_FRAME_LENGTH octets.
+        '''
+        data = bytes(self['data'])
+        if self.get('map_id') is not None:
+            flags = self.get('sequence_flags', SEG_UNSEGMENTED)
+            data = struct.pack('>B', (flags << 6) | (self['map_id'] & 0x3F)) + data
+
+        length = _TC_HEADER.size + len(data) + (_FECF.size if self.fecf else 0)
+        if length > TC_MAX_FRAME_LENGTH:
+            raise ValueError('TC frame length {} exceeds {} octets'.format(length, TC_MAX_FRAME_LENGTH))
+
+        word0 = (
+            ((self['version'] & 0x03) << 14) |
+            ((self['bypass_flag'] & 0x01) << 13) |
+            ((self['control_command_flag'] & 0x01) << 12) |
+            (self['spacecraft_id'] & 0x3FF)
+        )
+        word1 = ((self['virtual_channel_id'] & 0x3F) << 10) | ((length - 1) & 0x3FF)
+        frame = _TC_HEADER.pack(word0, word1, self['frame_seq_num'] & 0xFF) + data
+
+        if self.fecf:
+            frame += _FECF.pack(crc16(frame))
+        return frame
+
+    def decode(self, data, segmented=False):
+        ''' Decode data as a TC Transfer Frame
+
+        Arguments:
+            data (bytes):
+                The encoded frame.
+
+            segmented (optional boolean):
+                Whether the frame's data field starts with a segment
+                header. Defaults to False.
+        '''
+        data = bytes(data)
+        word0, word1, seq = _TC_HEADER.unpack_from(data)
+        length = (word1 & 0x3FF) + 1
+        if length > len(data):
+            raise ValueError('TC frame length {} exceeds the {} octets given'.format(length, len(data)))
+
+        self['version'] = word0 >> 14
+        self['bypass_flag'] = (word0 >> 13) & 0x01
+        self['control_command_flag'] = (word0 >> 12) & 0x01
+        self['spacecraft_id'] = word0 & 0x3FF
+        self['virtual_channel_id'] = word1 >> 10
+        self['frame_seq_num'] = seq
+
+        end = length
+        if self.fecf:
+            end -= _FECF.size
+            self.fecf_valid = _FECF.unpack_from(data, end)[0] == crc16(data[:end])
+
+        body = data[_TC_HEADER.size:end]
+        if segmented:
+            header = ord(body[0:1])
+            self['sequence_flags'] = header >> 6
+            self['map_id'] = header & 0x3F
+            body = body[1:]
+        self['data'] = body
+
+
+class CLCW(dict):
+    ''' Communications Link Control Word
+
+    The CLCW reported by a spacecraft's FARM in the OCF of downlink frames,
+    as defined in CCSDS 232.0-B. The word's fields are held as dictionary
+    items:
+
+        control_word_type, version, status_field, cop_in_effect,
+        virtual_channel_id, no_rf_available, no_bit_lock, lockout, wait,
+        retransmit, farm_b_counter, report_value
+
+    Arguments:
+        data (optional bytes):
+            An encoded CLCW to decode.
+    '''
+    _FIELDS = [
+        ('control_word_type', 31, 0x1),
+        ('version', 29, 0x3),
+        ('status_field', 26, 0x7),
+        ('cop_in_effect', 24, 0x3),
+        ('virtual_channel_id', 18, 0x3F),
+        ('no_rf_available', 15, 0x1),
+        ('no_bit_lock', 14, 0x1),
+        ('lockout', 13, 0x1),
+        ('wait', 12, 0x1),
+        ('retransmit', 11, 0x1),
+        ('farm_b_counter', 9, 0x3),
+        ('report_value', 0, 0xFF),
+    ]
+
+    def __init__(self, data=None, **fields):
+        super(CLCW, self).__init__()
+
+        for name, _, _ in self._FIELDS:
+            self[name] = 0
+        self['cop_in_effect'] = 1
+        self.update(fields)
+
+        if data:
+            self.decode(data)
+
+    def encode(self):
+        ''' Encode the CLCW as 4 octets '''
+        word = 0
+        for name, shift, mask in self._FIELDS:
+            word |= (self[name] & mask) << shift
+        return _CLCW.pack(word)
+
+    def decode(self, data):
+        ''' Decode 4 octets as a CLCW '''
+        word = _CLCW.unpack_from(data)[0]
+        for name, shift, mask in self._FIELDS:
+            self[name] = (word >> shift) & mask
+
+
+def crc16(data, crc=0xFFFF):
+    ''' Compute the CRC-16-CCITT used for the TC Frame Error Control Field '''
+    return binascii.crc_hqx(data, crc)
+
+
+def tc_frames(data, spacecraft_id, virtual_channel_id, frame_seq_num=0, map_id=None,
+              bypass_flag=0, control_command_flag=0, fecf=True,
+              max_frame_length=TC_MAX_FRAME_LENGTH):
+    ''' Build the TC Transfer Frames which carry a user data unit
+
+    Data which does not fit in one frame is split into segments, which
+    requires a segment header and so a MAP id.
+
+    Arguments:
+        data (bytes):
+            The user data unit, e.g. a command packet.
+
+        spacecraft_id (integer):
+            The spacecraft id.
+
+        virtual_channel_id (integer):
+            The virtual channel id.
+
+        frame_seq_num (optional integer):
+            The sequence number of the first frame. Following frames are
+            numbered consecutively, modulo 256. Defaults to 0.
+
+        map_id (optional integer):
+            The MAP id. If given every frame carries a segment header.
+            Defaults to None.
+
+        bypass_flag (optional integer):
+            1 for Type-B (expedited) frames. Defaults to 0.
+
+        control_command_flag (optional integer):
+            1 for control command frames. Defaults to 0.
+
+        fecf (optional boolean):
+            Whether to append a Frame Error Control Field. Defaults to True.
+
+        max_frame_length (optional integer):
+            The maximum length of a frame in octets. Defaults to
+            TC_MAX_FRAME_LENGTH.
+
+    Returns:
+        A list of :class:`TCTransFrame` instances.
+
+    Raises:
+        ValueError: If the data does not fit in one frame and no MAP id is
+            given.
+    '''
+    overhead = _TC_HEADER.size + (_FECF.size if fecf else 0) + (1 if map_id is not None else 0)
+    capacity = min(max_frame_length, TC_MAX_FRAME_LENGTH) - overhead
+    if capacity < 1:
+        raise ValueError('Maximum frame length {} leaves no room for data'.format(max_frame_length))
+
+    data = bytes(data)
+    if len(data) <= capacity:
+        segments = [(SEG_UNSEGMENTED, data)]
+    elif map_id is None:
+        raise ValueError('{} octets of data need segmenting, which requires a MAP id'.format(len(data)))
+    else:
+        chunks = [data[i:i + capacity] for i in range(0, len(data), capacity)]
+        flags = [SEG_FIRST] + [SEG_CONTINUING] * (len(chunks) - 2) + [SEG_LAST]
+        segments = list(zip(flags, chunks))
+
+    frames = []
+    for i, (flags, chunk) in enumerate(segments):
+        frame = TCTransFrame(
+            fecf=fecf,
+            bypass_flag=bypass_flag,
+            control_command_flag=control_command_flag,
+            spacecraft_id=spacecraft_id,
+            virtual_channel_id=virtual_channel_id,
+            frame_seq_num=(frame_seq_num + i) & 0xFF
+        )
+        frame['data'] = chunk
+        if map_id is not None:
+            frame['map_id'] = map_id
+            frame['sequence_flags'] = flags
+        frames.append(frame)
+
+    return frames
@@ -0,0 +1,539 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' SLE Fan-out Gateway
+
+The ait.dsn.sle.gateway module shares the transfer buffers received over a
+single upstream RAF or RCF session with many local consumers. Consumers
+can be in-process subscribers, raw frame clients or local SLE users which
+bind and start against the gateway exactly as they would against the
+provider.
+
+Every subscriber has its own filter and bounded queue and is served from
+its own greenlet. A subscriber whose queue fills up is dropped rather than
+slowing down the upstream session or the other subscribers.
+
+Example:
+
+    raf = ait.dsn.sle.RAF()
+    gateway = FanoutGateway(raf)
+    gateway.serve_sle(('localhost', 5200))
+    gateway.serve_frames(('localhost', 5201))
+
+    raf.connect()
+    raf.bind()
+    raf.start(None, None)
+
+Downstream SLE users are not authenticated. The gateway should only be
+served on trusted interfaces.
+
+Classes:
+    FanoutGateway: Re-serve the transfer buffers of one upstream session
+        to many subscribers.
+
+    Subscriber: A filtered, bounded consumer of a gateway's frames.
+
+Functions:
+    quality_filter: Build a filter for a RAF requested frame quality.
+
+    gvcid_filter: Build a filter for a spacecraft and virtual channel.
+'''
+
+import socket
+import struct
+
+import gevent
+import gevent.lock
+import gevent.queue
+import gevent.server
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.decoder import decode
+import pyasn1.error
+
+import ait.core.log
+
+import common
+import frames
+
+FRAME_HEADER = struct.Struct('!I')
+TML_HEADER = struct.Struct('!II')
+CONTEXT_BODY = struct.Struct('!4sIHH')
+
+
+def _service_pdus(prefix):
+    ''''''
+    if prefix == 'Raf':
+        from ait.dsn.sle.pdu.raf import RafUsertoProviderPdu, RafProvidertoUserPdu
+        return RafUsertoProviderPdu, RafProvidertoUserPdu
+    elif prefix == 'Rcf':
+        from ait.dsn.sle.pdu.rcf import RcfUsertoProviderPdu, RcfProvidertoUserPdu
+        return RcfUsertoProviderPdu, RcfProvidertoUserPdu
+
+    raise ValueError('Fan-out is only supported for RAF and RCF services')
+
+
+def quality_filter(requested_quality):
+    ''' Build a filter for a RAF requested frame quality
+
+    Arguments:
+        requested_quality (integer):
+            0 for good frames only, 1 for erred frames only or 2 for all
+            frames.
+
+    Returns:
+        A callable which returns True for transfer buffer elements that
+        should be delivered. Sync notifications are always delivered.
+    '''
+    requested_quality = int(requested_quality)
+    if requested_quality == 2:
+        return None
+
+    def frame_filter(element):
+        if element.getName() != 'annotatedFrame':
+            return True
+        return int(element.getComponent()['deliveredFrameQuality']) == requested_quality
+
+    return frame_filter
+
+
+def gvcid_filter(spacecraft_id, virtual_channel=None):
+    ''' Build a filter for a spacecraft and virtual channel
+
+    Arguments:
+        spacecraft_id (integer):
+            The spacecraft id frames must match.
+
+        virtual_channel (optional integer):
+            The virtual channel id frames must match. If None all virtual
+            channels of the spacecraft are delivered.
+
+    Returns:
+        A callable which returns True for transfer buffer elements that
+        should be delivered. Sync notifications are always delivered.
+    '''
+    def frame_filter(element):
+        if element.getName() != 'annotatedFrame':
+            return True
+
+        scid, vcid, _ = frames.frame_id(element.getComponent()['data'].asOctets())
+        return scid == spacecraft_id and (virtual_channel is None or vcid == virtual_channel)
+
+    return frame_filter
+
+
+class _SharedBuffer(object):
+    ''' An upstream transfer buffer PDU, encoded at most once '''
+    __slots__ = ['pdu', '_encoded']
+
+    def __init__(self, pdu):
+        self.pdu = pdu
+        self._encoded = None
+
+    def encoded(self):
+        if self._encoded is None:
+            self._encoded = encode(self.pdu)
+        return self._encoded
+
+
+class Subscriber(object):
+    ''' A filtered, bounded consumer of a gateway's frames
+
+    Subscribers are created with :meth:`FanoutGateway.subscribe`. The
+    callback is run from the subscriber's own greenlet with a list of the
+    transfer buffer elements from each upstream buffer which pass the
+    subscriber's filter.
+
+    Attributes:
+        delivered: The number of elements passed to the callback.
+    '''
+    def __init__(self, callback=None, frame_filter=None, max_queue=256):
+        self._callback = callback
+        self._filter = frame_filter
+        self._queue = gevent.queue.Queue(max_queue)
+        self._greenlet = gevent.spawn(self._run)
+        self.delivered = 0
+
+    def offer(self, elements, shared):
+        ''' Queue the elements which pass the filter without blocking
+
+        Returns:
+            False if the subscriber's queue is full, True otherwise.
+        '''
+        frame_filter = self._filter
+        if frame_filter is not None:
+            selected = [e for e in elements if frame_filter(e)]
+            if not selected:
+                return True
+        else:
+            selected = elements
+
+        try:
+            self._queue.put_nowait((selected, len(selected) == len(elements), shared))
+        except gevent.queue.Full:
+            return False
+        return True
+
+    def close(self):
+        ''' Stop delivering to the subscriber '''
+        self._greenlet.kill(block=False)
+
+    def drop(self):
+        ''' Close the subscriber and any connection it is serving '''
+        self.close()
+
+    def _run(self):
+        ''''''
+        while True:
+            selected, complete, shared = self._queue.get()
+            try:
+                self._deliver(selected, complete, shared)
+            except Exception as e:
+                ait.core.log.error('Gateway subscriber failed to handle frames: {}'.format(e))
+            self.delivered += len(selected)
+
+    def _deliver(self, selected, complete, shared):
+        ''''''
+        self._callback(selected)
+
+
+class _FrameClient(Subscriber):
+    ''' Write the data of each annotated frame to a socket '''
+    def __init__(self, sock, **kwargs):
+        self._sock = sock
+        super(_FrameClient, self).__init__(**kwargs)
+
+    def drop(self):
+        super(_FrameClient, self).drop()
+        self._sock.close()
+
+    def _deliver(self, selected, complete, shared):
+        out = []
+        for element in selected:
+            if element.getName() == 'annotatedFrame':
+                data = element.getComponent()['data'].asOctets()
+                out.append(FRAME_HEADER.pack(len(data)))
+                out.append(data)
+        if out:
+            self._sock.sendall(b''.join(out))
+
+
+class _SLEUser(Subscriber):
+    ''' Forward transfer buffers to a downstream SLE user '''
+    def __init__(self, session, **kwargs):
+        self._session = session
+        super(_SLEUser, self).__init__(**kwargs)
+
+    def drop(self):
+        super(_SLEUser, self).drop()
+        self._session.close()
+
+    def _deliver(self, selected, complete, shared):
+        if complete:
+            body = shared.encoded()
+        else:
+            buf = self._session._provider_spec()[self._session._prefix.lower() + 'TransferBuffer']
+            for i, element in enumerate(selected):
+                buf[i] = element
+            body = encode(buf)
+        self._session.send_pdu_body(body)
+
+
+class _SLESession(object):
+    ''' Act as the SLE provider for one downstream user connection '''
+    def __init__(self, gateway, sock):
+        self._gateway = gateway
+        self._sock = sock
+        self._prefix = gateway._prefix
+        self._user_spec, self._provider_spec = _service_pdus(self._prefix)
+        self._send_lock = gevent.lock.Semaphore()
+        self._subscriber = None
+        self._heartbeat = None
+        self._closed = False
+
+    def run(self):
+        ''' Read and handle messages until the user disconnects '''
+        buf = b''
+        try:
+            while True:
+                data = self._sock.recv(65536)
+                if not data:
+                    break
+
+                buf += data
+                while len(buf) >= TML_HEADER.size:
+                    msg_type, length = TML_HEADER.unpack_from(buf)
+                    end = TML_HEADER.size + length
+                    if len(buf) < end:
+                        break
+
+                    body, buf = buf[TML_HEADER.size:end], buf[end:]
+                    if msg_type == common.TML_SLE_TYPE:
+                        if not self._handle_pdu(body):
+                            return
+                    elif msg_type == common.TML_CONTEXT_MSG_TYPE:
+                        self._start_heartbeat(body)
+                    elif msg_type != common.TML_CONTEXT_HEARTBEAT_TYPE:
+                        ait.core.log.error('Gateway received unexpected TML message. Closing user connection.')
+                        return
+        except socket.error as e:
+            ait.core.log.info('Gateway user connection lost: {}'.format(e))
+        finally:
+            self.close()
+
+    def close(self):
+        ''' Unsubscribe the user and close the connection '''
+        if self._closed:
+            return
+        self._closed = True
+
+        self._unsubscribe()
+        if self._heartbeat is not None:
+            self._heartbeat.kill(block=False)
+        self._sock.close()
+
+    def send_pdu_body(self, body):
+        ''' Write an encoded PDU to the user '''
+        with self._send_lock:
+            self._sock.sendall(TML_HEADER.pack(common.TML_SLE_TYPE, len(body)) + body)
+
+    def _start_heartbeat(self, body):
+        ''''''
+        _, _, heartbeat, _ = CONTEXT_BODY.unpack(body[:CONTEXT_BODY.size])
+        if heartbeat and self._heartbeat is None:
+            self._heartbeat = gevent.spawn(self._send_heartbeats, heartbeat)
+
+    def _send_heartbeats(self, interval):
+        ''''''
+        hb = TML_HEADER.pack(common.TML_CONTEXT_HEARTBEAT_TYPE, 0)
+        while True:
+            gevent.sleep(interval)
+            with self._send_lock:
+                self._sock.sendall(hb)
+
+    def _handle_pdu(self, body):
+        ''''''
+        try:
+            pdu = decode(body, asn1Spec=self._user_spec())[0]
+        except pyasn1.error.PyAsn1Error:
+            ait.core.log.error('Gateway unable to decode user PDU. Skipping ...')
+            return True
+
+        name = pdu.getName()[len(self._prefix):]
+        invocation = pdu.getComponent()
+        p = self._prefix.lower()
+
+        if name == 'BindInvocation':
+            ret = self._provider_spec()[p + 'BindReturn']
+            ret['performerCredentials']['unused'] = None
+            ret['responderIdentifier'] = self._gateway._service._responder_id
+            ret['result']['positive'] = int(invocation['versionNumber'])
+        elif name == 'StartInvocation':
+            self._subscribe(invocation)
+            ret = self._provider_spec()[p + 'StartReturn']
+            ret['performerCredentials']['unused'] = None
+            ret['invokeId'] = int(invocation['invokeId'])
+            ret['result']['positiveResult'] = None
+        elif name == 'StopInvocation':
+            self._unsubscribe()
+            ret = self._provider_spec()[p + 'StopReturn']
+            ret['credentials']['unused'] = None
+            ret['invokeId'] = int(invocation['invokeId'])
+            ret['result']['positiveResult'] = None
+        elif name == 'UnbindInvocation':
+            self._unsubscribe()
+            ret = self._provider_spec()[p + 'UnbindReturn']
+            ret['responderCredentials']['unused'] = None
+            ret['result']['positive'] = None
+        elif name == 'PeerAbortInvocation':
+            ait.core.log.info('Gateway user sent peer abort. Closing connection.')
+            return False
+        else:
+            ait.core.log.warn('Gateway does not support {}. Skipping ...'.format(pdu.getName()))
+            return True
+
+        self.send_pdu_body(encode(ret))
+        return True
+
+    def _subscribe(self, invocation):
+        ''''''
+        if 'requestedFrameQuality' in invocation:
+            frame_filter = quality_filter(invocation['requestedFrameQuality'])
+        else:
+            gvcid = invocation['requestedGvcId']
+            vcid = gvcid['vcId']
+            channel = int(vcid['virtualChannel']) if vcid.getName() == 'virtualChannel' else None
+            frame_filter = gvcid_filter(int(gvcid['spacecraftId']), channel)
+
+        self._unsubscribe()
+        self._subscriber = _SLEUser(self, frame_filter=frame_filter,
+                                    max_queue=self._gateway._max_queue)
+        self._gateway._add_subscriber(self._subscriber)
+
+    def _unsubscribe(self):
+        ''''''
+        if self._subscriber is not None:
+            self._gateway.unsubscribe(self._subscriber)
+            self._subscriber.close()
+            self._subscriber = None
+
+
+class FanoutGateway(object):
+    ''' Re-serve the transfer buffers of one upstream session
+
+    Arguments:
+        service:
+            The upstream RAF or RCF instance. The gateway adds a handler
+            for its transfer buffers. Connecting, binding and starting the
+            upstream session is left to the caller.
+
+        max_queue (optional integer):
+            The default number of transfer buffers each subscriber may
+            have queued before it is dropped. Defaults to 256.
+
+    Attributes:
+        dropped: The number of subscribers dropped for falling behind.
+    '''
+    def __init__(self, service, max_queue=256):
+        self._service = service
+        self._prefix = type(service).__name__.capitalize()
+        _service_pdus(self._prefix)
+
+        self._max_queue = max_queue
+        self._subscribers = []
+        self._servers = []
+        self.dropped = 0
+
+        self._buffer_name = self._prefix.lower() + 'TransferBuffer'
+        service.add_handler(self._prefix + 'TransferBuffer', self._on_transfer_buffer)
+
+    def subscribe(self, callback, frame_filter=None, max_queue=None):
+        ''' Add an in-process subscriber
+
+        Arguments:
+            callback:
+                Called from the subscriber's greenlet with a list of the
+                transfer buffer elements that pass the filter.
+
+            frame_filter (optional):
+                A callable which is passed each transfer buffer element and
+                returns True if it should be delivered. None delivers all
+                elements.
+
+            max_queue (optional integer):
+                The subscriber's queue size. Defaults to the gateway's.
+
+        Returns:
+            The :class:`Subscriber`, which can be passed to
+            :meth:`unsubscribe`.
+        '''
+        sub = Subscriber(callback, frame_filter=frame_filter,
+                         max_queue=max_queue or self._max_queue)
+        self._add_subscriber(sub)
+        return sub
+
+    def unsubscribe(self, subscriber):
+        ''' Stop delivering frames to a subscriber '''
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def serve_frames(self, address, frame_filter=None):
+        ''' Serve raw frames to TCP clients
+
+        Each annotated frame's data is written to every connected client
+        prefixed with its length as a 4 byte big-endian integer.
+
+        Arguments:
+            address:
+                The (host, port) to listen on.
+
+            frame_filter (optional):
+                A filter applied to the frames sent to every client.
+
+        Returns:
+            The started :class:`gevent.server.StreamServer`.
+        '''
+        def handle(sock, addr):
+            ait.core.log.info('Gateway frame client connected from {}'.format(addr))
+            sub = _FrameClient(sock, frame_filter=frame_filter, max_queue=self._max_queue)
+            self._add_subscriber(sub)
+
+            # Block until the client disconnects so the server keeps the
+            # connection open.
+            try:
+                while sock.recv(4096):
+                    pass
+            except socket.error:
+                pass
+            finally:
+                self.unsubscribe(sub)
+                sub.drop()
+
+        return self._serve(address, handle)
+
+    def serve_sle(self, address):
+        ''' Act as an SLE provider for local RAF or RCF users
+
+        Users connect, bind, start, stop and unbind as they would with the
+        provider. Each start subscribes the user with a filter built from
+        its requested frame quality (RAF) or GVCID (RCF). Credentials are
+        not checked.
+
+        Arguments:
+            address:
+                The (host, port) to listen on.
+
+        Returns:
+            The started :class:`gevent.server.StreamServer`.
+        '''
+        def handle(sock, addr):
+            ait.core.log.info('Gateway SLE user connected from {}'.format(addr))
+            _SLESession(self, sock).run()
+
+        return self._serve(address, handle)
+
+    def close(self):
+        ''' Stop the servers and drop all subscribers '''
+        for server in self._servers:
+            server.stop()
+        self._servers = []
+
+        for sub in list(self._subscribers):
+            self.unsubscribe(sub)
+            sub.drop()
+
+        self._service.remove_handler(self._prefix + 'TransferBuffer', self._on_transfer_buffer)
+
+    def _serve(self, address, handle):
+        ''''''
+        server = gevent.server.StreamServer(address, handle)
+        server.start()
+        self._servers.append(server)
+        return server
+
+    def _add_subscriber(self, subscriber):
+        ''''''
+        self._subscribers.append(subscriber)
+
+    def _on_transfer_buffer(self, pdu):
+        ''''''
+        elements = list(pdu[self._buffer_name])
+        shared = _SharedBuffer(pdu)
+
+        for sub in list(self._subscribers):
+            if not sub.offer(elements, shared):
+                ait.core.log.warn('Gateway subscriber fell behind and has been dropped')
+                self.dropped += 1
+                self.unsubscribe(sub)
+                sub.drop()
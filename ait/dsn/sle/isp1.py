@@ -0,0 +1,159 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' ISP1 Credentials
+
+The ait.dsn.sle.isp1 module generates and verifies the ISP1 credentials
+used by SLE when the authentication level is "bind" or "all".
+
+The credentials are the SHA-1 hash of the DER encoded HashInput sequence
+(time, random number, username and password) packaged with the time and
+random number into a BER encoded ISP1Credentials sequence. The username
+and password encodings never change for a peer, so they are encoded once
+and only the time and random number are inserted per call. The resulting
+bytes are identical to those produced by the PyASN1 encoders.
+
+Classes:
+    CredentialGenerator: Generate and verify ISP1 credentials for a
+        username and password.
+'''
+
+import binascii
+import hashlib
+import hmac
+
+import ccsdstime
+
+_TAG_SEQUENCE = b'\x30'
+_TAG_INTEGER = b'\x02'
+_TAG_OCTET_STRING = b'\x04'
+_TAG_VISIBLE_STRING = b'\x1a'
+
+_TIME_PREFIX = _TAG_OCTET_STRING + b'\x08'
+_PROTECTED_PREFIX = _TAG_OCTET_STRING + b'\x14'
+
+
+def _encode_length(length):
+    ''''''
+    if length < 0x80:
+        return bytes(bytearray([length]))
+
+    octets = binascii.unhexlify('{:x}'.format(length).zfill(((length.bit_length() + 7) // 8) * 2))
+    return bytes(bytearray([0x80 | len(octets)])) + octets
+
+
+def _encode_integer(value):
+    ''''''
+    if value < 0:
+        raise ValueError('Random number must be non-negative')
+
+    num_octets = value.bit_length() // 8 + 1
+    octets = binascii.unhexlify('{:x}'.format(value).zfill(num_octets * 2))
+    return _TAG_INTEGER + _encode_length(num_octets) + octets
+
+
+def _as_octets(value, encoding):
+    ''''''
+    if isinstance(value, bytes):
+        return value
+    if value is None:
+        return b''
+    return value.encode(encoding)
+
+
+class CredentialGenerator(object):
+    ''' Generate and verify ISP1 credentials for a username and password
+
+    Example:
+
+        gen = CredentialGenerator('LSE', 'password')
+        creds = gen.generate(datetime.datetime.utcnow(), 12345)
+        gen.verify(creds)  # True
+    '''
+    def __init__(self, username, password):
+        username = _as_octets(username, 'us-ascii')
+        password = _as_octets(password, 'iso-8859-1')
+
+        self._suffix = (
+            _TAG_VISIBLE_STRING + _encode_length(len(username)) + username +
+            _TAG_OCTET_STRING + _encode_length(len(password)) + password
+        )
+
+        # SHA-1 contexts pre-fed with the HashInput header and time prefix,
+        # keyed by the length of the encoded random number. The header only
+        # depends on that length since every other component has a fixed
+        # size.
+        self._contexts = {}
+
+    def generate(self, current_time, random_number):
+        ''' Generate BER encoded ISP1 credentials
+
+        Arguments:
+            current_time:
+                The datetime or 8 byte CDS time to use in the credentials.
+
+            random_number:
+                The random number to use in the credentials.
+
+        Returns:
+            The encoded ISP1Credentials sequence.
+        '''
+        if not isinstance(current_time, bytes):
+            current_time = ccsdstime.encode_cds(current_time)
+
+        number = _encode_integer(random_number)
+        body = _TIME_PREFIX + current_time + number + _PROTECTED_PREFIX + self._protect(current_time, number)
+        return _TAG_SEQUENCE + _encode_length(len(body)) + body
+
+    def verify(self, credentials):
+        ''' Check that encoded ISP1 credentials were made with this password
+
+        Arguments:
+            credentials:
+                The BER encoded ISP1Credentials, as bytes or as a PyASN1
+                OctetString.
+
+        Returns:
+            True if the credentials' protected hash matches the one
+            generated for their time and random number, False otherwise.
+        '''
+        if not isinstance(credentials, bytes):
+            credentials = credentials.asOctets()
+
+        header = bytearray(credentials[:14])
+        if (len(header) < 14 or header[0] != 0x30 or header[1] != len(credentials) - 2 or
+                credentials[2:4] != _TIME_PREFIX or header[12] != 0x02):
+            return False
+
+        number_end = 14 + header[13]
+        if (len(credentials) != number_end + 22 or
+                credentials[number_end:number_end + 2] != _PROTECTED_PREFIX):
+            return False
+
+        protected = self._protect(credentials[4:12], credentials[12:number_end])
+        return hmac.compare_digest(protected, credentials[number_end + 2:])
+
+    def _protect(self, time_octets, number):
+        ''''''
+        ctx = self._contexts.get(len(number))
+        if ctx is None:
+            length = len(_TIME_PREFIX) + len(time_octets) + len(number) + len(self._suffix)
+            ctx = hashlib.sha1(_TAG_SEQUENCE + _encode_length(length) + _TIME_PREFIX)
+            self._contexts[len(number)] = ctx
+
+        ctx = ctx.copy()
+        ctx.update(time_octets)
+        ctx.update(number)
+        ctx.update(self._suffix)
+        return ctx.digest()
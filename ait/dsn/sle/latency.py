@@ -0,0 +1,290 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Frame Latency Tracing
+
+The ait.dsn.sle.latency module measures how stale received frames are as
+they move through a RAF or RCF interface. For a sample of the annotated
+frames received, the time of each stage of the receive path is compared
+with the frame's earth receive time (ERT):
+
+    received: The TML message holding the frame was read from the socket
+        (``conn_handler``).
+
+    decoded: The frame was decoded from its transfer buffer
+        (``data_processor``).
+
+    delivered: The frame's handlers, and so the sinks they write to, have
+        returned.
+
+Latencies are kept in histograms with logarithmic buckets per stage and
+virtual channel. Tracing costs a counter decrement for frames which are
+not sampled. Latencies compare the local clock with the provider's ERT,
+so both are assumed to be UTC.
+
+Consumers which queue frames and hand them on later can add their own
+stages with :meth:`LatencyTracer.record`.
+
+Example:
+
+    tracer = LatencyTracer(sample_every=10)
+    tracer.attach(raf_mngr)
+    ...
+    tracer.status()['delivered'][0]['p99']
+
+Classes:
+    LatencyHistogram: A histogram of latencies with logarithmic buckets.
+
+    LatencyTracer: Sample the latency of received frames at each stage.
+
+Attributes:
+    STAGES: The stages of the receive path, in order.
+'''
+
+from collections import OrderedDict
+import bisect
+import datetime as dt
+import time
+
+import ccsdstime
+import frames
+
+STAGES = ('received', 'decoded', 'delivered')
+
+# Seconds from the CCSDS epoch to the Unix epoch
+_UNIX_OFFSET = (dt.datetime(1970, 1, 1) - ccsdstime.CCSDS_EPOCH).total_seconds()
+
+# Bucket upper bounds in seconds, doubling from 1 ms to about 36 hours
+_BOUNDS = [0.001 * 2 ** i for i in range(28)]
+
+
+class LatencyHistogram(object):
+    ''' A histogram of latencies with logarithmic buckets
+
+    Buckets double in width from 1 millisecond up to about 36 hours. Later
+    latencies fall into a final overflow bucket and negative latencies,
+    from clock offsets, into the first.
+
+    Attributes:
+        count: The number of latencies added.
+
+        total: The sum of the latencies in seconds.
+
+        max: The largest latency in seconds, or None.
+    '''
+    def __init__(self):
+        self._counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+
+    def add(self, latency):
+        ''' Add a latency in seconds '''
+        self._counts[bisect.bisect_left(_BOUNDS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        if self.max is None or latency > self.max:
+            self.max = latency
+
+    def merge(self, other):
+        ''' Add the latencies of another histogram to this one '''
+        self._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        self.count += other.count
+        self.total += other.total
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def mean(self):
+        ''' Return the mean latency in seconds, or None '''
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        ''' Return the upper bound of the bucket holding a percentile
+
+        The result is within a factor of two of the true percentile. The
+        maximum is returned for percentiles in the overflow bucket.
+        '''
+        if not self.count:
+            return None
+
+        rank = max(int(-(-p * self.count // 100)), 1)
+        seen = 0
+        for bound, n in zip(_BOUNDS, self._counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def buckets(self):
+        ''' Return (upper bound, count) for each non-empty bucket
+
+        The overflow bucket's upper bound is None.
+        '''
+        return [(b, n) for b, n in zip(_BOUNDS + [None], self._counts) if n]
+
+
+class LatencyTracer(object):
+    ''' Sample the latency of received frames at each stage
+
+    Arguments:
+        sample_every (optional integer):
+            Trace one of every this many transfer buffer elements.
+            Defaults to 1, tracing every frame.
+
+        max_pending (optional integer):
+            The number of sampled frames to remember between decoding and
+            delivery. Frames dropped from a full frame queue are forgotten
+            once this is reached. Defaults to 4096.
+
+        clock (optional callable):
+            Returns the current Unix time. Defaults to time.time.
+
+    Attributes:
+        sampled: The number of frames sampled.
+    '''
+    def __init__(self, sample_every=1, max_pending=4096, clock=time.time):
+        if sample_every < 1:
+            raise ValueError('sample_every must be at least 1')
+
+        self._sample_every = sample_every
+        self._countdown = 1
+        self._max_pending = max_pending
+        self._clock = clock
+        self._pending = OrderedDict()
+        self._histograms = {}
+        self.sampled = 0
+
+    def attach(self, service):
+        ''' Trace the frames received by a RAF or RCF instance '''
+        service.tracer = self
+
+    def detach(self, service):
+        ''' Stop tracing the frames received by a RAF or RCF instance '''
+        service.tracer = None
+
+    def record(self, stage, ert, vcid=None, now=None):
+        ''' Record the latency of a frame at a stage
+
+        Arguments:
+            stage (string):
+                The stage name.
+
+            ert (integer):
+                The frame's ERT in nanoseconds since the CCSDS epoch, as
+                returned by :func:`ait.dsn.sle.ccsdstime.to_nanoseconds`.
+
+            vcid (optional integer):
+                The frame's virtual channel.
+
+            now (optional number):
+                The Unix time the stage was reached. Defaults to the
+                current time.
+        '''
+        if now is None:
+            now = self._clock()
+
+        key = (stage, vcid)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.add(now - (ert / 1e9 - _UNIX_OFFSET))
+
+    def histogram(self, stage, vcid=None):
+        ''' Return the histogram for a stage and virtual channel
+
+        If vcid is None the histograms of all virtual channels are merged.
+        '''
+        if vcid is not None:
+            return self._histograms.get((stage, vcid), LatencyHistogram())
+
+        merged = LatencyHistogram()
+        for (s, _), histogram in self._histograms.items():
+            if s == stage:
+                merged.merge(histogram)
+        return merged
+
+    def status(self, percentiles=(50, 90, 99)):
+        ''' Return latency statistics per stage and virtual channel
+
+        Returns:
+            A dict by stage of dicts by VCID, each with the sample
+            ``count`` and the ``mean``, ``max`` and percentile latencies
+            (``p50`` and so on) in seconds.
+        '''
+        result = {}
+        for (stage, vcid), histogram in sorted(self._histograms.items()):
+            stats = {
+                'count': histogram.count,
+                'mean': histogram.mean(),
+                'max': histogram.max,
+            }
+            for p in percentiles:
+                stats['p{}'.format(p)] = histogram.percentile(p)
+            result.setdefault(stage, {})[vcid] = stats
+        return result
+
+    def reset(self):
+        ''' Discard all recorded latencies '''
+        self._histograms = {}
+        self._pending.clear()
+        self.sampled = 0
+
+    def trace(self, elements, received=None):
+        ''' Sample transfer buffer elements as they are decoded
+
+        Called by the interface with the elements of each transfer buffer.
+        Sampled annotated frames have their received and decoded latencies
+        recorded and are remembered until :meth:`delivered` is called.
+
+        Arguments:
+            elements:
+                An iterable of transfer buffer elements.
+
+            received (optional number):
+                The Unix time the PDU holding the elements was received.
+
+        Returns:
+            A generator yielding the elements unchanged.
+        '''
+        for element in elements:
+            self._countdown -= 1
+            if not self._countdown:
+                self._countdown = self._sample_every
+                if element.getName() == 'annotatedFrame':
+                    self._sample(element, received)
+            yield element
+
+    def delivered(self, element):
+        ''' Record the delivered latency of an element if it was sampled '''
+        key = id(element)
+        if key in self._pending:
+            entry = self._pending.pop(key)
+            if entry[0] is element:
+                self.record('delivered', entry[1], entry[2])
+
+    def _sample(self, element, received):
+        ''''''
+        frame = element.getComponent()
+        ert = ccsdstime.to_nanoseconds(frame['earthReceiveTime'].getComponent().asOctets())
+        vcid = frames.frame_id(frame['data'].asOctets())[1]
+
+        self.sampled += 1
+        if received is not None:
+            self.record('received', ert, vcid, received)
+        self.record('decoded', ert, vcid)
+
+        pending = self._pending
+        pending[id(element)] = (element, ert, vcid)
+        if len(pending) > self._max_pending:
+            pending.popitem(last=False)
@@ -0,0 +1,262 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Vectorised Limit Checking
+
+The ait.dsn.sle.limitcheck module applies the red (error) and yellow
+(warn) limits from the limits dictionary (``limits.yaml``) to the columns
+decoded by :class:`ait.dsn.sle.decom.Decommutator`. A whole column is
+checked with NumPy comparisons and only the samples where a field enters
+or leaves a limit are reported, as :class:`LimitEvent` tuples.
+
+A value is out of limits if it is below a lower threshold, above an upper
+threshold or equal to one of the listed values. Error limits take
+precedence over warn limits. Enumerated values are matched against the
+field's raw values using the enumerations in the telemetry dictionary.
+
+Unlike :mod:`ait.core.limits`, limits are compared with the raw values of
+the columns, since DN to EU conversions are not applied by the
+decommutator. Limits on fields with a ``dntoeu`` conversion are rejected
+rather than being silently compared with raw values. The ``when`` and
+``persist`` settings of a limit are not applied.
+
+NumPy is required and is an optional dependency.
+
+Example:
+
+    def on_event(event):
+        ait.core.log.warn('{} is {}'.format(event.source, event.level))
+
+    checker = LimitChecker(load_limit_defs(), on_event=on_event, sink=publish)
+    decom = Decommutator(checker.check, apids={0x12: '1553_HS_Packet'})
+
+Classes:
+    LimitEvent: A field entering or leaving a limit.
+
+    LimitChecker: Check decoded columns against limits and report
+        transitions.
+
+Functions:
+    load_limit_defs: Load the limit definitions from ``limits.yaml``.
+
+Attributes:
+    LEVELS: The limit levels in order of severity.
+'''
+
+from collections import namedtuple
+
+LEVELS = ('ok', 'warn', 'error')
+
+
+class LimitEvent(namedtuple('LimitEvent', 'source ert value level previous')):
+    ''' A field entering or leaving a limit
+
+    Attributes:
+        source: The limit's source, e.g. ``1553_HS_Packet.Voltage_A``.
+
+        ert: The earth receive time of the sample, or None if the checked
+            columns have no ``ert`` column.
+
+        value: The sample's raw value.
+
+        level: The level of the sample, one of :data:`LEVELS`.
+
+        previous: The level of the previous sample.
+    '''
+    __slots__ = ()
+
+
+def load_limit_defs(filename=None):
+    ''' Load the limit definitions from limits.yaml
+
+    Arguments:
+        filename (optional string):
+            The limits dictionary to load. Defaults to the AIT default
+            limits dictionary (the ``limits.filename`` config value).
+
+    Returns:
+        A list of :class:`ait.core.limits.LimitDefinition`.
+    '''
+    import ait.core.limits
+
+    if filename is None:
+        return list(ait.core.limits.getDefaultDict().values())
+    return list(ait.core.limits.LimitsDict(filename).values())
+
+
+def _threshold(thresholds, level):
+    ''''''
+    if thresholds is None:
+        return None
+    if isinstance(thresholds, dict):
+        return thresholds.get(level)
+    return getattr(thresholds, level, None)
+
+
+class _Limit(object):
+    ''''''
+    def __init__(self, defn, enums):
+        self.source = defn.source
+        self.field = defn.source.split('.', 1)[1]
+        self.checks = []
+
+        for level in ('warn', 'error'):
+            lower = _threshold(defn.lower, level)
+            upper = _threshold(defn.upper, level)
+            values = _threshold(defn.value, level)
+
+            if values is not None:
+                if not isinstance(values, list):
+                    values = [values]
+                names = dict((name, raw) for raw, name in (enums or {}).items())
+                for value in values:
+                    if isinstance(value, basestring) and value not in names:
+                        raise ValueError('{} has no enumeration {}'.format(self.source, value))
+                values = [names.get(v, v) for v in values]
+
+            if lower is not None or upper is not None or values:
+                self.checks.append((LEVELS.index(level), lower, upper, values))
+
+    def levels(self, numpy, column):
+        ''''''
+        levels = numpy.zeros(len(column), dtype='i1')
+        for level, lower, upper, values in self.checks:
+            out = numpy.zeros(len(column), dtype=bool)
+            if lower is not None:
+                out |= column < lower
+            if upper is not None:
+                out |= column > upper
+            if values:
+                out |= numpy.in1d(column, values)
+            levels[out] = level
+        return levels
+
+
+class LimitChecker(object):
+    ''' Check decoded telemetry columns against limits
+
+    The level of each limit's last sample is kept between batches, so a
+    transition is reported when a batch starts at a different level from
+    the one the previous batch ended at. Every limit starts at ``ok``.
+
+    Arguments:
+        limits (list):
+            The limit definitions, such as those returned by
+            :func:`load_limit_defs`. Each needs a ``source`` of the form
+            ``Packet.field`` and ``lower``, ``upper`` and ``value``
+            thresholds.
+
+        tlmdict (optional dict):
+            The packet definitions by name, used to look up the raw values
+            of enumerated value limits and to reject limits on converted
+            fields. Defaults to the AIT default telemetry dictionary.
+
+        on_event (optional callable):
+            Called with each :class:`LimitEvent`.
+
+        sink (optional callable):
+            Called with the packet name and columns of each batch after it
+            has been checked, so the checker can sit between a
+            :class:`ait.dsn.sle.decom.Decommutator` and its consumer.
+
+    Attributes:
+        checked: The number of samples checked.
+
+    Raises:
+        ValueError: If a limit is on a field with a DN to EU conversion or
+            lists an enumeration its field doesn't have.
+    '''
+    def __init__(self, limits, tlmdict=None, on_event=None, sink=None):
+        self._on_event = on_event
+        self._sink = sink
+        self._limits = {}
+        self._state = {}
+        self.checked = 0
+
+        if tlmdict is None:
+            import decom
+            tlmdict = decom.load_packet_defs()
+
+        for defn in limits:
+            packet, field = defn.source.split('.', 1)
+            enums = None
+            if packet in tlmdict:
+                fields = dict((f.name, f) for f in tlmdict[packet].fields)
+                if field in fields:
+                    if getattr(fields[field], 'dntoeu', None):
+                        raise ValueError('{} has a DN to EU conversion; limits are checked '
+                                         'against raw values'.format(defn.source))
+                    enums = fields[field].enum
+
+            self._limits.setdefault(packet, []).append(_Limit(defn, enums))
+            self._state[defn.source] = 0
+
+    def check(self, name, columns):
+        ''' Check a batch of decoded columns
+
+        Arguments:
+            name (string):
+                The packet definition name.
+
+            columns (dict):
+                The NumPy arrays of the batch by field name, optionally
+                with an ``ert`` column, as produced by
+                :meth:`ait.dsn.sle.decom.PacketDecoder.decode`.
+
+        Returns:
+            The list of :class:`LimitEvent` for the batch, in sample order
+            per limit.
+        '''
+        import numpy
+
+        events = []
+        erts = columns.get('ert')
+        for limit in self._limits.get(name, ()):
+            column = columns.get(limit.field)
+            if column is None or len(column) == 0:
+                continue
+
+            levels = limit.levels(numpy, column)
+            self.checked += len(levels)
+
+            previous = self._state[limit.source]
+            changes = numpy.flatnonzero(levels[1:] != levels[:-1]) + 1
+            if levels[0] != previous:
+                changes = numpy.concatenate(([0], changes))
+
+            for i in changes:
+                level = levels[i]
+                events.append(LimitEvent(
+                    limit.source,
+                    erts[i] if erts is not None else None,
+                    column[i],
+                    LEVELS[level],
+                    LEVELS[previous]
+                ))
+                previous = level
+
+            self._state[limit.source] = int(levels[-1])
+
+        if self._on_event is not None:
+            for event in events:
+                self._on_event(event)
+
+        if self._sink is not None:
+            self._sink(name, columns)
+
+        return events
+
+    def status(self):
+        ''' Return the current level of every limit by source '''
+        return dict((source, LEVELS[level]) for source, level in self._state.items())
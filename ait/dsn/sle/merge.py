@@ -0,0 +1,170 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Redundant Frame Stream Merging
+
+The ait.dsn.sle.merge module merges the frames received over several RAF
+or RCF sessions carrying the same downlink, such as those from arrayed
+stations or from both sides of a handover, into a single stream without
+duplicates.
+
+Example:
+
+    merger = FrameMerger(archive_frame, window=2.0)
+    for service in [raf_station_a, raf_station_b]:
+        service.remove_handler('AnnotatedFrame', service._transfer_data_invoc_handler)
+        merger.attach(service)
+
+Classes:
+    FrameMerger: Merge annotated frames from several sessions, drop
+        duplicates and keep the best quality copy of each frame.
+'''
+
+from collections import OrderedDict
+import heapq
+
+import ccsdstime
+import frames
+
+# deliveredFrameQuality values ranked from best to worst: good (0),
+# undetermined (2), erred (1).
+_QUALITY_RANK = {0: 0, 2: 1, 1: 2}
+
+
+class FrameMerger(object):
+    ''' Merge annotated frames from several sessions into one stream
+
+    Frames are identified by their spacecraft id, virtual channel id and
+    virtual channel frame count. Two frames with the same identity whose
+    earth receive times are within ``window`` seconds of each other are
+    copies of the same frame. The frame counts wrap quickly, so the ERT
+    window is what keeps them apart from later frames with the same count.
+
+    Each frame is held until ERTs more than ``window`` seconds newer have
+    been seen, so that a better quality copy arriving over another session
+    can replace it. Held frames are then passed to the sink in ERT order.
+    The identities of passed frames are remembered in a bounded window so
+    that late copies are still dropped.
+
+    Arguments:
+        sink:
+            A callable which receives each unique AnnotatedFrame transfer
+            buffer element.
+
+        window (optional number):
+            The ERT window in seconds within which frames with the same
+            identity are treated as copies. Defaults to 1.
+
+        max_entries (optional integer):
+            The number of passed frame identities to remember. Defaults to
+            65536.
+
+    Attributes:
+        received: The number of frames added.
+
+        duplicates: The number of frames dropped as copies.
+
+        replaced: The number of held frames replaced by a better copy.
+    '''
+    def __init__(self, sink, window=1.0, max_entries=65536):
+        self._sink = sink
+        self._window = int(window * 1e9)
+        self._max_entries = max_entries
+
+        self._pending = {}
+        self._heap = []
+        self._passed = OrderedDict()
+        self._newest = None
+        self._seq = 0
+
+        self.received = 0
+        self.duplicates = 0
+        self.replaced = 0
+
+    def attach(self, service):
+        ''' Merge the annotated frames received by a RAF or RCF instance '''
+        service.add_handler('AnnotatedFrame', self.add)
+
+    def detach(self, service):
+        ''' Stop merging the frames received by a RAF or RCF instance '''
+        service.remove_handler('AnnotatedFrame', self.add)
+
+    def add(self, pdu):
+        ''' Add an AnnotatedFrame transfer buffer element to the merge '''
+        frame = pdu.getComponent()
+        ert = ccsdstime.to_nanoseconds(frame['earthReceiveTime'].getComponent().asOctets())
+        key = frames.frame_id(frame['data'].asOctets())
+
+        if 'deliveredFrameQuality' in frame:
+            rank = _QUALITY_RANK.get(int(frame['deliveredFrameQuality']), 2)
+        else:
+            rank = 0
+
+        self.received += 1
+        self._advance(ert)
+
+        window = self._window
+        entry = self._pending.get(key)
+        if entry is not None:
+            if abs(entry[0] - ert) <= window:
+                self.duplicates += 1
+                if rank < entry[1]:
+                    entry[1] = rank
+                    entry[3] = pdu
+                    self.replaced += 1
+                return
+
+            # A different frame with a wrapped count is still held. Pass
+            # everything up to it so the identity can be reused.
+            self._release(entry[0])
+
+        passed = self._passed.get(key)
+        if passed is not None and abs(passed - ert) <= window:
+            self.duplicates += 1
+            return
+
+        seq = self._seq
+        self._seq += 1
+        self._pending[key] = [ert, rank, seq, pdu]
+        heapq.heappush(self._heap, (ert, seq, key))
+
+    def flush(self):
+        ''' Pass all held frames to the sink '''
+        while self._heap:
+            self._pop()
+
+    def _advance(self, ert):
+        ''''''
+        if self._newest is None or ert > self._newest:
+            self._newest = ert
+            self._release(ert - self._window - 1)
+
+    def _release(self, ert):
+        ''''''
+        heap = self._heap
+        while heap and heap[0][0] <= ert:
+            self._pop()
+
+    def _pop(self):
+        ''''''
+        ert, _, key = heapq.heappop(self._heap)
+        entry = self._pending.pop(key)
+
+        passed = self._passed
+        passed.pop(key, None)
+        passed[key] = ert
+        if len(passed) > self._max_entries:
+            passed.popitem(last=False)
+
+        self._sink(entry[3])
@@ -0,0 +1,127 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Bounded Receive Queues
+
+The ait.dsn.sle.queues module provides the bounded queue used between the
+stages of the SLE receive path. A queue holds at most ``maxsize`` items and
+applies one of the following policies when it is full:
+
+    block: The producer waits until there is room. For the raw PDU queue
+        this stops the socket being read, so TCP flow control pushes back
+        on the provider.
+
+    drop-oldest: The oldest queued item is discarded to make room.
+
+    drop-newest: The new item is discarded.
+
+Attributes:
+    POLICIES: The supported full queue policies.
+
+Classes:
+    BoundedQueue: A gevent queue with a size limit, a full queue policy
+        and drop accounting.
+'''
+
+import gevent.queue
+
+POLICIES = ('block', 'drop-oldest', 'drop-newest')
+
+
+class BoundedQueue(object):
+    ''' A gevent queue with a size limit and a full queue policy
+
+    Arguments:
+        maxsize (optional integer):
+            The maximum number of queued items. 0 or None leaves the queue
+            unbounded. Defaults to 0.
+
+        policy (optional string):
+            What to do with a new item when the queue is full. One of
+            "block", "drop-oldest" or "drop-newest". Defaults to "block".
+
+    Attributes:
+        dropped: The number of items discarded because the queue was full.
+
+        high_water: The largest number of items queued at once.
+    '''
+    def __init__(self, maxsize=0, policy='block'):
+        if policy not in POLICIES:
+            raise ValueError('Queue policy must be one of: {}'.format(
+                ', '.join('"{}"'.format(p) for p in POLICIES)))
+
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('Queue size must not be negative')
+
+        self._queue = gevent.queue.Queue(maxsize or None)
+        self.maxsize = maxsize or 0
+        self.policy = policy
+        self.dropped = 0
+        self.high_water = 0
+
+    def put(self, item):
+        ''' Add an item to the queue, applying the policy if it is full
+
+        Returns:
+            True if the item was queued, False if it was dropped.
+        '''
+        queue = self._queue
+        if self.maxsize and queue.qsize() >= self.maxsize:
+            if self.policy == 'drop-newest':
+                self.dropped += 1
+                return False
+
+            if self.policy == 'drop-oldest':
+                try:
+                    queue.get_nowait()
+                    self.dropped += 1
+                except gevent.queue.Empty:
+                    pass
+
+        queue.put(item)
+
+        depth = queue.qsize()
+        if depth > self.high_water:
+            self.high_water = depth
+        return True
+
+    def get(self, block=True, timeout=None):
+        ''' Remove and return the oldest item, waiting if none is queued '''
+        return self._queue.get(block, timeout)
+
+    def get_nowait(self):
+        ''' Remove and return the oldest item without waiting '''
+        return self._queue.get_nowait()
+
+    def qsize(self):
+        ''' Return the number of queued items '''
+        return self._queue.qsize()
+
+    def empty(self):
+        ''' Return True if no items are queued '''
+        return self._queue.empty()
+
+    def full(self):
+        ''' Return True if the queue is bounded and at its limit '''
+        return bool(self.maxsize) and self._queue.qsize() >= self.maxsize
+
+    def stats(self):
+        ''' Return the queue's depth, limit, high water mark and drop count '''
+        return {
+            'depth': self._queue.qsize(),
+            'maxsize': self.maxsize,
+            'high_water': self.high_water,
+            'dropped': self.dropped,
+        }
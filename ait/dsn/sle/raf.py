@@ -21,10 +21,10 @@ Classes:
     RAF: An extension of the generic ait.dsn.sle.common.SLE class which
         implements the RAF standard.
 '''
-import struct
 
 import ait.core.log
 
+import ccsdstime
 import common
 import frames
 from ait.dsn.sle.pdu.raf import *
@@ -91,6 +91,9 @@ class RAF(common.SLE):
         Received from the provider to abort the connection.
     '''
     # TODO: Add error checking for actions based on current state
+    _provider_pdu_spec = RafProvidertoUserPdu
+    _frame_spec = FrameOrNotification
+    _transfer_buffer_name = 'rafTransferBuffer'
 
     def __init__(self, *args, **kwargs):
         self._inst_id = ait.config.get('dsn.sle.raf.inst_id',
@@ -105,17 +108,17 @@ class RAF(common.SLE):
         self._service_type = 'rtnAllFrames'
         self._version = kwargs.get('version', 4)
 
-        self._handlers['RafBindReturn'].append(self._bind_return_handler)
-        self._handlers['RafUnbindReturn'].append(self._unbind_return_handler)
-        self._handlers['RafStartReturn'].append(self._start_return_handler)
-        self._handlers['RafStopReturn'].append(self._stop_return_handler)
-        self._handlers['RafTransferBuffer'].append(self._data_transfer_handler)
-        self._handlers['RafScheduleStatusReportReturn'].append(self._schedule_status_report_return_handler)
-        self._handlers['RafStatusReportInvocation'].append(self._status_report_invoc_handler)
-        self._handlers['RafGetParameterReturn'].append(self._get_param_return_handler)
-        self._handlers['AnnotatedFrame'].append(self._transfer_data_invoc_handler)
-        self._handlers['SyncNotification'].append(self._sync_notify_handler)
-        self._handlers['RafPeerAbortInvocation'].append(self._peer_abort_handler)
+        self.add_handler('RafBindReturn', self._bind_return_handler)
+        self.add_handler('RafUnbindReturn', self._unbind_return_handler)
+        self.add_handler('RafStartReturn', self._start_return_handler)
+        self.add_handler('RafStopReturn', self._stop_return_handler)
+        self.add_handler('RafTransferBuffer', self._data_transfer_handler)
+        self.add_handler('RafScheduleStatusReportReturn', self._schedule_status_report_return_handler)
+        self.add_handler('RafStatusReportInvocation', self._status_report_invoc_handler)
+        self.add_handler('RafGetParameterReturn', self._get_param_return_handler)
+        self.add_handler('AnnotatedFrame', self._transfer_data_invoc_handler)
+        self.add_handler('SyncNotification', self._sync_notify_handler)
+        self.add_handler('RafPeerAbortInvocation', self._peer_abort_handler)
 
     def bind(self, inst_id=None):
         ''' Bind to a RAF interface
@@ -174,19 +177,19 @@ class RAF(common.SLE):
         if start_time is None:
             start_invoc['rafStartInvocation']['startTime']['undefined'] = None
         else:
-            start_time = struct.pack('!HIH', (start_time - common.CCSDS_EPOCH).days, 0, 0)
+            start_time = ccsdstime.encode_cds(start_time)
             start_invoc['rafStartInvocation']['startTime']['known']['ccsdsFormat'] = start_time
 
         if end_time is None:
             start_invoc['rafStartInvocation']['stopTime']['undefined'] = None
         else:
-            stop_time = struct.pack('!HIH', (end_time - common.CCSDS_EPOCH).days, 0, 0)
+            stop_time = ccsdstime.encode_cds(end_time)
             start_invoc['rafStartInvocation']['stopTime']['known']['ccsdsFormat'] = stop_time
 
         start_invoc['rafStartInvocation']['requestedFrameQuality'] = frame_quality
 
         ait.core.log.info('Sending data start invocation ...')
-        self.send(self.encode_pdu(start_invoc))
+        self.send_pdu(start_invoc)
 
     def stop(self):
         ''' Send data stop request to the RAF interface '''
@@ -226,7 +229,7 @@ class RAF(common.SLE):
             raise ValueError('Unknown report type: {}'.format(report_type))
 
         ait.core.log.info('Scheduling Status Report')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def peer_abort(self, reason=127):
         ''' Send a peer abort notification to the RAF interface
@@ -241,7 +244,7 @@ class RAF(common.SLE):
         pdu['rafPeerAbortInvocation'] = reason
 
         ait.core.log.info('Sending Peer Abort')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
         self._state = 'unbound'
 
     def decode(self, message):
@@ -325,8 +328,7 @@ class RAF(common.SLE):
 
     def _data_transfer_handler(self, pdu):
         ''''''
-        for data in pdu['rafTransferBuffer']:
-            self._handle_pdu(data)
+        self._handle_frames(pdu['rafTransferBuffer'])
 
     def _transfer_data_invoc_handler(self, pdu):
         ''''''
@@ -372,7 +374,8 @@ class RAF(common.SLE):
                 prod_status_labels[int(notification)]
             )
         elif notification_name == 'excessiveDataBacklog':
-            report = 'Excessive Data Backlog Detected'
+            ait.core.log.warn(self._provider_backlog_report())
+            return
         elif notification_name == 'endOfData':
             report = 'End of Data Received'
         else:
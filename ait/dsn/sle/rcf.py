@@ -23,10 +23,10 @@ Classes:
     RCF: An extension of the generic ait.dsn.sle.common.SLE class which
         implements the RCF standard.
 '''
-import struct
 
 import ait.core.log
 
+import ccsdstime
 import common
 import frames
 from ait.dsn.sle.pdu.rcf import *
@@ -94,6 +94,10 @@ class RCF(common.SLE):
     '''
     # TODO: Add error checking for actions based on current state
 
+    _provider_pdu_spec = RcfProvidertoUserPdu
+    _frame_spec = FrameOrNotification
+    _transfer_buffer_name = 'rcfTransferBuffer'
+
     def __init__(self, *args, **kwargs):
         self._inst_id = ait.config.get('dsn.sle.rcf.inst_id',
                                        kwargs.get('inst_id', None))
@@ -108,17 +112,17 @@ class RCF(common.SLE):
         self._scid = kwargs.get('spacecraft_id', None)
         self._tfvn = kwargs.get('trans_frame_ver_num', None)
 
-        self._handlers['RcfBindReturn'].append(self._bind_return_handler)
-        self._handlers['RcfUnbindReturn'].append(self._unbind_return_handler)
-        self._handlers['RcfStartReturn'].append(self._start_return_handler)
-        self._handlers['RcfStopReturn'].append(self._stop_return_handler)
-        self._handlers['RcfTransferBuffer'].append(self._data_transfer_handler)
-        self._handlers['RcfScheduleStatusReportReturn'].append(self._schedule_status_report_return_handler)
-        self._handlers['RcfStatusReportInvocation'].append(self._status_report_invoc_handler)
-        self._handlers['RcfGetParameterReturn'].append(self._get_param_return_handler)
-        self._handlers['AnnotatedFrame'].append(self._transfer_data_invoc_handler)
-        self._handlers['SyncNotification'].append(self._sync_notify_handler)
-        self._handlers['RcfPeerAbortInvocation'].append(self._peer_abort_handler)
+        self.add_handler('RcfBindReturn', self._bind_return_handler)
+        self.add_handler('RcfUnbindReturn', self._unbind_return_handler)
+        self.add_handler('RcfStartReturn', self._start_return_handler)
+        self.add_handler('RcfStopReturn', self._stop_return_handler)
+        self.add_handler('RcfTransferBuffer', self._data_transfer_handler)
+        self.add_handler('RcfScheduleStatusReportReturn', self._schedule_status_report_return_handler)
+        self.add_handler('RcfStatusReportInvocation', self._status_report_invoc_handler)
+        self.add_handler('RcfGetParameterReturn', self._get_param_return_handler)
+        self.add_handler('AnnotatedFrame', self._transfer_data_invoc_handler)
+        self.add_handler('SyncNotification', self._sync_notify_handler)
+        self.add_handler('RcfPeerAbortInvocation', self._peer_abort_handler)
 
     def bind(self, inst_id=None):
         ''' Bind to a RCF interface
@@ -223,13 +227,13 @@ class RCF(common.SLE):
         if start_time is None:
             start_invoc['rcfStartInvocation']['startTime']['undefined'] = None
         else:
-            start_time = struct.pack('!HIH', (start_time - common.CCSDS_EPOCH).days, 0, 0)
+            start_time = ccsdstime.encode_cds(start_time)
             start_invoc['rcfStartInvocation']['startTime']['known']['ccsdsFormat'] = start_time
 
         if end_time is None:
             start_invoc['rcfStartInvocation']['stopTime']['undefined'] = None
         else:
-            stop_time = struct.pack('!HIH', (end_time - common.CCSDS_EPOCH).days, 0, 0)
+            stop_time = ccsdstime.encode_cds(end_time)
             start_invoc['rcfStartInvocation']['stopTime']['known']['ccsdsFormat'] = stop_time
 
         req_gvcid = GvcId()
@@ -244,7 +248,7 @@ class RCF(common.SLE):
         start_invoc['rcfStartInvocation']['requestedGvcId'] = req_gvcid
 
         ait.core.log.info('Sending data start invocation ...')
-        self.send(self.encode_pdu(start_invoc))
+        self.send_pdu(start_invoc)
 
     def stop(self):
         ''' Send data stop request to the RCF interface '''
@@ -284,7 +288,7 @@ class RCF(common.SLE):
             raise ValueError('Unknown report type: {}'.format(report_type))
 
         ait.core.log.info('Scheduling Status Report')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
 
     def peer_abort(self, reason=127):
         ''' Send a peer abort notification to the RCF interface
@@ -299,7 +303,7 @@ class RCF(common.SLE):
         pdu['rcfPeerAbortInvocation'] = reason
 
         ait.core.log.info('Sending Peer Abort')
-        self.send(self.encode_pdu(pdu))
+        self.send_pdu(pdu)
         self._state = 'unbound'
 
     def decode(self, message):
@@ -315,21 +319,6 @@ class RCF(common.SLE):
         '''
         return super(self.__class__, self).decode(message, RcfProvidertoUserPdu())
 
-    def _handle_pdu(self, pdu):
-        ''''''
-        pdu_key = pdu.getName()
-        pdu_key = pdu_key[:1].upper() + pdu_key[1:]
-        if pdu_key in self._handlers:
-            pdu_handlerss = self._handlers[pdu_key]
-            for h in pdu_handlerss:
-                h(pdu)
-        else:
-            err = (
-                'PDU of type {} has no associated handlers. '
-                'Unable to process further and skipping ...'
-            )
-            ait.core.log.error(err.format(pdu_key))
-
     def _bind_return_handler(self, pdu):
         ''''''
         result = pdu['rcfBindReturn']['result']
@@ -399,8 +388,7 @@ class RCF(common.SLE):
 
     def _data_transfer_handler(self, pdu):
         ''''''
-        for data in pdu['rcfTransferBuffer']:
-            self._handle_pdu(data)
+        self._handle_frames(pdu['rcfTransferBuffer'])
 
     def _transfer_data_invoc_handler(self, pdu):
         ''''''
@@ -447,7 +435,8 @@ class RCF(common.SLE):
                 prod_status_labels[int(notification)]
             )
         elif notification_name == 'excessiveDataBacklog':
-            report = 'Excessive Data Backlog Detected'
+            ait.core.log.warn(self._provider_backlog_report())
+            return
         elif notification_name == 'endOfData':
             report = 'End of Data Received'
         else:
@@ -0,0 +1,317 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Offline Frame Retrieval
+
+The ait.dsn.sle.retrieval module retrieves long earth receive time (ERT)
+ranges from offline RAF or RCF service instances. The range is split into
+one time slice per service instance and every slice is retrieved over its
+own concurrent SLE session. The frames from the slices are merged back into
+ERT order with a k-way heap merge before being handed to the caller. Each
+slice buffers a bounded number of frames ahead of the merge, so a slice
+which is ahead of the one being merged stops reading from its provider
+until the merge reaches it.
+
+Retrieval uses the gevent engine.
+
+Example:
+
+    retrieval = SlicedRetrieval([
+        'sagr=1.spack=1.rsl-fg=1.raf=onlt1',
+        'sagr=1.spack=1.rsl-fg=1.raf=onlt2',
+    ])
+    retrieval.retrieve(start_time, end_time, archive.write_frame)
+
+Classes:
+    SlicedRetrieval: Retrieve an ERT range over concurrent service
+        instances and merge the frames into ERT order.
+
+Functions:
+    split_range: Split a time range into equal slices.
+
+    service_event: Return the full event name for a service.
+
+    invoke_and_wait: Send a request and wait for the provider's return.
+'''
+
+import heapq
+
+import gevent
+import gevent.event
+import gevent.queue
+
+import ait.core.log
+
+import ccsdstime
+
+_END = object()
+
+
+def split_range(start_time, end_time, num_slices):
+    ''' Split a time range into equal, contiguous slices
+
+    Arguments:
+        start_time (:class:`datetime.datetime`):
+            The start of the range.
+
+        end_time (:class:`datetime.datetime`):
+            The end of the range.
+
+        num_slices (integer):
+            The number of slices to create.
+
+    Returns:
+        A list of (start, end) tuples covering the range. The end of each
+        slice is the start of the next.
+    '''
+    if end_time <= start_time:
+        raise ValueError('End time must be after start time')
+
+    if num_slices < 1:
+        raise ValueError('Number of slices must be at least 1')
+
+    step = (end_time - start_time) // num_slices
+    bounds = [start_time + step * i for i in range(num_slices)] + [end_time]
+    return [(s, e) for s, e in zip(bounds[:-1], bounds[1:]) if s < e]
+
+
+def service_event(service, name):
+    ''' Return the full event name for a service, e.g. RafBindReturn '''
+    return type(service).__name__.capitalize() + name
+
+
+def invoke_and_wait(service, event, state, request, timeout):
+    ''' Send a request and wait for the provider's return
+
+    Arguments:
+        service:
+            The RAF, RCF or CLTU instance to send the request through.
+
+        event (string):
+            The return event without its service prefix, e.g. BindReturn.
+
+        state (string):
+            The state the service is expected to be in after a successful
+            return.
+
+        request:
+            A callable which sends the request.
+
+        timeout (number):
+            The number of seconds to wait for the return.
+
+    Raises:
+        Exception: If no return is received within the timeout or the
+            service is not in the expected state afterwards.
+    '''
+    result = gevent.event.AsyncResult()
+    event = service_event(service, event)
+    service.add_handler(event, result.set)
+
+    try:
+        request()
+        result.wait(timeout)
+    finally:
+        service.remove_handler(event, result.set)
+
+    if not result.ready():
+        raise Exception('Timed out waiting for {}'.format(event))
+
+    if service._state != state:
+        raise Exception('{} was not successful'.format(event))
+
+
+class SlicedRetrieval(object):
+    ''' Retrieve an ERT range over concurrent service instances
+
+    Each service instance id is given one slice of the requested range. A
+    new RAF (or RCF) instance is created per slice, connected, bound to its
+    service instance and started for the slice. Annotated frames are
+    collected until the provider signals the end of data, after which the
+    session is stopped, unbound and disconnected.
+
+    Slices are contiguous, so a frame whose ERT falls exactly on a slice
+    boundary is only kept by the slice which starts at that time.
+
+    Arguments:
+        inst_ids (list):
+            The offline service instance ids to retrieve over. One slice is
+            retrieved per id.
+
+        service_class (optional):
+            The service interface class to use. Defaults to
+            :class:`ait.dsn.sle.raf.RAF`.
+
+        timeout (optional number):
+            The number of seconds to wait for each bind, start, stop and
+            unbind return, and between frames before the end of data.
+            Defaults to 30.
+
+        slice_queue_size (optional integer):
+            The number of frames each slice may buffer ahead of the merge.
+            Defaults to 1000.
+
+        kwargs:
+            Any additional keyword arguments are passed to the service
+            class when each session is created.
+    '''
+    def __init__(self, inst_ids, service_class=None, timeout=30, slice_queue_size=1000, **kwargs):
+        self._inst_ids = list(inst_ids)
+        if not self._inst_ids:
+            raise ValueError('At least one service instance id is required')
+
+        if service_class is None:
+            import raf
+            service_class = raf.RAF
+
+        self._service_class = service_class
+        self._timeout = timeout
+        self._slice_queue_size = slice_queue_size
+        self._service_kwargs = kwargs
+
+    def retrieve(self, start_time, end_time, sink, **start_kwargs):
+        ''' Retrieve a range and pass each frame to a sink in ERT order
+
+        Arguments:
+            start_time (:class:`datetime.datetime`):
+                The start ERT of the range to retrieve.
+
+            end_time (:class:`datetime.datetime`):
+                The end ERT of the range to retrieve.
+
+            sink:
+                A callable which receives each AnnotatedFrame transfer
+                buffer element.
+
+            start_kwargs:
+                Any additional keyword arguments are passed to the service
+                class's start method, e.g. ``frame_quality`` for RAF.
+
+        Returns:
+            The number of frames passed to the sink.
+        '''
+        count = 0
+        for frame in self.iter_frames(start_time, end_time, **start_kwargs):
+            sink(frame)
+            count += 1
+        return count
+
+    def iter_frames(self, start_time, end_time, **start_kwargs):
+        ''' Retrieve a range and yield the frames in ERT order
+
+        The arguments are the same as for :meth:`retrieve`. Frames are
+        yielded as soon as they can be placed in order. If a slice fails,
+        including when its provider sends neither a frame nor the end of
+        data within the timeout, the exception is raised once its frames
+        are reached, and the remaining sessions are shut down.
+        '''
+        slices = split_range(start_time, end_time, len(self._inst_ids))
+        queues = [gevent.queue.Queue(self._slice_queue_size) for _ in slices]
+        workers = [
+            gevent.spawn(
+                self._run_slice, inst_id, s, e,
+                i == len(slices) - 1, start_kwargs, queues[i]
+            )
+            for i, (inst_id, (s, e)) in enumerate(zip(self._inst_ids, slices))
+        ]
+
+        try:
+            streams = [self._drain(i, q) for i, q in enumerate(queues)]
+            for _, _, _, frame in heapq.merge(*streams):
+                yield frame
+        finally:
+            gevent.killall(workers)
+
+    def _drain(self, index, queue):
+        ''''''
+        seq = 0
+        while True:
+            item = queue.get()
+            if item is _END:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            ert, frame = item
+            yield ert, index, seq, frame
+            seq += 1
+
+    def _run_slice(self, inst_id, start_time, end_time, last, start_kwargs, queue):
+        ''''''
+        service = self._service_class(**self._service_kwargs)
+        service.remove_handler('AnnotatedFrame', service._transfer_data_invoc_handler)
+
+        end_of_data = gevent.event.Event()
+        aborted = []
+        progress = [0]
+        handing_off = [False]
+
+        # A slice's end time is the next slice's start time. Frames at or
+        # after it belong to the next slice.
+        end_ns = None if last else ccsdstime.to_nanoseconds(ccsdstime.encode_cds_pico(end_time))
+
+        def on_frame(pdu):
+            progress[0] += 1
+            ert = ccsdstime.to_nanoseconds(pdu.getComponent()['earthReceiveTime'].getComponent().asOctets())
+            if end_ns is None or ert < end_ns:
+                handing_off[0] = True
+                try:
+                    queue.put((ert, pdu))
+                finally:
+                    handing_off[0] = False
+                    progress[0] += 1
+
+        def on_sync(pdu):
+            if pdu.getComponent()['notification'].getName() == 'endOfData':
+                end_of_data.set()
+
+        def on_abort(pdu):
+            aborted.append(pdu)
+            end_of_data.set()
+
+        service.add_handler('AnnotatedFrame', on_frame)
+        service.add_handler('SyncNotification', on_sync)
+        service.add_handler(service_event(service, 'PeerAbortInvocation'), on_abort)
+
+        try:
+            service.connect()
+            invoke_and_wait(service, 'BindReturn', 'ready',
+                            lambda: service.bind(inst_id), self._timeout)
+            invoke_and_wait(service, 'StartReturn', 'active',
+                            lambda: service.start(start_time, end_time, **start_kwargs),
+                            self._timeout)
+
+            ait.core.log.info('Retrieving {} to {} from {}'.format(start_time, end_time, inst_id))
+
+            # Waiting on a full queue means the merge hasn't reached this
+            # slice yet, not that the provider has stalled
+            seen = 0
+            while not end_of_data.wait(self._timeout):
+                if progress[0] == seen and not handing_off[0]:
+                    invoke_and_wait(service, 'StopReturn', 'ready', service.stop, self._timeout)
+                    raise Exception('Timed out waiting for the end of data from {}'.format(inst_id))
+                seen = progress[0]
+
+            if aborted:
+                raise Exception('Retrieval from {} was aborted by the provider'.format(inst_id))
+
+            invoke_and_wait(service, 'StopReturn', 'ready', service.stop, self._timeout)
+            invoke_and_wait(service, 'UnbindReturn', 'unbound', service.unbind, self._timeout)
+            queue.put(_END)
+        except Exception as e:
+            ait.core.log.error('Retrieval from {} failed: {}'.format(inst_id, e))
+            queue.put(e)
+        finally:
+            service.disconnect()
@@ -0,0 +1,465 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' APID Packet Routing
+
+The ait.dsn.sle.router module reassembles the space packets carried in the
+TM frames received by a RAF or RCF session and routes each packet to the
+handlers registered for its APID. Counters are kept per APID and gaps in
+the packet sequence counts are detected as packets are routed.
+
+A :class:`PacketIndex` can record the APID, sequence count, ERT and frame
+archive location of every packet, so a single packet can be found in the
+archive without scanning it. The archive offset of each frame is passed
+to :meth:`APIDRouter.add_frame` by whatever writes the archive.
+
+Example:
+
+    router = APIDRouter(index=PacketIndex('/gds/data/packets.idx'))
+    router.add_route(decom.add, apids=0x12)
+    router.add_route(science.write, apids=(0x100, 0x1FF))
+
+    def on_frame(pdu):
+        offset = archive.write_frame(pdu)
+        router.add_frame(pdu, offset)
+
+    raf_mngr.add_handler('AnnotatedFrame', on_frame)
+
+Classes:
+    PacketReassembler: Reassemble the packets which span the TM frames
+        of a virtual channel.
+
+    APIDRouter: Route packets to handlers by APID, count them and detect
+        sequence count gaps.
+
+    PacketIndex: Record the archive location of every packet.
+
+Functions:
+    read_index: Find packets in a packet index file.
+
+Attributes:
+    IDLE_APID: The APID of idle packets.
+
+    INDEX_MAGIC: The magic string at the start of a packet index file.
+'''
+
+import os
+import struct
+
+import ccsdstime
+import frames
+
+IDLE_APID = 0x07FF
+INDEX_MAGIC = b'AITPKTX1'
+
+_PACKET_ID = struct.Struct('>HH')
+_INDEX_RECORD = struct.Struct('>HHqQH')
+_SEQ_MASK = 0x3FFF
+
+
+class PacketReassembler(object):
+    ''' Reassemble the packets which span the TM frames of a virtual channel
+
+    A packet left incomplete at the end of a frame is held until the next
+    frame of the same virtual channel arrives. The bytes before that
+    frame's first header pointer complete it. If a frame is missing, as
+    seen from the virtual channel frame count, the incomplete packet is
+    dropped.
+
+    Arguments:
+        fecf (optional boolean):
+            Whether frames end with a Frame Error Control Field. Defaults
+            to False.
+
+    Attributes:
+        dropped: The number of incomplete packets dropped.
+    '''
+    def __init__(self, fecf=False):
+        self._fecf = fecf
+        self._partial = {}
+        self._counts = {}
+        self.dropped = 0
+
+    def add(self, data, ert=None, offset=None):
+        ''' Add a TM frame and return the packets completed by it
+
+        Arguments:
+            data:
+                The raw transfer frame.
+
+            ert (optional):
+                The frame's earth receive time.
+
+            offset (optional integer):
+                The frame's offset in the frame archive.
+
+        Returns:
+            A list of (packet, ert, offset, position) tuples. The ERT and
+            archive offset are those of the frame the packet starts in and
+            position is the packet's offset within that frame.
+        '''
+        scid, vcid, count = frames.frame_id(data)
+        key = (scid, vcid)
+
+        expected = self._counts.get(key)
+        self._counts[key] = (count + 1) & 0xFF
+
+        partial = self._partial.pop(key, None)
+        if partial is not None and count != expected:
+            self.dropped += 1
+            partial = None
+
+        first_hdr_ptr, start, end = frames.tm_data_field(data, self._fecf)
+        if first_hdr_ptr == frames.FHP_IDLE:
+            if partial is not None:
+                self.dropped += 1
+            return []
+
+        packets = []
+        if partial is not None:
+            buf = partial[0]
+            if first_hdr_ptr == frames.FHP_NO_PACKET:
+                buf += data[start:end]
+            else:
+                buf += data[start:start + first_hdr_ptr]
+
+            length = frames.packet_length(buf) if len(buf) >= 6 else None
+            if length == len(buf):
+                packets.append((bytes(buf), partial[1], partial[2], partial[3]))
+            elif first_hdr_ptr == frames.FHP_NO_PACKET and (length is None or length > len(buf)):
+                self._partial[key] = partial
+            else:
+                self.dropped += 1
+
+        if first_hdr_ptr == frames.FHP_NO_PACKET:
+            return packets
+
+        position = start + first_hdr_ptr
+        while position < end:
+            if position + 6 <= end:
+                length = frames.packet_length(data, position)
+                if position + length <= end:
+                    packets.append((data[position:position + length], ert, offset, position))
+                    position += length
+                    continue
+
+            self._partial[key] = [bytearray(data[position:end]), ert, offset, position]
+            break
+
+        return packets
+
+
+def _apid_ranges(apids):
+    ''''''
+    if apids is None:
+        return None
+
+    if isinstance(apids, (int, long, tuple)):
+        apids = [apids]
+
+    ranges = []
+    for entry in apids:
+        if isinstance(entry, tuple):
+            first, last = entry
+        else:
+            first = last = entry
+
+        if not 0 <= first <= last <= IDLE_APID:
+            raise ValueError('Invalid APID range {}'.format(entry))
+        ranges.append((first, last))
+
+    return ranges
+
+
+class APIDRouter(object):
+    ''' Route packets to handlers by APID
+
+    Handlers are called with each packet, including its primary header,
+    and its ERT in nanoseconds since the CCSDS epoch. This matches
+    :meth:`ait.dsn.sle.decom.Decommutator.add`. The handlers for each APID
+    are looked up once and cached until the routes change.
+
+    Gaps are detected per APID from the 14 bit packet sequence count. A
+    count that moves backwards, or forwards by half the count range or
+    more, is counted as out of order instead of as a gap.
+
+    Arguments:
+        index (optional :class:`PacketIndex`):
+            The index to record packets in. Packets are only recorded if
+            their frame's archive offset is given.
+
+        fecf (optional boolean):
+            Whether frames end with a Frame Error Control Field. Defaults
+            to False.
+
+        on_gap (optional callable):
+            Called with the APID, the expected sequence count and the
+            received sequence count when a gap is detected.
+    '''
+    def __init__(self, index=None, fecf=False, on_gap=None):
+        self._reassembler = PacketReassembler(fecf)
+        self._index = index
+        self._on_gap = on_gap
+        self._routes = []
+        self._handlers = {}
+        self._stats = {}
+
+    def add_route(self, handler, apids=None):
+        ''' Add a handler for packets of some APIDs
+
+        Arguments:
+            handler:
+                A callable which receives each packet and its ERT.
+
+            apids (optional):
+                The APIDs to route to the handler: a single APID, an
+                inclusive (first, last) range, or a list of APIDs and
+                ranges. If None all packets except idle packets are
+                routed to the handler.
+        '''
+        self._routes.append((handler, _apid_ranges(apids)))
+        self._handlers = {}
+
+    def remove_route(self, handler):
+        ''' Remove all routes to a handler '''
+        self._routes = [r for r in self._routes if r[0] != handler]
+        self._handlers = {}
+
+    def attach(self, service):
+        ''' Route the packets in the frames received by a RAF or RCF instance '''
+        service.add_handler('AnnotatedFrame', self.add_frame)
+
+    def detach(self, service):
+        ''' Stop routing the packets received by a RAF or RCF instance '''
+        service.remove_handler('AnnotatedFrame', self.add_frame)
+
+    def add_frame(self, pdu, offset=None):
+        ''' Route the packets completed by an AnnotatedFrame transfer buffer element
+
+        Arguments:
+            pdu:
+                The AnnotatedFrame transfer buffer element.
+
+            offset (optional integer):
+                The frame's offset in the frame archive, recorded in the
+                packet index.
+        '''
+        frame = pdu.getComponent()
+        ert = ccsdstime.to_nanoseconds(frame['earthReceiveTime'].getComponent().asOctets())
+        for packet, packet_ert, frame_offset, position in self._reassembler.add(
+                frame['data'].asOctets(), ert, offset):
+            self.route(packet, packet_ert, frame_offset, position)
+
+    def route(self, packet, ert=None, offset=None, position=0):
+        ''' Count a packet, check its sequence count and pass it to its handlers
+
+        Arguments:
+            packet:
+                The packet, including its primary header.
+
+            ert (optional integer):
+                The packet's ERT in nanoseconds since the CCSDS epoch.
+
+            offset (optional integer):
+                The archive offset of the frame the packet starts in.
+
+            position (optional integer):
+                The packet's offset within that frame.
+        '''
+        ident, seq = _PACKET_ID.unpack_from(packet)
+        apid = ident & IDLE_APID
+        seq &= _SEQ_MASK
+
+        stats = self._stats.get(apid)
+        if stats is None:
+            stats = self._stats[apid] = [0, 0, 0, 0, 0, seq]
+        else:
+            missing = (seq - stats[5] - 1) & _SEQ_MASK
+            if missing:
+                if missing < (_SEQ_MASK + 1) // 2:
+                    stats[2] += 1
+                    stats[3] += missing
+                    if self._on_gap is not None:
+                        self._on_gap(apid, (stats[5] + 1) & _SEQ_MASK, seq)
+                else:
+                    stats[4] += 1
+            stats[5] = seq
+
+        stats[0] += 1
+        stats[1] += len(packet)
+
+        if self._index is not None and offset is not None:
+            self._index.add(apid, seq, ert, offset, position)
+
+        handlers = self._handlers.get(apid)
+        if handlers is None:
+            handlers = self._handlers[apid] = self._lookup(apid)
+
+        for handler in handlers:
+            handler(packet, ert)
+
+    def status(self):
+        ''' Return the counters of every APID seen
+
+        Returns:
+            A dict of dicts by APID, each with the number of ``packets``
+            and ``octets`` received, the number of ``gaps`` and
+            ``missing`` packets, the number of ``out_of_order`` packets
+            and the ``last_seq`` sequence count.
+        '''
+        names = ('packets', 'octets', 'gaps', 'missing', 'out_of_order', 'last_seq')
+        return dict((apid, dict(zip(names, stats))) for apid, stats in self._stats.items())
+
+    @property
+    def dropped(self):
+        ''' The number of incomplete packets dropped by reassembly '''
+        return self._reassembler.dropped
+
+    def _lookup(self, apid):
+        ''''''
+        handlers = []
+        for handler, ranges in self._routes:
+            if ranges is None:
+                if apid != IDLE_APID:
+                    handlers.append(handler)
+            elif any(first <= apid <= last for first, last in ranges):
+                handlers.append(handler)
+        return tuple(handlers)
+
+
+class PacketIndex(object):
+    ''' Record the archive location of every packet
+
+    The index is an append-only file which starts with
+    :data:`INDEX_MAGIC`, followed by one fixed size record per packet
+    holding the APID, sequence count, ERT in nanoseconds since the CCSDS
+    epoch (-1 if unknown), the archive offset of the frame the packet
+    starts in and the packet's offset within that frame. Records are
+    buffered and written in blocks.
+
+    Arguments:
+        path (string):
+            The index file. Records are appended if it already exists.
+
+        flush_size (optional integer):
+            The number of records to buffer before writing. Defaults to
+            4096.
+    '''
+    def __init__(self, path, flush_size=4096):
+        self._path = path
+        self._flush_size = flush_size
+        self._buffer = []
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            _check_magic(path)
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(INDEX_MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, apid, seq, ert, offset, position):
+        ''' Record the location of a packet '''
+        self._buffer.append(_INDEX_RECORD.pack(
+            apid, seq, -1 if ert is None else ert, offset, position))
+        if len(self._buffer) >= self._flush_size:
+            self.flush()
+
+    def flush(self):
+        ''' Write the buffered records '''
+        if self._buffer:
+            self._file.write(b''.join(self._buffer))
+            self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        ''' Write the buffered records and close the file '''
+        self.flush()
+        self._file.close()
+
+    def lookup(self, **kwargs):
+        ''' Find packets in the index, see :func:`read_index` '''
+        self.flush()
+        return read_index(self._path, **kwargs)
+
+
+def _check_magic(path):
+    ''''''
+    with open(path, 'rb') as infile:
+        if infile.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            raise ValueError('{} is not a packet index'.format(path))
+
+
+def _ert_ns(value):
+    ''''''
+    if isinstance(value, (int, long)):
+        return value
+    return ccsdstime.to_nanoseconds(ccsdstime.encode_cds(value))
+
+
+def read_index(path, apid=None, seq=None, start_time=None, end_time=None):
+    ''' Find packets in a packet index file with NumPy
+
+    Arguments:
+        path (string):
+            The index file.
+
+        apid (optional integer):
+            Only return packets with this APID.
+
+        seq (optional integer):
+            Only return packets with this sequence count.
+
+        start_time (optional):
+            Only return packets received at or after this time, either a
+            :class:`datetime.datetime` or nanoseconds since the CCSDS
+            epoch.
+
+        end_time (optional):
+            Only return packets received before this time.
+
+    Returns:
+        A NumPy structured array with ``apid``, ``seq``, ``ert``,
+        ``offset`` and ``position`` fields, one entry per matching packet
+        in index order.
+    '''
+    import numpy
+
+    dtype = numpy.dtype([('apid', '>u2'), ('seq', '>u2'), ('ert', '>i8'),
+                         ('offset', '>u8'), ('position', '>u2')])
+
+    with open(path, 'rb') as infile:
+        if infile.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            raise ValueError('{} is not a packet index'.format(path))
+        data = infile.read()
+
+    # Ignore a partial record left by an interrupted write
+    records = numpy.frombuffer(data, dtype=dtype, count=len(data) // dtype.itemsize)
+
+    keep = numpy.ones(len(records), dtype=bool)
+    if apid is not None:
+        keep &= records['apid'] == apid
+    if seq is not None:
+        keep &= records['seq'] == seq
+    if start_time is not None:
+        keep &= records['ert'] >= _ert_ns(start_time)
+    if end_time is not None:
+        keep &= records['ert'] < _ert_ns(end_time)
+
+    return records[keep]
@@ -0,0 +1,373 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Time-Tagged CLTU Scheduling
+
+The ait.dsn.sle.scheduler module holds CLTUs with earliest and latest
+transmission times until they are due and sends them through an F-CLTU
+service instance.
+
+A CLTU is released ``lead_time`` seconds before its earliest transmission
+time, so the provider has it in hand when radiation may start, and only if
+the provider's CLTU buffer has room for it. CLTUs which can no longer be
+sent before their latest transmission time are dropped locally and
+reported, rather than being sent only for the provider to reject them as
+late.
+
+The scheduler uses the gevent engine.
+
+Example:
+
+    scheduler = UplinkScheduler(cltu_mngr, lead_time=5)
+    scheduler.start()
+    for cltu in cltus:
+        scheduler.schedule(cltu, earliest_time=window_start, latest_time=window_end)
+
+Classes:
+    ProviderBuffer: Track the space left in the provider's CLTU buffer.
+
+    UplinkScheduler: Hold time-tagged CLTUs and send them when due.
+'''
+
+import collections
+import datetime as dt
+import heapq
+import itertools
+
+import gevent
+import gevent.event
+
+import ait.core.log
+
+
+class ProviderBuffer(object):
+    ''' Track the space left in the provider's CLTU buffer
+
+    The space is taken from each CltuTransferDataReturn, less the size of
+    the CLTUs sent but not yet acknowledged.
+
+    Arguments:
+        service (:class:`ait.dsn.sle.cltu.CLTU`):
+            The F-CLTU service whose returns are tracked.
+
+        available (optional integer):
+            The buffer space in octets before the first return is
+            received, or None if it is not known.
+
+        on_return (optional callable):
+            Called without arguments after each return is accounted for.
+
+    Attributes:
+        available: The buffer space in octets not taken by CLTUs in
+            flight, or None if it is not known.
+    '''
+    def __init__(self, service, available=None, on_return=None):
+        self._service = service
+        self._on_return_cb = on_return
+        self._in_flight = collections.deque()
+        self._in_flight_size = 0
+
+        self.available = available
+
+        service.add_handler('CltuTransferDataReturn', self._on_return)
+
+    @property
+    def in_flight(self):
+        ''' The number of CLTUs sent but not yet acknowledged '''
+        return len(self._in_flight)
+
+    def fits(self, size):
+        ''' Return True if a CLTU of size octets fits in the known space '''
+        return self.available is None or size <= self.available
+
+    def sent(self, size):
+        ''' Account for a CLTU of size octets written to the provider '''
+        self._in_flight.append(size)
+        self._in_flight_size += size
+        if self.available is not None:
+            self.available -= size
+
+    def close(self):
+        ''' Stop tracking the service's returns '''
+        self._service.remove_handler('CltuTransferDataReturn', self._on_return)
+
+    def _on_return(self, pdu):
+        ''''''
+        if self._in_flight:
+            self._in_flight_size -= self._in_flight.popleft()
+
+        available = int(pdu['cltuTransferDataReturn']['cltuBufferAvailable'])
+        self.available = max(available - self._in_flight_size, 0)
+        if self._on_return_cb is not None:
+            self._on_return_cb()
+
+
+class UplinkScheduler(object):
+    ''' Hold time-tagged CLTUs and send them when due
+
+    CLTUs wait in a heap ordered by release time. Once released, CLTUs are
+    sent highest priority first, and in release order within a priority.
+    The provider's available buffer space is tracked with a
+    :class:`ProviderBuffer`. A CLTU larger than the remaining space waits until the
+    provider reports more. Released CLTUs which reach their latest
+    transmission time while waiting are dropped.
+
+    Arguments:
+        service (:class:`ait.dsn.sle.cltu.CLTU`):
+            The F-CLTU service to send through.
+
+        lead_time (optional number):
+            The number of seconds before its earliest transmission time at
+            which a CLTU is sent. Defaults to 2.
+
+        margin (optional number):
+            CLTUs which would reach the provider less than this many
+            seconds before their latest transmission time are dropped.
+            Defaults to 0.5.
+
+        buffer_available (optional integer):
+            The provider's CLTU buffer space in octets before the first
+            return is received. None, the default, sends without limit
+            until a return is received.
+
+        on_drop (optional callable):
+            Called with the report dictionary of each dropped CLTU.
+
+        clock (optional callable):
+            Returns the current UTC time as a datetime. Defaults to
+            :meth:`datetime.datetime.utcnow`.
+
+    Attributes:
+        sent: The number of CLTUs sent.
+
+        dropped: A list of report dictionaries for the CLTUs dropped
+            because they would have been late.
+    '''
+    def __init__(self, service, lead_time=2, margin=0.5, buffer_available=None,
+                 on_drop=None, clock=None):
+        self._service = service
+        self._lead_time = dt.timedelta(seconds=lead_time)
+        self._margin = dt.timedelta(seconds=margin)
+        self._on_drop = on_drop
+        self._clock = clock or dt.datetime.utcnow
+
+        self._pending = []
+        self._ready = []
+        self._cancelled = set()
+        self._counter = itertools.count()
+        self._wakeup = gevent.event.Event()
+        self._worker = None
+        self._buffer = ProviderBuffer(service, buffer_available, on_return=self._wakeup.set)
+
+        self.sent = 0
+        self.dropped = []
+
+    @property
+    def buffer_available(self):
+        ''' The provider's CLTU buffer space not taken by CLTUs in flight '''
+        return self._buffer.available
+
+    @buffer_available.setter
+    def buffer_available(self, available):
+        self._buffer.available = available
+
+    def __len__(self):
+        return len(self._pending) + len(self._ready) - len(self._cancelled)
+
+    def schedule(self, cltu, earliest_time=None, latest_time=None, priority=0, delay=0, notify=False):
+        ''' Add a CLTU to the schedule
+
+        Arguments:
+            cltu (bytes):
+                The CLTU to send.
+
+            earliest_time (optional :class:`datetime.datetime`):
+                The earliest time the provider may radiate the CLTU. If None
+                the CLTU is released immediately.
+
+            latest_time (optional :class:`datetime.datetime`):
+                The latest time the provider may start radiating the CLTU.
+                If None the CLTU is never dropped.
+
+            priority (optional integer):
+                Released CLTUs with a higher priority are sent first.
+                Defaults to 0.
+
+            delay (optional integer):
+                The radiation delay in microseconds passed to upload_cltu.
+
+            notify (optional boolean):
+                Whether to request radiation notification, passed to
+                upload_cltu.
+
+        Returns:
+            A ticket which can be passed to :meth:`cancel`.
+
+        Raises:
+            ValueError: If the latest time is before the earliest time.
+        '''
+        if earliest_time and latest_time and latest_time < earliest_time:
+            raise ValueError('Latest transmission time is before the earliest time')
+
+        release = earliest_time - self._lead_time if earliest_time else dt.datetime.min
+        ticket = next(self._counter)
+        entry = (release, ticket, priority, bytearray(cltu), earliest_time, latest_time, delay, notify)
+        heapq.heappush(self._pending, entry)
+        self._wakeup.set()
+        return ticket
+
+    def cancel(self, ticket):
+        ''' Remove a scheduled CLTU which has not been sent yet
+
+        Returns:
+            True if the CLTU was still scheduled.
+        '''
+        scheduled = any(e[1] == ticket for e in self._pending)
+        scheduled = scheduled or any(e[2] == ticket for e in self._ready)
+        if scheduled and ticket not in self._cancelled:
+            self._cancelled.add(ticket)
+            return True
+        return False
+
+    def start(self):
+        ''' Start sending CLTUs as they become due '''
+        if self._worker is None:
+            self._worker = gevent.spawn(self._run)
+
+    def stop(self):
+        ''' Stop sending CLTUs. Scheduled CLTUs are kept. '''
+        if self._worker is not None:
+            self._worker.kill()
+            self._worker = None
+
+    def status(self):
+        ''' Return a dictionary of the scheduler's counters '''
+        return {
+            'scheduled': len(self),
+            'released': len(self._ready),
+            'sent': self.sent,
+            'dropped': len(self.dropped),
+            'buffer_available': self.buffer_available,
+        }
+
+    def run_pending(self):
+        ''' Send every CLTU which is due and fits in the provider's buffer
+
+        Returns:
+            The number of seconds until the next CLTU is released or, while
+            released CLTUs wait for buffer space, until the first of them
+            must be dropped, whichever is sooner. None if nothing is due
+            before a CLTU is scheduled or the provider reports more buffer
+            space.
+        '''
+        now = self._clock()
+        pending = self._pending
+        ready = self._ready
+
+        while pending and pending[0][0] <= now:
+            entry = heapq.heappop(pending)
+            heapq.heappush(ready, (-entry[2], entry[0], entry[1], entry))
+
+        blocked = False
+        while ready:
+            entry = ready[0][3]
+            ticket = entry[1]
+            if ticket in self._cancelled:
+                heapq.heappop(ready)
+                self._cancelled.discard(ticket)
+                continue
+
+            latest_time = entry[5]
+            if latest_time is not None and now + self._margin > latest_time:
+                heapq.heappop(ready)
+                self._drop(entry, now)
+                continue
+
+            cltu = entry[3]
+            if not self._buffer.fits(len(cltu)):
+                if self._drop_late(now):
+                    continue
+                blocked = True
+                break
+
+            heapq.heappop(ready)
+            self._send(entry)
+
+        while pending and pending[0][1] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(pending)[1])
+
+        due = [pending[0][0]] if pending else []
+        if blocked:
+            due.extend(r[3][5] - self._margin for r in ready if r[3][5] is not None)
+
+        if due:
+            return max((min(due) - now).total_seconds(), 0)
+        return None
+
+    def _drop_late(self, now):
+        ''' Drop every released CLTU which would miss its latest time
+
+        Returns:
+            True if any released CLTU was dropped or cancelled.
+        '''
+        ready = self._ready
+        keep, late = [], []
+        for item in ready:
+            entry = item[3]
+            if entry[1] in self._cancelled:
+                self._cancelled.discard(entry[1])
+            elif entry[5] is not None and now + self._margin > entry[5]:
+                late.append(entry)
+            else:
+                keep.append(item)
+
+        if len(keep) == len(ready):
+            return False
+
+        ready[:] = keep
+        heapq.heapify(ready)
+        for entry in sorted(late, key=lambda e: e[1]):
+            self._drop(entry, now)
+        return True
+
+    def _send(self, entry):
+        ''''''
+        _, _, _, cltu, earliest_time, latest_time, delay, notify = entry
+        self._service.upload_cltu(cltu, earliest_time, latest_time, delay, notify)
+        self.sent += 1
+        self._buffer.sent(len(cltu))
+
+    def _drop(self, entry, now):
+        ''''''
+        report = {
+            'ticket': entry[1],
+            'priority': entry[2],
+            'size': len(entry[3]),
+            'earliest_time': entry[4],
+            'latest_time': entry[5],
+            'dropped_at': now,
+        }
+        self.dropped.append(report)
+        ait.core.log.warn('Dropped CLTU {} which would miss its latest transmission time {}'.format(
+            entry[1], entry[5]))
+
+        if self._on_drop is not None:
+            self._on_drop(report)
+
+    def _run(self):
+        ''''''
+        while True:
+            self._wakeup.clear()
+            self._wakeup.wait(self.run_pending())
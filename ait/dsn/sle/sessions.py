@@ -0,0 +1,384 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' SLE Session Manager
+
+The ait.dsn.sle.sessions module runs a pool of RAF and RCF sessions from a
+single configuration. Every session is opened concurrently, restarted if
+its connection is lost or the provider aborts it, and its frames are
+combined into one stream which is routed to handlers by session name.
+
+Sessions are read from ``dsn.sle.sessions`` in the config unless they are
+passed in directly. Each entry names the session and its service and gives
+the instance id, optional hostnames and port overriding the service's
+defaults, and the arguments for the service's start method.
+
+.. code-block:: yaml
+
+    dsn:
+        sle:
+            sessions:
+                - name: vc0
+                  service: rcf
+                  inst_id: sagr=LSE-SSC.spack=Test.rsl-fg=1.rcf=onlc1
+                  start:
+                      spacecraft_id: 250
+                      trans_frame_ver_num: 0
+                      virtual_channel: 0
+                - name: vc1
+                  service: rcf
+                  inst_id: sagr=LSE-SSC.spack=Test.rsl-fg=1.rcf=onlc2
+                  start:
+                      spacecraft_id: 250
+                      trans_frame_ver_num: 0
+                      virtual_channel: 1
+
+The manager uses the gevent engine.
+
+Example:
+
+    manager = SessionManager()
+    manager.add_route(archive_frame)
+    manager.add_route(process_vc1, session='vc1')
+    manager.start()
+    manager.wait_active(timeout=60)
+
+Classes:
+    Session: The configuration and state of one managed session.
+
+    SessionManager: Open, restart and route the frames of a pool of RAF
+        and RCF sessions.
+'''
+
+import datetime as dt
+import importlib
+
+import gevent
+import gevent.event
+
+import ait.core
+import ait.core.log
+
+from retrieval import invoke_and_wait
+
+_SERVICES = {
+    'raf': ('ait.dsn.sle.raf', 'RAF'),
+    'rcf': ('ait.dsn.sle.rcf', 'RCF'),
+}
+
+
+class Session(object):
+    ''' The configuration and state of one managed session
+
+    Arguments:
+        name (string):
+            The name frames from the session are routed by.
+
+        service (string):
+            The service type, "raf" or "rcf".
+
+        inst_id (optional string):
+            The service instance id to bind to. Defaults to the service's
+            configured instance id.
+
+        hostnames (optional list):
+            The provider hostnames, overriding the service's configured
+            hostnames.
+
+        port (optional integer):
+            The provider port, overriding the service's configured port.
+
+        start (optional dictionary):
+            Keyword arguments for the service's start method, such as
+            ``frame_quality`` for RAF or ``virtual_channel`` for RCF.
+
+        start_time (optional :class:`datetime.datetime`):
+            The start ERT to request. Defaults to None (undefined).
+
+        end_time (optional :class:`datetime.datetime`):
+            The end ERT to request. Defaults to None (undefined).
+
+        service_kwargs:
+            Any additional keyword arguments are passed to the service
+            class when the session is created.
+
+    Attributes:
+        state: One of "stopped", "starting", "active" or "failed".
+
+        active: A gevent Event which is set while the session is active.
+
+        frames: The number of frames received over the session.
+
+        restarts: The number of times the session has been restarted.
+
+        last_error: A description of the session's most recent failure.
+    '''
+    def __init__(self, name, service, inst_id=None, hostnames=None, port=None,
+                 start=None, start_time=None, end_time=None, **service_kwargs):
+        if service not in _SERVICES:
+            raise ValueError('Session service must be one of: {}'.format(
+                ', '.join('"{}"'.format(s) for s in sorted(_SERVICES))))
+
+        self.name = name
+        self.service_type = service
+        self.inst_id = inst_id
+        self.hostnames = hostnames
+        self.port = port
+        self.start_kwargs = dict(start or {})
+        self.start_time = start_time
+        self.end_time = end_time
+        self.service_kwargs = service_kwargs
+
+        self.service = None
+        self.state = 'stopped'
+        self.active = gevent.event.Event()
+        self.frames = 0
+        self.restarts = 0
+        self.last_error = None
+
+    def status(self):
+        ''' Return the session's state and counters as a dictionary '''
+        return {
+            'service': self.service_type,
+            'inst_id': self.inst_id,
+            'state': self.state,
+            'frames': self.frames,
+            'restarts': self.restarts,
+            'last_error': self.last_error,
+        }
+
+
+class SessionManager(object):
+    ''' Open, restart and route the frames of a pool of SLE sessions
+
+    Arguments:
+        sessions (optional list):
+            The sessions to manage, as :class:`Session` instances or
+            dictionaries of :class:`Session` arguments. Defaults to the
+            ``dsn.sle.sessions`` config entry.
+
+        timeout (optional number):
+            The number of seconds to wait for each bind, start, stop and
+            unbind return. Defaults to 30.
+
+        restart_delay (optional number):
+            The number of seconds to wait before reopening a failed
+            session. Defaults to 5.
+
+        check_interval (optional number):
+            The number of seconds between checks that an active session's
+            connection is still up. Defaults to 1.
+
+        service_classes (optional dictionary):
+            Service classes keyed by service type, overriding the RAF and
+            RCF classes.
+    '''
+    def __init__(self, sessions=None, timeout=30, restart_delay=5, check_interval=1,
+                 service_classes=None):
+        if sessions is None:
+            sessions = ait.config.get('dsn.sle.sessions', [])
+
+        self._sessions = {}
+        for session in sessions:
+            if not isinstance(session, Session):
+                session = Session(**session)
+
+            if session.name in self._sessions:
+                raise ValueError('Duplicate session name: {}'.format(session.name))
+            self._sessions[session.name] = session
+
+        if not self._sessions:
+            raise ValueError('At least one session is required')
+
+        self._timeout = timeout
+        self._restart_delay = restart_delay
+        self._check_interval = check_interval
+        self._service_classes = dict(service_classes or {})
+
+        self._routes = []
+        self._workers = {}
+        self._running = False
+
+    @property
+    def sessions(self):
+        ''' A dictionary of the managed sessions keyed by name '''
+        return dict(self._sessions)
+
+    def add_route(self, handler, session=None):
+        ''' Route frames to a handler
+
+        Arguments:
+            handler:
+                A callable which is passed the session name and each
+                AnnotatedFrame transfer buffer element received.
+
+            session (optional string or list):
+                The name or names of the sessions whose frames are routed
+                to the handler. Defaults to all sessions.
+        '''
+        if session is None:
+            names = None
+        else:
+            names = frozenset([session] if isinstance(session, basestring) else session)
+            unknown = names - set(self._sessions)
+            if unknown:
+                raise ValueError('Unknown sessions: {}'.format(', '.join(sorted(unknown))))
+
+        self._routes.append((names, handler))
+
+    def remove_route(self, handler):
+        ''' Stop routing frames to a previously added handler '''
+        self._routes = [r for r in self._routes if r[1] != handler]
+
+    def start(self):
+        ''' Open every session concurrently
+
+        Sessions are opened in the background. Use :meth:`wait_active` to
+        wait for them to start.
+        '''
+        self._running = True
+        for name, session in self._sessions.items():
+            if name not in self._workers:
+                self._workers[name] = gevent.spawn(self._run_session, session)
+
+    def wait_active(self, timeout=None):
+        ''' Wait for every session to become active
+
+        Arguments:
+            timeout (optional number):
+                The maximum number of seconds to wait. Defaults to no limit.
+
+        Returns:
+            A sorted list of the names of the sessions which are not active.
+        '''
+        with gevent.Timeout(timeout, False):
+            for session in self._sessions.values():
+                session.active.wait()
+
+        return sorted(s.name for s in self._sessions.values() if not s.active.is_set())
+
+    def stop(self):
+        ''' Stop, unbind and disconnect every session '''
+        self._running = False
+        workers, self._workers = self._workers, {}
+        gevent.killall(list(workers.values()))
+
+        closers = [
+            gevent.spawn(self._close_session, session)
+            for session in self._sessions.values()
+            if session.service is not None
+        ]
+        gevent.joinall(closers)
+
+        for session in self._sessions.values():
+            session.state = 'stopped'
+
+    def status(self):
+        ''' Return the status of every session keyed by name '''
+        return dict((name, s.status()) for name, s in self._sessions.items())
+
+    def _route(self, session, pdu):
+        ''''''
+        session.frames += 1
+        name = session.name
+        for names, handler in self._routes:
+            if names is None or name in names:
+                handler(name, pdu)
+
+    def _service_class(self, service_type):
+        ''''''
+        service_class = self._service_classes.get(service_type)
+        if service_class is None:
+            module, name = _SERVICES[service_type]
+            service_class = getattr(importlib.import_module(module), name)
+            self._service_classes[service_type] = service_class
+        return service_class
+
+    def _create_service(self, session):
+        ''''''
+        service = self._service_class(session.service_type)(**session.service_kwargs)
+
+        # Configured connection settings take precedence over keyword
+        # arguments, so per-session overrides are applied afterwards.
+        if session.hostnames is not None:
+            service._hostnames = session.hostnames
+        if session.port is not None:
+            service._port = session.port
+
+        service.remove_handler('AnnotatedFrame', service._transfer_data_invoc_handler)
+        service.add_handler('AnnotatedFrame', lambda pdu: self._route(session, pdu))
+        return service
+
+    def _run_session(self, session):
+        ''''''
+        while self._running:
+            session.state = 'starting'
+            try:
+                self._open_session(session)
+                session.state = 'active'
+                session.active.set()
+                ait.core.log.info('Session {} is active'.format(session.name))
+
+                while session.service._connected.is_set():
+                    gevent.sleep(self._check_interval)
+
+                raise Exception('Connection lost')
+            except Exception as e:
+                session.active.clear()
+                session.state = 'failed'
+                session.last_error = '{}: {}'.format(dt.datetime.utcnow(), e)
+                ait.core.log.error('Session {} failed: {}'.format(session.name, e))
+                self._close_session(session)
+
+            gevent.sleep(self._restart_delay)
+            session.restarts += 1
+            ait.core.log.info('Restarting session {}'.format(session.name))
+
+    def _open_session(self, session):
+        ''''''
+        service = self._create_service(session)
+        session.service = service
+        timeout = self._timeout
+
+        service.connect()
+        invoke_and_wait(service, 'BindReturn', 'ready',
+                        lambda: service.bind(session.inst_id), timeout)
+        invoke_and_wait(service, 'StartReturn', 'active',
+                        lambda: service.start(session.start_time, session.end_time,
+                                              **session.start_kwargs),
+                        timeout)
+
+    def _close_session(self, session):
+        ''''''
+        service, session.service = session.service, None
+        session.active.clear()
+        if service is None:
+            return
+
+        # A session whose connection is already gone can only be
+        # disconnected. Waiting for stop or unbind returns would time out.
+        connected = service._connected.is_set
+        try:
+            if connected() and service._state == 'active':
+                invoke_and_wait(service, 'StopReturn', 'ready', service.stop, self._timeout)
+            if connected() and service._state == 'ready':
+                invoke_and_wait(service, 'UnbindReturn', 'unbound', service.unbind, self._timeout)
+        except Exception as e:
+            ait.core.log.error('Unable to close session {} cleanly: {}'.format(session.name, e))
+        finally:
+            try:
+                service.disconnect()
+            except Exception as e:
+                ait.core.log.error('Unable to disconnect session {}: {}'.format(session.name, e))
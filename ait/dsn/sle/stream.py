@@ -0,0 +1,198 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Streaming Transfer Buffer Decoding
+
+The ait.dsn.sle.stream module decodes RAF and RCF transfer buffers one
+element at a time. Decoding a transfer buffer PDU in one call builds a
+PyASN1 object for every frame in the buffer before the first can be
+handled. The :class:`TransferBufferDecoder` instead reads the BER tag and
+length of each FrameOrNotification element and decodes only that element,
+so every annotated frame or sync notification can be handled, and
+released, before the next one is decoded.
+
+Elements are decoded with the BER decoder, so elements and buffers using
+the indefinite length form are accepted.
+
+Classes:
+    TransferBufferDecoder: Yield the decoded elements of an encoded
+        transfer buffer PDU one at a time.
+
+Functions:
+    encode_tag: Return the BER identifier octets of a PyASN1 tag set.
+
+    read_header: Read the BER tag and length octets of an encoded value.
+'''
+
+import pyasn1.error
+from pyasn1.codec.ber.decoder import decode
+
+import ait.core.log
+
+_EOC = b'\x00\x00'
+
+
+def encode_tag(tag_set):
+    ''' Return the BER identifier octets of a PyASN1 tag set
+
+    Only the outermost tag is encoded, which is the tag seen on the wire
+    for implicitly tagged types.
+    '''
+    outer = tag_set[-1]
+    first = outer.tagClass | outer.tagFormat
+    tag_id = outer.tagId
+
+    if tag_id < 31:
+        return bytearray([first | tag_id])
+
+    octets = [tag_id & 0x7F]
+    tag_id >>= 7
+    while tag_id:
+        octets.insert(0, 0x80 | (tag_id & 0x7F))
+        tag_id >>= 7
+    return bytearray([first | 0x1F] + octets)
+
+
+def read_header(data, offset):
+    ''' Read the BER tag and length octets of an encoded value
+
+    Arguments:
+        data (bytearray):
+            The encoded data.
+
+        offset (integer):
+            The offset of the value's first identifier octet.
+
+    Returns:
+        A (content offset, content length) tuple. The length is None if the
+        value uses the indefinite length form.
+
+    Raises:
+        pyasn1.error.PyAsn1Error: If the header is truncated or invalid.
+    '''
+    end = len(data)
+    if offset >= end:
+        raise pyasn1.error.PyAsn1Error('Truncated BER header')
+
+    # Skip the identifier octets
+    if data[offset] & 0x1F == 0x1F:
+        offset += 1
+        while offset < end and data[offset] & 0x80:
+            offset += 1
+    offset += 1
+
+    if offset >= end:
+        raise pyasn1.error.PyAsn1Error('Truncated BER header')
+
+    first = data[offset]
+    offset += 1
+    if first < 0x80:
+        length = first
+    elif first == 0x80:
+        return offset, None
+    else:
+        size = first & 0x7F
+        if offset + size > end:
+            raise pyasn1.error.PyAsn1Error('Truncated BER length')
+        length = 0
+        for octet in data[offset:offset + size]:
+            length = (length << 8) | octet
+        offset += size
+
+    if offset + length > end:
+        raise pyasn1.error.PyAsn1Error('Truncated BER value')
+
+    return offset, length
+
+
+class TransferBufferDecoder(object):
+    ''' Yield the decoded elements of a transfer buffer PDU one at a time
+
+    Arguments:
+        pdu_spec:
+            The provider to user PDU Choice class, e.g.
+            :class:`ait.dsn.sle.pdu.raf.RafProvidertoUserPdu`.
+
+        buffer_name (string):
+            The name of the transfer buffer alternative of the PDU Choice,
+            e.g. "rafTransferBuffer".
+
+        frame_spec:
+            The transfer buffer element Choice class, e.g.
+            :class:`ait.dsn.sle.pdu.raf.FrameOrNotification`.
+
+    Attributes:
+        tag_set: The PyASN1 tag set of the transfer buffer alternative.
+    '''
+    def __init__(self, pdu_spec, buffer_name, frame_spec):
+        self.tag_set = pdu_spec.componentType[buffer_name].asn1Object.tagSet
+        self._tag = bytes(encode_tag(self.tag_set))
+        self._frame_spec = frame_spec()
+
+    def matches(self, body):
+        ''' Return True if an encoded PDU body is a transfer buffer '''
+        return body[:len(self._tag)] == self._tag
+
+    def iter_elements(self, body):
+        ''' Decode the elements of an encoded transfer buffer PDU
+
+        Elements are decoded lazily, so the first element is available as
+        soon as it has been decoded. An element which can't be decoded is
+        logged and skipped.
+
+        Arguments:
+            body:
+                The ASN.1 encoded transfer buffer PDU.
+
+        Yields:
+            Each decoded FrameOrNotification element, in buffer order.
+
+        Raises:
+            pyasn1.error.PyAsn1Error: If the buffer's structure is
+                invalid, in which case the remaining elements can't be
+                located.
+        '''
+        body = bytes(body)
+        data = bytearray(body)
+        spec = self._frame_spec
+
+        offset, length = read_header(data, 0)
+        end = len(data) if length is None else offset + length
+
+        while offset < end:
+            if length is None and data[offset:offset + 2] == _EOC:
+                return
+
+            start = offset
+            content, size = read_header(data, offset)
+
+            if size is None:
+                # The element's end is only found by decoding it
+                element, rest = decode(body[start:end], asn1Spec=spec)
+                offset = end - len(rest)
+                yield element
+                continue
+
+            offset = content + size
+            try:
+                element, _ = decode(body[start:offset], asn1Spec=spec)
+            except pyasn1.error.PyAsn1Error:
+                ait.core.log.error('Unable to decode transfer buffer element. Skipping ...')
+                continue
+
+            yield element
+
+        if length is None:
+            raise pyasn1.error.PyAsn1Error('Missing end of contents octets')
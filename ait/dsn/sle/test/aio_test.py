@@ -0,0 +1,207 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import socket
+import struct
+import unittest
+import mock
+
+import ait.dsn.sle
+from ait.dsn.sle import aio, common
+from ait.dsn.sle.test.fixtures import T0, make_transfer_buffer_pdu
+
+
+class SLEProtocolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.asyncio.new_event_loop()
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100,
+                                   engine='asyncio', loop=self.loop)
+        self.raf._process_pdu = mock.MagicMock()
+        self.protocol = aio.SLEProtocol(self.raf._engine)
+        self.protocol.connection_made(mock.MagicMock())
+
+    def tearDown(self):
+        self.raf._telem_sock.close()
+        self.loop.close()
+
+    def test_framing(self):
+        pdu = struct.pack('!II', 0x01000000, 3) + b'abc'
+        heartbeat = struct.pack('!II', 0x03000000, 0)
+        data = pdu + heartbeat + pdu
+
+        # Deliver the stream one byte at a time
+        for i in range(len(data)):
+            self.protocol.data_received(data[i:i + 1])
+
+        self.assertEqual(self.raf._process_pdu.call_args_list,
+                         [mock.call(b'abc'), mock.call(b'abc')])
+        self.assertEqual(len(self.protocol._buffer), 0)
+
+    @mock.patch('ait.core.log.error')
+    def test_unexpected_header(self, log_error):
+        self.protocol.data_received(struct.pack('!II', 0x05000000, 0))
+        self.assertTrue(self.protocol._transport.close.called)
+        self.assertFalse(self.raf._process_pdu.called)
+
+    def test_write(self):
+        self.raf.send(b'abc')
+        self.protocol._transport.writelines.assert_called_with([b'abc'])
+
+
+class AsyncioEngineConnectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(self.server.close)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+
+    def make_raf(self, hostnames):
+        raf = ait.dsn.sle.RAF(engine='asyncio', loop=self.loop)
+        # The config's hostnames and port take precedence over the kwargs
+        raf._hostnames = hostnames
+        raf._port = self.port
+        self.addCleanup(self.disconnect, raf)
+        return raf
+
+    def disconnect(self, raf):
+        raf.disconnect()
+        # Let the transport finish closing before the loop is closed
+        self.loop.run_until_complete(aio.asyncio.sleep(0, loop=self.loop))
+
+    @mock.patch('ait.core.log.info')
+    def test_failover_to_next_hostname(self, log_info):
+        # Nothing listens on 127.0.0.2 so the first attempt is refused
+        raf = self.make_raf(['127.0.0.2', '127.0.0.1'])
+        self.loop.run_until_complete(raf.connect())
+
+        log_info.assert_any_call('Failed to connect to DSN at 127.0.0.2. Trying next hostname.')
+        log_info.assert_any_call('Connection to DSN successful through 127.0.0.1.')
+        self.assertIsNotNone(raf._engine._heartbeat_timer)
+
+        conn, _ = self.server.accept()
+        self.addCleanup(conn.close)
+        conn.settimeout(2)
+        context = conn.recv(struct.calcsize(common.TML_CONTEXT_MSG_FORMAT))
+        self.assertEqual(struct.unpack(common.TML_CONTEXT_MSG_FORMAT, context)[0],
+                         common.TML_CONTEXT_MSG_TYPE)
+
+    @mock.patch('ait.core.log.error')
+    @mock.patch('ait.core.log.info')
+    def test_no_reachable_hostname(self, log_info, log_error):
+        raf = self.make_raf(['127.0.0.2', '127.0.0.3'])
+        future = raf.connect()
+
+        with self.assertRaises(Exception) as cm:
+            self.loop.run_until_complete(future)
+        self.assertEqual(str(cm.exception), 'Unable to connect to DSN through any provided hostnames.')
+        self.assertEqual(log_info.call_count, 2)
+        self.assertIsNone(raf._engine._transport)
+
+
+class AsyncioEngineHeartbeatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.asyncio.new_event_loop()
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100,
+                                   engine='asyncio', loop=self.loop)
+        self.raf._send_heartbeat = mock.MagicMock()
+        self.engine = self.raf._engine
+        self.transport = mock.MagicMock()
+        self.engine._connection_made(self.transport)
+
+    def tearDown(self):
+        self.engine.close()
+        self.raf._telem_sock.close()
+        self.loop.close()
+
+    def test_heartbeat_sent_and_rescheduled(self):
+        self.engine._heartbeat_task()
+        self.assertEqual(self.raf._send_heartbeat.call_count, 1)
+        self.assertIsNotNone(self.engine._heartbeat_timer)
+        self.assertFalse(self.transport.close.called)
+
+    @mock.patch('ait.core.log.error')
+    def test_dead_connection_closed(self, log_error):
+        dead_time = self.raf._heartbeat * self.raf._deadfactor
+        self.engine._last_recv = self.loop.time() - dead_time
+
+        self.engine._heartbeat_task()
+        self.assertFalse(self.raf._send_heartbeat.called)
+        self.assertTrue(self.transport.close.called)
+        self.assertIsNone(self.engine._transport)
+        self.assertIsNone(self.engine._heartbeat_timer)
+
+    def test_received_data_defers_dead_time(self):
+        dead_time = self.raf._heartbeat * self.raf._deadfactor
+        self.engine._last_recv = self.loop.time() - dead_time
+
+        protocol = aio.SLEProtocol(self.engine)
+        protocol.data_received(struct.pack('!II', common.TML_CONTEXT_HEARTBEAT_TYPE, 0))
+        self.engine._heartbeat_task()
+        self.assertEqual(self.raf._send_heartbeat.call_count, 1)
+        self.assertFalse(self.transport.close.called)
+
+    def test_zero_heartbeat_disables_timer(self):
+        self.raf._heartbeat = 0
+        self.engine._schedule_heartbeat()
+        self.assertIsNone(self.engine._heartbeat_timer)
+        self.assertFalse(self.transport.close.called)
+
+    @mock.patch('ait.core.log.error')
+    def test_connection_lost_stops_heartbeats(self, log_error):
+        self.engine._schedule_heartbeat()
+        self.engine._connection_lost(socket.error('reset'))
+        self.assertIsNone(self.engine._heartbeat_timer)
+        self.assertIsNone(self.engine._transport)
+
+
+class WaitForPduTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = aio.asyncio.new_event_loop()
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100,
+                                   engine='asyncio', loop=self.loop)
+
+    def tearDown(self):
+        self.raf._telem_sock.close()
+        self.loop.close()
+
+    def test_result_is_next_pdu(self):
+        future = aio.wait_for_pdu(self.raf, 'RafTransferBuffer')
+        self.assertFalse(future.done())
+
+        first = make_transfer_buffer_pdu([T0])
+        self.raf._handle_pdu(first)
+        self.assertIs(self.loop.run_until_complete(future), first)
+
+        # The waiter removes itself once it has a result
+        self.raf._handle_pdu(make_transfer_buffer_pdu([T0]))
+        self.assertIs(future.result(), first)
+
+    def test_priority(self):
+        seen = []
+        self.raf.add_handler('RafTransferBuffer', lambda pdu: seen.append(future.done()))
+
+        future = aio.wait_for_pdu(self.raf, 'RafTransferBuffer')
+        self.raf._handle_pdu(make_transfer_buffer_pdu([T0]))
+        self.assertEqual(seen, [False])
+
+        future = aio.wait_for_pdu(self.raf, 'RafTransferBuffer', priority=10)
+        self.raf._handle_pdu(make_transfer_buffer_pdu([T0]))
+        self.assertEqual(seen, [False, True])
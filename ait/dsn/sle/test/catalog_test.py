@@ -0,0 +1,150 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import datetime as dt
+import os
+import shutil
+import tempfile
+import unittest
+
+from ait.dsn.sle.catalog import RangeCatalog
+from ait.dsn.sle.test.fixtures import RAF, T0, make_transfer_buffer, tm_frame
+
+FRAME_TIMES = [T0 + dt.timedelta(minutes=10 * i) for i in range(37)]
+
+
+def hours(n):
+    return T0 + dt.timedelta(hours=n)
+
+
+def make_service():
+    service = RAF(frame_times=FRAME_TIMES)
+    service.remove_handler('AnnotatedFrame', service._transfer_data_invoc_handler)
+    service._inst_id = 'raf1'
+    return service
+
+
+class RangeCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'catalog.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_add_merges_overlapping_ranges(self):
+        catalog = RangeCatalog()
+        catalog.add('raf1', hours(0), hours(1))
+        catalog.add('raf1', hours(3), hours(4))
+        catalog.add('raf1', hours(1), hours(2))
+        self.assertEqual(catalog.ranges('raf1'), [(hours(0), hours(2)), (hours(3), hours(4))])
+
+        catalog.add('raf1', hours(1), hours(3.5))
+        self.assertEqual(catalog.ranges('raf1'), [(hours(0), hours(4))])
+
+    def test_ranges_are_per_instance_and_vcid(self):
+        catalog = RangeCatalog()
+        catalog.add('rcf1', hours(0), hours(1), vcid=1)
+        self.assertEqual(catalog.ranges('rcf1', vcid=2), [])
+        self.assertEqual(catalog.missing('rcf1', hours(0), hours(1), vcid=2), [(hours(0), hours(1))])
+
+    def test_missing(self):
+        catalog = RangeCatalog()
+        catalog.add('raf1', hours(1), hours(2))
+        catalog.add('raf1', hours(3), hours(4))
+        self.assertEqual(
+            catalog.missing('raf1', hours(0), hours(5)),
+            [(hours(0), hours(1)), (hours(2), hours(3)), (hours(4), hours(5))]
+        )
+        self.assertEqual(catalog.missing('raf1', hours(1), hours(2)), [])
+        self.assertEqual(catalog.missing('raf1', hours(1.5), hours(3.5)), [(hours(2), hours(3))])
+
+    def test_save_and_load(self):
+        catalog = RangeCatalog(self.path)
+        catalog.add('raf1', hours(0), hours(1))
+        catalog.add('rcf1', hours(2), hours(3), vcid=6)
+        catalog.save()
+
+        loaded = RangeCatalog(self.path)
+        self.assertEqual(loaded.ranges('raf1'), [(hours(0), hours(1))])
+        self.assertEqual(loaded.ranges('rcf1', vcid=6), [(hours(2), hours(3))])
+
+    def test_watch_records_frame_runs(self):
+        catalog = RangeCatalog(max_gap=dt.timedelta(minutes=15))
+        service = make_service()
+        catalog.watch(service)
+
+        erts = [hours(0), hours(0.2), hours(0.4), hours(2), hours(2.1)]
+        for frame in make_transfer_buffer(erts)[:len(erts)]:
+            service.emit('AnnotatedFrame', frame)
+
+        self.assertEqual(catalog.ranges('raf1'), [(hours(0), hours(0.4)), (hours(2), hours(2.1))])
+
+    def test_watch_ignores_other_virtual_channels(self):
+        catalog = RangeCatalog()
+        service = make_service()
+        catalog.watch(service, vcid=3)
+
+        transfer_buffer = make_transfer_buffer([hours(0), hours(1)], data=[tm_frame(0, 0, 0), tm_frame(0, 3, 0)])
+        for frame in transfer_buffer[:2]:
+            service.emit('AnnotatedFrame', frame)
+
+        self.assertEqual(catalog.ranges('raf1', vcid=3), [(hours(1), hours(1))])
+
+    def test_fetch_missing_selects_virtual_channel(self):
+        catalog = RangeCatalog()
+        service = make_service()
+        service._state = 'ready'
+        channels = []
+        original_start = service.start
+        def start(start_time, end_time, virtual_channel=None):
+            channels.append(virtual_channel)
+            original_start(start_time, end_time)
+        service.start = start
+
+        catalog.fetch_missing(service, FRAME_TIMES[0], FRAME_TIMES[2], vcid=4, timeout=1)
+        self.assertEqual(channels, [4])
+        self.assertEqual(catalog.ranges('raf1', vcid=4), [(FRAME_TIMES[0], FRAME_TIMES[2])])
+
+    def test_fetch_missing_times_out_without_end_of_data(self):
+        catalog = RangeCatalog()
+        service = make_service()
+        service._state = 'ready'
+        service._send = lambda transfer_buffer: None
+
+        with self.assertRaises(Exception):
+            catalog.fetch_missing(service, FRAME_TIMES[0], FRAME_TIMES[2], timeout=0.1)
+        self.assertEqual(service._state, 'ready')
+        self.assertEqual(catalog.ranges('raf1'), [])
+
+    def test_fetch_missing_only_requests_gaps(self):
+        catalog = RangeCatalog(self.path)
+        catalog.add('raf1', FRAME_TIMES[0], FRAME_TIMES[12])
+
+        service = make_service()
+        service._state = 'ready'
+        starts = []
+        original_start = service.start
+        def start(start_time, end_time):
+            starts.append((start_time, end_time))
+            original_start(start_time, end_time)
+        service.start = start
+
+        fetched = catalog.fetch_missing(service, FRAME_TIMES[0], FRAME_TIMES[-1], timeout=1)
+
+        self.assertEqual(fetched, [(FRAME_TIMES[12], FRAME_TIMES[-1])])
+        self.assertEqual(starts, fetched)
+        self.assertEqual(RangeCatalog(self.path).ranges('raf1'), [(FRAME_TIMES[0], FRAME_TIMES[-1])])
+        self.assertEqual(catalog.fetch_missing(service, FRAME_TIMES[0], FRAME_TIMES[-1]), [])
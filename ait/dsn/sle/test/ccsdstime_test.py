@@ -0,0 +1,79 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import datetime as dt
+import struct
+import unittest
+
+import numpy
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.decoder import decode
+
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.pdu.raf import RafProvidertoUserPdu
+
+
+class CDSTimeTest(unittest.TestCase):
+
+    def test_encode_cds(self):
+        t = dt.datetime(2018, 3, 4, 5, 6, 7, 123456)
+        days = (t - ccsdstime.CCSDS_EPOCH).days
+        ms = ((5 * 60 + 6) * 60 + 7) * 1000 + 123
+        self.assertEqual(ccsdstime.encode_cds(t), struct.pack('!HIH', days, ms, 456))
+
+    def test_round_trip(self):
+        t = dt.datetime(2018, 3, 4, 23, 59, 59, 999999)
+        self.assertEqual(ccsdstime.decode_cds(ccsdstime.encode_cds(t)), t)
+        self.assertEqual(ccsdstime.decode_cds_pico(ccsdstime.encode_cds_pico(t)), t)
+        self.assertEqual(ccsdstime.decode(ccsdstime.encode_cds_pico(t)), t)
+
+    def test_out_of_range(self):
+        with self.assertRaises(ValueError):
+            ccsdstime.encode_cds(dt.datetime(1957, 12, 31))
+
+        with self.assertRaises(ValueError):
+            ccsdstime.decode(b'\x00' * 9)
+
+    def test_decode_array(self):
+        times = [dt.datetime(2018, 1, 1, 0, 0, 0, 1), dt.datetime(2019, 6, 30, 12)]
+        packed = b''.join(ccsdstime.encode_cds(t) for t in times)
+        expected = numpy.array(times, dtype='datetime64[ns]')
+        numpy.testing.assert_array_equal(ccsdstime.decode_array(packed), expected)
+
+        mixed = [ccsdstime.encode_cds(times[0]), ccsdstime.encode_cds_pico(times[1])]
+        numpy.testing.assert_array_equal(ccsdstime.decode_array(mixed), expected)
+
+    def test_decode_array_pico_precision(self):
+        data = struct.pack('!HII', 1, 0, 1500)
+        result = ccsdstime.decode_array(data, pico=True)
+        self.assertEqual(result[0], numpy.datetime64('1958-01-02T00:00:00.000000001', 'ns'))
+
+    def test_decode_erts(self):
+        pdu = RafProvidertoUserPdu()
+        buf = pdu['rafTransferBuffer']
+        times = [dt.datetime(2018, 1, 1, 1), dt.datetime(2018, 1, 1, 2)]
+        for i, t in enumerate(times):
+            frame = buf[i]['annotatedFrame']
+            frame['invokerCredentials']['unused'] = None
+            frame['earthReceiveTime']['ccsdsFormat'] = ccsdstime.encode_cds(t)
+            frame['antennaId']['localForm'] = b'\x01'
+            frame['dataLinkContinuity'] = 0
+            frame['deliveredFrameQuality'] = 0
+            frame['privateAnnotation']['null'] = None
+            frame['data'] = b'\x00' * 16
+        pdu = decode(encode(pdu), asn1Spec=RafProvidertoUserPdu())[0]
+
+        erts = ccsdstime.decode_erts(pdu['rafTransferBuffer'])
+        numpy.testing.assert_array_equal(erts, numpy.array(times, dtype='datetime64[ns]'))
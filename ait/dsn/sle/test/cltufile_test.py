@@ -0,0 +1,166 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import gevent
+import mock
+from pyasn1.codec.ber.decoder import decode
+
+import ait.dsn.sle
+from ait.dsn.sle.cltu import CltuProviderToUserPdu, CltuUserToProviderPdu
+from ait.dsn.sle.cltufile import CLTUFileReader, CLTUFileWriter
+
+
+def transfer_data_return(cltu_id, buffer_available):
+    ''' Build a positive CltuTransferDataReturn reporting buffer_available '''
+    pdu = CltuProviderToUserPdu()
+    ret = pdu['cltuTransferDataReturn']
+    ret['performerCredentials']['unused'] = None
+    ret['invokeId'] = 0
+    ret['cltuIdentification'] = cltu_id
+    ret['cltuBufferAvailable'] = buffer_available
+    ret['result']['positiveResult'] = None
+    return pdu
+
+
+class CLTUFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'batch.cltu')
+
+        self.cltu = ait.dsn.sle.CLTU(hostnames=['localhost'], port=5100)
+        self.cltu._cltu_id = 10
+        self.cltu._write_buffers = mock.MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        with CLTUFileWriter(self.path, self.cltu) as writer:
+            ids = [writer.add(bytearray([i]) * 20) for i in range(5)]
+
+        self.assertEqual(ids, [10, 11, 12, 13, 14])
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+        reader = CLTUFileReader(self.path)
+        self.assertEqual(len(reader), 5)
+        self.assertEqual(reader.cltu_ids, ids)
+        self.assertEqual(reader.validate(), [])
+        self.assertEqual(reader.decode(3)['cltuData'].asOctets(), b'\x03' * 20)
+        reader.close()
+
+    def test_save_batch_to_file(self):
+        count = self.cltu.save_batch_to_file(self.path, [b'\x01' * 8, b'\x02' * 8], notify=True)
+        self.assertEqual(count, 2)
+        self.assertEqual(int(CLTUFileReader(self.path).decode(1)['slduRadiationNotification']), 0)
+
+    def test_export_leaves_service_counters(self):
+        self.cltu._invoke_id = 7
+        with CLTUFileWriter(self.path, self.cltu, first_cltu_id=0) as writer:
+            self.assertEqual([writer.add(b'\x01' * 8) for _ in range(3)], [0, 1, 2])
+
+        self.assertEqual(self.cltu._cltu_id, 10)
+        self.assertEqual(self.cltu._invoke_id, 7)
+        self.assertEqual(int(CLTUFileReader(self.path).decode(2)['invokeId']), 0)
+
+    def written(self):
+        return [b for call in self.cltu._write_buffers.call_args_list for b in call[0][0]]
+
+    def test_replay(self):
+        self.cltu.save_batch_to_file(self.path, [bytearray([i]) * 8 for i in range(5)])
+        reader = CLTUFileReader(self.path)
+
+        with self.assertRaises(Exception):
+            self.cltu._cltu_id = 12
+            reader.replay(self.cltu)
+
+        # The session has used invoke ids for its bind and start
+        self.cltu._cltu_id = 11
+        self.cltu._invoke_id = 2
+        self.cltu.tracker = mock.MagicMock()
+        self.assertEqual(reader.replay(self.cltu, start=1, batch_size=2, buffer_available=100), 4)
+        self.assertEqual(self.cltu._cltu_id, 15)
+        self.assertEqual(self.cltu._invoke_id, 6)
+        self.assertEqual(self.cltu.tracker.submitted.call_args_list,
+                         [mock.call(i, 8) for i in range(11, 15)])
+        self.assertEqual(self.cltu._write_buffers.call_count, 2)
+
+        invocations = [decode(pdu[8:], asn1Spec=CltuUserToProviderPdu())[0].getComponent()
+                       for pdu in self.written()]
+        self.assertEqual([int(i['invokeId']) for i in invocations], [2, 3, 4, 5])
+        self.assertEqual([int(i['cltuIdentification']) for i in invocations], [11, 12, 13, 14])
+        self.assertEqual([i['cltuData'].asOctets() for i in invocations],
+                         [reader.decode(i)['cltuData'].asOctets() for i in range(1, 5)])
+
+    def test_replay_waits_for_buffer_space(self):
+        self.cltu.save_batch_to_file(self.path, [bytearray([i]) * 8 for i in range(5)])
+        reader = CLTUFileReader(self.path)
+
+        replay = gevent.spawn(reader.replay, self.cltu)
+        gevent.sleep(0)
+        # Until the provider reports its buffer space one CLTU is in flight
+        self.assertEqual(len(self.written()), 1)
+
+        self.cltu._handle_pdu(transfer_data_return(10, 16))
+        gevent.sleep(0)
+        self.assertEqual(len(self.written()), 3)
+
+        self.cltu._handle_pdu(transfer_data_return(11, 8))
+        gevent.sleep(0)
+        self.assertEqual(len(self.written()), 3)
+
+        self.cltu._handle_pdu(transfer_data_return(12, 40))
+        self.assertEqual(replay.get(timeout=1), 5)
+        self.assertEqual(len(self.written()), 5)
+        self.assertEqual(self.cltu._handlers['CltuTransferDataReturn'][-1][2],
+                         self.cltu._trans_data_return_handler)
+
+    def test_replay_times_out(self):
+        self.cltu.save_batch_to_file(self.path, [b'\x01' * 8, b'\x02' * 8])
+        reader = CLTUFileReader(self.path)
+
+        with self.assertRaises(Exception):
+            reader.replay(self.cltu, timeout=0.01)
+        self.assertEqual(len(self.written()), 1)
+        self.assertEqual(self.cltu._cltu_id, 11)
+
+    def test_validate_detects_problems(self):
+        self.cltu.save_batch_to_file(self.path, [b'\x01' * 8, b'\x02' * 8])
+        with open(self.path, 'r+b') as f:
+            f.seek(20 + 8)
+            f.write(b'\xff\xff')
+
+        problems = CLTUFileReader(self.path).validate()
+        self.assertEqual(len(problems), 1)
+        self.assertTrue(problems[0].startswith('PDU 0'))
+
+    def test_not_a_container(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 64)
+
+        with self.assertRaises(ValueError):
+            CLTUFileReader(self.path)
+
+    def test_failed_write_leaves_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with CLTUFileWriter(self.path, self.cltu) as writer:
+                writer.add(b'\x01')
+                raise RuntimeError()
+
+        self.assertEqual(os.listdir(self.tmpdir), [])
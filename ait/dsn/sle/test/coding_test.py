@@ -0,0 +1,137 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import binascii
+import unittest
+
+from ait.dsn.sle import coding, frames
+
+
+def bch_parity_bitwise(block):
+    ''' Compute a BCH(63,56) parity octet one bit at a time '''
+    reg = 0
+    for octet in bytearray(block):
+        for bit in range(7, -1, -1):
+            feedback = ((reg >> 6) ^ (octet >> bit)) & 1
+            reg = (reg << 1) & 0x7F
+            if feedback:
+                reg ^= 0x45
+    return ((~reg) & 0x7F) << 1
+
+
+class BCHTest(unittest.TestCase):
+    def test_table_matches_bitwise(self):
+        blocks = [bytearray([i, 255 - i, i * 3 & 0xFF, 0x55, i ^ 0xA5, 0, i * 7 & 0xFF]) for i in range(256)]
+        for block in blocks:
+            self.assertEqual(coding.bch_parity(block), bch_parity_bitwise(block))
+
+    def test_zero_block(self):
+        self.assertEqual(coding.bch_parity(bytearray(7)), 0xFE)
+
+
+class RandomiseTest(unittest.TestCase):
+    def test_sequence(self):
+        self.assertEqual(binascii.hexlify(coding.randomise(b'\x00' * 8)), b'ff399e5a68e906f5')
+
+    def test_round_trip(self):
+        frame = bytes(bytearray(range(200)))
+        self.assertNotEqual(coding.randomise(frame), frame)
+        self.assertEqual(coding.randomise(coding.randomise(frame)), frame)
+
+    def test_too_long(self):
+        with self.assertRaises(ValueError):
+            coding.randomise(b'\x00' * (frames.TC_MAX_FRAME_LENGTH + 1))
+
+
+class EncodeCLTUTest(unittest.TestCase):
+    def test_structure(self):
+        frame = bytes(bytearray(range(10)))
+        cltu = bytearray(coding.encode_cltu(frame))
+
+        self.assertEqual(cltu[:2], coding.START_SEQUENCE)
+        self.assertEqual(cltu[-8:], coding.TAIL_SEQUENCE)
+
+        blocks = cltu[2:-8]
+        self.assertEqual(len(blocks), 16)
+        self.assertEqual(blocks[0:7], frame[0:7])
+        self.assertEqual(blocks[7], bch_parity_bitwise(frame[0:7]))
+        self.assertEqual(blocks[8:15], frame[7:] + b'\x55' * 4)
+        self.assertEqual(blocks[15], bch_parity_bitwise(blocks[8:15]))
+
+    def test_randomised(self):
+        frame = b'\x00' * 7
+        cltu = bytearray(coding.encode_cltu(frame, randomised=True))
+        self.assertEqual(cltu[2:9], coding.randomise(frame))
+
+
+class TCTransFrameTest(unittest.TestCase):
+    def test_round_trip(self):
+        frame = frames.TCTransFrame(
+            bypass_flag=1, spacecraft_id=0x2FA, virtual_channel_id=5, frame_seq_num=42
+        )
+        frame['data'] = b'\x01\x02\x03'
+        data = frame.encode()
+
+        self.assertEqual(len(data), 5 + 3 + 2)
+        self.assertEqual(binascii.hexlify(data[:5]), b'22fa14092a')
+
+        decoded = frames.TCTransFrame(data)
+        self.assertTrue(decoded.fecf_valid)
+        self.assertEqual(decoded['spacecraft_id'], 0x2FA)
+        self.assertEqual(decoded['virtual_channel_id'], 5)
+        self.assertEqual(decoded['bypass_flag'], 1)
+        self.assertEqual(decoded['frame_seq_num'], 42)
+        self.assertEqual(decoded['data'], b'\x01\x02\x03')
+
+        corrupt = data[:6] + b'\xff' + data[7:]
+        self.assertFalse(frames.TCTransFrame(corrupt).fecf_valid)
+
+    def test_too_long(self):
+        frame = frames.TCTransFrame()
+        frame['data'] = b'\x00' * frames.TC_MAX_FRAME_LENGTH
+        with self.assertRaises(ValueError):
+            frame.encode()
+
+    def test_segmentation(self):
+        data = bytes(bytearray(i & 0xFF for i in range(2500)))
+        tc_frames = frames.tc_frames(data, 10, 1, frame_seq_num=254, map_id=3)
+
+        self.assertEqual([f['sequence_flags'] for f in tc_frames],
+                         [frames.SEG_FIRST, frames.SEG_CONTINUING, frames.SEG_LAST])
+        self.assertEqual([f['frame_seq_num'] for f in tc_frames], [254, 255, 0])
+
+        decoded = [frames.TCTransFrame(f.encode(), segmented=True) for f in tc_frames]
+        self.assertTrue(all(len(f.encode()) <= frames.TC_MAX_FRAME_LENGTH for f in tc_frames))
+        self.assertTrue(all(f['map_id'] == 3 for f in decoded))
+        self.assertEqual(b''.join(f['data'] for f in decoded), data)
+
+    def test_segmentation_requires_map_id(self):
+        with self.assertRaises(ValueError):
+            frames.tc_frames(b'\x00' * 2000, 10, 1)
+
+
+class CLTUGeneratorTest(unittest.TestCase):
+    def test_frame_numbering(self):
+        generator = coding.CLTUGenerator(10, 1, frame_seq_num=255)
+        cltus = generator.encode_batch([b'\x01' * 20, b'\x02' * 20])
+
+        self.assertEqual(len(cltus), 2)
+        self.assertEqual(generator.frame_seq_num, 1)
+
+        blocks = bytearray(cltus[1][2:-8])
+        frame = bytearray()
+        for i in range(0, len(blocks), 8):
+            frame += blocks[i:i + 7]
+        self.assertEqual(frames.TCTransFrame(bytes(frame))['frame_seq_num'], 0)
@@ -0,0 +1,191 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import unittest
+import mock
+
+import time
+
+import gevent
+import gevent.event
+import gevent.socket
+
+import ait.dsn.sle
+
+
+class PartialSocket(object):
+    ''' Socket stand-in that accepts at most chunk bytes per call '''
+    def __init__(self, chunk):
+        self.chunk = chunk
+        self.data = b''
+        self.calls = 0
+
+    def send(self, data):
+        self.calls += 1
+        sent = data[:self.chunk]
+        self.data += sent
+        return len(sent)
+
+    def close(self):
+        pass
+
+
+class SendQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+
+    def tearDown(self):
+        self.raf._conn_monitor.kill()
+        self.raf._data_processor.kill()
+        self.raf._telem_sock.close()
+
+    def test_partial_writes(self):
+        self.raf._socket = PartialSocket(3)
+        self.raf._enqueue([b'abcd', b'', b'efghij', b'k'])
+        self.assertEqual(self.raf._socket.data, b'abcdefghijk')
+
+    def test_small_buffers_joined(self):
+        self.raf._socket = PartialSocket(1 << 20)
+        large = b'x' * ait.dsn.sle.common.SEND_JOIN_MAX
+        self.raf._enqueue([b'hdr1', b'body', large, b'hdr2', b'b'])
+        self.assertEqual(self.raf._socket.data, b'hdr1body' + large + b'hdr2b')
+        self.assertEqual(self.raf._socket.calls, 3)
+
+    def test_send_pdu_matches_encode_pdu(self):
+        self.raf._socket = PartialSocket(1024)
+        pdu = ait.dsn.sle.raf.RafUsertoProviderPdu()
+        pdu['rafPeerAbortInvocation'] = 127
+        self.raf.send_pdu(pdu)
+        self.assertEqual(self.raf._socket.data, self.raf.encode_pdu(pdu))
+
+    def test_coalesce_within_latency(self):
+        self.raf._socket = PartialSocket(1024)
+        self.raf._send_latency = 0.01
+
+        self.raf.send(b'hb1')
+        self.raf.send(b'hb2')
+        self.assertEqual(self.raf._socket.calls, 0)
+
+        gevent.sleep(0.05)
+        self.assertEqual(self.raf._socket.data, b'hb1hb2')
+        self.assertEqual(self.raf._socket.calls, 1)
+
+    def test_flush_at_batch_size(self):
+        self.raf._socket = PartialSocket(1024)
+        self.raf._send_latency = 10
+        self.raf._send_batch_size = 6
+
+        self.raf.send(b'abc')
+        self.assertEqual(self.raf._socket.calls, 0)
+        self.raf.send(b'def')
+        self.assertEqual(self.raf._socket.data, b'abcdef')
+        self.assertIsNone(self.raf._flush_timer)
+
+        # The timer started for the first batch doesn't flush the next one early
+        self.raf._send_latency = 0.05
+        self.raf.send(b'abc')
+        self.raf.send(b'def')
+        self.raf._send_latency = 10
+        self.raf.send(b'g')
+        gevent.sleep(0.1)
+        self.assertEqual(self.raf._socket.data, b'abcdefabcdef')
+
+
+class ConnectionTimerTest(unittest.TestCase):
+
+    HEARTBEAT = b'\x03\x00\x00\x00\x00\x00\x00\x00'
+
+    def setUp(self):
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+        self.raf._heartbeat = 10
+        self.raf._deadfactor = 3
+        self.raf._socket, self.peer = gevent.socket.socketpair()
+        self.peer.settimeout(1)
+        self.raf._connection_made()
+
+    def tearDown(self):
+        self.raf._connected.clear()
+        self.raf._cancel_heartbeat()
+        self.raf._conn_monitor.kill()
+        self.raf._data_processor.kill()
+        self.raf._socket.close()
+        self.raf._telem_sock.close()
+        self.peer.close()
+
+    def wait_until(self, condition):
+        for _ in range(100):
+            if condition():
+                return
+            gevent.sleep(0.01)
+
+    def test_heartbeat_sent_when_due(self):
+        self.raf._last_heartbeat = time.time() - 10
+        self.raf._heartbeat_task()
+
+        self.assertEqual(self.peer.recv(1024), self.HEARTBEAT)
+        self.assertIsNotNone(self.raf._heartbeat_timer)
+
+    def test_next_run_at_dead_factor_deadline(self):
+        self.raf._last_recv = time.time() - 29.5
+        with mock.patch.object(self.raf, '_schedule_heartbeat') as schedule:
+            self.raf._heartbeat_task()
+
+        self.assertTrue(schedule.call_args[0][0] <= 0.5)
+
+    @mock.patch('ait.core.log.error')
+    def test_dead_peer_detected(self, mock_error):
+        self.raf._last_recv = time.time() - 30
+        self.raf._heartbeat_task()
+
+        self.assertFalse(self.raf._connected.is_set())
+        self.assertIsNone(self.raf._heartbeat_timer)
+
+    def test_zero_heartbeat_disables_timer(self):
+        self.raf._cancel_heartbeat()
+        self.raf._heartbeat = 0
+        self.raf._connection_made()
+        self.assertIsNone(self.raf._heartbeat_timer)
+
+        self.raf._last_recv = time.time() - 60
+        self.raf._heartbeat_task()
+        gevent.sleep(0.01)
+        self.assertTrue(self.raf._connected.is_set())
+        self.assertIsNone(self.raf._heartbeat_timer)
+
+        self.peer.setblocking(0)
+        with self.assertRaises(gevent.socket.error):
+            self.peer.recv(1024)
+
+    def test_received_data_keeps_connection_alive(self):
+        self.raf._last_recv = time.time() - 30
+        self.peer.sendall(self.HEARTBEAT)
+        self.wait_until(lambda: time.time() - self.raf._last_recv < 10)
+
+        self.raf._heartbeat_task()
+        self.assertTrue(self.raf._connected.is_set())
+
+    def test_pdu_processed_on_arrival(self):
+        processed = gevent.event.AsyncResult()
+        self.raf._process_pdu = processed.set
+        self.peer.sendall(b'\x01\x00\x00\x00\x00\x00\x00\x02ab')
+        self.assertEqual(processed.get(timeout=1), b'ab')
+
+    @mock.patch('ait.core.log.error')
+    def test_peer_close_detected(self, mock_error):
+        self.peer.close()
+        self.wait_until(lambda: not self.raf._connected.is_set())
+
+        self.assertFalse(self.raf._connected.is_set())
+        mock_error.assert_called_with('Connection closed by DSN')
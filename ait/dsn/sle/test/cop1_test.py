@@ -0,0 +1,182 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import unittest
+
+import mock
+
+from ait.dsn.sle import frames
+from ait.dsn.sle.cop1 import FOP1
+
+
+def cltu_frame(cltu):
+    ''' Recover the TC frame from an unrandomised CLTU '''
+    blocks = bytearray(cltu[2:-8])
+    data = bytearray()
+    for i in range(0, len(blocks), 8):
+        data += blocks[i:i + 7]
+    return frames.TCTransFrame(bytes(data))
+
+
+class FakeService(object):
+    def __init__(self):
+        self.handlers = {}
+        self.uploads = []
+
+    def add_handler(self, event, handler):
+        self.handlers[event] = handler
+
+    def remove_handler(self, event, handler):
+        del self.handlers[event]
+
+    def upload_cltu(self, tc_data):
+        self.uploads.append(cltu_frame(tc_data))
+
+
+class CLCWTest(unittest.TestCase):
+    def test_round_trip(self):
+        clcw = frames.CLCW(virtual_channel_id=5, lockout=1, retransmit=1, farm_b_counter=2,
+                           report_value=200)
+        data = clcw.encode()
+        self.assertEqual(data, b'\x01\x14\x2c\xc8')
+        self.assertEqual(frames.CLCW(data), clcw)
+
+    def test_tm_ocf(self):
+        ocf = b'\x01\x00\x00\x07'
+        frame = b'\x00\x01' + b'\x00' * 10 + ocf
+        self.assertEqual(frames.tm_ocf(frame), ocf)
+        self.assertEqual(frames.tm_ocf(frame + b'\xff\xff', fecf=True), ocf)
+        self.assertIsNone(frames.tm_ocf(b'\x00\x00' + b'\x00' * 14))
+        self.assertEqual(frames.TMTransFrame(frame)['ocf'], ocf)
+
+
+class FOP1Test(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeService()
+        self.alerts = []
+        self.fop = FOP1(self.service, 10, 1, window=3, timer=100, transmission_limit=2,
+                        on_alert=self.alerts.append)
+
+    def tearDown(self):
+        self.fop._cancel_timer()
+
+    def clcw(self, nr, **fields):
+        self.fop.on_clcw(frames.CLCW(virtual_channel_id=1, report_value=nr, **fields))
+
+    def sent(self):
+        return [(f['bypass_flag'], f['frame_seq_num'], f['data']) for f in self.service.uploads]
+
+    def test_sliding_window(self):
+        self.fop.send(b'\x00')
+        self.assertEqual(self.sent(), [])
+
+        self.fop.initialise()
+        for i in range(1, 5):
+            self.fop.send(bytearray([i]))
+        self.assertEqual([s[1] for s in self.sent()], [0, 1, 2])
+
+        self.clcw(2)
+        self.assertEqual([s[1] for s in self.sent()], [0, 1, 2, 3, 4])
+        self.assertEqual(self.fop.status()['unacknowledged'], 3)
+        self.assertEqual(self.fop.nnr, 2)
+
+        self.clcw(5)
+        self.assertEqual(self.fop.status()['unacknowledged'], 0)
+        self.assertIsNone(self.fop._timer_greenlet)
+
+    def test_retransmit(self):
+        self.fop.initialise()
+        for i in range(3):
+            self.fop.send(bytearray([i]))
+
+        self.clcw(1, retransmit=1)
+        self.assertEqual([s[1] for s in self.sent()], [0, 1, 2, 1, 2])
+        self.assertEqual(self.fop.state, 'retransmit')
+
+        # Further CLCWs reporting the same request wait for the timer
+        self.clcw(1, retransmit=1)
+        self.assertEqual(len(self.sent()), 5)
+
+        self.fop._timer_expired()
+        self.assertEqual(self.fop.state, 'initial')
+        self.assertEqual(len(self.alerts), 1)
+        self.assertEqual(self.fop.status()['unacknowledged'], 0)
+
+    def test_timer_retransmits(self):
+        self.fop.initialise()
+        self.fop.send(b'\x01')
+        self.fop._timer_expired()
+        self.assertEqual([s[1] for s in self.sent()], [0, 0])
+        self.assertEqual(self.fop.retransmissions, 1)
+
+        self.clcw(1)
+        self.assertEqual(self.fop.state, 'active')
+
+    def test_wait(self):
+        self.fop.initialise()
+        self.fop.send(b'\x01')
+        self.clcw(0, wait=1)
+        self.fop.send(b'\x02')
+        self.assertEqual(len(self.sent()), 1)
+
+        self.clcw(1)
+        self.assertEqual([s[1] for s in self.sent()], [0, 1])
+
+    def test_lockout_and_invalid_nr(self):
+        self.fop.initialise()
+        self.fop.send(b'\x01')
+        self.clcw(0, lockout=1)
+        self.assertEqual(self.alerts, ['FARM lockout'])
+
+        self.fop.initialise()
+        self.fop.send(b'\x01')
+        self.clcw(9)
+        self.assertEqual(len(self.alerts), 2)
+        self.assertEqual(self.fop.state, 'initial')
+
+    def test_set_vr(self):
+        self.fop.initialise(vr=5)
+        self.assertEqual(self.sent(), [(1, 0, b'\x82\x00\x05')])
+        self.assertEqual(self.service.uploads[0]['control_command_flag'], 1)
+
+        self.fop.send(b'\x01')
+        self.clcw(3)
+        self.assertEqual(self.fop.state, 'initialising')
+
+        self.clcw(5)
+        self.assertEqual(self.fop.state, 'active')
+        self.assertEqual(self.sent()[-1], (0, 5, b'\x01'))
+
+    def test_expedited_and_unlock(self):
+        self.fop.send_expedited(b'\x07')
+        self.fop.unlock()
+        self.assertEqual(self.sent(), [(1, 0, b'\x07'), (1, 0, b'\x00')])
+
+    def test_watch(self):
+        self.fop.initialise()
+        self.fop.send(b'\x01')
+
+        downlink = FakeService()
+        self.fop.watch(downlink)
+        ocf = frames.CLCW(virtual_channel_id=1, report_value=1).encode()
+        pdu = mock.MagicMock()
+        pdu.getComponent.return_value = {'data': mock.MagicMock(**{
+            'asOctets.return_value': b'\x00\x01' + b'\x00' * 10 + ocf
+        })}
+        downlink.handlers['AnnotatedFrame'](pdu)
+        self.assertEqual(self.fop.nnr, 1)
+
+        self.fop.unwatch(downlink)
+        self.assertEqual(downlink.handlers, {})
@@ -0,0 +1,150 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+
+import datetime as dt
+import struct
+import unittest
+
+import mock
+import numpy
+
+from ait.dsn.sle import ccsdstime, frames
+from ait.dsn.sle.decom import Decommutator, PacketDecoder, load_packet_defs
+from ait.dsn.sle.test.fixtures import T0, annotated_frame, config_file
+
+
+def space_packet(apid, seq, data):
+    ''' Build a space packet with a primary header '''
+    return struct.pack('>HHH', 0x0800 | apid, 0xC000 | seq, len(data) - 1) + data
+
+
+def hs_packet(i):
+    ''' Build the data field of a 1553_HS_Packet '''
+    return struct.pack('>5H', i, i + 1, i + 2, i + 3, 1000 + i)
+
+
+def tm_frame(packets, first_hdr_ptr=0, ocf=False):
+    ''' Build a TM transfer frame carrying packets '''
+    header = struct.pack('>HBBH', (1 << 4) | int(ocf), 0, 0, first_hdr_ptr)
+    return header + b''.join(packets) + (b'\x00' * 4 if ocf else b'')
+
+
+class TmPacketsTest(unittest.TestCase):
+
+    def test_packets_from_first_header_pointer(self):
+        packets = [space_packet(0x12, i, hs_packet(i)) for i in range(3)]
+        data = tm_frame([b'\xAA' * 4] + packets + [packets[0][:8]], first_hdr_ptr=4, ocf=True)
+        self.assertEqual(frames.tm_packets(data), packets)
+
+    def test_idle_frame(self):
+        self.assertEqual(frames.tm_packets(tm_frame([b'\x00' * 20], first_hdr_ptr=0x7FE)), [])
+
+
+class PacketDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.defs = load_packet_defs(config_file('tlmdict'))
+
+    def test_batch_decode(self):
+        decoder = PacketDecoder(self.defs['1553_HS_Packet'], offset=6)
+        packets = [space_packet(0x12, i, hs_packet(i)) for i in range(100)]
+        erts = [ccsdstime.to_nanoseconds(ccsdstime.encode_cds(T0 + dt.timedelta(seconds=i)))
+                for i in range(100)]
+
+        columns = decoder.decode(packets, erts)
+
+        self.assertEqual(list(columns), ['ert'] + decoder.fields)
+        self.assertEqual(columns['ert'][5], numpy.datetime64('2018-01-01T00:00:05', 'ns'))
+        numpy.testing.assert_array_equal(columns['Voltage_B'], numpy.arange(100) + 1)
+        numpy.testing.assert_array_equal(columns['Current_A'], numpy.arange(100) + 1000)
+        self.assertTrue(columns['Voltage_A'].dtype.isnative)
+
+    def test_masks_and_times(self):
+        decoder = PacketDecoder(self.defs['Ethernet_HS_Packet'])
+        data = struct.pack('>IIIBIIIHHHHI', 0x01234567, 1000, 500000000, 3, 0x7F000100,
+                           2000, 250000000, 1, 2, 3, 4, 0x89ABCDEF)
+
+        columns = decoder.decode([data, data])
+        self.assertEqual(columns['product_length'][0], 0x100)
+        self.assertEqual(columns['time'][1], 1000.5)
+        self.assertEqual(columns['VoltageSampleTime'][0], 2000.25)
+        self.assertEqual(decoder.decode_one(data), dict((k, v[0]) for k, v in columns.items()))
+
+    def test_overlapping_fields(self):
+        decoder = PacketDecoder(self.defs['CCSDS_HEADER'])
+        header = space_packet(0x1A5, 0x123, b'\x00')[:6] + b'\x00' * (decoder.size - 6)
+
+        values = decoder.decode_one(header)
+        self.assertEqual((values['apid'], values['secondary_header_flag']), (0x1A5, 1))
+        self.assertEqual(decoder.decode([header])['apid'][0], 0x1A5)
+
+    def test_short_packets_dropped(self):
+        decoder = PacketDecoder(self.defs['1553_HS_Packet'], offset=6)
+        packets = [space_packet(0x12, 0, hs_packet(0)), space_packet(0x12, 1, b'\x00\x01')]
+
+        columns = decoder.decode(packets, [1, 2])
+        self.assertEqual(len(columns['Voltage_A']), 1)
+        self.assertEqual(decoder.short, 1)
+
+
+class DecommutatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = []
+        self.decom = Decommutator(
+            lambda name, columns: self.batches.append((name, columns)),
+            apids={0x12: '1553_HS_Packet'},
+            tlmdict=load_packet_defs(config_file('tlmdict')),
+            batch_size=4
+        )
+
+    def test_batches_by_apid(self):
+        for i in range(6):
+            self.decom.add(space_packet(0x12, i, hs_packet(i)), i)
+        self.decom.add(space_packet(0x13, 0, hs_packet(0)), 0)
+
+        self.assertEqual(len(self.batches), 1)
+        self.decom.flush()
+
+        self.assertEqual([name for name, _ in self.batches], ['1553_HS_Packet'] * 2)
+        numpy.testing.assert_array_equal(self.batches[1][1]['Voltage_A'], [4, 5])
+        self.assertEqual((self.decom.received, self.decom.unknown), (7, 1))
+
+    def test_attach(self):
+        service = mock.MagicMock()
+        self.decom.attach(service)
+        service.add_handler.assert_called_with('AnnotatedFrame', self.decom.add_frame)
+
+        self.decom.add_frame(annotated_frame(tm_frame(
+            [space_packet(0x12, i, hs_packet(i)) for i in range(2)])))
+        self.decom.flush()
+        self.assertEqual(self.batches[0][1]['ert'][1], numpy.datetime64('2018-01-01', 'ns'))
+
+    def test_packets_spanning_frames(self):
+        stream = b''.join(space_packet(0x12, i, hs_packet(i)) for i in range(10))
+        zone = 23
+        for n, pos in enumerate(range(0, len(stream), zone)):
+            first_hdr_ptr = (16 - pos % 16) % 16
+            data = struct.pack('>HBBH', 1 << 4, 0, n, first_hdr_ptr) + stream[pos:pos + zone]
+            if n != 3:
+                self.decom.add_frame(annotated_frame(data, seconds=n))
+        self.decom.flush()
+
+        voltages = numpy.concatenate([columns['Voltage_A'] for _, columns in self.batches])
+        # The packets partly carried by the missing fourth frame are lost
+        numpy.testing.assert_array_equal(voltages, [0, 1, 2, 3, 6, 7, 8, 9])
+        self.assertEqual(self.decom.dropped, 1)
+        self.assertEqual(self.batches[0][1]['ert'][1], numpy.datetime64('2018-01-01', 'ns'))
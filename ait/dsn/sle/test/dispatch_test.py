@@ -0,0 +1,70 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import unittest
+import mock
+
+import ait.dsn.sle
+from ait.dsn.sle.test.fixtures import T0, make_transfer_buffer_pdu
+
+
+class DispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+
+    def tearDown(self):
+        self.raf._conn_monitor.kill()
+        self.raf._data_processor.kill()
+        self.raf._telem_sock.close()
+
+    def test_handlers_are_per_instance(self):
+        other = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+        handler = mock.MagicMock()
+        self.raf.add_handler('RafTransferBuffer', handler)
+        self.assertNotIn(handler, other._handlers['RafTransferBuffer'])
+        other._conn_monitor.kill()
+        other._data_processor.kill()
+        other._telem_sock.close()
+
+    def test_frame_dispatch(self):
+        self.raf.remove_handler('AnnotatedFrame', self.raf._transfer_data_invoc_handler)
+        handler = mock.MagicMock()
+        self.raf.add_handler('AnnotatedFrame', handler)
+
+        self.raf._handle_pdu(make_transfer_buffer_pdu([T0] * 3))
+        self.assertEqual(handler.call_count, 3)
+
+    def test_priority_order(self):
+        calls = []
+        self.raf.remove_handler('RafTransferBuffer', self.raf._data_transfer_handler)
+        self.raf.add_handler('RafTransferBuffer', lambda pdu: calls.append('low'), priority=-1)
+        self.raf.add_handler('RafTransferBuffer', lambda pdu: calls.append('default'))
+        self.raf.add_handler('RafTransferBuffer', lambda pdu: calls.append('high'), priority=10)
+
+        self.raf._handle_pdu(make_transfer_buffer_pdu([T0]))
+        self.assertEqual(calls, ['high', 'default', 'low'])
+
+    def test_remove_handler(self):
+        self.raf.remove_handler('RafTransferBuffer', self.raf._data_transfer_handler)
+        self.assertEqual(self.raf._pdu_dispatch.get(make_transfer_buffer_pdu([T0]).getComponent().tagSet), None)
+
+        with self.assertRaises(ValueError):
+            self.raf.remove_handler('RafTransferBuffer', self.raf._data_transfer_handler)
+
+    @mock.patch('ait.core.log.error')
+    def test_unhandled_pdu(self, log_error):
+        self.raf.remove_handler('RafTransferBuffer', self.raf._data_transfer_handler)
+        self.raf._handle_pdu(make_transfer_buffer_pdu([T0]))
+        self.assertTrue(log_error.called)
@@ -0,0 +1,174 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import datetime as dt
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import gevent
+
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.failover import Checkpoint, HotStandby, StandbyLock
+from ait.dsn.sle.test.fixtures import RAF, T0, annotated_frame, tm_frame
+
+SESSION = {'name': 'raf', 'service': 'raf', 'start_time': T0, 'end_time': T0 + dt.timedelta(hours=1)}
+
+
+def ert(element):
+    return ccsdstime.to_nanoseconds(
+        element.getComponent()['earthReceiveTime'].getComponent().asOctets()
+    )
+
+
+class FailoverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.lock_path = os.path.join(self.tmpdir, 'bridge.lock')
+        self.checkpoint_path = os.path.join(self.tmpdir, 'bridge.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+class StandbyLockTest(FailoverTestCase):
+
+    def test_exclusive(self):
+        active = StandbyLock(self.lock_path)
+        standby = StandbyLock(self.lock_path)
+
+        self.assertTrue(active.acquire())
+        self.assertFalse(standby.acquire(blocking=False))
+        self.assertFalse(standby.acquire(timeout=0.05, poll_interval=0.01))
+
+        with open(self.lock_path) as infile:
+            self.assertEqual(int(infile.read()), os.getpid())
+
+        waiter = gevent.spawn(standby.acquire, poll_interval=0.01)
+        gevent.sleep(0.02)
+        active.release()
+        self.assertTrue(waiter.get(timeout=1))
+        self.assertTrue(standby.locked)
+        standby.release()
+
+
+class CheckpointTest(FailoverTestCase):
+
+    def test_resume_skips_delivered_frames(self):
+        checkpoint = Checkpoint(self.checkpoint_path)
+        self.assertEqual([checkpoint.accept(t) for t in [1, 2, 2, 3]], [True] * 4)
+        checkpoint.save()
+
+        resumed = Checkpoint(self.checkpoint_path)
+        self.assertTrue(resumed.load())
+        self.assertEqual((resumed.last_ert, resumed.position, resumed.frames), (3, 1, 4))
+
+        accepted = [t for t in [1, 2, 2, 3, 3, 4, 2] if resumed.accept(t)]
+        self.assertEqual(accepted, [3, 4, 2])
+        self.assertEqual(resumed.frames, 7)
+
+    def test_resume_time(self):
+        checkpoint = Checkpoint(self.checkpoint_path)
+        self.assertFalse(checkpoint.load())
+        self.assertIsNone(checkpoint.resume_time())
+
+        checkpoint.accept(ccsdstime.to_nanoseconds(ccsdstime.encode_cds_pico(T0)) + 999)
+        self.assertEqual(checkpoint.resume_time(), T0)
+
+
+class HotStandbyTest(FailoverTestCase):
+
+    def setUp(self):
+        super(HotStandbyTest, self).setUp()
+        RAF.instances = []
+        RAF.connect_failures = 0
+        self.delivered = {'a': [], 'b': []}
+        self.pair = [
+            HotStandby(SESSION, self.delivered[name].append, self.lock_path,
+                       self.checkpoint_path, checkpoint_interval=0.01, poll_interval=0.01,
+                       timeout=1, service_classes={'raf': RAF})
+            for name in ['a', 'b']
+        ]
+
+    def tearDown(self):
+        for member in self.pair:
+            member.stop()
+        super(HotStandbyTest, self).tearDown()
+
+    def test_takeover(self):
+        active, standby = self.pair
+        active.start()
+        self.assertTrue(active.wait_active(timeout=1))
+        standby.start()
+        self.assertFalse(standby.wait_active(timeout=0.05))
+        self.assertEqual(standby.role, 'standby')
+
+        frames = [annotated_frame(tm_frame(1, 0, i), i // 2) for i in range(6)]
+        active._manager.wait_active(timeout=1)
+        for frame in frames[:3]:
+            RAF.instances[0].emit('AnnotatedFrame', frame)
+        gevent.sleep(0.05)
+
+        # Crash the active process without a final checkpoint or unbind
+        active._worker.kill()
+        active._checkpointer.kill()
+        active._lock.release()
+        switch_time = time.time()
+
+        self.assertTrue(standby.wait_active(timeout=1))
+        self.assertTrue(time.time() - switch_time < 0.5)
+
+        standby._manager.wait_active(timeout=1)
+        self.assertEqual(standby._session.start_time, T0 + dt.timedelta(seconds=1))
+        for frame in frames:
+            RAF.instances[-1].emit('AnnotatedFrame', frame)
+
+        self.assertEqual([ert(f) for f in self.delivered['a']], [ert(f) for f in frames[:3]])
+        self.assertEqual([ert(f) for f in self.delivered['b']], [ert(f) for f in frames[3:]])
+        self.assertEqual(standby.checkpoint.frames, 6)
+
+    def test_restart_resumes_from_checkpoint(self):
+        member = HotStandby(SESSION, self.delivered['a'].append, self.lock_path,
+                            self.checkpoint_path, checkpoint_interval=0.01, timeout=1,
+                            restart_delay=0, check_interval=0.01, service_classes={'raf': RAF})
+        self.pair.append(member)
+        member.start()
+        member.wait_active(timeout=1)
+        member._manager.wait_active(timeout=1)
+
+        frames = [annotated_frame(tm_frame(1, 0, i), i // 2) for i in range(6)]
+        for frame in frames[:3]:
+            RAF.instances[0].emit('AnnotatedFrame', frame)
+
+        # The active process loses its connection and reopens the session
+        RAF.instances[0]._connected.clear()
+        for _ in range(100):
+            if len(RAF.instances) > 1 and member._session.active.is_set():
+                break
+            gevent.sleep(0.01)
+        self.assertEqual(member._session.restarts, 1)
+        self.assertEqual(member._session.start_time, T0 + dt.timedelta(seconds=1))
+
+        erts = []
+        for frame in frames:
+            RAF.instances[-1].emit('AnnotatedFrame', frame)
+            erts.append(member.checkpoint.last_ert)
+
+        self.assertEqual([ert(f) for f in self.delivered['a']], [ert(f) for f in frames])
+        self.assertEqual(erts, sorted(erts))
+        self.assertEqual(member.checkpoint.frames, 6)
@@ -0,0 +1,196 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Shared builders and stand-ins for the SLE tests and benchmarks '''
+
+from collections import defaultdict
+import datetime as dt
+import struct
+
+import gevent
+import gevent.event
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.decoder import decode
+
+import ait.core
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.pdu.raf import RafProvidertoUserPdu
+
+T0 = dt.datetime(2018, 1, 1)
+
+
+def config_file(name):
+    ''' Return the path of a dictionary in the AIT config, e.g. "tlmdict"
+
+    Loading the file directly rather than through the default dictionary
+    keeps the tests from writing a pickled copy next to it.
+    '''
+    return ait.config.get('{}.filename'.format(name))
+
+
+def tm_frame(scid, vcid, vc_count):
+    ''' Build a minimal TM transfer frame header and body '''
+    ident = (scid << 4) | (vcid << 1)
+    return struct.pack('>HBBH', ident, 0, vc_count, 0) + b'\x00' * 10
+
+
+def transfer_buffer_pdu(erts, data=None, qualities=None, end_of_data=False, pico=False):
+    ''' Build an unencoded RAF transfer buffer PDU with a frame per ERT
+
+    Arguments:
+        erts: The datetime ERT of each frame.
+
+        data: The data of each frame. Defaults to 16 zero octets.
+
+        qualities: The delivered frame quality of each frame. Defaults
+            to 0 (good).
+
+        end_of_data: Whether to end the buffer with an end of data sync
+            notification.
+
+        pico: Whether to encode the ERTs as CDS pico times.
+    '''
+    pdu = RafProvidertoUserPdu()
+    buf = pdu['rafTransferBuffer']
+    for i, ert in enumerate(erts):
+        frame = buf[i]['annotatedFrame']
+        frame['invokerCredentials']['unused'] = None
+        if pico:
+            frame['earthReceiveTime']['ccsdsPicoFormat'] = ccsdstime.encode_cds_pico(ert)
+        else:
+            frame['earthReceiveTime']['ccsdsFormat'] = ccsdstime.encode_cds(ert)
+        frame['antennaId']['localForm'] = b'\x01'
+        frame['dataLinkContinuity'] = 0
+        frame['deliveredFrameQuality'] = qualities[i] if qualities else 0
+        frame['privateAnnotation']['null'] = None
+        frame['data'] = data[i] if data else b'\x00' * 16
+
+    if end_of_data:
+        notify = buf[len(erts)]['syncNotification']
+        notify['invokerCredentials']['unused'] = None
+        notify['notification']['endOfData'] = None
+    return pdu
+
+
+def make_transfer_buffer_pdu(erts, **kwargs):
+    ''' Build a RAF transfer buffer PDU decoded as if it had been received
+
+    The arguments are the same as for :func:`transfer_buffer_pdu`.
+    '''
+    pdu = transfer_buffer_pdu(erts, **kwargs)
+    return decode(encode(pdu), asn1Spec=RafProvidertoUserPdu())[0]
+
+
+def make_transfer_buffer(erts, **kwargs):
+    ''' Build a decoded RAF transfer buffer
+
+    The arguments are the same as for :func:`transfer_buffer_pdu`.
+    '''
+    return make_transfer_buffer_pdu(erts, **kwargs)['rafTransferBuffer']
+
+
+def annotated_frame(data, seconds=0, quality=0):
+    ''' Build a decoded RAF annotated frame element received seconds after T0 '''
+    return make_transfer_buffer([T0 + dt.timedelta(seconds=seconds)], data=[data], qualities=[quality])[0]
+
+
+class FakeService(object):
+    ''' Stand-in for a RAF or RCF instance which answers every request
+
+    Binding to an instance id in ``fail_bind`` leaves the service unbound.
+    If ``frame_times`` is passed, each start sends a transfer buffer of
+    the frames whose ERTs are in the requested range followed by an end
+    of data. Instances bound to an id in ``pico_ert`` send CDS pico ERTs.
+    '''
+    connect_failures = 0
+    fail_bind = set()
+    pico_ert = set()
+
+    def __init__(self, frame_times=None, **kwargs):
+        self.kwargs = kwargs
+        self.frame_times = frame_times
+        self.inst_id = None
+        self._state = 'unbound'
+        self._hostnames = ['default']
+        self._port = None
+        self._connected = gevent.event.Event()
+        self._handlers = defaultdict(list)
+        self.requests = []
+        self.add_handler('AnnotatedFrame', self._transfer_data_invoc_handler)
+        type(self).instances.append(self)
+
+    def add_handler(self, event, handler, priority=0):
+        self._handlers[event].append(handler)
+
+    def remove_handler(self, event, handler):
+        self._handlers[event].remove(handler)
+
+    def emit(self, event, pdu=None):
+        for h in list(self._handlers[event]):
+            h(pdu)
+
+    def _transfer_data_invoc_handler(self, pdu):
+        raise AssertionError('Default frame handler should be removed')
+
+    def _reply(self, request, state, event):
+        self.requests.append(request)
+        self._state = state
+        self.emit(type(self).__name__.capitalize() + event)
+
+    def connect(self):
+        if type(self).connect_failures:
+            type(self).connect_failures -= 1
+            raise Exception('Unable to connect to DSN through any provided hostnames.')
+        self._connected.set()
+
+    def disconnect(self):
+        self.requests.append('disconnect')
+        self._connected.clear()
+
+    def bind(self, inst_id=None):
+        self.inst_id = inst_id
+        state = 'unbound' if inst_id in type(self).fail_bind else 'ready'
+        self._reply('bind', state, 'BindReturn')
+
+    def start(self, start_time, end_time, **kwargs):
+        self.start_kwargs = kwargs
+        self._reply('start', 'active', 'StartReturn')
+        if self.frame_times is not None:
+            erts = [t for t in self.frame_times if start_time <= t <= end_time]
+            pico = self.inst_id in type(self).pico_ert
+            gevent.spawn(self._send, make_transfer_buffer(erts, end_of_data=True, pico=pico))
+
+    def _send(self, transfer_buffer):
+        for element in transfer_buffer:
+            gevent.sleep(0)
+            if element.getName() == 'annotatedFrame':
+                self.emit('AnnotatedFrame', element)
+            else:
+                self.emit('SyncNotification', element)
+
+    def stop(self):
+        self._reply('stop', 'ready', 'StopReturn')
+
+    def unbind(self):
+        self._reply('unbind', 'unbound', 'UnbindReturn')
+
+
+class RAF(FakeService):
+    instances = []
+
+
+class RCF(FakeService):
+    instances = []
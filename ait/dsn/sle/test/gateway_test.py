@@ -0,0 +1,125 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import struct
+import unittest
+
+import gevent
+import gevent.socket
+
+
+import ait.dsn.sle
+from ait.dsn.sle.gateway import FanoutGateway, quality_filter
+from ait.dsn.sle.test.fixtures import T0, make_transfer_buffer_pdu, tm_frame
+
+
+def make_transfer_buffer(qualities):
+    ''' Build a decoded RAF transfer buffer PDU with one frame per quality '''
+    data = [tm_frame(1, 0, i) for i in range(len(qualities))]
+    return make_transfer_buffer_pdu([T0] * len(qualities), data=data, qualities=qualities)
+
+
+def wait_for(condition, timeout=2.0):
+    with gevent.Timeout(timeout, AssertionError('Condition not met')):
+        while not condition():
+            gevent.sleep(0.01)
+
+
+def close_raf(raf):
+    raf._conn_monitor.kill()
+    raf._data_processor.kill()
+    raf._telem_sock.close()
+
+
+class FanoutGatewayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.upstream = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+        self.upstream.remove_handler('AnnotatedFrame', self.upstream._transfer_data_invoc_handler)
+        self.upstream.add_handler('AnnotatedFrame', lambda pdu: None)
+        self.gateway = FanoutGateway(self.upstream, max_queue=2)
+
+    def tearDown(self):
+        self.gateway.close()
+        close_raf(self.upstream)
+
+    def test_subscribers_filtered(self):
+        all_frames, good_frames = [], []
+        self.gateway.subscribe(all_frames.extend)
+        self.gateway.subscribe(good_frames.extend, frame_filter=quality_filter(0))
+
+        self.upstream._handle_pdu(make_transfer_buffer([0, 1, 0]))
+        gevent.sleep(0)
+
+        self.assertEqual(len(all_frames), 3)
+        self.assertEqual(len(good_frames), 2)
+
+    def test_slow_subscriber_dropped(self):
+        fast = []
+        self.gateway.subscribe(fast.extend)
+        slow = self.gateway.subscribe(lambda frames: gevent.sleep(10))
+
+        for _ in range(8):
+            self.upstream._handle_pdu(make_transfer_buffer([0]))
+            gevent.sleep(0)
+
+        self.assertEqual(self.gateway.dropped, 1)
+        self.assertNotIn(slow, self.gateway._subscribers)
+        self.assertEqual(len(fast), 8)
+
+    def test_raw_frame_clients(self):
+        server = self.gateway.serve_frames(('127.0.0.1', 0))
+        client = gevent.socket.create_connection(('127.0.0.1', server.server_port))
+        wait_for(lambda: len(self.gateway._subscribers) == 1)
+
+        self.upstream._handle_pdu(make_transfer_buffer([0, 0]))
+        data = b''
+        expected = 2 * (4 + len(tm_frame(1, 0, 0)))
+        with gevent.Timeout(2):
+            while len(data) < expected:
+                data += client.recv(4096)
+
+        length, = struct.unpack('!I', data[:4])
+        self.assertEqual(data[4:4 + length], tm_frame(1, 0, 0))
+        client.close()
+
+    def test_sle_user(self):
+        server = self.gateway.serve_sle(('127.0.0.1', 0))
+
+        user = ait.dsn.sle.RAF(hostnames=['127.0.0.1'], port=server.server_port)
+        user._hostnames = ['127.0.0.1']
+        user._port = server.server_port
+        frames = []
+        user.remove_handler('AnnotatedFrame', user._transfer_data_invoc_handler)
+        user.add_handler('AnnotatedFrame', frames.append)
+
+        try:
+            user.connect()
+            user.bind(inst_id='sagr=1.spack=1.rsl-fg=1.raf=onlt1')
+            wait_for(lambda: user._state == 'ready')
+
+            user.start(None, None, frame_quality=0)
+            wait_for(lambda: user._state == 'active')
+
+            self.upstream._handle_pdu(make_transfer_buffer([0, 1, 0]))
+            wait_for(lambda: len(frames) == 2)
+
+            user.stop()
+            wait_for(lambda: user._state == 'ready')
+            self.assertEqual(self.gateway._subscribers, [])
+
+            user.unbind()
+            wait_for(lambda: user._state == 'unbound')
+        finally:
+            user.disconnect()
@@ -0,0 +1,74 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import datetime as dt
+import hashlib
+import unittest
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.encoder import encode as der_encode
+from pyasn1.type import univ
+
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.isp1 import CredentialGenerator
+from ait.dsn.sle.pdu.common import HashInput, ISP1Credentials
+
+
+def reference_credentials(current_time, random_number, username, password):
+    ''' Encode ISP1 credentials with the PyASN1 encoders '''
+    credential_time = ccsdstime.encode_cds(current_time)
+
+    hash_input = HashInput()
+    hash_input['time'] = credential_time
+    hash_input['randomNumber'] = random_number
+    hash_input['username'] = username
+    hash_input['password'] = password
+
+    isp1_creds = ISP1Credentials()
+    isp1_creds['time'] = credential_time
+    isp1_creds['randomNumber'] = random_number
+    isp1_creds['theProtected'] = hashlib.sha1(der_encode(hash_input)).digest()
+    return encode(isp1_creds)
+
+
+class CredentialGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = dt.datetime(2018, 5, 6, 7, 8, 9, 101112)
+
+    def test_matches_pyasn1(self):
+        gen = CredentialGenerator('LSE', 'secret')
+        for number in [0, 1, 0x7f, 0x80, 0xff, 0x100, 0x8000, 0x7fffffff, 42949667295]:
+            self.assertEqual(
+                gen.generate(self.now, number),
+                reference_credentials(self.now, number, 'LSE', 'secret')
+            )
+
+    def test_long_username_and_password(self):
+        username, password = 'U' * 200, 'p' * 300
+        gen = CredentialGenerator(username, password)
+        self.assertEqual(
+            gen.generate(self.now, 12345),
+            reference_credentials(self.now, 12345, username, password)
+        )
+
+    def test_verify(self):
+        gen = CredentialGenerator('SSE', 'secret')
+        creds = reference_credentials(self.now, 0x80, 'SSE', 'secret')
+        self.assertTrue(gen.verify(creds))
+        self.assertTrue(gen.verify(univ.OctetString(creds)))
+
+        self.assertFalse(CredentialGenerator('SSE', 'other').verify(creds))
+        self.assertFalse(gen.verify(creds[:-1]))
+        self.assertFalse(gen.verify(b''))
@@ -0,0 +1,121 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+
+import calendar
+import unittest
+
+import mock
+
+import ait.dsn.sle
+from ait.dsn.sle.latency import LatencyHistogram, LatencyTracer
+from ait.dsn.sle.test.fixtures import T0, make_transfer_buffer, tm_frame
+
+T0_UNIX = calendar.timegm(T0.timetuple())
+
+
+def frames_on(vcids):
+    ''' Build a RAF transfer buffer of frames received at T0 on vcids '''
+    return make_transfer_buffer([T0] * len(vcids), data=[tm_frame(0, vcid, i) for i, vcid in enumerate(vcids)])
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for latency in [0.0005] * 50 + [0.003] * 40 + [0.1] * 9 + [5.0]:
+            histogram.add(latency)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max, 5.0)
+        self.assertAlmostEqual(histogram.mean(), 0.06045)
+        self.assertEqual(histogram.percentile(50), 0.001)
+        self.assertEqual(histogram.percentile(90), 0.004)
+        self.assertEqual(histogram.percentile(99), 0.128)
+        self.assertEqual(histogram.percentile(100), 5.0)
+        self.assertEqual(histogram.buckets(), [(0.001, 50), (0.004, 40), (0.128, 9), (8.192, 1)])
+
+    def test_empty_and_merge(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.mean())
+        self.assertIsNone(histogram.percentile(50))
+
+        other = LatencyHistogram()
+        other.add(1e6)
+        histogram.merge(other)
+        self.assertEqual(histogram.buckets(), [(None, 1)])
+        self.assertEqual(histogram.percentile(50), 1e6)
+
+
+class LatencyTracerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+        self.raf._handlers.clear()
+        self.raf._frame_dispatch.clear()
+        self.delivered = []
+        self.raf.add_handler('AnnotatedFrame', self.delivered.append)
+
+    def test_stages_by_vcid(self):
+        clock = mock.Mock(side_effect=[T0_UNIX + 1.0, T0_UNIX + 3.0, T0_UNIX + 1.0, T0_UNIX + 3.0])
+        tracer = LatencyTracer(clock=clock)
+        tracer.attach(self.raf)
+
+        self.raf._pdu_received = T0_UNIX + 0.5
+        self.raf._handle_frames(frames_on([2, 5]))
+
+        self.assertEqual(len(self.delivered), 2)
+        self.assertEqual(tracer.sampled, 2)
+        status = tracer.status(percentiles=(50,))
+        self.assertEqual(sorted(status), ['decoded', 'delivered', 'received'])
+        self.assertEqual(sorted(status['delivered']), [2, 5])
+        self.assertAlmostEqual(status['received'][2]['mean'], 0.5)
+        self.assertAlmostEqual(status['decoded'][5]['max'], 1.0)
+        self.assertAlmostEqual(status['delivered'][5]['max'], 3.0)
+        self.assertEqual(status['delivered'][5]['p50'], 3.0)
+        self.assertEqual(tracer.histogram('delivered').count, 2)
+
+        tracer.detach(self.raf)
+        self.assertIsNone(self.raf.tracer)
+
+    def test_sampling(self):
+        tracer = LatencyTracer(sample_every=3, clock=lambda: T0_UNIX + 1.0)
+        tracer.attach(self.raf)
+
+        self.raf._handle_frames(frames_on([0] * 4))
+        self.raf._handle_frames(frames_on([1] * 4))
+
+        self.assertEqual(len(self.delivered), 8)
+        # The 1st, 4th and 7th frames are sampled
+        self.assertEqual(tracer.sampled, 3)
+        self.assertEqual(tracer.histogram('delivered', 0).count, 2)
+        self.assertEqual(tracer.histogram('delivered', 1).count, 1)
+        self.assertEqual(tracer.histogram('received').count, 0)
+
+        tracer.reset()
+        self.assertEqual(tracer.status(), {})
+
+    def test_undelivered_frames_forgotten(self):
+        tracer = LatencyTracer(max_pending=2, clock=lambda: T0_UNIX)
+        frames = list(tracer.trace(frames_on([0, 0, 0])))
+
+        for frame in frames:
+            tracer.delivered(frame)
+        self.assertEqual(tracer.histogram('decoded').count, 3)
+        self.assertEqual(tracer.histogram('delivered').count, 2)
+
+    def test_invalid_sample_rate(self):
+        with self.assertRaises(ValueError):
+            LatencyTracer(sample_every=0)
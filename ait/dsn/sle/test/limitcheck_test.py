@@ -0,0 +1,72 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+
+import unittest
+
+import mock
+import numpy
+
+from ait.core.limits import LimitDefinition
+from ait.dsn.sle.decom import load_packet_defs
+from ait.dsn.sle.limitcheck import LimitChecker, load_limit_defs
+from ait.dsn.sle.test.fixtures import config_file
+
+
+class LimitCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.sink = mock.Mock()
+        self.tlmdict = load_packet_defs(config_file('tlmdict'))
+        self.checker = LimitChecker(load_limit_defs(config_file('limits')), tlmdict=self.tlmdict,
+                                    on_event=self.events.append, sink=self.sink)
+
+    def test_range_transitions(self):
+        voltage = numpy.array([20, 39, 41, 42, 46, 50, 30, 4, 4, 20], dtype='u2')
+        erts = numpy.arange(10).astype('datetime64[s]')
+        events = self.checker.check('1553_HS_Packet', {'ert': erts, 'Voltage_A': voltage})
+
+        self.assertEqual(
+            [(e.ert, e.value, e.previous, e.level) for e in events],
+            [(erts[2], 41, 'ok', 'warn'), (erts[4], 46, 'warn', 'error'),
+             (erts[6], 30, 'error', 'ok'), (erts[7], 4, 'ok', 'error'),
+             (erts[9], 20, 'error', 'ok')]
+        )
+        self.assertEqual(self.events, events)
+        self.assertEqual(self.checker.checked, 10)
+        self.sink.assert_called_once()
+
+    def test_state_kept_between_batches(self):
+        self.checker.check('1553_HS_Packet', {'Voltage_A': numpy.array([20, 41])})
+        events = self.checker.check('1553_HS_Packet', {'Voltage_A': numpy.array([41, 20])})
+
+        self.assertEqual([(e.value, e.level) for e in events], [(20, 'ok')])
+        self.assertEqual(self.checker.status()['1553_HS_Packet.Voltage_A'], 'ok')
+
+    def test_enumerated_values(self):
+        events = self.checker.check('Ethernet_HS_Packet', {'product_type': numpy.array([3, 0, 1, 2, 3])})
+
+        self.assertEqual([(e.value, e.level) for e in events], [(0, 'warn'), (2, 'error'), (3, 'ok')])
+
+    def test_unknown_enumeration(self):
+        limits = [LimitDefinition(source='Ethernet_HS_Packet.product_type', value={'error': 'NOT_A_TYPE'})]
+        with self.assertRaises(ValueError):
+            LimitChecker(limits, tlmdict=self.tlmdict)
+
+    def test_converted_field_rejected(self):
+        limits = [LimitDefinition(source='1553_HS_Packet.Current_A', lower={'error': 1.0})]
+        with self.assertRaises(ValueError):
+            LimitChecker(limits, tlmdict=self.tlmdict)
@@ -0,0 +1,77 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import struct
+import unittest
+
+from ait.dsn.sle import frames
+from ait.dsn.sle.merge import FrameMerger
+from ait.dsn.sle.test.fixtures import annotated_frame, tm_frame
+
+
+def identity(element):
+    frame = element.getComponent()
+    return frames.frame_id(frame['data'].asOctets()), int(frame['deliveredFrameQuality'])
+
+
+class FrameIdTest(unittest.TestCase):
+
+    def test_tm_frame(self):
+        self.assertEqual(frames.frame_id(tm_frame(0x2AB, 5, 200)), (0x2AB, 5, 200))
+
+    def test_aos_frame(self):
+        data = struct.pack('>HHB', 0x4000 | (0xAB << 6) | 0x21, 0x1234, 0x56) + b'\x00' * 4
+        self.assertEqual(frames.frame_id(data), (0xAB, 0x21, 0x123456))
+
+
+class FrameMergerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.out = []
+        self.merger = FrameMerger(self.out.append, window=1.0)
+
+    def test_duplicates_dropped_and_best_quality_kept(self):
+        station_a = [annotated_frame(tm_frame(1, 0, i), i * 0.1, quality=1 if i == 2 else 0) for i in range(5)]
+        station_b = [annotated_frame(tm_frame(1, 0, i), i * 0.1 + 0.05) for i in range(5)]
+
+        for a, b in zip(station_a, station_b):
+            self.merger.add(a)
+            self.merger.add(b)
+        self.merger.flush()
+
+        self.assertEqual([identity(f) for f in self.out], [((1, 0, i), 0) for i in range(5)])
+        self.assertEqual(self.merger.duplicates, 5)
+        self.assertEqual(self.merger.replaced, 1)
+
+    def test_wrapped_counts_outside_window_kept(self):
+        self.merger.add(annotated_frame(tm_frame(1, 0, 7), 0))
+        self.merger.add(annotated_frame(tm_frame(1, 0, 7), 10))
+        self.merger.flush()
+        self.assertEqual(len(self.out), 2)
+
+    def test_late_copy_dropped_after_release(self):
+        self.merger.add(annotated_frame(tm_frame(1, 0, 1), 0))
+        self.merger.add(annotated_frame(tm_frame(1, 0, 2), 5))
+        self.assertEqual(len(self.out), 1)
+
+        self.merger.add(annotated_frame(tm_frame(1, 0, 1), 0.5))
+        self.merger.flush()
+        self.assertEqual(len(self.out), 2)
+        self.assertEqual(self.merger.duplicates, 1)
+
+    def test_output_in_ert_order(self):
+        for seconds, count in [(0.3, 3), (0.1, 1), (0.2, 2)]:
+            self.merger.add(annotated_frame(tm_frame(1, 0, count), seconds))
+        self.merger.flush()
+        self.assertEqual([identity(f)[0][2] for f in self.out], [1, 2, 3])
@@ -0,0 +1,120 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import unittest
+import mock
+
+import gevent
+
+import ait.dsn.sle
+from ait.dsn.sle.queues import BoundedQueue
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get())
+    return items
+
+
+class BoundedQueueTest(unittest.TestCase):
+
+    def test_drop_newest(self):
+        queue = BoundedQueue(2, 'drop-newest')
+        results = [queue.put(i) for i in range(4)]
+
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(drain(queue), [0, 1])
+        self.assertEqual(queue.dropped, 2)
+
+    def test_drop_oldest(self):
+        queue = BoundedQueue(2, 'drop-oldest')
+        for i in range(4):
+            self.assertTrue(queue.put(i))
+
+        self.assertEqual(drain(queue), [2, 3])
+        self.assertEqual(queue.dropped, 2)
+        self.assertEqual(queue.high_water, 2)
+
+    def test_block(self):
+        queue = BoundedQueue(1, 'block')
+        queue.put(0)
+
+        producer = gevent.spawn(queue.put, 1)
+        gevent.sleep(0)
+        self.assertFalse(producer.ready())
+        self.assertTrue(queue.full())
+
+        self.assertEqual(queue.get(), 0)
+        producer.join(timeout=1)
+        self.assertTrue(producer.value)
+        self.assertEqual(queue.get(), 1)
+        self.assertEqual(queue.dropped, 0)
+
+    def test_unbounded(self):
+        queue = BoundedQueue()
+        for i in range(1000):
+            queue.put(i)
+
+        self.assertFalse(queue.full())
+        self.assertEqual(queue.stats(), {
+            'depth': 1000, 'maxsize': 0, 'high_water': 1000, 'dropped': 0
+        })
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            BoundedQueue(1, 'drop-random')
+
+        with self.assertRaises(ValueError):
+            BoundedQueue(-1)
+
+
+class ReceiveQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100,
+                                   frame_queue_size=2, queue_policy='drop-oldest')
+
+    def tearDown(self):
+        self.raf._conn_monitor.kill()
+        self.raf._data_processor.kill()
+        self.raf._frame_processor.kill()
+        self.raf._telem_sock.close()
+
+    def test_frames_dispatched_from_queue(self):
+        received = []
+        self.raf._frame_dispatch = {}
+        self.raf._dispatch_frames = received.extend
+
+        self.raf._handle_frames(['a', 'b', 'c'])
+        self.assertEqual(received, [])
+        self.assertEqual(self.raf.queue_status()['frame_queue']['dropped'], 1)
+
+        gevent.sleep(0)
+        self.assertEqual(received, ['b', 'c'])
+
+    @mock.patch('ait.core.log.warn')
+    def test_provider_backlog_reported_with_queue_depth(self, mock_warn):
+        self.raf._data_queue.put('pdu')
+
+        pdu = ait.dsn.sle.raf.FrameOrNotification()
+        pdu['syncNotification']['notification']['excessiveDataBacklog'] = None
+        self.raf._sync_notify_handler(pdu)
+
+        status = self.raf.queue_status()
+        self.assertEqual(status['provider_backlog']['count'], 1)
+        self.assertIsNotNone(status['provider_backlog']['last_time'])
+        self.assertEqual(status['pdu_queue']['depth'], 1)
+        self.assertIn('Local PDU queue: 1/unbounded', mock_warn.call_args[0][0])
@@ -0,0 +1,108 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+import datetime as dt
+import unittest
+
+import gevent
+
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.retrieval import SlicedRetrieval, split_range
+from ait.dsn.sle.test.fixtures import RAF
+
+START = dt.datetime(2018, 1, 1)
+END = dt.datetime(2018, 1, 1, 6)
+FRAME_TIMES = [START + dt.timedelta(minutes=10 * i) for i in range(37)]
+
+
+class SplitRangeTest(unittest.TestCase):
+
+    def test_split_range(self):
+        slices = split_range(START, END, 3)
+        self.assertEqual(len(slices), 3)
+        self.assertEqual(slices[0], (START, START + dt.timedelta(hours=2)))
+        self.assertEqual(slices[-1][1], END)
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            split_range(END, START, 3)
+
+
+class SlicedRetrievalTest(unittest.TestCase):
+
+    def setUp(self):
+        RAF.instances = []
+        RAF.fail_bind = set()
+        RAF.pico_ert = set()
+
+    def ert_ns(self, frame):
+        return ccsdstime.to_nanoseconds(frame.getComponent()['earthReceiveTime'].getComponent().asOctets())
+
+    def test_frames_merged_in_ert_order(self):
+        retrieval = SlicedRetrieval(['a', 'b', 'c'], service_class=RAF, timeout=1, frame_times=FRAME_TIMES)
+        frames = []
+        count = retrieval.retrieve(START, END, frames.append)
+
+        erts = [
+            ccsdstime.decode(f.getComponent()['earthReceiveTime'].getComponent().asOctets())
+            for f in frames
+        ]
+        self.assertEqual(count, len(FRAME_TIMES))
+        self.assertEqual(erts, FRAME_TIMES)
+        self.assertEqual(sorted(r.inst_id for r in RAF.instances), ['a', 'b', 'c'])
+        self.assertTrue(all('disconnect' in r.requests for r in RAF.instances))
+
+    def test_failed_slice_raises(self):
+        RAF.fail_bind.add('a')
+        retrieval = SlicedRetrieval(['a', 'b'], service_class=RAF, timeout=1, frame_times=FRAME_TIMES)
+        with self.assertRaises(Exception):
+            list(retrieval.iter_frames(START, END))
+
+        gevent.sleep(0)
+        self.assertTrue(all('disconnect' in r.requests for r in RAF.instances))
+
+    def test_mixed_ert_formats_merged_in_order(self):
+        # Slices meet 900us into the range, within the same millisecond
+        RAF.pico_ert.add('b')
+        times = [START + dt.timedelta(microseconds=500), START + dt.timedelta(microseconds=950)]
+        retrieval = SlicedRetrieval(['a', 'b'], service_class=RAF, timeout=1, frame_times=times)
+        frames = list(retrieval.iter_frames(START, START + dt.timedelta(microseconds=1800)))
+
+        self.assertEqual([self.ert_ns(f) for f in frames],
+                         [ccsdstime.to_nanoseconds(ccsdstime.encode_cds(t)) for t in times])
+
+    def test_missing_end_of_data_times_out(self):
+        retrieval = SlicedRetrieval(['a'], service_class=RAF, timeout=0.05)
+        with self.assertRaises(Exception):
+            list(retrieval.iter_frames(START, END))
+
+        self.assertIn('stop', RAF.instances[0].requests)
+        self.assertIn('disconnect', RAF.instances[0].requests)
+
+    def test_slices_buffer_ahead_of_merge_bounded(self):
+        retrieval = SlicedRetrieval(['a', 'b'], service_class=RAF, timeout=0.05,
+                                    slice_queue_size=2, frame_times=FRAME_TIMES)
+        frames = retrieval.iter_frames(START, END)
+        first = next(frames)
+
+        # The later slice is held back by its full queue, so it has not
+        # reached its end of data, and waiting behind the merge is not
+        # treated as a stalled provider
+        gevent.sleep(0.2)
+        later = [r for r in RAF.instances if r.inst_id == 'b'][0]
+        self.assertNotIn('stop', later.requests)
+
+        rest = list(frames)
+        self.assertEqual([self.ert_ns(f) for f in [first] + rest],
+                         [ccsdstime.to_nanoseconds(ccsdstime.encode_cds(t)) for t in FRAME_TIMES])
@@ -0,0 +1,173 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+
+import datetime as dt
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import mock
+
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.router import APIDRouter, PacketIndex, PacketReassembler, read_index
+
+T0 = dt.datetime(2018, 1, 1)
+
+
+def space_packet(apid, seq, size=10):
+    ''' Build a space packet with a primary header '''
+    return struct.pack('>HHH', 0x0800 | apid, 0xC000 | seq, size - 1) + bytes(bytearray([seq & 0xFF]) * size)
+
+
+def tm_frames(packets, vcid=0, zone=32, first_count=0):
+    ''' Pack packets into the data fields of consecutive TM frames '''
+    stream = b''.join(packets)
+    starts = []
+    offset = 0
+    for p in packets:
+        starts.append(offset)
+        offset += len(p)
+
+    result = []
+    for i, pos in enumerate(range(0, len(stream), zone)):
+        chunk = stream[pos:pos + zone].ljust(zone, b'\x00')
+        inside = [s - pos for s in starts if pos <= s < pos + zone]
+        fhp = inside[0] if inside else 0x7FF
+        header = struct.pack('>HBBH', (1 << 4) | (vcid << 1), 0, (first_count + i) & 0xFF, fhp)
+        result.append(header + chunk)
+    return result
+
+
+class PacketReassemblerTest(unittest.TestCase):
+
+    def test_packets_spanning_frames(self):
+        packets = [space_packet(0x10, i, size=10 + 7 * i) for i in range(6)]
+        reassembler = PacketReassembler()
+
+        out = []
+        for i, frame in enumerate(tm_frames(packets + [space_packet(0x10, 6)])):
+            out.extend(reassembler.add(frame, ert=i, offset=i * 100))
+
+        self.assertEqual([p for p, _, _, _ in out][:6], packets)
+        # The third packet starts in the second frame, 7 octets into its data field
+        self.assertEqual(out[2][1:], (1, 100, 13))
+        self.assertEqual(reassembler.dropped, 0)
+
+    def test_missing_frame_drops_partial_packet(self):
+        packets = [space_packet(0x10, i, size=40) for i in range(4)]
+        frame_list = tm_frames(packets, zone=23)
+        reassembler = PacketReassembler()
+
+        out = []
+        for frame in frame_list[:1] + frame_list[2:]:
+            out.extend(reassembler.add(frame))
+
+        self.assertEqual([p for p, _, _, _ in out], packets[1:])
+        self.assertEqual(reassembler.dropped, 1)
+
+
+class APIDRouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gaps = []
+        self.router = APIDRouter(on_gap=lambda *args: self.gaps.append(args))
+
+    def test_routes_by_apid(self):
+        single, ranged, every = mock.Mock(), mock.Mock(), mock.Mock()
+        self.router.add_route(single, apids=0x10)
+        self.router.add_route(ranged, apids=[(0x20, 0x2F), 0x40])
+        self.router.add_route(every)
+
+        for apid in (0x10, 0x25, 0x40, 0x30, 0x7FF):
+            self.router.route(space_packet(apid, 0), ert=5)
+
+        self.assertEqual(single.call_count, 1)
+        self.assertEqual(ranged.call_count, 2)
+        self.assertEqual(every.call_count, 4)
+        single.assert_called_with(space_packet(0x10, 0), 5)
+
+        self.router.remove_route(every)
+        self.router.route(space_packet(0x30, 1))
+        self.assertEqual(every.call_count, 4)
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            self.router.add_route(mock.Mock(), apids=(0x20, 0x10))
+
+    def test_sequence_gaps(self):
+        for seq in [0x3FFE, 0x3FFF, 0, 3, 4, 2]:
+            self.router.route(space_packet(0x10, seq))
+
+        status = self.router.status()[0x10]
+        self.assertEqual((status['packets'], status['octets']), (6, 96))
+        self.assertEqual((status['gaps'], status['missing'], status['out_of_order']), (1, 2, 1))
+        self.assertEqual(self.gaps, [(0x10, 1, 3)])
+
+    def test_add_frame(self):
+        service = mock.MagicMock()
+        self.router.attach(service)
+        service.add_handler.assert_called_with('AnnotatedFrame', self.router.add_frame)
+
+        handler = mock.Mock()
+        self.router.add_route(handler, apids=0x10)
+
+        ert = ccsdstime.encode_cds(T0)
+        element = mock.MagicMock()
+        frame = element.getComponent.return_value
+        frame.__getitem__.side_effect = lambda key: {
+            'earthReceiveTime': mock.Mock(**{'getComponent.return_value.asOctets.return_value': ert}),
+            'data': mock.Mock(**{'asOctets.return_value': tm_frames([space_packet(0x10, 0)])[0]}),
+        }[key]
+
+        self.router.add_frame(element)
+        handler.assert_called_once_with(space_packet(0x10, 0), ccsdstime.to_nanoseconds(ert))
+
+
+class PacketIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'packets.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_index_and_lookup(self):
+        t0 = ccsdstime.to_nanoseconds(ccsdstime.encode_cds(T0))
+        index = PacketIndex(self.path, flush_size=3)
+        router = APIDRouter(index=index)
+
+        for i in range(10):
+            router.route(space_packet(0x10 + i % 2, i), ert=t0 + i * 10 ** 9, offset=i * 1000, position=6)
+        router.route(space_packet(0x10, 20))
+
+        found = index.lookup(apid=0x11, start_time=T0 + dt.timedelta(seconds=2))
+        self.assertEqual(found['seq'].tolist(), [3, 5, 7, 9])
+        self.assertEqual(found['offset'].tolist(), [3000, 5000, 7000, 9000])
+        index.close()
+
+        with PacketIndex(self.path) as index:
+            index.add(0x12, 1, None, 20000, 6)
+        self.assertEqual(len(read_index(self.path)), 11)
+        self.assertEqual(read_index(self.path, apid=0x12)['ert'][0], -1)
+
+    def test_not_an_index(self):
+        with open(self.path, 'wb') as outfile:
+            outfile.write(b'not an index')
+        with self.assertRaises(ValueError):
+            PacketIndex(self.path)
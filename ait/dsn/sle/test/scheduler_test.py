@@ -0,0 +1,166 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import datetime as dt
+import unittest
+
+import gevent
+import mock
+
+from ait.dsn.sle.scheduler import UplinkScheduler
+
+T0 = dt.datetime(2018, 1, 1)
+
+
+class FakeCLTU(object):
+    ''' Record the CLTUs uploaded and the handlers added '''
+    def __init__(self):
+        self.handlers = {}
+        self.uploads = []
+
+    def add_handler(self, event, handler):
+        self.handlers[event] = handler
+
+    def upload_cltu(self, tc_data, earliest_time=None, latest_time=None, delay=0, notify=False):
+        self.uploads.append((bytes(tc_data), earliest_time, latest_time))
+
+    def transfer_data_return(self, buffer_available):
+        self.handlers['CltuTransferDataReturn']({
+            'cltuTransferDataReturn': {'cltuBufferAvailable': buffer_available}
+        })
+
+
+class UplinkSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = T0
+        self.service = FakeCLTU()
+        self.scheduler = UplinkScheduler(self.service, lead_time=2, margin=0.5,
+                                         clock=lambda: self.now)
+
+    def sent(self):
+        return [u[0] for u in self.service.uploads]
+
+    def test_release_at_lead_time(self):
+        self.scheduler.schedule(b'a', earliest_time=T0 + dt.timedelta(seconds=10))
+        self.scheduler.schedule(b'b')
+
+        self.assertEqual(self.scheduler.run_pending(), 8)
+        self.assertEqual(self.sent(), [b'b'])
+
+        self.now = T0 + dt.timedelta(seconds=8)
+        self.assertIsNone(self.scheduler.run_pending())
+        self.assertEqual(self.sent(), [b'b', b'a'])
+        self.assertEqual(self.service.uploads[1][1], T0 + dt.timedelta(seconds=10))
+
+    def test_priority(self):
+        self.scheduler.schedule(b'low', priority=0)
+        self.scheduler.schedule(b'high', priority=5)
+        self.scheduler.schedule(b'low2', priority=0)
+        self.scheduler.run_pending()
+        self.assertEqual(self.sent(), [b'high', b'low', b'low2'])
+
+    def test_drop_late(self):
+        on_drop = mock.MagicMock()
+        self.scheduler._on_drop = on_drop
+        self.scheduler.schedule(b'late', latest_time=T0 + dt.timedelta(seconds=0.2))
+        self.scheduler.schedule(b'ok', latest_time=T0 + dt.timedelta(seconds=5))
+
+        self.scheduler.run_pending()
+        self.assertEqual(self.sent(), [b'ok'])
+        self.assertEqual(len(self.scheduler.dropped), 1)
+        self.assertEqual(on_drop.call_args[0][0]['size'], 4)
+
+    def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.schedule(b'x', earliest_time=T0, latest_time=T0 - dt.timedelta(seconds=1))
+
+    def test_buffer_availability(self):
+        self.scheduler.buffer_available = 10
+        for data in [b'x' * 6, b'y' * 6, b'z' * 2]:
+            self.scheduler.schedule(data)
+
+        self.assertIsNone(self.scheduler.run_pending())
+        self.assertEqual(self.sent(), [b'x' * 6])
+
+        # The provider acknowledges the first CLTU with room for both others
+        self.service.transfer_data_return(8)
+        self.scheduler.run_pending()
+        self.assertEqual(self.sent(), [b'x' * 6, b'y' * 6, b'z' * 2])
+        self.assertEqual(self.scheduler.buffer_available, 0)
+
+    def test_drop_late_while_waiting_for_buffer(self):
+        self.scheduler.buffer_available = 10
+        self.scheduler.schedule(b'x' * 6)
+        self.scheduler.schedule(b'y' * 6, latest_time=T0 + dt.timedelta(seconds=3))
+        self.scheduler.schedule(b'z' * 2, latest_time=T0 + dt.timedelta(seconds=10))
+
+        # Run again when the blocked CLTU must be dropped
+        self.assertEqual(self.scheduler.run_pending(), 2.5)
+        self.assertEqual(self.sent(), [b'x' * 6])
+
+        self.now = T0 + dt.timedelta(seconds=2.6)
+        self.assertIsNone(self.scheduler.run_pending())
+        self.assertEqual([d['size'] for d in self.scheduler.dropped], [6])
+        self.assertEqual(self.sent(), [b'x' * 6, b'z' * 2])
+
+    def test_drop_behind_blocked_cltu(self):
+        self.scheduler.buffer_available = 4
+        self.scheduler.schedule(b'x' * 6, priority=1)
+        self.scheduler.schedule(b'y' * 2, latest_time=T0 + dt.timedelta(seconds=1))
+
+        self.assertEqual(self.scheduler.run_pending(), 0.5)
+        self.now = T0 + dt.timedelta(seconds=0.6)
+        self.assertIsNone(self.scheduler.run_pending())
+        self.assertEqual(self.sent(), [])
+        self.assertEqual([d['size'] for d in self.scheduler.dropped], [2])
+
+    def test_cancel(self):
+        ticket = self.scheduler.schedule(b'a', earliest_time=T0 + dt.timedelta(seconds=10))
+        self.scheduler.schedule(b'b', earliest_time=T0 + dt.timedelta(seconds=20))
+
+        self.assertTrue(self.scheduler.cancel(ticket))
+        self.assertFalse(self.scheduler.cancel(ticket))
+        self.assertEqual(len(self.scheduler), 1)
+
+        self.now = T0 + dt.timedelta(seconds=30)
+        self.scheduler.run_pending()
+        self.assertEqual(self.sent(), [b'b'])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_background_sending(self):
+        scheduler = UplinkScheduler(self.service)
+        scheduler.start()
+        try:
+            scheduler.schedule(b'a')
+            gevent.sleep(0.01)
+            self.assertEqual(self.sent(), [b'a'])
+        finally:
+            scheduler.stop()
+
+    def test_background_drop_while_waiting_for_buffer(self):
+        scheduler = UplinkScheduler(self.service, margin=0.05, buffer_available=10)
+        scheduler.schedule(b'x' * 6)
+        scheduler.schedule(b'y' * 6, latest_time=dt.datetime.utcnow() + dt.timedelta(seconds=0.1))
+        scheduler.schedule(b'z' * 2)
+        scheduler.start()
+        try:
+            for _ in range(100):
+                if scheduler.dropped:
+                    break
+                gevent.sleep(0.01)
+            self.assertEqual(len(scheduler.dropped), 1)
+            self.assertEqual(self.sent(), [b'x' * 6, b'z' * 2])
+        finally:
+            scheduler.stop()
@@ -0,0 +1,121 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import unittest
+import mock
+
+import gevent
+
+from ait.dsn.sle.sessions import Session, SessionManager
+from ait.dsn.sle.test.fixtures import RAF, RCF, FakeService
+
+
+SESSIONS = [
+    {'name': 'all', 'service': 'raf', 'inst_id': 'raf=onlt1', 'start': {'frame_quality': 0}},
+    {'name': 'vc0', 'service': 'rcf', 'inst_id': 'rcf=onlc1', 'port': 5101,
+     'start': {'spacecraft_id': 250, 'trans_frame_ver_num': 0, 'virtual_channel': 0}},
+    {'name': 'vc1', 'service': 'rcf', 'inst_id': 'rcf=onlc2', 'hostnames': ['backup'],
+     'start': {'spacecraft_id': 250, 'trans_frame_ver_num': 0, 'virtual_channel': 1}},
+]
+
+
+class SessionManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        RAF.instances = []
+        RCF.instances = []
+        FakeService.connect_failures = 0
+        RCF.connect_failures = 0
+        self.manager = SessionManager(
+            SESSIONS, timeout=1, restart_delay=0, check_interval=0.01,
+            service_classes={'raf': RAF, 'rcf': RCF}
+        )
+
+    def tearDown(self):
+        self.manager.stop()
+
+    def test_sessions_started_from_config(self):
+        self.manager.start()
+        self.assertEqual(self.manager.wait_active(timeout=1), [])
+
+        raf = RAF.instances[0]
+        vc0, vc1 = sorted(RCF.instances, key=lambda s: s.inst_id)
+        self.assertEqual(raf.start_kwargs, {'frame_quality': 0})
+        self.assertEqual(vc1.start_kwargs['virtual_channel'], 1)
+        self.assertEqual(vc0._port, 5101)
+        self.assertEqual(vc1._hostnames, ['backup'])
+        self.assertEqual(self.manager.status()['vc0']['state'], 'active')
+
+    def test_frames_routed_by_session(self):
+        everything = []
+        vc1_only = []
+        self.manager.add_route(lambda name, pdu: everything.append((name, pdu)))
+        self.manager.add_route(lambda name, pdu: vc1_only.append(pdu), session='vc1')
+        self.manager.start()
+        self.manager.wait_active(timeout=1)
+
+        for service in RAF.instances + RCF.instances:
+            service.emit('AnnotatedFrame', service.inst_id)
+
+        self.assertEqual(sorted(everything), [
+            ('all', 'raf=onlt1'), ('vc0', 'rcf=onlc1'), ('vc1', 'rcf=onlc2')
+        ])
+        self.assertEqual(vc1_only, ['rcf=onlc2'])
+        self.assertEqual(self.manager.sessions['vc1'].frames, 1)
+
+    @mock.patch('ait.core.log.error')
+    def test_failed_session_restarted(self, mock_error):
+        RCF.connect_failures = 1
+        self.manager.start()
+        self.assertEqual(self.manager.wait_active(timeout=1), [])
+
+        status = self.manager.status()
+        self.assertEqual(status['vc0']['restarts'] + status['vc1']['restarts'], 1)
+        self.assertEqual(status['all']['restarts'], 0)
+
+    @mock.patch('ait.core.log.error')
+    def test_lost_connection_restarted(self, mock_error):
+        self.manager.start()
+        self.manager.wait_active(timeout=1)
+
+        lost = RAF.instances[0]
+        lost._connected.clear()
+        gevent.sleep(0.05)
+
+        self.assertEqual(self.manager.wait_active(timeout=1), [])
+        self.assertEqual(len(RAF.instances), 2)
+        self.assertEqual(lost.requests, ['bind', 'start', 'disconnect'])
+        self.assertIn('Connection lost', self.manager.status()['all']['last_error'])
+
+    def test_stop(self):
+        self.manager.start()
+        self.manager.wait_active(timeout=1)
+        self.manager.stop()
+
+        for service in RAF.instances + RCF.instances:
+            self.assertEqual(service.requests, ['bind', 'start', 'stop', 'unbind', 'disconnect'])
+        self.assertEqual(
+            set(s['state'] for s in self.manager.status().values()), set(['stopped'])
+        )
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            SessionManager([SESSIONS[0], SESSIONS[0]])
+
+        with self.assertRaises(ValueError):
+            Session('x', 'cltu')
+
+        with self.assertRaises(ValueError):
+            self.manager.add_route(lambda name, pdu: None, session='vc9')
@@ -0,0 +1,148 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import unittest
+import mock
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.decoder import decode
+import pyasn1.error
+from pyasn1.type import tag
+
+import ait.dsn.sle
+from ait.dsn.sle.pdu.raf import FrameOrNotification, RafProvidertoUserPdu
+from ait.dsn.sle.stream import TransferBufferDecoder, encode_tag, read_header
+from ait.dsn.sle.test.fixtures import T0, tm_frame, transfer_buffer_pdu
+
+
+def encoded_transfer_buffer(count):
+    ''' Encode a RAF transfer buffer of frames followed by an end of data '''
+    data = [tm_frame(1, 0, i % 256) + b'\x00' * 200 for i in range(count)]
+    return encode(transfer_buffer_pdu([T0] * count, data=data, end_of_data=True))
+
+
+def indefinite(body):
+    ''' Re-encode the outer TLV of a BER value with the indefinite length '''
+    content, length = read_header(bytearray(body), 0)
+    return body[:1] + b'\x80' + body[content:content + length] + b'\x00\x00'
+
+
+class BerHeaderTest(unittest.TestCase):
+
+    def test_encode_tag(self):
+        short = tag.TagSet().tagImplicitly(tag.Tag(tag.tagClassContext, tag.tagFormatConstructed, 8))
+        long_form = tag.TagSet().tagImplicitly(tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 200))
+        self.assertEqual(bytes(encode_tag(short)), b'\xa8')
+        self.assertEqual(bytes(encode_tag(long_form)), b'\x9f\x81\x48')
+
+    def test_read_header(self):
+        self.assertEqual(read_header(bytearray(b'\x04\x02ab'), 0), (2, 2))
+        self.assertEqual(read_header(bytearray(b'\x04\x82\x00\x02ab'), 0), (4, 2))
+        self.assertEqual(read_header(bytearray(b'\x9f\x81\x48\x01a'), 0), (4, 1))
+        self.assertEqual(read_header(bytearray(b'\x30\x80\x00\x00'), 0), (2, None))
+
+        for data in [b'', b'\x04', b'\x04\x82\x00', b'\x04\x05ab']:
+            with self.assertRaises(pyasn1.error.PyAsn1Error):
+                read_header(bytearray(data), 0)
+
+
+class TransferBufferDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = TransferBufferDecoder(RafProvidertoUserPdu, 'rafTransferBuffer', FrameOrNotification)
+        self.body = encoded_transfer_buffer(50)
+        self.expected = list(decode(self.body, asn1Spec=RafProvidertoUserPdu())[0]['rafTransferBuffer'])
+
+    def test_matches(self):
+        self.assertTrue(self.decoder.matches(self.body))
+
+        pdu = RafProvidertoUserPdu()
+        pdu['rafPeerAbortInvocation'] = 1
+        self.assertFalse(self.decoder.matches(encode(pdu)))
+
+    def test_elements_match_full_decode(self):
+        elements = list(self.decoder.iter_elements(self.body))
+        self.assertEqual(len(elements), 51)
+        self.assertEqual(elements, self.expected)
+        self.assertEqual(elements[-1].getName(), 'syncNotification')
+
+    def test_elements_yielded_lazily(self):
+        elements = self.decoder.iter_elements(self.body)
+        with mock.patch('ait.dsn.sle.stream.decode', wraps=decode) as mock_decode:
+            self.assertEqual(next(elements), self.expected[0])
+            self.assertEqual(mock_decode.call_count, 1)
+
+    def test_indefinite_lengths(self):
+        content, length = read_header(bytearray(self.body), 0)
+        first_content, first_length = read_header(bytearray(self.body), content)
+        first = self.body[content:first_content + first_length]
+        rest = self.body[first_content + first_length:content + length]
+
+        body = self.body[:1] + b'\x80' + indefinite(first) + rest + b'\x00\x00'
+        self.assertEqual(list(self.decoder.iter_elements(body)), self.expected)
+
+    @mock.patch('ait.core.log.error')
+    def test_bad_element_skipped(self, mock_error):
+        content, _ = read_header(bytearray(self.body), 0)
+        first_content, first_length = read_header(bytearray(self.body), content)
+
+        # Replace the first element's tag with one the Choice doesn't allow
+        body = bytearray(self.body)
+        body[content] = 0xA5
+        elements = list(self.decoder.iter_elements(bytes(body)))
+
+        self.assertEqual(elements, self.expected[1:])
+        self.assertTrue(mock_error.called)
+
+    def test_truncated_buffer(self):
+        with self.assertRaises(pyasn1.error.PyAsn1Error):
+            list(self.decoder.iter_elements(self.body[:-10]))
+
+
+class StreamingDispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+        self.frames = []
+        self.raf.remove_handler('AnnotatedFrame', self.raf._transfer_data_invoc_handler)
+        self.raf.add_handler('AnnotatedFrame', self.frames.append)
+        self.raf.remove_handler('SyncNotification', self.raf._sync_notify_handler)
+        self.raf.add_handler('SyncNotification', self.frames.append)
+
+    def tearDown(self):
+        self.raf._conn_monitor.kill()
+        self.raf._data_processor.kill()
+        self.raf._telem_sock.close()
+
+    def test_transfer_buffer_streamed(self):
+        self.assertTrue(self.raf._stream_transfer_buffers)
+
+        with mock.patch.object(self.raf, 'decode') as mock_decode:
+            self.raf._process_pdu(encoded_transfer_buffer(5))
+
+        self.assertFalse(mock_decode.called)
+        self.assertEqual(len(self.frames), 6)
+
+    def test_full_decode_with_buffer_handlers(self):
+        buffers = []
+        self.raf.add_handler('RafTransferBuffer', buffers.append)
+        self.assertFalse(self.raf._stream_transfer_buffers)
+
+        self.raf._process_pdu(encoded_transfer_buffer(5))
+        self.assertEqual(len(buffers), 1)
+        self.assertEqual(len(self.frames), 6)
+
+        self.raf.remove_handler('RafTransferBuffer', buffers.append)
+        self.assertTrue(self.raf._stream_transfer_buffers)
@@ -0,0 +1,161 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import datetime as dt
+import unittest
+
+import mock
+
+import ait.dsn.sle
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.cltu import CltuProviderToUserPdu
+from ait.dsn.sle.tracker import CLTUTracker
+
+T0 = dt.datetime(2018, 1, 1)
+
+
+def seconds(n):
+    return T0 + dt.timedelta(seconds=n)
+
+
+def transfer_return(cltu_id, diagnostic=None):
+    pdu = CltuProviderToUserPdu()
+    ret = pdu['cltuTransferDataReturn']
+    ret['performerCredentials']['unused'] = None
+    ret['invokeId'] = 0
+    ret['cltuIdentification'] = cltu_id
+    ret['cltuBufferAvailable'] = 1000
+    if diagnostic is None:
+        ret['result']['positiveResult'] = None
+    else:
+        ret['result']['negativeResult']['specific'] = diagnostic
+    return pdu
+
+
+def async_notify(processed=None, status='productionStarted', start=None, ok=None, stop=None):
+    pdu = CltuProviderToUserPdu()
+    notify = pdu['cltuAsyncNotifyInvocation']
+    notify['invokerCredentials']['unused'] = None
+    notify['cltuNotification']['cltuRadiated'] = None
+
+    if processed is None:
+        notify['cltuLastProcessed']['noCltuProcessed'] = None
+    else:
+        lp = notify['cltuLastProcessed']['cltuProcessed']
+        lp['cltuIdentification'] = processed
+        if start is None:
+            lp['radiationStartTime']['undefined'] = None
+        else:
+            lp['radiationStartTime']['known']['ccsdsFormat'] = ccsdstime.encode_cds(start)
+        lp['cltuStatus'] = status
+
+    if ok is None:
+        notify['cltuLastOk']['noCltuOk'] = None
+    else:
+        lok = notify['cltuLastOk']['cltuOk']
+        lok['cltuIdentification'] = ok
+        lok['radiationStopTime']['ccsdsFormat'] = ccsdstime.encode_cds(stop)
+
+    notify['productionStatus'] = 0
+    notify['uplinkStatus'] = 3
+    return pdu
+
+
+class CLTUTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = T0
+        self.completed = []
+        self.tracker = CLTUTracker(on_complete=self.completed.append, clock=lambda: self.now)
+
+        self.cltu = ait.dsn.sle.CLTU(hostnames=['localhost'], port=5100)
+        self.cltu._cltu_id = 0
+        self.cltu.send_pdu = mock.MagicMock()
+        self.tracker.attach(self.cltu)
+
+    def upload(self, count):
+        return [self.cltu.upload_cltu(bytearray(10)) for _ in range(count)]
+
+    def test_lifecycle(self):
+        self.assertEqual(self.upload(2), [0, 1])
+        self.assertEqual(self.tracker.outstanding(), {'submitted': 2, 'accepted': 0})
+
+        self.now = seconds(0.5)
+        self.cltu._handle_pdu(transfer_return(0))
+        self.cltu._handle_pdu(transfer_return(1))
+        self.assertEqual(self.tracker.outstanding(), {'submitted': 0, 'accepted': 2})
+
+        watched = []
+        self.tracker.watch(1, watched.append)
+
+        self.cltu._handle_pdu(async_notify(processed=1, start=seconds(2)))
+        record = self.tracker.record(1)
+        self.assertEqual(record.status, 'productionStarted')
+        self.assertEqual(record.radiation_start, seconds(2))
+
+        self.cltu._handle_pdu(async_notify(processed=1, status='radiated', start=seconds(2),
+                                           ok=1, stop=seconds(3)))
+        self.assertEqual([r.cltu_id for r in self.completed], [0, 1])
+        self.assertEqual(watched, [record])
+        self.assertEqual(record.status, 'radiated')
+        self.assertEqual(record.latency('radiation_stop'), 3)
+        self.assertIsNone(self.tracker.record(0).radiation_stop)
+        self.assertEqual(self.tracker.outstanding(), {'submitted': 0, 'accepted': 0})
+
+    def test_rejected(self):
+        self.upload(1)
+        self.cltu._handle_pdu(transfer_return(0, diagnostic=5))
+
+        record = self.completed[0]
+        self.assertEqual(record.status, 'rejected')
+        self.assertEqual(record.diagnostic, 'lateSldu')
+
+    def test_expired(self):
+        self.upload(1)
+        self.cltu._handle_pdu(transfer_return(0))
+        self.cltu._handle_pdu(async_notify(processed=0, status='expired'))
+        self.assertEqual(self.completed[0].status, 'expired')
+
+    def test_watch_completed(self):
+        self.upload(1)
+        self.cltu._handle_pdu(transfer_return(0, diagnostic=0))
+        watched = []
+        self.tracker.watch(0, watched.append)
+        self.assertEqual(len(watched), 1)
+
+    def test_latency_percentiles(self):
+        self.assertEqual(self.tracker.latency_percentiles(), {50: None, 90: None, 99: None})
+
+        for i in range(100):
+            self.now = T0
+            self.tracker.submitted(i)
+            self.now = seconds(i + 1)
+            self.tracker._on_transfer_return(transfer_return(i))
+        self.tracker._on_async_notify(async_notify(ok=99, stop=seconds(200)))
+
+        self.assertEqual(len(self.completed), 100)
+        self.assertEqual(self.tracker.latency_percentiles('accepted'), {50: 50, 90: 90, 99: 99})
+        self.assertEqual(self.tracker.latency_percentiles('radiation_stop', (100,)), {100: 200})
+
+    def test_stalled(self):
+        self.upload(2)
+        self.now = seconds(5)
+        self.cltu._handle_pdu(transfer_return(1))
+        self.now = seconds(12)
+        self.assertEqual([r.cltu_id for r in self.tracker.stalled(10)], [0])
+
+    def test_detach(self):
+        self.tracker.detach(self.cltu)
+        self.upload(1)
+        self.assertEqual(self.tracker.outstanding(), {'submitted': 0, 'accepted': 0})
@@ -0,0 +1,136 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2018, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+import struct
+import unittest
+
+import mock
+
+import ait.core.cmd
+from ait.dsn.sle import coding, frames
+from ait.dsn.sle.test.fixtures import config_file
+from ait.dsn.sle.uplink import CommandEncoder, CommandPipeline, load_header_fields, parse_command
+
+# A command with a fixed argument and its own CCSDS header values, which
+# the repository's cmd.yaml doesn't have
+SET_MODE = '''
+- !Command
+  name:   SET_MODE
+  opcode: 0x0010
+  ccsds:
+    apid:    0x55
+    type:    1
+    version: 0
+  arguments:
+    - !Fixed
+      name:  target
+      type:  U8
+      bytes: 0
+      value: 7
+    - !Argument
+      name:  mode
+      type:  U8
+      bytes: 1
+'''
+
+
+def command_dict():
+    ''' Load the repository's cmd.yaml with SET_MODE added '''
+    cmddict = ait.core.cmd.CmdDict(config_file('cmddict'))
+    cmddict.update(ait.core.cmd.CmdDict(SET_MODE))
+    return cmddict
+
+
+def checksum(data):
+    return sum(struct.unpack('>{}H'.format(len(data) // 2), bytes(data))) & 0xFFFF
+
+
+class CommandEncoderTest(unittest.TestCase):
+    def setUp(self):
+        values = {'version': 0, 'type': 1, 'secondary_header_flag': 1, 'sequence_flags': 3,
+                  'checkword_indicator': 1, 'packet_type': 'RT/Payload Command', 'apid': 0x1A}
+        self.encoder = CommandEncoder(command_dict()['SEQ_ENABLE_DISABLE'], load_header_fields(), values)
+
+    def test_packet_layout(self):
+        packet = self.encoder.encode((513, 1), sequence_count=5)
+
+        self.assertEqual(len(packet), 16 + 6 + 2)
+        word0, word1, length = struct.unpack_from('>HHH', bytes(packet))
+        self.assertEqual(word0, 0x1800 | 0x1A)
+        self.assertEqual(word1, 0xC000 | 5)
+        self.assertEqual(length, len(packet) - 7)
+        self.assertEqual(packet[11], 0x20 | 10)
+        self.assertEqual(packet[16:22], b'\x00\x03\x03\x02\x01\x01')
+        self.assertEqual(struct.unpack('>H', bytes(packet[-2:]))[0], checksum(packet[:-2]))
+
+    def test_cached_packet(self):
+        first = self.encoder.encode((1, 0), sequence_count=1)
+        second = self.encoder.encode((1, 0), sequence_count=0x3FFF)
+
+        self.assertEqual(first[:2], second[:2])
+        self.assertEqual(first[4:-2], second[4:-2])
+        self.assertEqual(struct.unpack('>H', bytes(second[2:4]))[0], 0xFFFF)
+        self.assertEqual(struct.unpack('>H', bytes(second[-2:]))[0], checksum(second[:-2]))
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            self.encoder.encode((1,))
+
+    def test_empty_mask_rejected(self):
+        fields = load_header_fields()
+        [f for f in fields if f.name == 'type'][0].mask = 0
+        with self.assertRaises(ValueError):
+            CommandEncoder(command_dict()['NO_OP'], fields, {'type': 1})
+
+
+class CommandPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.generator = coding.CLTUGenerator(10, 2)
+        self.pipeline = CommandPipeline(self.generator, cmddict=command_dict(),
+                                        header_fields=load_header_fields(), apid=0x1A)
+
+    def test_parse_command(self):
+        self.assertEqual(parse_command('SEQ_ENABLE_DISABLE 0x10 1'), ('SEQ_ENABLE_DISABLE', (16, 1)))
+        self.assertEqual(parse_command(('NO_OP',)), ('NO_OP', ()))
+
+    def test_sequence_counts_per_apid(self):
+        packets = self.pipeline.packets(['NO_OP', 'SET_MODE 3', 'NO_OP', ('SET_MODE', 4)])
+        ids = [struct.unpack_from('>HH', bytes(p)) for p in packets]
+
+        self.assertEqual([w0 & 0x7FF for w0, _ in ids], [0x1A, 0x55, 0x1A, 0x55])
+        self.assertEqual([w1 & 0x3FFF for _, w1 in ids], [0, 0, 1, 1])
+        self.assertEqual(packets[1][16:21], b'\x00\x10\x02\x07\x03')
+
+    def test_encoder_cache(self):
+        self.pipeline.packets(['NO_OP', 'NO_OP'])
+        self.assertIs(self.pipeline.encoder('NO_OP'), self.pipeline.encoder('NO_OP'))
+        with self.assertRaises(ValueError):
+            self.pipeline.encoder('BOGUS')
+
+    def test_upload(self):
+        service = mock.MagicMock()
+        count = self.pipeline.upload(['NO_OP', 'SEQ_ENABLE_DISABLE 1 1'], service)
+
+        self.assertEqual(count, 2)
+        cltu = bytes(service.upload_cltu.call_args_list[0][0][0])
+        self.assertTrue(cltu.startswith(coding.START_SEQUENCE))
+
+        blocks = bytearray(cltu[2:-8])
+        data = bytearray()
+        for i in range(0, len(blocks), 8):
+            data += blocks[i:i + 7]
+        frame = frames.TCTransFrame(bytes(data))
+        self.assertTrue(frame.fecf_valid)
+        self.assertEqual(frame['data'], bytes(self.pipeline.encoder('NO_OP').encode((), 0)))
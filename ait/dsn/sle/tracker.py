@@ -0,0 +1,323 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' CLTU Lifecycle Tracking
+
+The ait.dsn.sle.tracker module follows each CLTU sent through an F-CLTU
+service instance from submission to the end of its radiation. Records are
+keyed by CLTU identification and hold the submit, accept, radiation start
+and radiation stop times, from which radiation latency statistics are
+computed.
+
+Submit and accept times are taken from the local clock when the CLTU is
+sent and when its CltuTransferDataReturn is received. Radiation times are
+the provider's, taken from CltuAsyncNotifyInvocation and
+CltuStatusReportInvocation PDUs, so latencies assume both clocks are UTC.
+
+Example:
+
+    tracker = CLTUTracker()
+    tracker.attach(cltu_mngr)
+    cltu_id = cltu_mngr.upload_cltu(cltu, notify=True)
+    tracker.watch(cltu_id, lambda record: log.info(record.status))
+    ...
+    tracker.latency_percentiles('radiation_stop')
+
+Classes:
+    CLTURecord: The lifecycle of one CLTU.
+
+    CLTUTracker: Track CLTUs sent through an F-CLTU service.
+'''
+
+from collections import deque, OrderedDict
+import datetime as dt
+
+import ccsdstime
+
+# CLTU statuses which end a CLTU's lifecycle. 'rejected' is used for
+# CLTUs with a negative CltuTransferDataReturn.
+TERMINAL_STATUSES = frozenset([
+    'radiated', 'expired', 'interrupted', 'productionNotStarted',
+    'unsupportedTransmissionMode', 'rejected'
+])
+
+_STAGES = ('accepted', 'radiation_start', 'radiation_stop')
+
+
+def _decode_time(value):
+    ''''''
+    return ccsdstime.decode(value.getComponent().asOctets())
+
+
+class CLTURecord(object):
+    ''' The lifecycle of one CLTU
+
+    Attributes:
+        cltu_id: The CLTU identification.
+
+        size: The CLTU's size in octets, if known.
+
+        submitted: When the CLTU was sent to the provider.
+
+        accepted: When the provider's positive transfer data return was
+            received.
+
+        radiation_start: The provider's radiation start time.
+
+        radiation_stop: The provider's radiation stop time.
+
+        status: 'submitted', 'accepted', a CLTU status reported by the
+            provider, such as 'productionStarted' or 'radiated', or
+            'rejected'.
+
+        diagnostic: The diagnostic of a rejected CLTU.
+
+        updated: When the record last changed, by the local clock.
+    '''
+    __slots__ = ('cltu_id', 'size', 'submitted', 'accepted', 'radiation_start',
+                 'radiation_stop', 'status', 'diagnostic', 'updated')
+
+    def __init__(self, cltu_id, size=None, submitted=None):
+        self.cltu_id = cltu_id
+        self.size = size
+        self.submitted = submitted
+        self.accepted = None
+        self.radiation_start = None
+        self.radiation_stop = None
+        self.status = 'submitted'
+        self.diagnostic = None
+        self.updated = submitted
+
+    @property
+    def complete(self):
+        ''' Whether the CLTU's lifecycle has ended '''
+        return self.status in TERMINAL_STATUSES
+
+    def latency(self, stage):
+        ''' Return the seconds from submission to a stage, or None if unknown
+
+        Arguments:
+            stage (string):
+                One of 'accepted', 'radiation_start' or 'radiation_stop'.
+        '''
+        end = getattr(self, stage)
+        if end is None or self.submitted is None:
+            return None
+        return (end - self.submitted).total_seconds()
+
+    def __repr__(self):
+        return '<CLTURecord {} {}>'.format(self.cltu_id, self.status)
+
+
+class CLTUTracker(object):
+    ''' Track the CLTUs sent through an F-CLTU service
+
+    Arguments:
+        on_complete (optional callable):
+            Called with the :class:`CLTURecord` of every CLTU whose
+            lifecycle ends.
+
+        max_completed (optional integer):
+            The number of completed records kept for statistics. Defaults
+            to 10000.
+
+        clock (optional callable):
+            Returns the current UTC time as a datetime. Defaults to
+            :meth:`datetime.datetime.utcnow`.
+    '''
+    def __init__(self, on_complete=None, max_completed=10000, clock=None):
+        self._on_complete = on_complete
+        self._clock = clock or dt.datetime.utcnow
+
+        self._outstanding = OrderedDict()
+        self._completed = deque(maxlen=max_completed)
+        self._watchers = {}
+
+    def attach(self, service):
+        ''' Track the CLTUs sent through a CLTU instance '''
+        service.tracker = self
+        service.add_handler('CltuTransferDataReturn', self._on_transfer_return)
+        service.add_handler('CltuAsyncNotifyInvocation', self._on_async_notify)
+        service.add_handler('CltuStatusReportInvocation', self._on_status_report)
+
+    def detach(self, service):
+        ''' Stop tracking the CLTUs sent through a CLTU instance '''
+        service.tracker = None
+        service.remove_handler('CltuTransferDataReturn', self._on_transfer_return)
+        service.remove_handler('CltuAsyncNotifyInvocation', self._on_async_notify)
+        service.remove_handler('CltuStatusReportInvocation', self._on_status_report)
+
+    def submitted(self, cltu_id, size=None):
+        ''' Record that a CLTU was sent. Called by the CLTU instance. '''
+        record = CLTURecord(cltu_id, size, self._clock())
+        self._outstanding[cltu_id] = record
+        return record
+
+    def watch(self, cltu_id, callback):
+        ''' Call a callback with a CLTU's record once its lifecycle ends
+
+        If the CLTU has already completed the callback is called
+        immediately.
+        '''
+        record = self.record(cltu_id)
+        if record is not None and record.complete:
+            callback(record)
+        else:
+            self._watchers.setdefault(cltu_id, []).append(callback)
+
+    def record(self, cltu_id):
+        ''' Return the record of an outstanding or recently completed CLTU '''
+        record = self._outstanding.get(cltu_id)
+        if record is None:
+            for record in reversed(self._completed):
+                if record.cltu_id == cltu_id:
+                    return record
+            return None
+        return record
+
+    def outstanding(self):
+        ''' Return the number of outstanding CLTUs by status '''
+        counts = {'submitted': 0, 'accepted': 0}
+        for record in self._outstanding.values():
+            counts[record.status] = counts.get(record.status, 0) + 1
+        return counts
+
+    def stalled(self, timeout):
+        ''' Return the outstanding records unchanged for longer than a timeout
+
+        Arguments:
+            timeout (number):
+                The number of seconds a record may go without an update.
+        '''
+        limit = self._clock() - dt.timedelta(seconds=timeout)
+        return [r for r in self._outstanding.values() if r.updated < limit]
+
+    def latencies(self, stage='radiation_stop'):
+        ''' Return the latencies in seconds from submission to a stage
+
+        Arguments:
+            stage (optional string):
+                One of 'accepted', 'radiation_start' or 'radiation_stop'.
+                Defaults to 'radiation_stop'.
+
+        Returns:
+            A list with the latency of each completed CLTU for which it is
+            known, oldest first.
+        '''
+        if stage not in _STAGES:
+            raise ValueError('Unknown stage {}'.format(stage))
+
+        return [
+            latency for latency in (r.latency(stage) for r in self._completed)
+            if latency is not None
+        ]
+
+    def latency_percentiles(self, stage='radiation_stop', percentiles=(50, 90, 99)):
+        ''' Return latency percentiles from submission to a stage
+
+        Percentiles use the nearest rank method over the completed CLTUs.
+
+        Returns:
+            A dictionary mapping each percentile to a latency in seconds,
+            or None if no latencies are known.
+        '''
+        values = sorted(self.latencies(stage))
+        if not values:
+            return dict((p, None) for p in percentiles)
+
+        result = {}
+        for p in percentiles:
+            rank = max(int(-(-p * len(values) // 100)), 1)
+            result[p] = values[min(rank, len(values)) - 1]
+        return result
+
+    def status(self):
+        ''' Return a summary of outstanding counts and latency percentiles '''
+        return {
+            'outstanding': self.outstanding(),
+            'completed': len(self._completed),
+            'latency': dict((s, self.latency_percentiles(s)) for s in _STAGES),
+        }
+
+    def _complete(self, record, status):
+        ''''''
+        record.status = status
+        self._outstanding.pop(record.cltu_id, None)
+        self._completed.append(record)
+
+        for callback in self._watchers.pop(record.cltu_id, []):
+            callback(record)
+        if self._on_complete is not None:
+            self._on_complete(record)
+
+    def _on_transfer_return(self, pdu):
+        ''''''
+        pdu = pdu['cltuTransferDataReturn']
+        record = self._outstanding.get(int(pdu['cltuIdentification']))
+        if record is None:
+            return
+
+        now = self._clock()
+        record.updated = now
+        result = pdu['result']
+        if result.getName() == 'positiveResult':
+            record.accepted = now
+            if record.status == 'submitted':
+                record.status = 'accepted'
+        else:
+            diag = result.getComponent().getComponent()
+            record.diagnostic = diag.prettyPrint()
+            self._complete(record, 'rejected')
+
+    def _on_async_notify(self, pdu):
+        ''''''
+        self._update(pdu['cltuAsyncNotifyInvocation'])
+
+    def _on_status_report(self, pdu):
+        ''''''
+        self._update(pdu['cltuStatusReportInvocation'])
+
+    def _update(self, pdu):
+        ''''''
+        now = self._clock()
+
+        if pdu['cltuLastProcessed'].getName() == 'cltuProcessed':
+            processed = pdu['cltuLastProcessed'].getComponent()
+            record = self._outstanding.get(int(processed['cltuIdentification']))
+            if record is not None:
+                record.updated = now
+                if processed['radiationStartTime'].getName() == 'known':
+                    record.radiation_start = _decode_time(processed['radiationStartTime'].getComponent())
+
+                status = processed['cltuStatus'].prettyPrint()
+                if status in TERMINAL_STATUSES and status != 'radiated':
+                    self._complete(record, status)
+                elif status != 'radiated':
+                    record.status = status
+
+        if pdu['cltuLastOk'].getName() == 'cltuOk':
+            ok = pdu['cltuLastOk'].getComponent()
+            last_ok = int(ok['cltuIdentification'])
+            stop = _decode_time(ok['radiationStopTime'])
+
+            # CLTUs are radiated in order, so every earlier accepted CLTU
+            # has been radiated too, though its stop time is unknown.
+            for record in list(self._outstanding.values()):
+                if record.cltu_id == last_ok:
+                    record.radiation_stop = stop
+                elif record.cltu_id > last_ok or record.accepted is None:
+                    continue
+                record.updated = now
+                self._complete(record, 'radiated')
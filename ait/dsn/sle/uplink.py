@@ -0,0 +1,441 @@
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Command Uplink Pipeline
+
+The ait.dsn.sle.uplink module turns commands from the AIT command
+dictionary (``cmd.yaml``) into CCSDS command packets, TC Transfer Frames and
+CLTUs and uploads them through an F-CLTU service instance.
+
+Packet headers are laid out according to the packet definition in
+``ccsds_header.yaml``. Each command is compiled once into a
+:class:`CommandEncoder` holding a packet template with the header, opcode
+and fixed arguments already in place. Encoders are cached per opcode and
+the packets for previously seen argument values are cached per encoder, so
+a repeated command only costs a copy of the cached packet, a patch of its
+sequence count and an update of its checkword.
+
+Example:
+
+    pipeline = CommandPipeline(CLTUGenerator(250, 0), apid=0x1A)
+    cltus = pipeline.encode_sequence(['NO_OP', 'SEQ_START 3'])
+    pipeline.upload(['NO_OP', 'SEQ_START 3'], cltu_mngr)
+
+Classes:
+    CommandEncoder: Encode one command definition as CCSDS packets.
+
+    CommandPipeline: Resolve commands by name and encode them as packets
+        and CLTUs.
+
+Functions:
+    load_header_fields: Load the packet header field definitions from
+        ``ccsds_header.yaml``.
+
+    parse_command: Split a command string into its name and arguments.
+'''
+
+import binascii
+import os
+import struct
+
+import ait.core
+import ait.core.log
+
+_WORD = struct.Struct('>H')
+
+# Header values for commands unless overridden: a type 1 primary header
+# with a secondary header, unsegmented, with a checkword, as a
+# real-time payload command.
+DEFAULT_HEADER_VALUES = {
+    'version': 0,
+    'type': 1,
+    'secondary_header_flag': 1,
+    'sequence_flags': 3,
+    'time_id': 0,
+    'checkword_indicator': 1,
+    'packet_type': 10,
+}
+
+
+def load_header_fields(filename=None):
+    ''' Load the packet header field definitions from ccsds_header.yaml
+
+    Arguments:
+        filename (optional string):
+            The YAML file defining the header packet. Defaults to the
+            ``dsn.sle.uplink.ccsds_header`` config value, or
+            ``ccsds_header.yaml`` next to the config file.
+
+    Returns:
+        The header packet's list of :class:`ait.core.tlm.FieldDefinition`.
+    '''
+    import ait.core.tlm
+
+    if filename is None:
+        filename = ait.config.get(
+            'dsn.sle.uplink.ccsds_header',
+            os.path.join(ait.config._directory, 'ccsds_header.yaml')
+        )
+
+    tlmdict = ait.core.tlm.TlmDict(filename)
+    if len(tlmdict) != 1:
+        raise ValueError('{} must define exactly one packet'.format(filename))
+
+    return list(tlmdict.values())[0].fields
+
+
+def parse_command(command):
+    ''' Split a command string such as "SEQ_START 3" into a name and arguments
+
+    Arguments are converted to numbers where possible, as done by
+    :meth:`ait.core.cmd.CmdDict.create`. Tuples and lists of a name followed
+    by its arguments are returned unchanged as (name, args).
+    '''
+    if isinstance(command, (tuple, list)):
+        return command[0], tuple(command[1:])
+
+    tokens = command.split()
+    return tokens[0], tuple(_to_number(t) for t in tokens[1:])
+
+
+def _to_number(token):
+    ''''''
+    for convert in (lambda t: int(t, 0), float):
+        try:
+            return convert(token)
+        except ValueError:
+            pass
+    return token
+
+
+def _field_slice(field):
+    ''''''
+    if isinstance(field.bytes, int):
+        return field.bytes, field.bytes + 1
+    return field.bytes[0], field.bytes[1] + 1
+
+
+def _encode_field(data, field, value):
+    ''''''
+    if field.enum and isinstance(value, basestring):
+        names = dict((v, k) for k, v in field.enum.items())
+        if value not in names:
+            raise ValueError('Invalid value {} for header field {}'.format(value, field.name))
+        value = names[value]
+
+    start, stop = _field_slice(field)
+    width = (stop - start) * 8
+    mask = field.mask if field.mask is not None else (1 << width) - 1
+    if not mask:
+        raise ValueError('Header field {} has an empty mask'.format(field.name))
+
+    shift = 0
+    while not (mask >> shift) & 1:
+        shift += 1
+
+    if value < 0 or (value << shift) & ~mask:
+        raise ValueError('Value {} does not fit header field {}'.format(value, field.name))
+
+    current = int(binascii.hexlify(data[start:stop]), 16)
+    current = (current & ~mask) | (value << shift)
+    data[start:stop] = binascii.unhexlify('{:0{}x}'.format(current, width // 4))
+
+
+def _checksum(data):
+    ''''''
+    return sum(struct.unpack('>{}H'.format(len(data) // 2), bytes(data))) & 0xFFFF
+
+
+class CommandEncoder(object):
+    ''' Encode one command definition as CCSDS packets
+
+    The packet is the header described by the header fields, followed by
+    the command as encoded by :meth:`ait.core.cmd.Cmd.encode` (opcode,
+    argument size and arguments), zero padded to an even length, followed
+    by a checkword if the header's ``checkword_indicator`` is set. The
+    checkword is the 16 bit sum without carry of all preceding words.
+
+    Arguments:
+        defn:
+            The :class:`ait.core.cmd.CmdDefn` to encode.
+
+        header_fields (list):
+            The header's :class:`ait.core.tlm.FieldDefinition` list. The
+            ``apid``, ``sequence_count`` and ``packet_length`` fields are
+            filled in by the encoder.
+
+        header_values (dict):
+            Values for the other header fields, by name. A ``ccsds`` block
+            in the command definition overrides ``apid``, ``type`` and
+            ``version``.
+
+        pad (optional integer):
+            The minimum size of the command after the header, as for
+            :meth:`ait.core.cmd.Cmd.encode`. Defaults to 0.
+
+        cache_size (optional integer):
+            The number of distinct argument values whose packets are
+            cached. Defaults to 1024.
+    '''
+    def __init__(self, defn, header_fields, header_values, pad=0, cache_size=1024):
+        self.defn = defn
+        self._cache_size = cache_size
+        self._cache = {}
+
+        fields = dict((f.name, f) for f in header_fields)
+        for name in ('apid', 'sequence_count', 'packet_length'):
+            if name not in fields:
+                raise ValueError('Header definition has no {} field'.format(name))
+
+        values = dict(header_values)
+        ccsds = getattr(defn, 'ccsds', None)
+        if ccsds is not None:
+            values.update(apid=ccsds.apid, type=ccsds.type, version=ccsds.version)
+
+        header_size = max(_field_slice(f)[1] for f in header_fields)
+        seq_start, seq_stop = _field_slice(fields['sequence_count'])
+        if seq_stop - seq_start != _WORD.size or seq_start % 2:
+            raise ValueError('Header sequence_count field must be an aligned 16 bit word')
+        self._seq_offset = seq_start
+        self._seq_mask = fields['sequence_count'].mask or 0xFFFF
+
+        # The opcode, argument size and fixed arguments never change, so
+        # the template holds everything but the variable arguments, the
+        # sequence count and the checkword.
+        body_size = max(3 + defn.argsize, pad)
+        body_size += body_size % 2
+        self._checkword = bool(values.get('checkword_indicator'))
+        size = header_size + body_size + (_WORD.size if self._checkword else 0)
+
+        values['packet_length'] = size - 7
+        values['sequence_count'] = 0
+        template = bytearray(size)
+        for name, value in values.items():
+            if name in fields:
+                _encode_field(template, fields[name], value)
+
+        template[header_size:header_size + 2] = _WORD.pack(defn.opcode)
+        template[header_size + 2] = defn.argsize
+
+        self._args = []
+        for arg in defn.argdefns:
+            if arg.fixed:
+                template[arg.slice(header_size + 3)] = arg.encode(arg.value)
+            else:
+                self._args.append((arg.slice(header_size + 3), arg))
+
+        self._template = template
+        self._end = size - _WORD.size if self._checkword else size
+
+    @property
+    def nargs(self):
+        ''' The number of arguments the command takes '''
+        return len(self._args)
+
+    def encode(self, args=(), sequence_count=0):
+        ''' Encode the command as a packet
+
+        Arguments:
+            args (optional tuple):
+                The command's argument values, excluding fixed arguments.
+
+            sequence_count (optional integer):
+                The packet sequence count.
+
+        Returns:
+            The packet as a bytearray.
+
+        Raises:
+            ValueError: If the wrong number of arguments is given.
+        '''
+        entry = self._cache.get(args)
+        if entry is None:
+            entry = self._compile(args)
+
+        packet = bytearray(entry[0])
+        offset = self._seq_offset
+        mask = self._seq_mask
+        word = (_WORD.unpack_from(packet, offset)[0] & ~mask) | (sequence_count & mask)
+        _WORD.pack_into(packet, offset, word)
+
+        if self._checkword:
+            # The cached sum excludes the word holding the sequence count.
+            _WORD.pack_into(packet, self._end, (entry[1] + word) & 0xFFFF)
+
+        return packet
+
+    def _compile(self, args):
+        ''''''
+        if len(args) != len(self._args):
+            raise ValueError('{} takes {} arguments but {} were given'.format(
+                self.defn.name, len(self._args), len(args)))
+
+        packet = bytearray(self._template)
+        for (where, arg), value in zip(self._args, args):
+            packet[where] = arg.encode(value)
+
+        offset = self._seq_offset
+        partial = (
+            _checksum(packet[:offset]) +
+            _checksum(packet[offset + _WORD.size:self._end])
+        ) & 0xFFFF
+
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+
+        entry = (bytes(packet), partial)
+        self._cache[args] = entry
+        return entry
+
+
+class CommandPipeline(object):
+    ''' Resolve commands by name and encode them as packets and CLTUs
+
+    Commands are given either as strings, e.g. ``"SEQ_START 3"``, or as a
+    name followed by its arguments, e.g. ``("SEQ_START", 3)``. Packet
+    sequence counts are kept per APID.
+
+    Arguments:
+        generator (:class:`ait.dsn.sle.coding.CLTUGenerator`):
+            The generator used to wrap packets in frames and CLTUs.
+
+        cmddict (optional :class:`ait.core.cmd.CmdDict`):
+            The command dictionary. Defaults to the AIT default command
+            dictionary.
+
+        header_fields (optional list):
+            The packet header field definitions. Defaults to those loaded
+            by :func:`load_header_fields`.
+
+        pad (optional integer):
+            The minimum size of each command after the header. Defaults to
+            0.
+
+        cache_size (optional integer):
+            The number of distinct command strings, and of distinct
+            argument values per command, whose encodings are cached.
+            Defaults to 1024.
+
+        header_values:
+            Any additional keyword arguments are header field values,
+            overriding :data:`DEFAULT_HEADER_VALUES`, e.g. ``apid``.
+    '''
+    def __init__(self, generator, cmddict=None, header_fields=None, pad=0, cache_size=1024,
+                 **header_values):
+        if cmddict is None:
+            import ait.core.cmd
+            cmddict = ait.core.cmd.getDefaultDict()
+
+        if header_fields is None:
+            header_fields = load_header_fields()
+
+        self._generator = generator
+        self._cmddict = cmddict
+        self._header_fields = header_fields
+        self._pad = pad
+
+        self._header_values = dict(DEFAULT_HEADER_VALUES)
+        self._header_values.setdefault('apid', 0)
+        self._header_values.update(header_values)
+
+        self._encoders = {}
+        self._resolved = {}
+        self._cache_size = cache_size
+        self._sequence_counts = {}
+
+    def encoder(self, name):
+        ''' Return the cached encoder for a command, compiling it if needed
+
+        Raises:
+            ValueError: If the command is not in the dictionary.
+        '''
+        defn = self._cmddict.get(name)
+        if defn is None:
+            raise ValueError('Unrecognized command: {}'.format(name))
+
+        encoder = self._encoders.get(defn.opcode)
+        if encoder is None:
+            encoder = CommandEncoder(defn, self._header_fields, self._header_values,
+                                     pad=self._pad, cache_size=self._cache_size)
+            self._encoders[defn.opcode] = encoder
+        return encoder
+
+    def packet(self, command):
+        ''' Encode a command as a CCSDS packet with the next sequence count '''
+        if isinstance(command, list):
+            command = tuple(command)
+
+        resolved = self._resolved.get(command)
+        if resolved is None:
+            resolved = self._resolve(command)
+
+        encoder, args, apid = resolved
+        count = self._sequence_counts.get(apid, 0)
+        self._sequence_counts[apid] = (count + 1) & 0x3FFF
+
+        return encoder.encode(args, count)
+
+    def packets(self, commands):
+        ''' Encode a sequence of commands as CCSDS packets '''
+        packet = self.packet
+        return [packet(c) for c in commands]
+
+    def encode(self, command):
+        ''' Encode a command as a list of CLTUs '''
+        return self._generator.encode(self.packet(command))
+
+    def encode_sequence(self, commands):
+        ''' Encode a sequence of commands as a flat list of CLTUs '''
+        return self._generator.encode_batch(self.packets(commands))
+
+    def _resolve(self, command):
+        ''''''
+        name, args = parse_command(command)
+        encoder = self.encoder(name)
+
+        ccsds = getattr(encoder.defn, 'ccsds', None)
+        apid = ccsds.apid if ccsds is not None else self._header_values['apid']
+
+        if len(self._resolved) >= self._cache_size:
+            self._resolved.clear()
+
+        resolved = (encoder, args, apid)
+        self._resolved[command] = resolved
+        return resolved
+
+    def upload(self, commands, service, **upload_kwargs):
+        ''' Encode commands and upload the CLTUs through an F-CLTU service
+
+        Arguments:
+            commands:
+                The commands to send, in order.
+
+            service (:class:`ait.dsn.sle.cltu.CLTU`):
+                An active F-CLTU service.
+
+            upload_kwargs:
+                Any additional keyword arguments are passed to the
+                service's upload_cltu method.
+
+        Returns:
+            The number of CLTUs uploaded.
+        '''
+        commands = list(commands)
+        cltus = self.encode_sequence(commands)
+        for cltu in cltus:
+            service.upload_cltu(bytearray(cltu), **upload_kwargs)
+
+        ait.core.log.info('Uploaded {} commands in {} CLTUs'.format(len(commands), len(cltus)))
+        return len(cltus)
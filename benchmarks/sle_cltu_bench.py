@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' CLTU generation benchmark
+
+Measures how many command packets per second can be wrapped in TC Transfer
+Frames and encoded as CLTUs, and compares the table driven BCH encoder
+with a bit at a time implementation.
+
+Usage:
+    python benchmarks/sle_cltu_bench.py [--packets N] [--packet-size N] [--randomise] [--repeat N]
+'''
+
+import argparse
+import timeit
+
+from ait.dsn.sle import coding
+
+
+def bch_parity_bitwise(block):
+    reg = 0
+    for octet in bytearray(block):
+        for bit in range(7, -1, -1):
+            feedback = ((reg >> 6) ^ (octet >> bit)) & 1
+            reg = (reg << 1) & 0x7F
+            if feedback:
+                reg ^= 0x45
+    return ((~reg) & 0x7F) << 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--packets', type=int, default=10000)
+    parser.add_argument('--packet-size', type=int, default=64)
+    parser.add_argument('--randomise', action='store_true')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    packets = [bytes(bytearray([i & 0xFF]) * args.packet_size) for i in range(args.packets)]
+    generator = coding.CLTUGenerator(250, 0, randomised=args.randomise)
+
+    frame = generator.frames(packets[0])[0].encode()
+    blocks = [bytearray(frame[i:i + 7]) for i in range(0, len(frame) - 6, 7)] * 100
+
+    results = [
+        ('cltus', args.packets, lambda: generator.encode_batch(packets)),
+        ('bch table', len(blocks), lambda: [coding.bch_parity(b) for b in blocks]),
+        ('bch bitwise', len(blocks), lambda: [bch_parity_bitwise(b) for b in blocks]),
+    ]
+
+    print('{} packets of {} bytes'.format(args.packets, args.packet_size))
+    for name, count, func in results:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print('{:<12} {:>12.0f} /s'.format(name, count / best))
+
+
+if __name__ == '__main__':
+    main()
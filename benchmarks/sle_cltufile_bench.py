@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' CLTU container file benchmark
+
+Compares saving CLTU PDUs one file per CLTU with save_to_file against
+saving them to a single container file, and times replaying the container
+into a discarding socket.
+
+Usage:
+    python benchmarks/sle_cltufile_bench.py [--cltus N] [--cltu-size N]
+'''
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+import ait.dsn.sle
+from ait.dsn.sle.cltufile import CLTUFileReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cltus', type=int, default=5000)
+    parser.add_argument('--cltu-size', type=int, default=200)
+    args = parser.parse_args()
+
+    cltu = ait.dsn.sle.CLTU(hostnames=['localhost'], port=5100)
+    cltu._write_buffers = lambda buffers: None
+    data = [bytearray([i & 0xFF]) * args.cltu_size for i in range(args.cltus)]
+    tmpdir = tempfile.mkdtemp()
+
+    try:
+        def single_files():
+            for i, d in enumerate(data):
+                cltu.save_to_file(os.path.join(tmpdir, '{}.cltu'.format(i)), d)
+
+        path = os.path.join(tmpdir, 'batch.cltu')
+
+        def container():
+            cltu.save_batch_to_file(path, data)
+
+        def replay():
+            reader = CLTUFileReader(path)
+            cltu._cltu_id = reader.cltu_ids[0]
+            reader.replay(cltu, buffer_available=args.cltus * args.cltu_size)
+            reader.close()
+
+        print('{} CLTUs of {} bytes'.format(args.cltus, args.cltu_size))
+        for name, func in [('one file each', single_files), ('container', container),
+                           ('replay', replay)]:
+            elapsed = timeit.timeit(func, number=1)
+            print('{:<14} {:>10.1f} ms'.format(name, elapsed * 1e3))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
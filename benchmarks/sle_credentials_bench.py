@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' ISP1 credential generation benchmark
+
+Measures the cost of generating and verifying ISP1 credentials with the
+cached generator, and compares it against building and encoding the
+HashInput and ISP1Credentials sequences with PyASN1 on every call.
+
+Usage:
+    python benchmarks/sle_credentials_bench.py [--number N] [--repeat N]
+'''
+
+import argparse
+import datetime as dt
+import hashlib
+import timeit
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.encoder import encode as der_encode
+
+from ait.dsn.sle import ccsdstime
+from ait.dsn.sle.isp1 import CredentialGenerator
+from ait.dsn.sle.pdu.common import HashInput, ISP1Credentials
+
+
+def legacy_credentials(current_time, random_number, username, password):
+    ''' The PyASN1 based generation used before the cached generator '''
+    hash_input = HashInput()
+    credential_time = ccsdstime.encode_cds(current_time)
+
+    hash_input['time'] = credential_time
+    hash_input['randomNumber'] = random_number
+    hash_input['username'] = username
+    hash_input['password'] = password
+    der_encoded_hash_input = der_encode(hash_input)
+    the_protected = bytearray.fromhex(hashlib.sha1(der_encoded_hash_input).hexdigest())
+
+    isp1_creds = ISP1Credentials()
+    isp1_creds['time'] = credential_time
+    isp1_creds['randomNumber'] = random_number
+    isp1_creds['theProtected'] = the_protected
+
+    return encode(isp1_creds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--number', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    now = dt.datetime.utcnow()
+    gen = CredentialGenerator('LSE', 'password')
+    creds = gen.generate(now, 123456789)
+
+    results = [
+        ('legacy generate', lambda: legacy_credentials(now, 123456789, 'LSE', 'password')),
+        ('cached generate', lambda: gen.generate(now, 123456789)),
+        ('cached verify', lambda: gen.verify(creds)),
+    ]
+
+    for name, func in results:
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        print('{:<20} {:>8.3f} us/call'.format(name, best / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Packet decommutation benchmark
+
+Compares decoding telemetry packets one at a time with struct against
+decoding them in batches into NumPy columns.
+
+Usage:
+    python benchmarks/sle_decom_bench.py [--packets N] [--fields N] [--repeat N]
+'''
+
+import argparse
+import struct
+import timeit
+
+from ait.core.tlm import FieldDefinition, PacketDefinition
+from ait.dsn.sle.decom import PacketDecoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--packets', type=int, default=100000)
+    parser.add_argument('--fields', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    fields = [FieldDefinition(name='time', type='TIME64')]
+    fields += [FieldDefinition(name='field_{}'.format(i), type='MSB_U16', mask=0x3FFF) for i in range(args.fields)]
+    decoder = PacketDecoder(PacketDefinition(name='Bench_Packet', fields=fields), offset=6)
+
+    packets = [
+        struct.pack('>6xII', i, 0) + struct.pack('>{}H'.format(args.fields), *[i & 0xFFFF] * args.fields)
+        for i in range(args.packets)
+    ]
+    erts = list(range(args.packets))
+
+    results = [
+        ('struct', lambda: [decoder.decode_one(p) for p in packets]),
+        ('numpy batch', lambda: decoder.decode(packets, erts)),
+    ]
+
+    print('{} packets of {} fields'.format(args.packets, args.fields + 1))
+    for name, func in results:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print('{:<12} {:>12.0f} packets/s'.format(name, args.packets / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Per-frame SLE PDU dispatch benchmark
+
+Measures the cost of dispatching every element of a decoded RAF transfer
+buffer to its handlers using the compiled dispatch tables, and compares it
+against the previous name based lookup.
+
+Usage:
+    python benchmarks/sle_dispatch_bench.py [--frames N] [--repeat N]
+'''
+
+import argparse
+from collections import defaultdict
+import timeit
+
+import ait.dsn.sle
+from ait.dsn.sle.test.fixtures import T0, make_transfer_buffer
+
+
+def legacy_dispatch(handlers, frames):
+    ''' The name based dispatch used before the dispatch tables '''
+    for pdu in frames:
+        pdu_key = pdu.getName()
+        pdu_key = pdu_key[:1].upper() + pdu_key[1:]
+        if pdu_key in handlers:
+            for h in handlers[pdu_key]:
+                h(pdu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    counter = [0]
+    def on_frame(pdu):
+        counter[0] += 1
+
+    raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+    raf.remove_handler('AnnotatedFrame', raf._transfer_data_invoc_handler)
+    raf.add_handler('AnnotatedFrame', on_frame)
+
+    legacy_handlers = defaultdict(list)
+    legacy_handlers['AnnotatedFrame'].append(on_frame)
+
+    frames = list(make_transfer_buffer([T0] * args.frames, data=[b'\x00' * 1115] * args.frames))
+
+    results = [
+        ('legacy name lookup', lambda: legacy_dispatch(legacy_handlers, frames)),
+        ('compiled dispatch', lambda: raf._handle_frames(frames)),
+    ]
+
+    for name, func in results:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print('{:<20} {:>8.3f} us/frame'.format(name, best / args.frames * 1e6))
+
+    raf._conn_monitor.kill()
+    raf._data_processor.kill()
+    raf._telem_sock.close()
+
+
+if __name__ == '__main__':
+    main()
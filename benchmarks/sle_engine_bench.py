@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' SLE engine throughput benchmark
+
+Serves RAF transfer buffers from a local TCP server and measures how
+quickly the gevent and asyncio engines receive, decode and dispatch the
+frames they contain.
+
+Usage:
+    python benchmarks/sle_engine_bench.py [--buffers N] [--frames N]
+'''
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+import gevent
+from pyasn1.codec.ber.encoder import encode
+
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+import ait.dsn.sle
+from ait.dsn.sle import common
+from ait.dsn.sle.test.fixtures import T0, transfer_buffer_pdu
+
+
+def make_transfer_buffer_message(num_frames):
+    pdu = transfer_buffer_pdu([T0] * num_frames, data=[b'\x00' * 1115] * num_frames)
+    body = encode(pdu)
+    return struct.pack(common.TML_SLE_FORMAT, common.TML_SLE_TYPE, len(body)) + body
+
+
+def serve(num_buffers, message):
+    ''' Start a one shot provider that streams num_buffers messages '''
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def run():
+        conn, _ = server.accept()
+        conn.recv(20)
+        for _ in range(num_buffers):
+            conn.sendall(message)
+        time.sleep(1)
+        conn.close()
+        server.close()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1]
+
+
+def make_raf(port, counter, **kwargs):
+    raf = ait.dsn.sle.RAF(hostnames=['127.0.0.1'], port=port, **kwargs)
+    raf._hostnames = ['127.0.0.1']
+    raf._port = port
+    raf.remove_handler('AnnotatedFrame', raf._transfer_data_invoc_handler)
+    raf.add_handler('AnnotatedFrame', lambda pdu: counter.append(1))
+    return raf
+
+
+def run_gevent(num_buffers, num_frames, message):
+    counter = []
+    raf = make_raf(serve(num_buffers, message), counter)
+
+    start = time.time()
+    raf.connect()
+    while len(counter) < num_buffers * num_frames:
+        gevent.sleep(0)
+    elapsed = time.time() - start
+
+    raf.disconnect()
+    return elapsed
+
+
+def run_asyncio(num_buffers, num_frames, message):
+    counter = []
+    loop = asyncio.new_event_loop()
+    raf = make_raf(serve(num_buffers, message), counter, engine='asyncio', loop=loop)
+    done = asyncio.Future(loop=loop)
+
+    def check():
+        if len(counter) >= num_buffers * num_frames:
+            done.set_result(None)
+        else:
+            loop.call_soon(check)
+
+    start = time.time()
+    raf.connect()
+    loop.call_soon(check)
+    loop.run_until_complete(done)
+    elapsed = time.time() - start
+
+    raf.disconnect()
+    loop.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--buffers', type=int, default=200)
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    message = make_transfer_buffer_message(args.frames)
+    total = args.buffers * args.frames
+
+    for name, func in [('gevent', run_gevent), ('asyncio', run_asyncio)]:
+        elapsed = func(args.buffers, args.frames, message)
+        print('{:<8} {:>10.0f} frames/s'.format(name, total / elapsed))
+
+
+if __name__ == '__main__':
+    main()
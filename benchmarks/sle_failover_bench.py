@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+
+''' Hot-standby switchover benchmark
+
+Starts an "active" child process which takes the standby lock, kills it
+with SIGKILL and measures how long the standby in this process takes to
+acquire the lock. This is the coordination part of a takeover. Connecting
+to and starting the provider session is additional.
+
+Usage:
+    python benchmarks/sle_failover_bench.py [--repeat N] [--poll-interval S]
+'''
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import gevent
+
+from ait.dsn.sle.failover import StandbyLock
+
+
+def child(lock_path):
+    lock = StandbyLock(lock_path)
+    lock.acquire()
+    sys.stdout.write('locked\n')
+    sys.stdout.flush()
+    while True:
+        time.sleep(1)
+
+
+def switchover(lock_path, poll_interval):
+    proc = subprocess.Popen(
+        [sys.executable, __file__, '--child', lock_path],
+        stdout=subprocess.PIPE
+    )
+    proc.stdout.readline()
+
+    standby = StandbyLock(lock_path)
+    waiter = gevent.spawn(standby.acquire, poll_interval=poll_interval)
+    gevent.sleep(poll_interval * 2)
+
+    killed = time.time()
+    os.kill(proc.pid, signal.SIGKILL)
+    waiter.get()
+    elapsed = time.time() - killed
+
+    proc.wait()
+    standby.release()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    lock_path = os.path.join(tempfile.mkdtemp(), 'bridge.lock')
+    times = sorted(switchover(lock_path, args.poll_interval) for _ in range(args.repeat))
+
+    print('switchover min {:.1f} ms, median {:.1f} ms, max {:.1f} ms'.format(
+        times[0] * 1e3, times[len(times) // 2] * 1e3, times[-1] * 1e3))
+
+
+if __name__ == '__main__':
+    main()
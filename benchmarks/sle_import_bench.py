@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' SLE start-up time benchmark
+
+Measures the wall clock time of a fresh interpreter importing parts of
+the SLE package and reports whether the import patched the socket module.
+
+Usage:
+    python benchmarks/sle_import_bench.py [--repeat N]
+'''
+
+import argparse
+import subprocess
+import sys
+import time
+
+CASES = [
+    ('baseline interpreter', 'pass'),
+    ('import ait.dsn.sle', 'import ait.dsn.sle'),
+    ('import ait.dsn.sle.common', 'import ait.dsn.sle.common'),
+    ('import RAF', 'import ait.dsn.sle.raf'),
+    ('import RAF, RCF, CLTU', 'import ait.dsn.sle.raf, ait.dsn.sle.rcf, ait.dsn.sle.cltu'),
+]
+
+PATCH_CHECK = (
+    'import gevent.monkey; '
+    'import sys; sys.stdout.write(str(gevent.monkey.is_module_patched("socket")))'
+)
+
+
+def run(stmt):
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', stmt])
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, stmt in CASES:
+        times = sorted(run(stmt) for _ in range(args.repeat))
+        print('{:<24} {:>8.1f} ms'.format(name, times[len(times) // 2] * 1e3))
+
+    patched = subprocess.check_output([
+        sys.executable, '-c', 'import ait.dsn.sle.raf; ' + PATCH_CHECK
+    ])
+    print('socket patched on import: {}'.format(patched.decode().strip()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+
+''' Latency tracing benchmark
+
+Measures the cost of dispatching received transfer buffers through a RAF
+instance with no tracer and with a LatencyTracer sampling every frame or
+one frame in a hundred.
+
+Usage:
+    python benchmarks/sle_latency_bench.py [--buffers N] [--repeat N]
+'''
+
+import argparse
+import datetime as dt
+import timeit
+
+import ait.dsn.sle
+from ait.dsn.sle.latency import LatencyTracer
+from ait.dsn.sle.test.fixtures import make_transfer_buffer
+
+FRAMES_PER_BUFFER = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--buffers', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    buf = make_transfer_buffer([dt.datetime.utcnow()] * FRAMES_PER_BUFFER,
+                               data=[b'\x00' * 1115] * FRAMES_PER_BUFFER)
+    raf = ait.dsn.sle.RAF(hostnames=['localhost'], port=5100)
+    raf._handlers.clear()
+    raf._frame_dispatch.clear()
+    raf.add_handler('AnnotatedFrame', lambda frame: None)
+
+    frames = args.buffers * FRAMES_PER_BUFFER
+    for label, tracer in [
+        ('no tracer', None),
+        ('every frame', LatencyTracer()),
+        ('1 in 100', LatencyTracer(sample_every=100)),
+    ]:
+        raf.tracer = tracer
+        best = min(timeit.repeat(
+            lambda: [raf._handle_frames(buf) for _ in range(args.buffers)],
+            number=1, repeat=args.repeat))
+        print('{:12} {:8.1f} ms  {:6.2f} us/frame'.format(
+            label, best * 1000, best * 1e6 / frames))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+# information to foreign countries or providing access to foreign persons.
+
+''' Limit checking benchmark
+
+Compares checking a column of samples against range limits one sample at
+a time, as ait.core.limits does, with checking the whole column with
+LimitChecker.
+
+Usage:
+    python benchmarks/sle_limitcheck_bench.py [--samples N] [--repeat N]
+'''
+
+import argparse
+import timeit
+
+import numpy
+
+from ait.core.limits import LimitDefinition
+from ait.dsn.sle.limitcheck import LimitChecker
+
+
+def check_samples(limit, column):
+    events = []
+    previous = 'ok'
+    for value in column:
+        if limit.error(value):
+            level = 'error'
+        elif limit.warn(value):
+            level = 'warn'
+        else:
+            level = 'ok'
+        if level != previous:
+            events.append((value, level))
+            previous = level
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    limit = LimitDefinition(source='Bench_Packet.voltage', lower={'error': 5.0, 'warn': 10.0},
+                            upper={'error': 45.0, 'warn': 40.0})
+    column = (25 + 22 * numpy.sin(numpy.arange(args.samples) / 500.0)).astype('u2')
+    values = column.tolist()
+
+    def vectorised():
+        LimitChecker([limit], tlmdict={}).check('Bench_Packet', {'voltage': column})
+
+    results = [
+        ('per sample', lambda: check_samples(limit, values)),
+        ('vectorised', vectorised),
+    ]
+
+    print('{} samples'.format(args.samples))
+    for name, func in results:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print('{:<12} {:>14.0f} samples/s'.format(name, args.samples / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+# Advanced Multi-Mission Operations System (AMMOS) Instrument Toolkit (AIT)
+# Bespoke Link to Instruments and Small Satellites (BLISS)
+#
+# Copyright 2017, by the California Institute of Technology. ALL RIGHTS
+# RESERVED. United States Government Sponsorship acknowledged. Any
+# commercial use must be negotiated with the Office of Technology Transfer
+# at the California Institute of Technology.
+#
+# This software may be subject to U.S. export control laws. By accepting
+# this software, the user agrees to comply with all applicable U.S. export
+# laws and regulations. User has the responsibility to obtain export licenses,
+# or other export authority as may be required before exporting such
+
+''' Transfer buffer decoding benchmark
+
+Compares decoding a RAF transfer buffer PDU in one call and iterating over
+its elements with decoding it one element at a time with the streaming
+decoder. Reports the time until the first frame is available and the time
+to handle the whole buffer.
+
+Usage:
+    python benchmarks/sle_stream_bench.py [--frames N] [--frame-size N] [--repeat N]
+'''
+
+import argparse
+import timeit
+
+from pyasn1.codec.ber.encoder import encode
+from pyasn1.codec.der.decoder import decode
+
+from ait.dsn.sle.pdu.raf import FrameOrNotification, RafProvidertoUserPdu
+from ait.dsn.sle.stream import TransferBufferDecoder
+from ait.dsn.sle.test.fixtures import T0, transfer_buffer_pdu
+
+
+def make_buffer(num_frames, frame_size):
+    pdu = transfer_buffer_pdu([T0] * num_frames, data=[b'\x00' * frame_size] * num_frames)
+    return encode(pdu)
+
+
+def full_first(body):
+    buf = decode(body, asn1Spec=RafProvidertoUserPdu())[0]['rafTransferBuffer']
+    return next(iter(buf))
+
+
+def full_all(body):
+    buf = decode(body, asn1Spec=RafProvidertoUserPdu())[0]['rafTransferBuffer']
+    for element in buf:
+        element.getComponent()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--frame-size', type=int, default=1115)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_buffer(args.frames, args.frame_size)
+    decoder = TransferBufferDecoder(RafProvidertoUserPdu, 'rafTransferBuffer', FrameOrNotification)
+
+    def stream_all():
+        for element in decoder.iter_elements(body):
+            element.getComponent()
+
+    results = [
+        ('full first frame', lambda: full_first(body)),
+        ('stream first frame', lambda: next(decoder.iter_elements(body))),
+        ('full buffer', lambda: full_all(body)),
+        ('stream buffer', stream_all),
+    ]
+
+    print('{} frames of {} bytes ({} byte PDU)'.format(args.frames, args.frame_size, len(body)))
+    for name, func in results:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print('{:<20} {:>10.3f} ms'.format(name, best * 1e3))
+
+
+if __name__ == '__main__':
+    main()
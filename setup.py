@@ -53,7 +53,15 @@ setup(
             'nose',
             'coverage',
             'mock',
-            'pylint'
+            'pylint',
+            'trollius; python_version < "3"',
+            'numpy'
+        ],
+        'asyncio': [
+            'trollius; python_version < "3"'
+        ],
+        'numpy': [
+            'numpy'
         ],
     },
 